@@ -17,7 +17,11 @@ from app.models.announcement import Announcement, PromoCode
 from app.models.support import SupportRequest
 from app.models.settings import AppSettings
 from app.models.pricing import DailyPrice, TrafficLog
-from app.models.notification import Notification, FCMToken
+from app.models.notification import Notification, FCMToken, NotificationBroadcast, NotificationBroadcastChunk
+from app.models.rollup import UserDailyStats
+from app.models.platform_stats import PlatformHourlyStats
+from app.models.traffic_series import SessionTrafficBucket
+from app.models.anomaly import SessionAnomaly
 
 # this is the Alembic Config object, which provides
 # access to the values within the .ini file in use.
@@ -0,0 +1,64 @@
+"""Notification broadcast checkpoints
+
+Revision ID: 002
+Revises: 001
+Create Date: 2024-02-01 00:00:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+# revision identifiers, used by Alembic.
+revision = '002'
+down_revision = '001'
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    # Create notification_broadcasts table
+    op.create_table(
+        'notification_broadcasts',
+        sa.Column('id', sa.BigInteger(), nullable=False),
+        sa.Column('key', sa.String(length=100), nullable=False),
+        sa.Column('title', sa.String(length=255), nullable=False),
+        sa.Column('body', sa.Text(), nullable=False),
+        sa.Column('type', sa.String(length=50), nullable=False),
+        sa.Column('data', sa.JSON(), nullable=True),
+        sa.Column('status', sa.String(length=20), nullable=False, server_default='planning'),
+        sa.Column('last_telegram_id', sa.BigInteger(), nullable=False, server_default='0'),
+        sa.Column('total_chunks', sa.Integer(), nullable=False, server_default='0'),
+        sa.Column('completed_chunks', sa.Integer(), nullable=False, server_default='0'),
+        sa.Column('sent', sa.Integer(), nullable=False, server_default='0'),
+        sa.Column('failed', sa.Integer(), nullable=False, server_default='0'),
+        sa.Column('created_at', sa.DateTime(timezone=True), nullable=False, server_default=sa.text('CURRENT_TIMESTAMP')),
+        sa.Column('updated_at', sa.DateTime(timezone=True), nullable=False, server_default=sa.text('CURRENT_TIMESTAMP')),
+        sa.Column('completed_at', sa.DateTime(timezone=True), nullable=True),
+        sa.PrimaryKeyConstraint('id'),
+        sa.UniqueConstraint('key')
+    )
+    
+    # Create notification_broadcast_chunks table
+    op.create_table(
+        'notification_broadcast_chunks',
+        sa.Column('id', sa.BigInteger(), nullable=False),
+        sa.Column('broadcast_id', sa.BigInteger(), nullable=False),
+        sa.Column('chunk_index', sa.Integer(), nullable=False),
+        sa.Column('telegram_ids', sa.JSON(), nullable=False),
+        sa.Column('status', sa.String(length=20), nullable=False, server_default='pending'),
+        sa.Column('sent', sa.Integer(), nullable=False, server_default='0'),
+        sa.Column('failed', sa.Integer(), nullable=False, server_default='0'),
+        sa.Column('created_at', sa.DateTime(timezone=True), nullable=False, server_default=sa.text('CURRENT_TIMESTAMP')),
+        sa.Column('claimed_at', sa.DateTime(timezone=True), nullable=True),
+        sa.Column('completed_at', sa.DateTime(timezone=True), nullable=True),
+        sa.PrimaryKeyConstraint('id'),
+        sa.ForeignKeyConstraint(['broadcast_id'], ['notification_broadcasts.id'], ondelete='CASCADE'),
+        sa.UniqueConstraint('broadcast_id', 'chunk_index', name='uq_broadcast_chunk')
+    )
+    op.create_index('idx_broadcast_chunks_broadcast_id', 'notification_broadcast_chunks', ['broadcast_id'])
+    op.create_index('idx_broadcast_chunks_status', 'notification_broadcast_chunks', ['status'])
+
+
+def downgrade() -> None:
+    op.drop_table('notification_broadcast_chunks')
+    op.drop_table('notification_broadcasts')
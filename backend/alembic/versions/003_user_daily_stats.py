@@ -0,0 +1,58 @@
+"""Per-user daily stats rollup
+
+Revision ID: 003
+Revises: 002
+Create Date: 2024-02-08 00:00:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+# revision identifiers, used by Alembic.
+revision = '003'
+down_revision = '002'
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    # Create user_daily_stats table
+    op.create_table(
+        'user_daily_stats',
+        sa.Column('telegram_id', sa.BigInteger(), nullable=False),
+        sa.Column('day', sa.Date(), nullable=False),
+        sa.Column('sessions', sa.Integer(), nullable=False, server_default='0'),
+        sa.Column('completed_sessions', sa.Integer(), nullable=False, server_default='0'),
+        sa.Column('sent_mb', sa.Float(), nullable=False, server_default='0'),
+        sa.Column('used_mb', sa.Float(), nullable=False, server_default='0'),
+        sa.Column('earned_usd', sa.Float(), nullable=False, server_default='0'),
+        sa.Column('duration_seconds', sa.Float(), nullable=False, server_default='0'),
+        sa.Column('updated_at', sa.DateTime(timezone=True), nullable=True, server_default=sa.text('CURRENT_TIMESTAMP')),
+        sa.PrimaryKeyConstraint('telegram_id', 'day', name='pk_user_daily_stats')
+    )
+    op.create_index('idx_user_daily_stats_day', 'user_daily_stats', ['day'])
+    
+    # Backfill from existing sessions
+    op.execute("""
+        INSERT INTO user_daily_stats (
+            telegram_id, day, sessions, completed_sessions,
+            sent_mb, used_mb, earned_usd, duration_seconds
+        )
+        SELECT
+            telegram_id,
+            DATE(start_time),
+            COUNT(id),
+            COUNT(id) FILTER (WHERE status = 'completed'),
+            COALESCE(SUM(sent_mb) FILTER (WHERE status = 'completed'), 0),
+            COALESCE(SUM(server_counted_mb) FILTER (WHERE status = 'completed'), 0),
+            COALESCE(SUM(earned_usd) FILTER (WHERE status = 'completed'), 0),
+            COALESCE(SUM(EXTRACT(EPOCH FROM end_time - start_time)) FILTER (WHERE status = 'completed'), 0)
+        FROM sessions
+        WHERE start_time IS NOT NULL
+        GROUP BY telegram_id, DATE(start_time)
+    """)
+
+
+def downgrade() -> None:
+    op.drop_index('idx_user_daily_stats_day', table_name='user_daily_stats')
+    op.drop_table('user_daily_stats')
@@ -0,0 +1,98 @@
+"""Platform hourly stats rollup
+
+Revision ID: 004
+Revises: 003
+Create Date: 2024-02-15 00:00:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+# revision identifiers, used by Alembic.
+revision = '004'
+down_revision = '003'
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    # Create platform_hourly_stats table
+    op.create_table(
+        'platform_hourly_stats',
+        sa.Column('hour', sa.DateTime(timezone=True), nullable=False),
+        sa.Column('sessions_started', sa.Integer(), nullable=False, server_default='0'),
+        sa.Column('sessions_completed', sa.Integer(), nullable=False, server_default='0'),
+        sa.Column('active_sessions', sa.Integer(), nullable=False, server_default='0'),
+        sa.Column('sent_mb', sa.Float(), nullable=False, server_default='0'),
+        sa.Column('used_mb', sa.Float(), nullable=False, server_default='0'),
+        sa.Column('earned_usd', sa.Float(), nullable=False, server_default='0'),
+        sa.Column('new_users', sa.Integer(), nullable=False, server_default='0'),
+        sa.Column('withdrawals_requested', sa.Integer(), nullable=False, server_default='0'),
+        sa.Column('withdrawals_usd', sa.Float(), nullable=False, server_default='0'),
+        sa.Column('updated_at', sa.DateTime(timezone=True), nullable=True, server_default=sa.text('CURRENT_TIMESTAMP')),
+        sa.PrimaryKeyConstraint('hour')
+    )
+    
+    # Backfill every hour since the first user signed up
+    op.execute("""
+        WITH hours AS (
+            SELECT generate_series(
+                date_trunc('hour', MIN(created_at)),
+                date_trunc('hour', CURRENT_TIMESTAMP),
+                interval '1 hour'
+            ) AS hour
+            FROM users
+        ),
+        started AS (
+            SELECT date_trunc('hour', start_time) AS hour, COUNT(*) AS count
+            FROM sessions GROUP BY 1
+        ),
+        completed AS (
+            SELECT date_trunc('hour', end_time) AS hour, COUNT(*) AS count,
+                   SUM(sent_mb) AS sent_mb, SUM(server_counted_mb) AS used_mb,
+                   SUM(earned_usd) AS earned_usd
+            FROM sessions WHERE status = 'completed' AND end_time IS NOT NULL GROUP BY 1
+        ),
+        active AS (
+            SELECT hours.hour, COUNT(s.id) AS count
+            FROM hours
+            JOIN sessions s ON s.start_time < hours.hour + interval '1 hour'
+                AND (s.is_active OR s.end_time >= hours.hour)
+            GROUP BY hours.hour
+        ),
+        new_users AS (
+            SELECT date_trunc('hour', created_at) AS hour, COUNT(*) AS count
+            FROM users GROUP BY 1
+        ),
+        withdrawals AS (
+            SELECT date_trunc('hour', created_at) AS hour, COUNT(*) AS count,
+                   SUM(amount_usd) AS amount
+            FROM withdraw_requests GROUP BY 1
+        )
+        INSERT INTO platform_hourly_stats (
+            hour, sessions_started, sessions_completed, active_sessions,
+            sent_mb, used_mb, earned_usd, new_users,
+            withdrawals_requested, withdrawals_usd
+        )
+        SELECT
+            hours.hour,
+            COALESCE(started.count, 0),
+            COALESCE(completed.count, 0),
+            COALESCE(active.count, 0),
+            COALESCE(completed.sent_mb, 0),
+            COALESCE(completed.used_mb, 0),
+            COALESCE(completed.earned_usd, 0),
+            COALESCE(new_users.count, 0),
+            COALESCE(withdrawals.count, 0),
+            COALESCE(withdrawals.amount, 0)
+        FROM hours
+        LEFT JOIN started ON started.hour = hours.hour
+        LEFT JOIN completed ON completed.hour = hours.hour
+        LEFT JOIN active ON active.hour = hours.hour
+        LEFT JOIN new_users ON new_users.hour = hours.hour
+        LEFT JOIN withdrawals ON withdrawals.hour = hours.hour
+    """)
+
+
+def downgrade() -> None:
+    op.drop_table('platform_hourly_stats')
@@ -0,0 +1,61 @@
+"""Composite and partial indexes for hot query shapes
+
+Revision ID: 005
+Revises: 004
+Create Date: 2024-02-22 00:00:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+# revision identifiers, used by Alembic.
+revision = '005'
+down_revision = '004'
+branch_labels = None
+depends_on = None
+
+
+# (name, table, columns, partial index predicate)
+INDEXES = [
+    ('idx_sessions_telegram_start', 'sessions', ['telegram_id', 'start_time', 'id'], None),
+    ('idx_sessions_active_by_user', 'sessions', ['telegram_id'], 'is_active'),
+    ('idx_sessions_status_start_time', 'sessions', ['status', 'start_time'], None),
+    ('idx_sessions_completed_end_time', 'sessions', ['end_time'], "status = 'completed'"),
+    ('idx_session_reports_session_timestamp', 'session_reports', ['session_id', 'timestamp'], None),
+    ('idx_transactions_telegram_created', 'transactions', ['telegram_id', 'created_at', 'id'], None),
+    ('idx_withdraw_requests_telegram_status', 'withdraw_requests', ['telegram_id', 'status'], None),
+    ('idx_withdraw_requests_pending', 'withdraw_requests', ['created_at'], "status IN ('pending', 'processing')"),
+    ('idx_support_requests_telegram_created', 'support_requests', ['telegram_id', 'created_at', 'id'], None),
+    ('idx_announcements_active_created', 'announcements', ['created_at', 'id'], 'is_active'),
+]
+
+
+def upgrade() -> None:
+    # Build without blocking writes on live tables
+    with op.get_context().autocommit_block():
+        for name, table, columns, where in INDEXES:
+            op.create_index(
+                name,
+                table,
+                columns,
+                postgresql_where=sa.text(where) if where else None,
+                postgresql_concurrently=True,
+                if_not_exists=True
+            )
+        
+        # Leading column of idx_session_reports_session_timestamp
+        op.execute("DROP INDEX CONCURRENTLY IF EXISTS idx_session_reports_session_id")
+
+
+def downgrade() -> None:
+    with op.get_context().autocommit_block():
+        op.create_index(
+            'idx_session_reports_session_id',
+            'session_reports',
+            ['session_id'],
+            postgresql_concurrently=True,
+            if_not_exists=True
+        )
+        
+        for name, table, _, _ in reversed(INDEXES):
+            op.execute(f"DROP INDEX CONCURRENTLY IF EXISTS {name}")
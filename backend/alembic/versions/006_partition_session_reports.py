@@ -0,0 +1,126 @@
+"""Partition session_reports by day
+
+Revision ID: 006
+Revises: 005
+Create Date: 2024-02-29 00:00:00.000000
+
+"""
+from datetime import datetime, timedelta
+from alembic import op
+import sqlalchemy as sa
+
+# revision identifiers, used by Alembic.
+revision = '006'
+down_revision = '005'
+branch_labels = None
+depends_on = None
+
+
+# Defaults of REPORT_RETENTION_DAYS / REPORT_PARTITIONS_AHEAD_DAYS;
+# rows older than retention are not carried over
+RETENTION_DAYS = 90
+AHEAD_DAYS = 7
+
+COLUMNS = [
+    'id', 'session_id', 'telegram_id', 'timestamp', 'cumulative_mb', 'delta_mb',
+    'speed_mb_s', 'battery_level', 'network_type', 'ip', 'raw_meta', 'created_at',
+]
+
+
+def _columns():
+    return [
+        sa.Column('id', sa.BigInteger(), autoincrement=True, nullable=False),
+        sa.Column('session_id', sa.BigInteger(), nullable=False),
+        sa.Column('telegram_id', sa.BigInteger(), nullable=False),
+        sa.Column('timestamp', sa.DateTime(timezone=True), nullable=False, server_default=sa.text('CURRENT_TIMESTAMP')),
+        sa.Column('cumulative_mb', sa.Float(), nullable=True),
+        sa.Column('delta_mb', sa.Float(), nullable=True),
+        sa.Column('speed_mb_s', sa.Float(), nullable=True),
+        sa.Column('battery_level', sa.Float(), nullable=True),
+        sa.Column('network_type', sa.String(length=16), nullable=True),
+        sa.Column('ip', sa.String(length=64), nullable=True),
+        sa.Column('raw_meta', sa.JSON(), nullable=True),
+        sa.Column('created_at', sa.DateTime(timezone=True), nullable=True, server_default=sa.text('CURRENT_TIMESTAMP')),
+        sa.ForeignKeyConstraint(['session_id'], ['sessions.id'], ondelete='CASCADE'),
+    ]
+
+
+def _legacy_columns(table: str) -> set:
+    return {column['name'] for column in sa.inspect(op.get_bind()).get_columns(table)}
+
+
+def _reset_sequence():
+    op.execute(
+        "SELECT setval(pg_get_serial_sequence('session_reports', 'id'), "
+        "COALESCE((SELECT max(id) FROM session_reports), 0) + 1, false)"
+    )
+
+
+def upgrade() -> None:
+    legacy = _legacy_columns('session_reports')
+    
+    op.rename_table('session_reports', 'session_reports_legacy')
+    op.execute("ALTER SEQUENCE IF EXISTS session_reports_id_seq RENAME TO session_reports_legacy_id_seq")
+    op.execute("ALTER INDEX IF EXISTS idx_session_reports_session_timestamp RENAME TO idx_session_reports_legacy_session_timestamp")
+    op.execute("ALTER INDEX IF EXISTS idx_session_reports_session_id RENAME TO idx_session_reports_legacy_session_id")
+    
+    # Partitioned table - the key has to include the partition column
+    op.create_table(
+        'session_reports',
+        *_columns(),
+        sa.PrimaryKeyConstraint('id', 'timestamp', name='pk_session_reports'),
+        postgresql_partition_by='RANGE (timestamp)'
+    )
+    op.create_index('idx_session_reports_session_timestamp', 'session_reports', ['session_id', 'timestamp'])
+    op.execute("CREATE TABLE session_reports_default PARTITION OF session_reports DEFAULT")
+    
+    # Daily partitions for the retention window and the days ahead
+    today = datetime.utcnow().date()
+    day = today - timedelta(days=RETENTION_DAYS)
+    while day <= today + timedelta(days=AHEAD_DAYS):
+        op.execute(
+            f"CREATE TABLE session_reports_p{day:%Y%m%d} PARTITION OF session_reports "
+            f"FOR VALUES FROM ('{day.isoformat()} 00:00:00+00') "
+            f"TO ('{(day + timedelta(days=1)).isoformat()} 00:00:00+00')"
+        )
+        day += timedelta(days=1)
+    
+    # Copy rows still inside retention; the legacy schema may lack newer columns
+    timestamp = "COALESCE(r.timestamp, r.created_at, now())" if 'created_at' in legacy else "COALESCE(r.timestamp, now())"
+    values = {
+        'timestamp': timestamp,
+        'telegram_id': "COALESCE(r.telegram_id, s.telegram_id)" if 'telegram_id' in legacy else "s.telegram_id",
+    }
+    copied = [name for name in COLUMNS if name in legacy or name in values]
+    
+    op.execute(
+        f"INSERT INTO session_reports ({', '.join(copied)}) "
+        f"SELECT {', '.join(values.get(name, f'r.{name}') for name in copied)} "
+        f"FROM session_reports_legacy r JOIN sessions s ON s.id = r.session_id "
+        f"WHERE {timestamp} >= now() - interval '{RETENTION_DAYS} days'"
+    )
+    _reset_sequence()
+    
+    op.drop_table('session_reports_legacy')
+
+
+def downgrade() -> None:
+    op.rename_table('session_reports', 'session_reports_partitioned')
+    op.execute("ALTER SEQUENCE IF EXISTS session_reports_id_seq RENAME TO session_reports_partitioned_id_seq")
+    op.execute("ALTER INDEX IF EXISTS idx_session_reports_session_timestamp RENAME TO idx_session_reports_partitioned_session_timestamp")
+    
+    op.create_table(
+        'session_reports',
+        *_columns(),
+        sa.PrimaryKeyConstraint('id')
+    )
+    op.create_index('idx_session_reports_session_timestamp', 'session_reports', ['session_id', 'timestamp'])
+    
+    op.execute(
+        f"INSERT INTO session_reports ({', '.join(COLUMNS)}) "
+        f"SELECT {', '.join(COLUMNS)} FROM session_reports_partitioned"
+    )
+    _reset_sequence()
+    
+    # Drops every partition with it
+    op.drop_table('session_reports_partitioned')
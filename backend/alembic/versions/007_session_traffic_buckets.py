@@ -0,0 +1,63 @@
+"""Per-session traffic buckets for speed charts
+
+Revision ID: 007
+Revises: 006
+Create Date: 2024-03-07 00:00:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+# revision identifiers, used by Alembic.
+revision = '007'
+down_revision = '006'
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    # Create session_traffic_buckets table
+    op.create_table(
+        'session_traffic_buckets',
+        sa.Column('session_id', sa.BigInteger(), nullable=False),
+        sa.Column('resolution', sa.Integer(), nullable=False),
+        sa.Column('bucket_start', sa.DateTime(timezone=True), nullable=False),
+        sa.Column('reports', sa.Integer(), nullable=True, server_default='0'),
+        sa.Column('delta_mb', sa.Float(), nullable=True, server_default='0'),
+        sa.Column('speed_min', sa.Float(), nullable=True),
+        sa.Column('speed_max', sa.Float(), nullable=True),
+        sa.Column('speed_sum', sa.Float(), nullable=True, server_default='0'),
+        sa.Column('updated_at', sa.DateTime(timezone=True), nullable=True, server_default=sa.text('CURRENT_TIMESTAMP')),
+        sa.PrimaryKeyConstraint('session_id', 'resolution', 'bucket_start', name='pk_session_traffic_buckets'),
+        sa.ForeignKeyConstraint(['session_id'], ['sessions.id'], ondelete='CASCADE')
+    )
+    op.create_index(
+        'idx_session_traffic_buckets_resolution_start',
+        'session_traffic_buckets',
+        ['resolution', 'bucket_start']
+    )
+    
+    # Backfill from the reports still in session_reports
+    op.execute("""
+        INSERT INTO session_traffic_buckets (
+            session_id, resolution, bucket_start,
+            reports, delta_mb, speed_min, speed_max, speed_sum
+        )
+        SELECT
+            r.session_id,
+            res.seconds,
+            to_timestamp(floor(extract(epoch FROM r.timestamp) / res.seconds) * res.seconds),
+            count(*),
+            COALESCE(sum(r.delta_mb), 0),
+            min(COALESCE(r.speed_mb_s, 0)),
+            max(COALESCE(r.speed_mb_s, 0)),
+            COALESCE(sum(r.speed_mb_s), 0)
+        FROM session_reports r
+        CROSS JOIN (VALUES (10), (60), (900)) AS res (seconds)
+        GROUP BY 1, 2, 3
+    """)
+
+
+def downgrade() -> None:
+    op.drop_index('idx_session_traffic_buckets_resolution_start', table_name='session_traffic_buckets')
+    op.drop_table('session_traffic_buckets')
@@ -0,0 +1,44 @@
+"""Session anomaly flags from online detection
+
+Revision ID: 008
+Revises: 007
+Create Date: 2024-03-14 00:00:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+# revision identifiers, used by Alembic.
+revision = '008'
+down_revision = '007'
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    # Create session_anomalies table
+    op.create_table(
+        'session_anomalies',
+        sa.Column('id', sa.BigInteger(), autoincrement=True, nullable=False),
+        sa.Column('session_id', sa.BigInteger(), nullable=False),
+        sa.Column('telegram_id', sa.BigInteger(), nullable=False),
+        sa.Column('kind', sa.String(length=32), nullable=False),
+        sa.Column('value', sa.Float(), nullable=True),
+        sa.Column('threshold', sa.Float(), nullable=True),
+        sa.Column('details', sa.JSON(), nullable=True),
+        sa.Column('action', sa.String(length=16), nullable=True, server_default='flagged'),
+        sa.Column('status', sa.String(length=16), nullable=True, server_default='open'),
+        sa.Column('resolved_by', sa.BigInteger(), nullable=True),
+        sa.Column('resolved_at', sa.DateTime(timezone=True), nullable=True),
+        sa.Column('created_at', sa.DateTime(timezone=True), nullable=True, server_default=sa.text('CURRENT_TIMESTAMP')),
+        sa.PrimaryKeyConstraint('id'),
+        sa.ForeignKeyConstraint(['session_id'], ['sessions.id'], ondelete='CASCADE')
+    )
+    op.create_index('idx_session_anomalies_status_created', 'session_anomalies', ['status', 'created_at', 'id'])
+    op.create_index('idx_session_anomalies_session', 'session_anomalies', ['session_id'])
+
+
+def downgrade() -> None:
+    op.drop_index('idx_session_anomalies_session', table_name='session_anomalies')
+    op.drop_index('idx_session_anomalies_status_created', table_name='session_anomalies')
+    op.drop_table('session_anomalies')
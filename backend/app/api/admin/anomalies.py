@@ -0,0 +1,79 @@
+from fastapi import APIRouter, Depends, HTTPException, Query
+from sqlalchemy.ext.asyncio import AsyncSession
+from typing import Optional
+
+from app.core.database import get_db
+from app.middleware.auth import verify_admin
+from app.models.user import User
+from app.services.anomaly_service import AnomalyService
+
+router = APIRouter(prefix="/admin/anomalies", tags=["Admin - Anomalies"])
+
+
+@router.get("/")
+async def get_anomalies(
+    status: str = "open",
+    limit: int = Query(50, ge=1, le=200),
+    cursor: Optional[str] = None,
+    admin: User = Depends(verify_admin),
+    db: AsyncSession = Depends(get_db)
+):
+    """
+    Get flagged sessions, newest first (Admin only)
+    Pass next_cursor back as `cursor` for the next page
+    """
+    anomaly_service = AnomalyService(db)
+    
+    try:
+        result = await anomaly_service.list_anomalies(status=status, limit=limit, cursor=cursor)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    
+    return {
+        "status": "success",
+        "data": result
+    }
+
+
+@router.post("/{anomaly_id}/dismiss")
+async def dismiss_anomaly(
+    anomaly_id: int,
+    admin: User = Depends(verify_admin),
+    db: AsyncSession = Depends(get_db)
+):
+    """
+    Dismiss a session's flags and resume it if paused (Admin only)
+    """
+    anomaly_service = AnomalyService(db)
+    
+    try:
+        result = await anomaly_service.dismiss(anomaly_id, admin_id=admin.telegram_id)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    
+    return {
+        "status": "success",
+        "data": result
+    }
+
+
+@router.post("/{anomaly_id}/confirm")
+async def confirm_anomaly(
+    anomaly_id: int,
+    admin: User = Depends(verify_admin),
+    db: AsyncSession = Depends(get_db)
+):
+    """
+    Confirm a session's flags and cancel it without payout (Admin only)
+    """
+    anomaly_service = AnomalyService(db)
+    
+    try:
+        result = await anomaly_service.confirm(anomaly_id, admin_id=admin.telegram_id)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    
+    return {
+        "status": "success",
+        "data": result
+    }
@@ -1,4 +1,5 @@
-from fastapi import APIRouter, Depends, Response
+from fastapi import APIRouter, Depends, HTTPException
+from fastapi.responses import StreamingResponse
 from sqlalchemy.ext.asyncio import AsyncSession
 from typing import Optional
 from datetime import date
@@ -8,6 +9,7 @@ from app.middleware.auth import verify_admin
 from app.models.user import User
 from app.services.admin_service import AdminService
 from app.services.analytics_service import AnalyticsService
+from app.services.export_service import ExportService
 
 router = APIRouter(prefix="/admin/reports", tags=["Admin - Reports"])
 
@@ -88,45 +90,59 @@ async def get_top_users(
 
 @router.get("/export/users")
 async def export_users(
+    format: str = "csv",
+    gzip: bool = False,
     admin: User = Depends(verify_admin),
     db: AsyncSession = Depends(get_db)
 ):
     """
-    Export users data as CSV (Admin only)
+    Export users data as CSV, NDJSON or Parquet, streamed (Admin only)
     """
-    admin_service = AdminService(db)
-    csv_content = await admin_service.export_users_csv()
+    export_service = ExportService(db)
     
-    return Response(
-        content=csv_content,
-        media_type="text/csv",
-        headers={
-            "Content-Disposition": "attachment; filename=users_export.csv"
-        }
-    )
+    try:
+        content = export_service.stream_users(fmt=format, compress=gzip)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    
+    return _export_response(content, "users_export", format, gzip)
 
 
 @router.get("/export/sessions")
 async def export_sessions(
     start_date: Optional[date] = None,
     end_date: Optional[date] = None,
+    format: str = "csv",
+    gzip: bool = False,
     admin: User = Depends(verify_admin),
     db: AsyncSession = Depends(get_db)
 ):
     """
-    Export sessions data as CSV (Admin only)
+    Export sessions data as CSV, NDJSON or Parquet, streamed (Admin only)
     """
-    admin_service = AdminService(db)
-    csv_content = await admin_service.export_sessions_csv(
-        start_date=start_date,
-        end_date=end_date
-    )
+    export_service = ExportService(db)
+    
+    try:
+        content = export_service.stream_sessions(
+            fmt=format,
+            compress=gzip,
+            start_date=start_date,
+            end_date=end_date
+        )
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    
+    return _export_response(content, "sessions_export", format, gzip)
+
+
+def _export_response(content, name: str, fmt: str, compress: bool) -> StreamingResponse:
+    filename = ExportService.filename(name, fmt, compress)
     
-    return Response(
-        content=csv_content,
-        media_type="text/csv",
+    return StreamingResponse(
+        content,
+        media_type=ExportService.media_type(fmt, compress),
         headers={
-            "Content-Disposition": "attachment; filename=sessions_export.csv"
+            "Content-Disposition": f"attachment; filename={filename}"
         }
     )
 
@@ -2,12 +2,15 @@ from fastapi import APIRouter, Depends, HTTPException, Query
 from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy import select, func, desc
 from datetime import datetime, date
+from typing import Optional
 
 from app.core.database import get_db
 from app.middleware.auth import get_current_user
 from app.models.user import User
 from app.models.transaction import Transaction, WithdrawRequest
 from app.models.session import Session
+from app.services.balance_service import BalanceService
+from app.utils.pagination import KeysetPaginator, cached_total
 import logging
 
 logger = logging.getLogger(__name__)
@@ -67,14 +70,17 @@ async def get_balance(
 
 @router.get("/transactions")
 async def get_transactions(
-    page: int = Query(1, ge=1),
+    page: Optional[int] = Query(None, ge=1),
     per_page: int = Query(20, ge=1, le=100),
+    cursor: Optional[str] = Query(None),
+    include_total: bool = Query(False),
     type_filter: str = Query(None),
     current_user: User = Depends(get_current_user),
     db: AsyncSession = Depends(get_db)
 ):
     """
     REAL transaction history from database with pagination
+    Cursor (keyset) pages by default, `page` keeps the old offset mode
     """
     # Base query
     query = select(Transaction).where(Transaction.telegram_id == current_user.telegram_id)
@@ -83,16 +89,48 @@ async def get_transactions(
     if type_filter:
         query = query.where(Transaction.type == type_filter)
     
-    # Count total
-    count_query = select(func.count()).select_from(query.subquery())
-    count_result = await db.execute(count_query)
-    total = count_result.scalar()
-    
-    # Get paginated data
-    offset = (page - 1) * per_page
-    query = query.order_by(desc(Transaction.created_at)).offset(offset).limit(per_page)
-    result = await db.execute(query)
-    transactions = result.scalars().all()
+    if page is None:
+        paginator = KeysetPaginator(Transaction.created_at, Transaction.id, per_page)
+        
+        try:
+            result = await db.execute(paginator.apply(query, cursor))
+        except ValueError as e:
+            raise HTTPException(status_code=400, detail=str(e))
+        
+        transactions, next_cursor = paginator.page(result.scalars().all())
+        
+        pagination = {
+            "per_page": per_page,
+            "next_cursor": next_cursor,
+            "has_next": next_cursor is not None,
+        }
+        
+        if include_total:
+            pagination["total"] = await cached_total(
+                db,
+                f"transactions:{current_user.telegram_id}:{type_filter or 'all'}",
+                query
+            )
+    else:
+        # Count total
+        count_query = select(func.count()).select_from(query.subquery())
+        count_result = await db.execute(count_query)
+        total = count_result.scalar()
+        
+        # Get paginated data
+        offset = (page - 1) * per_page
+        query = query.order_by(desc(Transaction.created_at)).offset(offset).limit(per_page)
+        result = await db.execute(query)
+        transactions = result.scalars().all()
+        
+        pagination = {
+            "page": page,
+            "per_page": per_page,
+            "total": total,
+            "total_pages": (total + per_page - 1) // per_page,
+            "has_next": page * per_page < total,
+            "has_prev": page > 1,
+        }
     
     return {
         "status": "success",
@@ -109,14 +147,7 @@ async def get_transactions(
                 }
                 for t in transactions
             ],
-            "pagination": {
-                "page": page,
-                "per_page": per_page,
-                "total": total,
-                "total_pages": (total + per_page - 1) // per_page,
-                "has_next": page * per_page < total,
-                "has_prev": page > 1,
-            }
+            "pagination": pagination
         }
     }
 
@@ -127,42 +158,21 @@ async def refresh_balance(
     db: AsyncSession = Depends(get_db)
 ):
     """
-    REAL balance refresh - recalculates from sessions and withdrawals
+    REAL balance refresh - recalculates from sessions, withdrawals and adjustments
     """
-    # Calculate total earnings
-    earnings_result = await db.execute(
-        select(func.sum(Session.earned_usd))
-        .where(Session.telegram_id == current_user.telegram_id)
-        .where(Session.status == 'completed')
-    )
-    total_earnings = earnings_result.scalar() or 0.0
-    
-    # Calculate total withdrawn
-    withdrawn_result = await db.execute(
-        select(func.sum(WithdrawRequest.amount_usd))
-        .where(WithdrawRequest.telegram_id == current_user.telegram_id)
-        .where(WithdrawRequest.status == 'completed')
-    )
-    total_withdrawn = abs(withdrawn_result.scalar() or 0.0)
-    
-    # Calculate correct balance
-    correct_balance = total_earnings - total_withdrawn
-    old_balance = current_user.balance_usd
-    delta = correct_balance - old_balance
+    result = await BalanceService(db).refresh_user(current_user.telegram_id)
     
-    # Update if different
-    if abs(delta) > 0.01:
-        current_user.balance_usd = correct_balance
+    if result["corrected"]:
         await db.commit()
-        logger.info(f"Balance refreshed for {current_user.telegram_id}: {old_balance:.2f} -> {correct_balance:.2f}")
     
     return {
         "status": "success",
         "data": {
-            "old_balance": float(old_balance),
-            "new_balance": float(correct_balance),
-            "delta": float(delta),
-            "total_earnings": float(total_earnings),
-            "total_withdrawn": float(total_withdrawn),
+            "old_balance": result["old_balance"],
+            "new_balance": result["new_balance"],
+            "delta": result["delta"],
+            "total_earnings": result["total_earnings"],
+            "total_withdrawn": result["total_withdrawn"],
+            "total_adjustments": result["total_adjustments"],
         }
     }
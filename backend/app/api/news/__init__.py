@@ -2,6 +2,7 @@ from fastapi import APIRouter, Depends, HTTPException, Query
 from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy import select, func, and_
 from datetime import datetime
+from typing import Optional
 import logging
 
 from app.core.database import get_db
@@ -9,6 +10,7 @@ from app.middleware.auth import get_current_user
 from app.models.user import User
 from app.models.announcement import Announcement, PromoCode
 from app.core.config import settings
+from app.utils.pagination import KeysetPaginator, cached_total
 
 logger = logging.getLogger(__name__)
 
@@ -17,30 +19,61 @@ router = APIRouter()
 
 @router.get("/")
 async def get_news(
-    page: int = Query(1, ge=1),
+    page: Optional[int] = Query(None, ge=1),
     per_page: int = Query(10, ge=1, le=50),
+    cursor: Optional[str] = Query(None),
+    include_total: bool = Query(False),
     db: AsyncSession = Depends(get_db)
 ):
     """
     REAL get news and announcements
+    Cursor (keyset) pages by default, `page` keeps the old offset mode
     """
-    # Get total count of active announcements
-    count_result = await db.execute(
-        select(func.count(Announcement.id))
-        .where(Announcement.is_active == True)
-    )
-    total = count_result.scalar()
-    
-    # Get announcements
-    offset = (page - 1) * per_page
-    result = await db.execute(
-        select(Announcement)
-        .where(Announcement.is_active == True)
-        .order_by(Announcement.created_at.desc())
-        .offset(offset)
-        .limit(per_page)
-    )
-    announcements = result.scalars().all()
+    query = select(Announcement).where(Announcement.is_active == True)
+    
+    if page is None:
+        paginator = KeysetPaginator(Announcement.created_at, Announcement.id, per_page)
+        
+        try:
+            result = await db.execute(paginator.apply(query, cursor))
+        except ValueError as e:
+            raise HTTPException(status_code=400, detail=str(e))
+        
+        announcements, next_cursor = paginator.page(result.scalars().all())
+        
+        pagination = {
+            "per_page": per_page,
+            "next_cursor": next_cursor,
+            "has_next": next_cursor is not None,
+        }
+        
+        if include_total:
+            # Same for every reader - one cached count serves all
+            pagination["total"] = await cached_total(db, "news:active", query)
+    else:
+        # Get total count of active announcements
+        count_result = await db.execute(
+            select(func.count(Announcement.id))
+            .where(Announcement.is_active == True)
+        )
+        total = count_result.scalar()
+        
+        # Get announcements
+        offset = (page - 1) * per_page
+        result = await db.execute(
+            query
+            .order_by(Announcement.created_at.desc())
+            .offset(offset)
+            .limit(per_page)
+        )
+        announcements = result.scalars().all()
+        
+        pagination = {
+            "page": page,
+            "per_page": per_page,
+            "total": total,
+            "total_pages": (total + per_page - 1) // per_page,
+        }
     
     # Get Telegram links from settings
     telegram_links = {
@@ -64,12 +97,7 @@ async def get_news(
                 }
                 for a in announcements
             ],
-            "pagination": {
-                "page": page,
-                "per_page": per_page,
-                "total": total,
-                "total_pages": (total + per_page - 1) // per_page,
-            }
+            "pagination": pagination
         }
     }
 
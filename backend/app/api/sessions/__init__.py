@@ -1,18 +1,23 @@
-from fastapi import APIRouter, Depends, HTTPException, WebSocket, WebSocketDisconnect
+from fastapi import APIRouter, Depends, HTTPException, Query, WebSocket, WebSocketDisconnect
 from sqlalchemy.ext.asyncio import AsyncSession
-from sqlalchemy import select, desc
+from sqlalchemy import select
 from pydantic import BaseModel
 from datetime import datetime
+from typing import Optional
 import uuid
-import asyncio
 import json
 
-from app.core.database import get_db
+from app.core.database import get_db, AsyncSessionLocal
 from app.models.session import Session
 from app.models.user import User
 from app.services.traffic_service import TrafficService
 from app.services.filter_service import FilterService
+from app.services.traffic_series_service import TrafficSeriesService
+from app.services.websocket_manager import ws_manager
+from app.utils.cache_manager import cache_manager
+from app.utils.pagination import KeysetPaginator
 from app.core.config import settings
+from app.core.security import decode_access_token
 
 
 router = APIRouter()
@@ -128,17 +133,25 @@ async def heartbeat(session_id: str, db: AsyncSession = Depends(get_db)):
 
 
 @router.get("/{telegram_id}")
-async def get_sessions(telegram_id: int, limit: int = 20, db: AsyncSession = Depends(get_db)):
+async def get_sessions(
+    telegram_id: int,
+    limit: int = Query(20, ge=1, le=100),
+    cursor: str | None = None,
+    db: AsyncSession = Depends(get_db)
+):
     """
     Get session history for user
+    Newest first; pass next_cursor back as `cursor` for the next page
     """
-    result = await db.execute(
-        select(Session)
-        .where(Session.telegram_id == telegram_id)
-        .order_by(desc(Session.created_at))
-        .limit(limit)
-    )
-    sessions = result.scalars().all()
+    paginator = KeysetPaginator(Session.start_time, Session.id, limit)
+    
+    try:
+        query = paginator.apply(select(Session).where(Session.telegram_id == telegram_id), cursor)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    
+    result = await db.execute(query)
+    sessions, next_cursor = paginator.page(result.scalars().all())
     
     return {
         "sessions": [
@@ -158,10 +171,41 @@ async def get_sessions(telegram_id: int, limit: int = 20, db: AsyncSession = Dep
                 "network_type": s.network_type_client,
             }
             for s in sessions
-        ]
+        ],
+        "next_cursor": next_cursor,
+        "has_next": next_cursor is not None,
     }
 
 
+@router.get("/{telegram_id}/{session_id}/series")
+async def get_session_series(
+    telegram_id: int,
+    session_id: str,
+    start: datetime | None = None,
+    end: datetime | None = None,
+    points: int = settings.SERIES_MAX_POINTS,
+    db: AsyncSession = Depends(get_db)
+):
+    """
+    Speed-over-time chart of one session
+    Defaults to the whole session; at most `points` points
+    """
+    result = await db.execute(
+        select(Session)
+        .where(Session.session_id == session_id)
+        .where(Session.telegram_id == telegram_id)
+    )
+    session = result.scalar_one_or_none()
+    
+    if not session:
+        raise HTTPException(status_code=404, detail="Session not found")
+    
+    try:
+        return await TrafficSeriesService(db).get_series(session, start, end, points)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+
 @router.get("/active/{telegram_id}")
 async def get_active_sessions(telegram_id: int, db: AsyncSession = Depends(get_db)):
     """
@@ -174,28 +218,48 @@ async def get_active_sessions(telegram_id: int, db: AsyncSession = Depends(get_d
 
 # WebSocket endpoint for real-time updates
 @router.websocket("/ws/{session_id}")
-async def websocket_endpoint(websocket: WebSocket, session_id: str):
+async def websocket_endpoint(websocket: WebSocket, session_id: str, token: Optional[str] = None):
     """
     WebSocket for real-time session updates
+    Requires the access token as ?token=, and only streams the caller's own session
+    Pushes accepted traffic reports as they arrive, at most
+    WS_SESSION_MAX_UPDATES_PER_SECOND per client (latest update wins)
     """
-    await websocket.accept()
+    payload = decode_access_token(token) if token else None
+    
+    if not payload or not payload.get("sub"):
+        await websocket.close(code=1008)
+        return
+    
+    session = await cache_manager.get_cached_session(session_id)
+    
+    if session is None:
+        async with AsyncSessionLocal() as db:
+            result = await db.execute(
+                select(Session.telegram_id)
+                .where(Session.session_id == session_id)
+                .where(Session.is_active == True)
+            )
+            telegram_id = result.scalar_one_or_none()
+    else:
+        telegram_id = session["telegram_id"]
+    
+    # Unknown and foreign sessions look the same to the caller
+    if telegram_id is None or str(telegram_id) != str(payload["sub"]):
+        await websocket.close(code=1008)
+        return
+    
+    await ws_manager.connect_session(websocket, session_id, telegram_id)
     
     try:
         while True:
-            # Send periodic updates every 3 seconds
-            await asyncio.sleep(3)
-            
-            # In production, fetch real session data from database
-            # For now, send mock data
-            data = {
-                "session_id": session_id,
-                "timestamp": datetime.utcnow().isoformat(),
-                "sent_mb": 150.5,
-                "speed_mb_s": 0.45,
-                "estimated_earnings": 0.225,
-            }
-            
-            await websocket.send_json(data)
+            # Client only sends keep-alive pings
+            message = await websocket.receive_text()
+            if message == "ping":
+                await websocket.send_text("pong")
     
     except WebSocketDisconnect:
         pass
+    
+    finally:
+        ws_manager.disconnect_session(websocket, session_id)
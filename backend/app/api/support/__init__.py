@@ -3,12 +3,14 @@ from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy import select, func, desc
 from pydantic import BaseModel, Field
 from datetime import datetime
+from typing import Optional
 import logging
 
 from app.core.database import get_db
 from app.middleware.auth import get_current_user
 from app.models.user import User
 from app.models.support import SupportRequest
+from app.utils.pagination import KeysetPaginator, cached_total
 
 logger = logging.getLogger(__name__)
 
@@ -94,31 +96,65 @@ async def create_support_request(
 
 @router.get("/history")
 async def get_support_history(
-    page: int = Query(1, ge=1),
+    page: Optional[int] = Query(None, ge=1),
     per_page: int = Query(20, ge=1, le=100),
+    cursor: Optional[str] = Query(None),
+    include_total: bool = Query(False),
     current_user: User = Depends(get_current_user),
     db: AsyncSession = Depends(get_db)
 ):
     """
     REAL support request history
+    Cursor (keyset) pages by default, `page` keeps the old offset mode
     """
-    # Get total count
-    count_result = await db.execute(
-        select(func.count(SupportRequest.id))
-        .where(SupportRequest.telegram_id == current_user.telegram_id)
-    )
-    total = count_result.scalar()
+    query = select(SupportRequest).where(SupportRequest.telegram_id == current_user.telegram_id)
     
-    # Get requests
-    offset = (page - 1) * per_page
-    result = await db.execute(
-        select(SupportRequest)
-        .where(SupportRequest.telegram_id == current_user.telegram_id)
-        .order_by(desc(SupportRequest.created_at))
-        .offset(offset)
-        .limit(per_page)
-    )
-    requests = result.scalars().all()
+    if page is None:
+        paginator = KeysetPaginator(SupportRequest.created_at, SupportRequest.id, per_page)
+        
+        try:
+            result = await db.execute(paginator.apply(query, cursor))
+        except ValueError as e:
+            raise HTTPException(status_code=400, detail=str(e))
+        
+        requests, next_cursor = paginator.page(result.scalars().all())
+        
+        pagination = {
+            "per_page": per_page,
+            "next_cursor": next_cursor,
+            "has_next": next_cursor is not None,
+        }
+        
+        if include_total:
+            pagination["total"] = await cached_total(
+                db,
+                f"support:{current_user.telegram_id}",
+                query
+            )
+    else:
+        # Get total count
+        count_result = await db.execute(
+            select(func.count(SupportRequest.id))
+            .where(SupportRequest.telegram_id == current_user.telegram_id)
+        )
+        total = count_result.scalar()
+        
+        # Get requests
+        offset = (page - 1) * per_page
+        result = await db.execute(
+            query
+            .order_by(desc(SupportRequest.created_at))
+            .offset(offset)
+            .limit(per_page)
+        )
+        requests = result.scalars().all()
+        
+        pagination = {
+            "page": page,
+            "per_page": per_page,
+            "total": total,
+            "total_pages": (total + per_page - 1) // per_page,
+        }
     
     return {
         "status": "success",
@@ -136,12 +172,7 @@ async def get_support_history(
                 }
                 for r in requests
             ],
-            "pagination": {
-                "page": page,
-                "per_page": per_page,
-                "total": total,
-                "total_pages": (total + per_page - 1) // per_page,
-            }
+            "pagination": pagination
         }
     }
 
@@ -27,6 +27,10 @@ class Settings(BaseSettings):
     # Telegram
     TELEGRAM_BOT_TOKEN: str = ""
     TELEGRAM_BOT_USERNAME: str = ""
+    TELEGRAM_API_URL: str = "https://api.telegram.org"
+    TELEGRAM_MESSAGES_PER_SECOND: int = 30  # Bot API global flood limit
+    TELEGRAM_CHAT_INTERVAL_SECONDS: float = 1.0  # one message per chat per interval
+    TELEGRAM_DISPATCH_WORKERS: int = 4
     
     # Admin IDs
     ADMIN_IDS: str = ""
@@ -40,6 +44,44 @@ class Settings(BaseSettings):
     # FCM
     FCM_SERVER_KEY: str = ""
     FCM_CREDENTIALS_PATH: str = ""
+    FCM_URL: str = "https://fcm.googleapis.com/fcm/send"  # point at scripts/fake_fcm_server.py for load tests
+    FCM_MAX_CONCURRENCY: int = 10
+    FCM_TIMEOUT_SECONDS: float = 10.0
+    
+    # Notification broadcasts (chunked Celery fan-out)
+    BROADCAST_CHUNK_SIZE: int = 5000
+    BROADCAST_STALE_MINUTES: int = 10  # re-dispatch chunks stuck this long
+    
+    # User daily stats rollup
+    ROLLUP_CATCHUP_DAYS: int = 2  # days rebuilt from sessions by the hourly job
+    
+    # Platform hourly stats and admin dashboard snapshot
+    PLATFORM_STATS_REFRESH_SECONDS: int = 60
+    PLATFORM_STATS_REFRESH_HOURS: int = 2  # trailing hours recomputed on each refresh
+    ADMIN_SNAPSHOT_TTL_SECONDS: int = 300
+    
+    # Admin exports
+    EXPORT_CHUNK_SIZE: int = 5000  # rows fetched and encoded per step
+    
+    # Cursor pagination
+    PAGINATION_TOTAL_TTL_SECONDS: int = 60  # cached totals for include_total=true
+    
+    # Session report partitions (one per day)
+    REPORT_PARTITIONS_AHEAD_DAYS: int = 7
+    REPORT_RETENTION_DAYS: int = 90  # older partitions are dropped whole
+    REPORT_ARCHIVE_DIR: str = "data/report_archive"  # archived before the drop; empty disables
+    
+    # Session traffic charts
+    SERIES_MAX_POINTS: int = 500
+    SERIES_FINE_RETENTION_DAYS: int = 30  # 10s buckets; coarser ones are kept
+    
+    # Online anomaly detection on traffic reports
+    ANOMALY_MAX_SPEED_MB_S: float = 125.0  # ~1 Gbit/s; above is impossible for a device
+    ANOMALY_SPIKE_FACTOR: float = 10.0  # speed over the session's EWMA speed
+    ANOMALY_EWMA_ALPHA: float = 0.2
+    ANOMALY_DRIFT_MB: float = 50.0  # client cumulative vs server-summed deltas
+    ANOMALY_DRIFT_PERCENT: float = 0.05
+    ANOMALY_AUTO_PAUSE: bool = True  # pause on impossible speed / counter regression
     
     # CORS
     ALLOWED_ORIGINS: str = "*"
@@ -56,6 +98,38 @@ class Settings(BaseSettings):
     # Rate Limiting
     RATE_LIMIT_PER_MINUTE: int = 60
     RATE_LIMIT_PER_HOUR: int = 1000
+    RATE_LIMIT_ENABLED: bool = False  # enable once RATE_LIMIT_TRUSTED_PROXIES covers the proxy in front
+    # Proxies (IPs/CIDRs) whose X-Real-IP / X-Forwarded-For is believed, e.g. the nginx network
+    RATE_LIMIT_TRUSTED_PROXIES: str = "127.0.0.1/32"
+    RATE_LIMIT_BACKEND: str = "memory"  # memory/redis (shared across workers)
+    RATE_LIMIT_MAX_KEYS: int = 100000
+    RATE_LIMIT_REPORT_PER_MINUTE: int = 120
+    RATE_LIMIT_AUTH_PER_MINUTE: int = 10
+    
+    # Cache (in-process L1 in front of Redis L2)
+    CACHE_L1_MAX_ITEMS: int = 10000
+    CACHE_L1_TTL_SECONDS: float = 30.0
+    CACHE_NEGATIVE_TTL_SECONDS: int = 300
+    CACHE_REDIS_MAX_CONNECTIONS: int = 50
+    
+    # IP reputation
+    IP_REPUTATION_PROVIDER: str = "ip-api"  # ip-api/stub
+    IP_API_URL: str = "http://ip-api.com"
+    IP_API_REQUESTS_PER_MINUTE: int = 15  # ip-api batch endpoint limit
+    IP_REPUTATION_BATCH_WINDOW_SECONDS: float = 0.05
+    IP_REPUTATION_TIMEOUT_SECONDS: float = 30.0
+    IP_INTEL_INDEX_PATH: str = ""  # built by scripts/build_ip_index.py
+    
+    # WebSocket hub
+    WS_SEND_QUEUE_SIZE: int = 100
+    WS_SEND_TIMEOUT_SECONDS: float = 5.0
+    WS_SESSION_MAX_UPDATES_PER_SECOND: float = 1.0
+    
+    # Traffic report ingestion (write-behind buffer)
+    REPORT_FLUSH_INTERVAL_SECONDS: float = 2.0
+    REPORT_FLUSH_MAX_BATCH: int = 2000
+    REPORT_BUFFER_MAX_SIZE: int = 50000
+    REPORT_SESSION_IDLE_SECONDS: float = 600.0  # cached sessions with no reports this long are dropped
     
     @property
     def admin_ids_list(self) -> List[int]:
@@ -16,6 +16,16 @@ from app.api.support import router as support_router
 from app.api.news import router as news_router
 from app.api.profile import router as profile_router
 from app.api.admin import router as admin_router
+from app.api.admin.anomalies import router as admin_anomalies_router
+from app.api.admin.reports import router as admin_reports_router
+from app.services.report_ingestion_service import report_ingestion
+from app.services.price_oracle import price_oracle
+from app.middleware.rate_limit import RateLimitMiddleware
+from app.utils.cache_manager import cache_manager
+from app.services.ip_reputation_service import ip_reputation
+from app.services.websocket_manager import ws_manager
+from app.services.fcm_client import fcm_client
+from app.services.telegram_dispatcher import telegram_dispatcher
 
 
 @asynccontextmanager
@@ -29,10 +39,26 @@ async def lifespan(app: FastAPI):
     async with engine.begin() as conn:
         await conn.run_sync(Base.metadata.create_all)
     
+    # Start write-behind traffic report ingestion
+    await report_ingestion.start()
+    
+    # Listen for price changes published by other processes
+    await price_oracle.start_listener()
+    
+    # Receive WebSocket messages published by other workers
+    await ws_manager.start()
+    
     yield
     
     # Shutdown
     print("👋 Shutting down...")
+    await report_ingestion.stop()
+    await price_oracle.stop_listener()
+    await cache_manager.close()
+    await ip_reputation.close()
+    await ws_manager.stop()
+    await fcm_client.close()
+    await telegram_dispatcher.close()
 
 
 app = FastAPI(
@@ -50,6 +76,10 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
+# Rate limiting
+if settings.RATE_LIMIT_ENABLED:
+    app.add_middleware(RateLimitMiddleware)
+
 
 # Exception handler
 @app.exception_handler(Exception)
@@ -77,6 +107,8 @@ app.include_router(support_router, prefix="/api/support", tags=["Support"])
 app.include_router(news_router, prefix="/api/news", tags=["News & Promo"])
 app.include_router(profile_router, prefix="/api/profile", tags=["Profile"])
 app.include_router(admin_router, prefix="/api/admin", tags=["Admin"])
+app.include_router(admin_anomalies_router, prefix="/api")
+app.include_router(admin_reports_router, prefix="/api")
 
 
 if __name__ == "__main__":
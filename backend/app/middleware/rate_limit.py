@@ -1,99 +1,151 @@
-from fastapi import Request, HTTPException, status
+from fastapi import Request, status
+from fastapi.responses import JSONResponse
 from starlette.middleware.base import BaseHTTPMiddleware
-from typing import Dict, Tuple
-from datetime import datetime, timedelta
+from typing import List, Optional, Tuple
+import ipaddress
+import math
 import logging
 
+from app.core.config import settings
+from app.core.security import decode_access_token
+from app.utils.rate_limiter import RateLimitRule, InMemoryRateLimiter, RedisRateLimiter
+
 logger = logging.getLogger(__name__)
 
 
+def default_route_rules() -> List[Tuple[str, List[RateLimitRule]]]:
+    """Per-route budgets from settings, first matching path prefix wins"""
+    return [
+        ("/api/sessions/report", [
+            RateLimitRule("Report", settings.RATE_LIMIT_REPORT_PER_MINUTE, 60),
+        ]),
+        ("/api/auth", [
+            RateLimitRule("Auth", settings.RATE_LIMIT_AUTH_PER_MINUTE, 60),
+        ]),
+    ]
+
+
+def default_rules() -> List[RateLimitRule]:
+    """Budgets for every other route"""
+    return [
+        RateLimitRule("Minute", settings.RATE_LIMIT_PER_MINUTE, 60),
+        RateLimitRule("Hour", settings.RATE_LIMIT_PER_HOUR, 3600),
+    ]
+
+
 class RateLimitMiddleware(BaseHTTPMiddleware):
-    """Rate limiting middleware"""
+    """
+    Rate limiting middleware
+    Token buckets keyed by telegram_id (authenticated) or client IP,
+    taken from X-Real-IP / X-Forwarded-For only behind a trusted proxy
+    """
     
     def __init__(
         self,
         app,
-        requests_per_minute: int = 60,
-        requests_per_hour: int = 1000
+        route_rules: Optional[List[Tuple[str, List[RateLimitRule]]]] = None,
+        rules: Optional[List[RateLimitRule]] = None,
+        limiter=None,
+        trusted_proxies: Optional[str] = None
     ):
         super().__init__(app)
-        self.requests_per_minute = requests_per_minute
-        self.requests_per_hour = requests_per_hour
+        self.route_rules = route_rules if route_rules is not None else default_route_rules()
+        self.rules = rules if rules is not None else default_rules()
+        
+        if limiter is None:
+            if settings.RATE_LIMIT_BACKEND == "redis":
+                limiter = RedisRateLimiter()
+            else:
+                limiter = InMemoryRateLimiter()
+        self.limiter = limiter
         
-        # Store: {ip: [(timestamp, count_minute, count_hour), ...]}
-        self.request_history: Dict[str, list] = {}
+        if trusted_proxies is None:
+            trusted_proxies = settings.RATE_LIMIT_TRUSTED_PROXIES
+        self.trusted_proxies = [
+            ipaddress.ip_network(cidr.strip(), strict=False)
+            for cidr in trusted_proxies.split(",") if cidr.strip()
+        ]
     
     async def dispatch(self, request: Request, call_next):
-        # Get client IP
-        client_ip = request.client.host if request.client else "unknown"
+        path = request.url.path
+        rules = self._rules_for(path)
+        key = self._client_key(request)
+        
+        # Check every budget for this route; tokens are only spent if all pass
+        headers = {}
+        results = await self.limiter.hit_all(key, rules)
         
-        # Check rate limit
-        if not self._check_rate_limit(client_ip):
-            logger.warning(f"Rate limit exceeded for IP: {client_ip}")
-            raise HTTPException(
-                status_code=status.HTTP_429_TOO_MANY_REQUESTS,
-                detail="Rate limit exceeded. Please try again later."
-            )
+        for rule, (allowed, remaining, _) in zip(rules, results):
+            headers[f"X-RateLimit-Limit-{rule.name}"] = str(rule.requests)
+            headers[f"X-RateLimit-Remaining-{rule.name}"] = str(remaining)
         
-        # Record request
-        self._record_request(client_ip)
+        for rule, (allowed, _, retry_after) in zip(rules, results):
+            if not allowed:
+                logger.warning(f"Rate limit exceeded for {key} on {path} ({rule.name})")
+                headers["Retry-After"] = str(max(1, math.ceil(retry_after)))
+                
+                return JSONResponse(
+                    status_code=status.HTTP_429_TOO_MANY_REQUESTS,
+                    content={
+                        "status": "error",
+                        "message": "Rate limit exceeded. Please try again later."
+                    },
+                    headers=headers
+                )
         
         # Continue with request
         response = await call_next(request)
         
         # Add rate limit headers
-        remaining_minute, remaining_hour = self._get_remaining(client_ip)
-        response.headers["X-RateLimit-Limit-Minute"] = str(self.requests_per_minute)
-        response.headers["X-RateLimit-Remaining-Minute"] = str(remaining_minute)
-        response.headers["X-RateLimit-Limit-Hour"] = str(self.requests_per_hour)
-        response.headers["X-RateLimit-Remaining-Hour"] = str(remaining_hour)
+        for name, value in headers.items():
+            response.headers[name] = value
         
         return response
     
-    def _check_rate_limit(self, ip: str) -> bool:
-        """Check if IP is within rate limits"""
-        now = datetime.utcnow()
-        minute_ago = now - timedelta(minutes=1)
-        hour_ago = now - timedelta(hours=1)
-        
-        if ip not in self.request_history:
-            return True
-        
-        # Clean old entries
-        self.request_history[ip] = [
-            timestamp for timestamp in self.request_history[ip]
-            if timestamp > hour_ago
-        ]
+    def _rules_for(self, path: str) -> List[RateLimitRule]:
+        """Route specific budgets, falling back to the defaults"""
+        for prefix, rules in self.route_rules:
+            if path.startswith(prefix):
+                return rules
+        
+        return self.rules
+    
+    def _client_key(self, request: Request) -> str:
+        """telegram_id from a valid bearer token, otherwise client IP"""
+        authorization = request.headers.get("authorization", "")
         
-        # Count requests
-        minute_count = sum(1 for t in self.request_history[ip] if t > minute_ago)
-        hour_count = len(self.request_history[ip])
+        if authorization.lower().startswith("bearer "):
+            payload = decode_access_token(authorization[7:])
+            if payload and payload.get("sub"):
+                return f"user:{payload['sub']}"
         
-        return (
-            minute_count < self.requests_per_minute and
-            hour_count < self.requests_per_hour
-        )
+        return f"ip:{self._client_ip(request)}"
     
-    def _record_request(self, ip: str):
-        """Record a request from IP"""
-        if ip not in self.request_history:
-            self.request_history[ip] = []
+    def _client_ip(self, request: Request) -> str:
+        """
+        Peer address, or the address a trusted proxy (nginx) reports for it
+        Forwarded headers from anyone else are ignored so they cannot be spoofed
+        """
+        peer = request.client.host if request.client else "unknown"
+        
+        if not self._is_trusted_proxy(peer):
+            return peer
         
-        self.request_history[ip].append(datetime.utcnow())
+        real_ip = request.headers.get("x-real-ip", "").strip()
+        if real_ip:
+            return real_ip
+        
+        # Rightmost hop is the one our proxy appended
+        forwarded = [ip.strip() for ip in request.headers.get("x-forwarded-for", "").split(",") if ip.strip()]
+        if forwarded:
+            return forwarded[-1]
+        
+        return peer
     
-    def _get_remaining(self, ip: str) -> Tuple[int, int]:
-        """Get remaining requests for IP"""
-        now = datetime.utcnow()
-        minute_ago = now - timedelta(minutes=1)
-        hour_ago = now - timedelta(hours=1)
-        
-        if ip not in self.request_history:
-            return self.requests_per_minute, self.requests_per_hour
-        
-        minute_count = sum(1 for t in self.request_history[ip] if t > minute_ago)
-        hour_count = len(self.request_history[ip])
-        
-        return (
-            max(0, self.requests_per_minute - minute_count),
-            max(0, self.requests_per_hour - hour_count)
-        )
+    def _is_trusted_proxy(self, peer: str) -> bool:
+        try:
+            address = ipaddress.ip_address(peer)
+        except ValueError:
+            return False
+        
+        return any(address in network for network in self.trusted_proxies)
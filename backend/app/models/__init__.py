@@ -5,7 +5,11 @@ from app.models.announcement import Announcement, PromoCode
 from app.models.support import SupportRequest
 from app.models.settings import UserSettings
 from app.models.pricing import DailyPrice, PricingLog, TrafficLog
-from app.models.notification import NotificationLog
+from app.models.notification import NotificationLog, NotificationBroadcast, NotificationBroadcastChunk
+from app.models.rollup import UserDailyStats
+from app.models.platform_stats import PlatformHourlyStats
+from app.models.traffic_series import SessionTrafficBucket
+from app.models.anomaly import SessionAnomaly
 
 __all__ = [
     "User",
@@ -21,4 +25,10 @@ __all__ = [
     "PricingLog",
     "TrafficLog",
     "NotificationLog",
+    "NotificationBroadcast",
+    "NotificationBroadcastChunk",
+    "UserDailyStats",
+    "PlatformHourlyStats",
+    "SessionTrafficBucket",
+    "SessionAnomaly",
 ]
@@ -1,4 +1,4 @@
-from sqlalchemy import Column, BigInteger, String, Text, Boolean, DateTime
+from sqlalchemy import Column, BigInteger, String, Text, Boolean, DateTime, Index, text
 from sqlalchemy.sql import func
 from app.core.database import Base
 
@@ -8,6 +8,10 @@ class Announcement(Base):
     REAL announcement/news model
     """
     __tablename__ = "announcements"
+    __table_args__ = (
+        # Published news feed pages
+        Index("idx_announcements_active_created", "created_at", "id", postgresql_where=text("is_active")),
+    )
     
     id = Column(BigInteger, primary_key=True, index=True, autoincrement=True)
     
@@ -0,0 +1,33 @@
+from sqlalchemy import Column, BigInteger, String, Float, DateTime, ForeignKey, JSON, Index
+from sqlalchemy.sql import func
+from app.core.database import Base
+
+
+class SessionAnomaly(Base):
+    """
+    REAL anomaly flagged on the live report stream
+    Open flags are reviewed by admins; paused sessions stay inactive
+    until the flag is dismissed
+    """
+    __tablename__ = "session_anomalies"
+    __table_args__ = (
+        # Admin review queue, newest first
+        Index("idx_session_anomalies_status_created", "status", "created_at", "id"),
+        Index("idx_session_anomalies_session", "session_id"),
+    )
+    
+    id = Column(BigInteger, primary_key=True, autoincrement=True)
+    session_id = Column(BigInteger, ForeignKey("sessions.id", ondelete="CASCADE"), nullable=False)
+    telegram_id = Column(BigInteger, nullable=False)
+    
+    kind = Column(String(32), nullable=False)  # impossible_speed/counter_regression/drift/speed_spike
+    value = Column(Float)
+    threshold = Column(Float)
+    details = Column(JSON)
+    
+    action = Column(String(16), default='flagged')  # flagged/paused
+    status = Column(String(16), default='open')  # open/dismissed/confirmed
+    resolved_by = Column(BigInteger)  # Admin telegram_id
+    resolved_at = Column(DateTime(timezone=True))
+    
+    created_at = Column(DateTime(timezone=True), server_default=func.now())
@@ -1,4 +1,4 @@
-from sqlalchemy import Column, BigInteger, String, Boolean, Text, DateTime, JSON
+from sqlalchemy import Column, BigInteger, Integer, String, Boolean, Text, DateTime, JSON, UniqueConstraint
 from sqlalchemy.sql import func
 from app.core.database import Base
 
@@ -43,3 +43,57 @@ class FCMToken(Base):
     
     created_at = Column(DateTime(timezone=True), server_default=func.now())
     last_used = Column(DateTime(timezone=True), server_default=func.now())
+
+
+class NotificationBroadcast(Base):
+    """
+    REAL broadcast progress
+    Audience is cut into chunks sent by separate tasks; a restarted
+    broadcast continues after its last planned chunk
+    """
+    __tablename__ = "notification_broadcasts"
+    
+    id = Column(BigInteger, primary_key=True, index=True, autoincrement=True)
+    key = Column(String(100), unique=True, nullable=False)  # e.g. daily_price:2024-01-01:1.50
+    
+    title = Column(String(255), nullable=False)
+    body = Column(Text, nullable=False)
+    type = Column(String(50), nullable=False)
+    data = Column(JSON, nullable=True)
+    
+    status = Column(String(20), default="planning")  # planning, dispatched, completed
+    last_telegram_id = Column(BigInteger, default=0)  # Audience planned up to this user
+    
+    total_chunks = Column(Integer, default=0)
+    completed_chunks = Column(Integer, default=0)
+    sent = Column(Integer, default=0)
+    failed = Column(Integer, default=0)
+    
+    created_at = Column(DateTime(timezone=True), server_default=func.now())
+    updated_at = Column(DateTime(timezone=True), server_default=func.now(), onupdate=func.now())
+    completed_at = Column(DateTime(timezone=True), nullable=True)
+
+
+class NotificationBroadcastChunk(Base):
+    """
+    REAL broadcast chunk checkpoint
+    A chunk is sent once; sent chunks are skipped on retry
+    """
+    __tablename__ = "notification_broadcast_chunks"
+    __table_args__ = (
+        UniqueConstraint("broadcast_id", "chunk_index", name="uq_broadcast_chunk"),
+    )
+    
+    id = Column(BigInteger, primary_key=True, index=True, autoincrement=True)
+    broadcast_id = Column(BigInteger, nullable=False, index=True)
+    chunk_index = Column(Integer, nullable=False)
+    
+    telegram_ids = Column(JSON, nullable=False)
+    
+    status = Column(String(20), default="pending", index=True)  # pending, sending, sent
+    sent = Column(Integer, default=0)
+    failed = Column(Integer, default=0)
+    
+    created_at = Column(DateTime(timezone=True), server_default=func.now())
+    claimed_at = Column(DateTime(timezone=True), nullable=True)
+    completed_at = Column(DateTime(timezone=True), nullable=True)
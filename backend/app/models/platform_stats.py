@@ -0,0 +1,26 @@
+from sqlalchemy import Column, Integer, Float, DateTime
+from sqlalchemy.sql import func
+from app.core.database import Base
+
+
+class PlatformHourlyStats(Base):
+    """
+    REAL platform-wide hourly rollup
+    Sessions started/new users/withdrawals count in the hour they were
+    created, traffic and earnings in the hour the session completed
+    """
+    __tablename__ = "platform_hourly_stats"
+    
+    hour = Column(DateTime(timezone=True), primary_key=True)
+    
+    sessions_started = Column(Integer, default=0)
+    sessions_completed = Column(Integer, default=0)
+    active_sessions = Column(Integer, default=0)  # Running at any point in the hour
+    sent_mb = Column(Float, default=0.0)
+    used_mb = Column(Float, default=0.0)
+    earned_usd = Column(Float, default=0.0)
+    new_users = Column(Integer, default=0)
+    withdrawals_requested = Column(Integer, default=0)
+    withdrawals_usd = Column(Float, default=0.0)
+    
+    updated_at = Column(DateTime(timezone=True), server_default=func.now(), onupdate=func.now())
@@ -0,0 +1,29 @@
+from sqlalchemy import Column, BigInteger, Integer, Float, Date, DateTime, PrimaryKeyConstraint, Index
+from sqlalchemy.sql import func
+from app.core.database import Base
+
+
+class UserDailyStats(Base):
+    """
+    REAL per-user daily rollup of sessions
+    Keyed by the day the session started; traffic and earnings
+    count once the session is completed
+    """
+    __tablename__ = "user_daily_stats"
+    __table_args__ = (
+        PrimaryKeyConstraint("telegram_id", "day", name="pk_user_daily_stats"),
+        # Platform-wide day ranges (today's totals, rankings)
+        Index("idx_user_daily_stats_day", "day"),
+    )
+    
+    telegram_id = Column(BigInteger, nullable=False)
+    day = Column(Date, nullable=False)
+    
+    sessions = Column(Integer, default=0)  # Started
+    completed_sessions = Column(Integer, default=0)
+    sent_mb = Column(Float, default=0.0)
+    used_mb = Column(Float, default=0.0)  # Server counted
+    earned_usd = Column(Float, default=0.0)
+    duration_seconds = Column(Float, default=0.0)  # Of completed sessions
+    
+    updated_at = Column(DateTime(timezone=True), server_default=func.now(), onupdate=func.now())
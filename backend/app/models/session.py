@@ -1,10 +1,22 @@
-from sqlalchemy import Column, BigInteger, String, DateTime, Float, ForeignKey, JSON, Text
+from sqlalchemy import (
+    Column, BigInteger, String, DateTime, Float, Boolean, ForeignKey, JSON, Text, Index,
+    PrimaryKeyConstraint, DDL, event, text
+)
 from sqlalchemy.sql import func
 from app.core.database import Base
 
 
 class Session(Base):
     __tablename__ = "sessions"
+    __table_args__ = (
+        # History pages and per-user day ranges, newest first
+        Index("idx_sessions_telegram_start", "telegram_id", "start_time", "id"),
+        # Running sessions only - limit checks, dashboards, live counts
+        Index("idx_sessions_active_by_user", "telegram_id", postgresql_where=text("is_active")),
+        # Reconciliation and rollup rebuild windows
+        Index("idx_sessions_status_start_time", "status", "start_time"),
+        Index("idx_sessions_completed_end_time", "end_time", postgresql_where=text("status = 'completed'")),
+    )
     
     id = Column(BigInteger, primary_key=True, index=True, autoincrement=True)
     session_id = Column(String(255), unique=True, nullable=False, index=True)
@@ -58,13 +70,23 @@ class Session(Base):
 
 
 class SessionReport(Base):
+    """
+    Heartbeat reports, range partitioned by day on `timestamp`
+    Partitions are created ahead and dropped after retention by
+    ReportPartitionService; the key includes the partition column
+    """
     __tablename__ = "session_reports"
+    __table_args__ = (
+        PrimaryKeyConstraint("id", "timestamp", name="pk_session_reports"),
+        Index("idx_session_reports_session_timestamp", "session_id", "timestamp"),
+        {"postgresql_partition_by": "RANGE (timestamp)"},
+    )
     
-    id = Column(BigInteger, primary_key=True, index=True, autoincrement=True)
+    id = Column(BigInteger, autoincrement=True)
     session_id = Column(BigInteger, ForeignKey("sessions.id"), nullable=False)
     telegram_id = Column(BigInteger, nullable=False)
     
-    timestamp = Column(DateTime(timezone=True), server_default=func.now())
+    timestamp = Column(DateTime(timezone=True), nullable=False, server_default=func.now())
     cumulative_mb = Column(Float, default=0.0)
     delta_mb = Column(Float, default=0.0)
     speed_mb_s = Column(Float, default=0.0)
@@ -74,3 +96,11 @@ class SessionReport(Base):
     raw_meta = Column(JSON)
     
     created_at = Column(DateTime(timezone=True), server_default=func.now())
+
+
+# Catch-all for rows outside the daily partitions (fresh databases, clock skew)
+event.listen(
+    SessionReport.__table__,
+    "after_create",
+    DDL("CREATE TABLE IF NOT EXISTS session_reports_default PARTITION OF session_reports DEFAULT")
+)
@@ -1,10 +1,13 @@
-from sqlalchemy import Column, BigInteger, String, DateTime, Text
+from sqlalchemy import Column, BigInteger, String, DateTime, Text, Index
 from sqlalchemy.sql import func
 from app.core.database import Base
 
 
 class SupportRequest(Base):
     __tablename__ = "support_requests"
+    __table_args__ = (
+        Index("idx_support_requests_telegram_created", "telegram_id", "created_at", "id"),
+    )
     
     id = Column(BigInteger, primary_key=True, index=True, autoincrement=True)
     user_id = Column(BigInteger, nullable=False, index=True)
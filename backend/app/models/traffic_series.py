@@ -0,0 +1,29 @@
+from sqlalchemy import Column, BigInteger, Integer, Float, DateTime, ForeignKey, PrimaryKeyConstraint, Index
+from sqlalchemy.sql import func
+from app.core.database import Base
+
+
+class SessionTrafficBucket(Base):
+    """
+    REAL per-session traffic aggregates at fixed resolutions
+    Maintained on report ingestion so charts read buckets,
+    not raw session_reports rows
+    """
+    __tablename__ = "session_traffic_buckets"
+    __table_args__ = (
+        PrimaryKeyConstraint("session_id", "resolution", "bucket_start", name="pk_session_traffic_buckets"),
+        # Retention of the fine resolution
+        Index("idx_session_traffic_buckets_resolution_start", "resolution", "bucket_start"),
+    )
+    
+    session_id = Column(BigInteger, ForeignKey("sessions.id", ondelete="CASCADE"), nullable=False)
+    resolution = Column(Integer, nullable=False)  # Seconds
+    bucket_start = Column(DateTime(timezone=True), nullable=False)
+    
+    reports = Column(Integer, default=0)
+    delta_mb = Column(Float, default=0.0)
+    speed_min = Column(Float)
+    speed_max = Column(Float)
+    speed_sum = Column(Float, default=0.0)  # avg = speed_sum / reports
+    
+    updated_at = Column(DateTime(timezone=True), server_default=func.now(), onupdate=func.now())
@@ -1,10 +1,13 @@
-from sqlalchemy import Column, BigInteger, String, DateTime, Float, Boolean, Text, JSON
+from sqlalchemy import Column, BigInteger, String, DateTime, Float, Boolean, Text, JSON, Index, text
 from sqlalchemy.sql import func
 from app.core.database import Base
 
 
 class Transaction(Base):
     __tablename__ = "transactions"
+    __table_args__ = (
+        Index("idx_transactions_telegram_created", "telegram_id", "created_at", "id"),
+    )
     
     id = Column(BigInteger, primary_key=True, index=True, autoincrement=True)
     telegram_id = Column(BigInteger, nullable=False, index=True)
@@ -26,6 +29,15 @@ class Transaction(Base):
 
 class WithdrawRequest(Base):
     __tablename__ = "withdraw_requests"
+    __table_args__ = (
+        Index("idx_withdraw_requests_telegram_status", "telegram_id", "status"),
+        # Open requests only - payout queue and pending totals
+        Index(
+            "idx_withdraw_requests_pending",
+            "created_at",
+            postgresql_where=text("status IN ('pending', 'processing')")
+        ),
+    )
     
     id = Column(BigInteger, primary_key=True, index=True, autoincrement=True)
     telegram_id = Column(BigInteger, nullable=False, index=True)
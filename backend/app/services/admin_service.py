@@ -1,13 +1,13 @@
 from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy import select, func, and_
-from datetime import datetime, timedelta, date
+from datetime import datetime, date
 from typing import Dict, Any, List
 import logging
 
 from app.models.user import User
 from app.models.session import Session
-from app.models.transaction import Transaction
-from app.models.withdraw_request import WithdrawRequest
+from app.models.transaction import WithdrawRequest
+from app.services.platform_stats_service import PlatformStatsService
 
 logger = logging.getLogger(__name__)
 
@@ -23,125 +23,39 @@ class AdminService:
     async def get_dashboard_stats(self) -> Dict[str, Any]:
         """
         REAL admin dashboard statistics
+        Served from the platform snapshot, refreshed by Celery
         """
-        # Total users
-        users_result = await self.db.execute(
-            select(func.count(User.id))
-        )
-        total_users = users_result.scalar()
-        
-        # Active users (last 7 days)
-        week_ago = datetime.utcnow() - timedelta(days=7)
-        active_users_result = await self.db.execute(
-            select(func.count(User.id))
-            .where(User.last_seen >= week_ago)
-            .where(User.is_active == True)
-        )
-        active_users = active_users_result.scalar()
-        
-        # Total sessions
-        sessions_result = await self.db.execute(
-            select(func.count(Session.id))
-        )
-        total_sessions = sessions_result.scalar()
-        
-        # Active sessions now
-        active_sessions_result = await self.db.execute(
-            select(func.count(Session.id))
-            .where(Session.status == "active")
-        )
-        active_sessions = active_sessions_result.scalar()
-        
-        # Total MB processed
-        total_mb_result = await self.db.execute(
-            select(func.sum(Session.server_counted_mb))
-            .where(Session.status == "completed")
-        )
-        total_mb = total_mb_result.scalar() or 0.0
-        
-        # Total earnings distributed
-        earnings_result = await self.db.execute(
-            select(func.sum(Transaction.amount_usd))
-            .where(Transaction.type == "income")
-            .where(Transaction.status == "completed")
-        )
-        total_earnings = earnings_result.scalar() or 0.0
-        
-        # Pending withdrawals
-        pending_withdrawals_result = await self.db.execute(
-            select(func.count(WithdrawRequest.id), func.sum(WithdrawRequest.amount_usd))
-            .where(WithdrawRequest.status.in_(["pending", "processing"]))
-        )
-        pending_withdraw_row = pending_withdrawals_result.first()
-        pending_withdraw_count = pending_withdraw_row[0] or 0
-        pending_withdraw_amount = pending_withdraw_row[1] or 0.0
-        
-        # Today's stats
-        today_start = datetime.utcnow().replace(hour=0, minute=0, second=0, microsecond=0)
-        
-        today_sessions_result = await self.db.execute(
-            select(func.count(Session.id))
-            .where(Session.started_at >= today_start)
-        )
-        today_sessions = today_sessions_result.scalar()
-        
-        today_mb_result = await self.db.execute(
-            select(func.sum(Session.server_counted_mb))
-            .where(Session.started_at >= today_start)
-            .where(Session.status.in_(["active", "completed"]))
-        )
-        today_mb = today_mb_result.scalar() or 0.0
+        snapshot = await PlatformStatsService(self.db).get_snapshot()
         
-        # Top users by earnings
-        top_users_result = await self.db.execute(
-            select(
-                User.telegram_id,
-                User.first_name,
-                User.username,
-                User.balance_usd,
-                func.sum(Session.estimated_earnings).label("total_earned")
-            )
-            .join(Session, Session.telegram_id == User.telegram_id)
-            .where(Session.status == "completed")
-            .group_by(User.telegram_id, User.first_name, User.username, User.balance_usd)
-            .order_by(func.sum(Session.estimated_earnings).desc())
-            .limit(10)
-        )
-        top_users = [
-            {
-                "telegram_id": row[0],
-                "first_name": row[1],
-                "username": row[2],
-                "balance_usd": float(row[3] or 0),
-                "total_earned": float(row[4] or 0)
-            }
-            for row in top_users_result.all()
-        ]
+        total_mb = snapshot["traffic"]["total_mb"]
+        today_mb = snapshot["traffic"]["today_mb"]
         
         return {
             "users": {
-                "total": total_users,
-                "active_last_7_days": active_users
+                "total": snapshot["users"]["total"],
+                "active_last_7_days": snapshot["users"]["active_7_days"]
             },
             "sessions": {
-                "total": total_sessions,
-                "active_now": active_sessions,
-                "today": today_sessions
+                "total": snapshot["sessions"]["total"],
+                "active_now": snapshot["sessions"]["active_now"],
+                "today": snapshot["sessions"]["today"]
             },
             "traffic": {
-                "total_mb": float(total_mb),
-                "total_gb": float(total_mb / 1024),
-                "today_mb": float(today_mb),
-                "today_gb": float(today_mb / 1024)
+                "total_mb": total_mb,
+                "total_gb": total_mb / 1024,
+                "today_mb": today_mb,
+                "today_gb": today_mb / 1024
             },
             "financials": {
-                "total_earnings_distributed": float(total_earnings),
+                "total_earnings_distributed": snapshot["earnings"]["total_usd"],
                 "pending_withdrawals": {
-                    "count": pending_withdraw_count,
-                    "amount": float(pending_withdraw_amount)
+                    "count": snapshot["pending_withdrawals"]["count"],
+                    "amount": snapshot["pending_withdrawals"]["amount_usd"]
                 }
             },
-            "top_users": top_users
+            "top_users": snapshot["top_users"],
+            "hourly": snapshot["hourly"],
+            "generated_at": snapshot["generated_at"]
         }
     
     async def get_user_details(self, telegram_id: int) -> Dict[str, Any]:
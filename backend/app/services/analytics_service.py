@@ -8,6 +8,9 @@ from app.models.user import User
 from app.models.session import Session, SessionReport
 from app.models.transaction import Transaction
 from app.models.pricing import TrafficLog, DailyPrice
+from app.models.rollup import UserDailyStats
+from app.services.rollup_service import RollupService
+from app.services.platform_stats_service import PlatformStatsService
 from app.utils.helpers import Helpers
 from app.utils.formatters import Formatters
 
@@ -29,40 +32,27 @@ class AnalyticsService:
         
         start_date, end_date = self._get_date_range(period)
         
-        # Get sessions in period
-        sessions_result = await self.db.execute(
-            select(Session)
-            .where(Session.telegram_id == telegram_id)
-            .where(Session.start_time >= start_date)
-            .where(Session.start_time <= end_date)
+        # Daily rollup rows instead of every session in the period
+        days = await RollupService(self.db).get_user_days(
+            telegram_id,
+            start_date.date(),
+            end_date.date()
         )
-        sessions = sessions_result.scalars().all()
+        totals = RollupService.sum_days(days)
         
-        # Calculate aggregates
-        total_sessions = len(sessions)
-        total_sent_mb = sum(s.sent_mb or 0 for s in sessions)
-        total_used_mb = sum(s.server_counted_mb or 0 for s in sessions)
-        total_earned = sum(s.earned_usd or 0 for s in sessions)
+        total_sessions = totals["sessions"]
+        completed_count = totals["completed_sessions"]
         
         # Calculate average session duration
-        completed_sessions = [s for s in sessions if s.end_time and s.start_time]
-        if completed_sessions:
-            avg_duration_seconds = sum(
-                (s.end_time - s.start_time).total_seconds()
-                for s in completed_sessions
-            ) / len(completed_sessions)
-            avg_duration = Helpers.format_duration(int(avg_duration_seconds))
+        if completed_count:
+            avg_duration = Helpers.format_duration(int(totals["duration_seconds"] / completed_count))
         else:
             avg_duration = "0s"
         
         # Calculate average speed
-        avg_speed = Helpers.safe_divide(
-            sum(s.server_counted_mb or 0 for s in completed_sessions),
-            sum((s.end_time - s.start_time).total_seconds() for s in completed_sessions if s.end_time)
-        )
+        avg_speed = Helpers.safe_divide(totals["used_mb"], totals["duration_seconds"])
         
         # Success rate
-        completed_count = len([s for s in sessions if s.status == 'completed'])
         success_rate = Helpers.calculate_percentage(completed_count, total_sessions)
         
         return {
@@ -73,106 +63,36 @@ class AnalyticsService:
                 "total_sessions": total_sessions,
                 "completed_sessions": completed_count,
                 "success_rate": success_rate,
-                "total_sent_mb": round(total_sent_mb, 2),
-                "total_used_mb": round(total_used_mb, 2),
-                "total_earned_usd": round(total_earned, 2),
+                "total_sent_mb": round(totals["sent_mb"], 2),
+                "total_used_mb": round(totals["used_mb"], 2),
+                "total_earned_usd": round(totals["earned_usd"], 2),
                 "avg_duration": avg_duration,
                 "avg_speed_mb_s": round(avg_speed, 2),
             },
-            "daily_breakdown": await self._get_daily_breakdown(telegram_id, start_date, end_date)
+            "daily_breakdown": self._get_daily_breakdown(days)
         }
     
-    async def _get_daily_breakdown(
-        self,
-        telegram_id: int,
-        start_date: datetime,
-        end_date: datetime
-    ) -> List[Dict]:
+    def _get_daily_breakdown(self, days: List[UserDailyStats]) -> List[Dict]:
         """Get daily breakdown of activity"""
-        
-        result = await self.db.execute(
-            select(
-                func.date(Session.start_time).label('date'),
-                func.count(Session.id).label('sessions'),
-                func.sum(Session.sent_mb).label('sent_mb'),
-                func.sum(Session.server_counted_mb).label('used_mb'),
-                func.sum(Session.earned_usd).label('earned'),
-            )
-            .where(Session.telegram_id == telegram_id)
-            .where(Session.start_time >= start_date)
-            .where(Session.start_time <= end_date)
-            .group_by(func.date(Session.start_time))
-            .order_by(func.date(Session.start_time))
-        )
-        
-        rows = result.all()
-        
         return [
             {
-                "date": row.date.isoformat() if row.date else None,
+                "date": row.day.isoformat(),
                 "sessions": row.sessions or 0,
                 "sent_mb": float(row.sent_mb or 0),
                 "used_mb": float(row.used_mb or 0),
-                "earned_usd": float(row.earned or 0),
+                "earned_usd": float(row.earned_usd or 0),
             }
-            for row in rows
+            for row in days
         ]
     
     async def get_platform_analytics(self) -> Dict[str, Any]:
-        """Get platform-wide analytics (admin only)"""
-        
-        # Total users
-        total_users_result = await self.db.execute(
-            select(func.count(User.id))
-        )
-        total_users = total_users_result.scalar()
-        
-        # Active users (logged in last 7 days)
-        week_ago = datetime.utcnow() - timedelta(days=7)
-        active_users_result = await self.db.execute(
-            select(func.count(User.id))
-            .where(User.last_seen >= week_ago)
-        )
-        active_users = active_users_result.scalar()
-        
-        # Total balance
-        total_balance_result = await self.db.execute(
-            select(func.sum(User.balance_usd))
-        )
-        total_balance = total_balance_result.scalar() or 0
+        """Get platform-wide analytics (admin only) from the cached snapshot"""
         
-        # Active sessions
-        active_sessions_result = await self.db.execute(
-            select(func.count(Session.id))
-            .where(Session.is_active == True)
-        )
-        active_sessions = active_sessions_result.scalar()
+        snapshot = await PlatformStatsService(self.db).get_snapshot()
         
-        # Today's statistics
-        today = date.today()
-        today_start = datetime.combine(today, datetime.min.time())
-        
-        today_sessions_result = await self.db.execute(
-            select(
-                func.count(Session.id).label('count'),
-                func.sum(Session.sent_mb).label('sent_mb'),
-                func.sum(Session.server_counted_mb).label('used_mb'),
-                func.sum(Session.earned_usd).label('earned'),
-            )
-            .where(Session.start_time >= today_start)
-        )
-        today_stats = today_sessions_result.one()
-        
-        # Pending withdrawals
-        pending_withdrawals_result = await self.db.execute(
-            select(
-                func.count(Transaction.id).label('count'),
-                func.sum(Transaction.amount_usd).label('amount'),
-            )
-            .where(Transaction.type == 'withdraw')
-            .where(Transaction.status.in_(['pending', 'processing']))
-        )
-        pending_withdrawals = pending_withdrawals_result.one()
+        total_users = snapshot["users"]["total"]
+        active_users = snapshot["users"]["active_7_days"]
+        total_balance = snapshot["balance_total_usd"]
         
         return {
             "users": {
@@ -185,16 +105,16 @@ class AnalyticsService:
                 "formatted": Formatters.format_currency(total_balance),
             },
             "sessions": {
-                "active_now": active_sessions,
-                "today_count": today_stats.count or 0,
-                "today_traffic_mb": float(today_stats.sent_mb or 0),
-                "today_earned_usd": float(today_stats.earned or 0),
+                "active_now": snapshot["sessions"]["active_now"],
+                "today_count": snapshot["sessions"]["today"],
+                "today_traffic_mb": snapshot["traffic"]["today_sent_mb"],
+                "today_earned_usd": snapshot["earnings"]["today_usd"],
             },
             "withdrawals": {
-                "pending_count": pending_withdrawals.count or 0,
-                "pending_amount_usd": float(pending_withdrawals.amount or 0),
+                "pending_count": snapshot["pending_withdrawals"]["count"],
+                "pending_amount_usd": snapshot["pending_withdrawals"]["amount_usd"],
             },
-            "timestamp": datetime.utcnow().isoformat(),
+            "timestamp": snapshot["generated_at"],
         }
     
     async def get_traffic_trends(
@@ -259,21 +179,33 @@ class AnalyticsService:
         
         start_date, end_date = self._get_date_range(period)
         
+        # Rank on the rollup first, join users only for the top rows
+        ranking = (
+            select(
+                UserDailyStats.telegram_id,
+                func.sum(UserDailyStats.earned_usd).label('total_earned'),
+                func.sum(UserDailyStats.sent_mb).label('total_sent'),
+                func.sum(UserDailyStats.sessions).label('session_count'),
+            )
+            .where(UserDailyStats.day >= start_date.date())
+            .where(UserDailyStats.day <= end_date.date())
+            .group_by(UserDailyStats.telegram_id)
+            .order_by(func.sum(UserDailyStats.earned_usd).desc())
+            .limit(limit)
+            .subquery()
+        )
+        
         result = await self.db.execute(
             select(
                 User.telegram_id,
                 User.username,
                 User.first_name,
-                func.sum(Session.earned_usd).label('total_earned'),
-                func.sum(Session.sent_mb).label('total_sent'),
-                func.count(Session.id).label('session_count'),
+                ranking.c.total_earned,
+                ranking.c.total_sent,
+                ranking.c.session_count,
             )
-            .join(Session, Session.telegram_id == User.telegram_id)
-            .where(Session.start_time >= start_date)
-            .where(Session.start_time <= end_date)
-            .group_by(User.telegram_id, User.username, User.first_name)
-            .order_by(func.sum(Session.earned_usd).desc())
-            .limit(limit)
+            .join(ranking, ranking.c.telegram_id == User.telegram_id)
+            .order_by(ranking.c.total_earned.desc())
         )
         
         rows = result.all()
@@ -286,7 +218,7 @@ class AnalyticsService:
                 "first_name": row.first_name,
                 "total_earned_usd": float(row.total_earned or 0),
                 "total_sent_mb": float(row.total_sent or 0),
-                "session_count": row.session_count,
+                "session_count": int(row.session_count or 0),
             }
             for idx, row in enumerate(rows)
         ]
@@ -373,15 +305,9 @@ class AnalyticsService:
         # Get analytics
         analytics = await self.get_user_analytics(telegram_id, "custom")
         
-        # Get all sessions in period
-        sessions_result = await self.db.execute(
-            select(Session)
-            .where(Session.telegram_id == telegram_id)
-            .where(Session.start_time >= start_datetime)
-            .where(Session.start_time <= end_datetime)
-            .order_by(Session.start_time.desc())
-        )
-        sessions = sessions_result.scalars().all()
+        # Sessions in period
+        days = await RollupService(self.db).get_user_days(telegram_id, start_date, end_date)
+        sessions_count = RollupService.sum_days(days)["sessions"]
         
         # Get transactions in period
         transactions_result = await self.db.execute(
@@ -406,6 +332,6 @@ class AnalyticsService:
                 "balance_usd": user.balance_usd,
             },
             "analytics": analytics,
-            "sessions_count": len(sessions),
+            "sessions_count": sessions_count,
             "transactions_count": len(transactions),
         }
@@ -0,0 +1,138 @@
+from datetime import datetime
+from typing import Dict, Any, List, Optional
+import logging
+
+from app.core.config import settings
+
+logger = logging.getLogger(__name__)
+
+
+# Kinds that pause the session; the others are only flagged for review.
+# Counter regressions are flagged only: clients reset their counters in
+# ordinary use, and report reconciliation counts those resets as legitimate
+PAUSING_KINDS = {"impossible_speed"}
+
+# Below this the EWMA is too small to call a jump a spike (MB/s)
+MIN_SPIKE_BASELINE = 0.1
+
+
+class _SessionState:
+    __slots__ = ("ewma_speed", "last_cumulative", "last_at", "baseline_mb", "server_mb", "flagged")
+    
+    def __init__(self, baseline_mb: float):
+        self.ewma_speed: Optional[float] = None
+        self.last_cumulative: Optional[float] = None
+        self.last_at: Optional[datetime] = None
+        self.baseline_mb = baseline_mb
+        self.server_mb = 0.0
+        self.flagged = set()
+
+
+class AnomalyDetector:
+    """
+    REAL online anomaly detection on the report stream
+    Keeps constant state per session (EWMA speed, last cumulative,
+    client vs server drift) and checks each report as it is accepted
+    """
+    
+    def __init__(
+        self,
+        max_speed_mb_s: float = settings.ANOMALY_MAX_SPEED_MB_S,
+        spike_factor: float = settings.ANOMALY_SPIKE_FACTOR,
+        ewma_alpha: float = settings.ANOMALY_EWMA_ALPHA,
+        drift_mb: float = settings.ANOMALY_DRIFT_MB,
+        drift_percent: float = settings.ANOMALY_DRIFT_PERCENT
+    ):
+        self.max_speed_mb_s = max_speed_mb_s
+        self.spike_factor = spike_factor
+        self.ewma_alpha = ewma_alpha
+        self.drift_mb = drift_mb
+        self.drift_percent = drift_percent
+        
+        # session pk -> state
+        self._states: Dict[int, _SessionState] = {}
+    
+    @property
+    def tracked_sessions(self) -> int:
+        return len(self._states)
+    
+    def observe(
+        self,
+        session_pk: int,
+        at: datetime,
+        cumulative_mb: float,
+        delta_mb: float,
+        speed_mb_s: Optional[float] = None
+    ) -> List[Dict[str, Any]]:
+        """
+        Check one report and update the session state
+        Returns anomalies not yet flagged for this session
+        """
+        state = self._states.get(session_pk)
+        if state is None:
+            # Drift is measured from the first report seen by this process
+            state = _SessionState(baseline_mb=cumulative_mb - delta_mb)
+            self._states[session_pk] = state
+        
+        anomalies = []
+        
+        # Reported speed, or the rate implied by the delta if higher
+        speed = speed_mb_s or 0.0
+        if state.last_at is not None:
+            elapsed = max((at - state.last_at).total_seconds(), 1.0)
+            speed = max(speed, delta_mb / elapsed)
+        
+        if speed > self.max_speed_mb_s:
+            anomalies.append(self._anomaly("impossible_speed", speed, self.max_speed_mb_s))
+        
+        if state.last_cumulative is not None and cumulative_mb < state.last_cumulative:
+            anomalies.append(self._anomaly(
+                "counter_regression",
+                cumulative_mb,
+                state.last_cumulative
+            ))
+        
+        state.server_mb += delta_mb
+        drift = cumulative_mb - (state.baseline_mb + state.server_mb)
+        drift_threshold = max(self.drift_mb, cumulative_mb * self.drift_percent)
+        
+        if abs(drift) > drift_threshold:
+            anomalies.append(self._anomaly("drift", drift, drift_threshold))
+        
+        if (
+            state.ewma_speed is not None
+            and state.ewma_speed >= MIN_SPIKE_BASELINE
+            and speed > state.ewma_speed * self.spike_factor
+        ):
+            anomalies.append(self._anomaly(
+                "speed_spike",
+                speed,
+                state.ewma_speed * self.spike_factor
+            ))
+        
+        if state.ewma_speed is None:
+            state.ewma_speed = speed
+        else:
+            state.ewma_speed += self.ewma_alpha * (speed - state.ewma_speed)
+        
+        state.last_cumulative = cumulative_mb
+        state.last_at = at
+        
+        # Each kind is raised once per session
+        new = [anomaly for anomaly in anomalies if anomaly["kind"] not in state.flagged]
+        state.flagged.update(anomaly["kind"] for anomaly in new)
+        
+        return new
+    
+    def forget(self, session_pk: int):
+        """Drop state of a session no longer ingested"""
+        self._states.pop(session_pk, None)
+    
+    @staticmethod
+    def _anomaly(kind: str, value: float, threshold: float) -> Dict[str, Any]:
+        return {
+            "kind": kind,
+            "value": value,
+            "threshold": threshold,
+            "pause": kind in PAUSING_KINDS,
+        }
@@ -0,0 +1,183 @@
+from datetime import datetime
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy import select, update
+from typing import Dict, Any, List, Optional
+import logging
+
+from app.models.session import Session
+from app.models.anomaly import SessionAnomaly
+from app.utils.pagination import KeysetPaginator
+from app.core.config import settings
+
+logger = logging.getLogger(__name__)
+
+
+class AnomalyService:
+    """
+    REAL anomaly flags and admin review
+    Flags come from the online detector; paused sessions are taken
+    out of ingestion until an admin dismisses or confirms the flag
+    """
+    
+    STATUSES = ("open", "dismissed", "confirmed")
+    
+    def __init__(self, db: AsyncSession):
+        self.db = db
+    
+    async def record(
+        self,
+        session_pk: int,
+        telegram_id: int,
+        anomalies: List[Dict[str, Any]],
+        details: Optional[Dict[str, Any]] = None
+    ) -> bool:
+        """
+        REAL store detector anomalies, pausing the session if one requires it
+        Returns True when the session was paused
+        """
+        pause = settings.ANOMALY_AUTO_PAUSE and any(anomaly["pause"] for anomaly in anomalies)
+        
+        for anomaly in anomalies:
+            self.db.add(SessionAnomaly(
+                session_id=session_pk,
+                telegram_id=telegram_id,
+                kind=anomaly["kind"],
+                value=anomaly["value"],
+                threshold=anomaly["threshold"],
+                details=details,
+                action="paused" if pause and anomaly["pause"] else "flagged",
+                status="open"
+            ))
+        
+        if pause:
+            # Buffered reports of an inactive session are dropped on flush
+            await self.db.execute(
+                update(Session)
+                .where(Session.id == session_pk)
+                .where(Session.is_active == True)
+                .values(is_active=False, status="paused")
+            )
+        
+        await self.db.commit()
+        
+        logger.warning(
+            f"Session {session_pk} (user {telegram_id}) anomalies: "
+            f"{', '.join(anomaly['kind'] for anomaly in anomalies)}"
+            f"{' - paused' if pause else ''}"
+        )
+        
+        return pause
+    
+    async def list_anomalies(
+        self,
+        status: str = "open",
+        limit: int = 50,
+        cursor: Optional[str] = None
+    ) -> Dict[str, Any]:
+        """
+        REAL review queue, newest first (keyset pagination)
+        """
+        if status not in self.STATUSES:
+            raise ValueError(f"Invalid status: {status}")
+        
+        paginator = KeysetPaginator(SessionAnomaly.created_at, SessionAnomaly.id, limit)
+        query = paginator.apply(
+            select(SessionAnomaly).where(SessionAnomaly.status == status),
+            cursor
+        )
+        
+        result = await self.db.execute(query)
+        anomalies, next_cursor = paginator.page(result.scalars().all())
+        
+        return {
+            "anomalies": [
+                {
+                    "id": a.id,
+                    "session_id": a.session_id,
+                    "telegram_id": a.telegram_id,
+                    "kind": a.kind,
+                    "value": a.value,
+                    "threshold": a.threshold,
+                    "details": a.details,
+                    "action": a.action,
+                    "status": a.status,
+                    "created_at": a.created_at.isoformat() if a.created_at else None,
+                }
+                for a in anomalies
+            ],
+            "next_cursor": next_cursor,
+            "has_next": next_cursor is not None,
+        }
+    
+    async def dismiss(self, anomaly_id: int, admin_id: int) -> Dict[str, Any]:
+        """
+        REAL false positive - close the session's open flags and resume it if paused
+        """
+        _, session = await self._get_open(anomaly_id)
+        
+        resumed = session.status == "paused"
+        if resumed:
+            session.is_active = True
+            session.status = "active"
+        
+        resolved = await self._resolve(session.id, "dismissed", admin_id)
+        
+        logger.info(f"Admin {admin_id} dismissed anomalies of session {session.id}")
+        
+        return {
+            "session_id": session.id,
+            "resolved": resolved,
+            "resumed": resumed,
+        }
+    
+    async def confirm(self, anomaly_id: int, admin_id: int) -> Dict[str, Any]:
+        """
+        REAL confirmed abuse - close the session's open flags and cancel it
+        A cancelled session is never completed, so it is never paid out
+        """
+        _, session = await self._get_open(anomaly_id)
+        
+        cancelled = session.status in ("active", "paused")
+        if cancelled:
+            session.is_active = False
+            session.status = "cancelled"
+            session.end_time = datetime.utcnow()
+        
+        resolved = await self._resolve(session.id, "confirmed", admin_id)
+        
+        logger.warning(f"Admin {admin_id} confirmed anomalies of session {session.id}")
+        
+        return {
+            "session_id": session.id,
+            "resolved": resolved,
+            "cancelled": cancelled,
+        }
+    
+    async def _get_open(self, anomaly_id: int):
+        result = await self.db.execute(
+            select(SessionAnomaly, Session)
+            .join(Session, Session.id == SessionAnomaly.session_id)
+            .where(SessionAnomaly.id == anomaly_id)
+        )
+        row = result.one_or_none()
+        
+        if not row:
+            raise ValueError("Anomaly not found")
+        
+        anomaly, session = row
+        if anomaly.status != "open":
+            raise ValueError("Anomaly is already resolved")
+        
+        return anomaly, session
+    
+    async def _resolve(self, session_pk: int, status: str, admin_id: int) -> int:
+        result = await self.db.execute(
+            update(SessionAnomaly)
+            .where(SessionAnomaly.session_id == session_pk)
+            .where(SessionAnomaly.status == "open")
+            .values(status=status, resolved_by=admin_id, resolved_at=datetime.utcnow())
+            .execution_options(synchronize_session=False)
+        )
+        await self.db.commit()
+        
+        return result.rowcount
@@ -0,0 +1,200 @@
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy import select, update, func
+from typing import Dict, Any, List, Optional
+import logging
+
+from app.models.user import User
+from app.models.session import Session
+from app.models.transaction import Transaction, WithdrawRequest
+
+logger = logging.getLogger(__name__)
+
+
+class BalanceService:
+    """
+    REAL ledger-based balance recomputation
+    Expected balances for any number of users in one grouped query
+    """
+    
+    # More than 1 cent difference counts as drift
+    TOLERANCE_USD = 0.01
+    
+    # Transaction types mirrored by sessions and withdraw_requests,
+    # everything else (promo, bonus, refund...) is an adjustment
+    MIRRORED_TYPES = ("income", "withdraw")
+    
+    def __init__(self, db: AsyncSession):
+        self.db = db
+    
+    async def find_drift(
+        self,
+        telegram_ids: Optional[List[int]] = None,
+        active_only: bool = False
+    ) -> List[Dict[str, Any]]:
+        """
+        REAL drift detection
+        Returns only users whose stored balance differs from the ledger
+        """
+        expected = self._expected_balances(telegram_ids, active_only).subquery("expected")
+        
+        result = await self.db.execute(
+            select(expected).where(self._is_drifted(expected))
+        )
+        
+        return [self._to_dict(row) for row in result.all()]
+    
+    async def correct_drift(
+        self,
+        telegram_ids: Optional[List[int]] = None,
+        active_only: bool = False
+    ) -> List[Dict[str, Any]]:
+        """
+        REAL bulk balance correction
+        Single UPDATE ... FROM the grouped query, caller commits
+        """
+        expected = self._expected_balances(telegram_ids, active_only).subquery("expected")
+        
+        # Subquery columns hold pre-update values, so RETURNING gives old and new
+        result = await self.db.execute(
+            update(User)
+            .where(User.id == expected.c.id)
+            .where(self._is_drifted(expected))
+            .values(balance_usd=expected.c.expected_balance)
+            .returning(
+                expected.c.id,
+                expected.c.telegram_id,
+                expected.c.balance_usd,
+                expected.c.total_earnings,
+                expected.c.total_withdrawn,
+                expected.c.total_adjustments,
+                expected.c.expected_balance
+            )
+            .execution_options(synchronize_session=False)
+        )
+        corrections = [self._to_dict(row) for row in result.all()]
+        
+        for c in corrections:
+            logger.warning(
+                f"User {c['telegram_id']} balance corrected: "
+                f"${c['old_balance']:.2f} -> ${c['new_balance']:.2f}"
+            )
+        
+        return corrections
+    
+    async def refresh_user(self, telegram_id: int) -> Dict[str, Any]:
+        """
+        REAL single user balance refresh
+        Same grouped query restricted to one user, caller commits
+        """
+        result = await self.db.execute(
+            self._expected_balances([telegram_id])
+        )
+        row = result.one_or_none()
+        
+        if not row:
+            raise ValueError("User not found")
+        
+        data = self._to_dict(row)
+        data["corrected"] = abs(data["delta"]) > self.TOLERANCE_USD
+        
+        if data["corrected"]:
+            # ORM update keeps an already loaded User in sync
+            await self.db.execute(
+                update(User)
+                .where(User.id == row.id)
+                .values(balance_usd=data["new_balance"])
+            )
+            logger.info(
+                f"Balance corrected for user {telegram_id}: "
+                f"{data['old_balance']:.2f} -> {data['new_balance']:.2f}"
+            )
+        
+        return data
+    
+    def _expected_balances(
+        self,
+        telegram_ids: Optional[List[int]] = None,
+        active_only: bool = False
+    ):
+        """
+        Grouped aggregates of sessions, withdrawals and adjustments per user
+        expected = session earnings - withdrawn + adjustments
+        """
+        earnings_query = (
+            select(
+                Session.telegram_id,
+                func.sum(Session.earned_usd).label("total")
+            )
+            .where(Session.status == "completed")
+        )
+        withdrawn_query = (
+            select(
+                WithdrawRequest.telegram_id,
+                func.sum(func.abs(WithdrawRequest.amount_usd)).label("total")
+            )
+            .where(WithdrawRequest.status == "completed")
+        )
+        adjustments_query = (
+            select(
+                Transaction.telegram_id,
+                func.sum(Transaction.amount_usd).label("total")
+            )
+            .where(Transaction.status == "completed")
+            .where(Transaction.type.notin_(self.MIRRORED_TYPES))
+        )
+        
+        # Push the user filter into each aggregate so only their rows are scanned
+        if telegram_ids is not None:
+            earnings_query = earnings_query.where(Session.telegram_id.in_(telegram_ids))
+            withdrawn_query = withdrawn_query.where(WithdrawRequest.telegram_id.in_(telegram_ids))
+            adjustments_query = adjustments_query.where(Transaction.telegram_id.in_(telegram_ids))
+        
+        earnings = earnings_query.group_by(Session.telegram_id).subquery("earnings")
+        withdrawn = withdrawn_query.group_by(WithdrawRequest.telegram_id).subquery("withdrawn")
+        adjustments = adjustments_query.group_by(Transaction.telegram_id).subquery("adjustments")
+        
+        total_earnings = func.coalesce(earnings.c.total, 0.0)
+        total_withdrawn = func.coalesce(withdrawn.c.total, 0.0)
+        total_adjustments = func.coalesce(adjustments.c.total, 0.0)
+        
+        query = (
+            select(
+                User.id,
+                User.telegram_id,
+                func.coalesce(User.balance_usd, 0.0).label("balance_usd"),
+                total_earnings.label("total_earnings"),
+                total_withdrawn.label("total_withdrawn"),
+                total_adjustments.label("total_adjustments"),
+                (total_earnings - total_withdrawn + total_adjustments).label("expected_balance")
+            )
+            .outerjoin(earnings, earnings.c.telegram_id == User.telegram_id)
+            .outerjoin(withdrawn, withdrawn.c.telegram_id == User.telegram_id)
+            .outerjoin(adjustments, adjustments.c.telegram_id == User.telegram_id)
+        )
+        
+        if telegram_ids is not None:
+            query = query.where(User.telegram_id.in_(telegram_ids))
+        
+        if active_only:
+            query = query.where(User.is_active == True)
+        
+        return query
+    
+    def _is_drifted(self, expected):
+        """Stored balance further than tolerance from expected"""
+        return func.abs(expected.c.balance_usd - expected.c.expected_balance) > self.TOLERANCE_USD
+    
+    @staticmethod
+    def _to_dict(row) -> Dict[str, Any]:
+        old_balance = float(row.balance_usd)
+        new_balance = float(row.expected_balance)
+        
+        return {
+            "telegram_id": row.telegram_id,
+            "old_balance": old_balance,
+            "new_balance": new_balance,
+            "delta": new_balance - old_balance,
+            "total_earnings": float(row.total_earnings),
+            "total_withdrawn": float(row.total_withdrawn),
+            "total_adjustments": float(row.total_adjustments),
+        }
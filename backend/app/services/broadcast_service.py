@@ -0,0 +1,252 @@
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy import select, update, and_, or_, func
+from sqlalchemy.dialects.postgresql import insert as pg_insert
+from typing import Dict, Any, Callable, List, Optional, Tuple
+from datetime import timedelta
+from contextlib import aclosing
+import logging
+
+from app.models.notification import NotificationBroadcast, NotificationBroadcastChunk
+from app.services.notification_service import NotificationService
+from app.core.config import settings
+
+logger = logging.getLogger(__name__)
+
+
+class BroadcastService:
+    """
+    REAL chunked notification broadcasts
+    The audience is streamed into checkpointed chunks, every chunk is sent
+    by its own task, so a crashed broadcast resumes where it stopped
+    """
+    
+    def __init__(
+        self,
+        db: AsyncSession,
+        notification_service: Optional[NotificationService] = None,
+        chunk_size: int = settings.BROADCAST_CHUNK_SIZE
+    ):
+        self.db = db
+        self.notification_service = notification_service or NotificationService(db)
+        self.chunk_size = chunk_size
+    
+    async def start(
+        self,
+        key: str,
+        title: str,
+        body: str,
+        data: Optional[Dict] = None,
+        notif_type: str = "general"
+    ) -> NotificationBroadcast:
+        """
+        REAL get or create broadcast
+        Starting an existing key returns it unchanged
+        """
+        await self.db.execute(
+            pg_insert(NotificationBroadcast)
+            .values(
+                key=key,
+                title=title,
+                body=body,
+                type=notif_type,
+                data=data,
+                status="planning"
+            )
+            .on_conflict_do_nothing(index_elements=["key"])
+        )
+        await self.db.commit()
+        
+        result = await self.db.execute(
+            select(NotificationBroadcast).where(NotificationBroadcast.key == key)
+        )
+        broadcast = result.scalar_one()
+        
+        logger.info(f"Broadcast {broadcast.id} ({key}): {broadcast.status}")
+        
+        return broadcast
+    
+    async def plan(self, broadcast_id: int, dispatch: Callable[[int, int], Any]) -> int:
+        """
+        REAL cut the audience into chunks
+        Continues after the last planned user; each chunk is committed
+        before dispatch(broadcast_id, chunk_index) is called
+        """
+        broadcast = await self.db.get(NotificationBroadcast, broadcast_id)
+        
+        if broadcast is None:
+            raise ValueError("Broadcast not found")
+        
+        if broadcast.status != "planning":
+            return 0
+        
+        planned = 0
+        
+        audience = self.notification_service.iter_active_audience(
+            after_telegram_id=broadcast.last_telegram_id,
+            chunk_size=self.chunk_size
+        )
+        
+        # Release the cursor connection even if dispatch fails
+        async with aclosing(audience):
+            async for telegram_ids in audience:
+                chunk_index = broadcast.total_chunks
+                
+                self.db.add(NotificationBroadcastChunk(
+                    broadcast_id=broadcast_id,
+                    chunk_index=chunk_index,
+                    telegram_ids=telegram_ids,
+                    status="pending"
+                ))
+                broadcast.total_chunks = chunk_index + 1
+                broadcast.last_telegram_id = telegram_ids[-1]
+                await self.db.commit()
+                
+                dispatch(broadcast_id, chunk_index)
+                planned += 1
+        
+        broadcast.status = "dispatched"
+        await self.db.commit()
+        
+        # Empty audience or chunks finished while planning
+        await self._complete_if_done(broadcast_id)
+        
+        logger.info(f"Broadcast {broadcast_id}: planned {planned} chunks")
+        
+        return planned
+    
+    async def send_chunk(self, broadcast_id: int, chunk_index: int) -> Dict[str, Any]:
+        """
+        REAL send one chunk
+        Claimed atomically; sent chunks and chunks another worker is
+        sending are skipped
+        """
+        stale = func.now() - timedelta(minutes=settings.BROADCAST_STALE_MINUTES)
+        
+        result = await self.db.execute(
+            update(NotificationBroadcastChunk)
+            .where(NotificationBroadcastChunk.broadcast_id == broadcast_id)
+            .where(NotificationBroadcastChunk.chunk_index == chunk_index)
+            .where(or_(
+                NotificationBroadcastChunk.status == "pending",
+                and_(
+                    NotificationBroadcastChunk.status == "sending",
+                    NotificationBroadcastChunk.claimed_at < stale
+                )
+            ))
+            .values(status="sending", claimed_at=func.now())
+            .returning(NotificationBroadcastChunk.id, NotificationBroadcastChunk.telegram_ids)
+        )
+        claimed = result.first()
+        await self.db.commit()
+        
+        if claimed is None:
+            logger.info(f"Broadcast {broadcast_id} chunk {chunk_index} already handled")
+            return {"status": "skipped"}
+        
+        broadcast = await self.db.get(NotificationBroadcast, broadcast_id)
+        
+        delivery = await self.notification_service.send_to_multiple(
+            telegram_ids=claimed.telegram_ids,
+            title=broadcast.title,
+            body=broadcast.body,
+            data=broadcast.data,
+            notif_type=broadcast.type
+        )
+        
+        await self.db.execute(
+            update(NotificationBroadcastChunk)
+            .where(NotificationBroadcastChunk.id == claimed.id)
+            .values(
+                status="sent",
+                sent=delivery["sent"],
+                failed=delivery["failed"],
+                completed_at=func.now()
+            )
+        )
+        await self.db.execute(
+            update(NotificationBroadcast)
+            .where(NotificationBroadcast.id == broadcast_id)
+            .values(
+                completed_chunks=NotificationBroadcast.completed_chunks + 1,
+                sent=NotificationBroadcast.sent + delivery["sent"],
+                failed=NotificationBroadcast.failed + delivery["failed"]
+            )
+        )
+        await self.db.commit()
+        
+        await self._complete_if_done(broadcast_id)
+        
+        return {"status": "sent", **delivery}
+    
+    async def find_stalled(self) -> Tuple[List[int], List[Tuple[int, int]]]:
+        """
+        REAL find work lost to crashed or restarted workers
+        Returns broadcasts stuck in planning and chunks never sent
+        """
+        stale = func.now() - timedelta(minutes=settings.BROADCAST_STALE_MINUTES)
+        
+        planning_result = await self.db.execute(
+            select(NotificationBroadcast.id)
+            .where(NotificationBroadcast.status == "planning")
+            .where(NotificationBroadcast.updated_at < stale)
+        )
+        
+        chunks_result = await self.db.execute(
+            select(NotificationBroadcastChunk.broadcast_id, NotificationBroadcastChunk.chunk_index)
+            .where(or_(
+                and_(
+                    NotificationBroadcastChunk.status == "pending",
+                    NotificationBroadcastChunk.created_at < stale
+                ),
+                and_(
+                    NotificationBroadcastChunk.status == "sending",
+                    NotificationBroadcastChunk.claimed_at < stale
+                )
+            ))
+            .order_by(NotificationBroadcastChunk.broadcast_id, NotificationBroadcastChunk.chunk_index)
+        )
+        
+        return (
+            list(planning_result.scalars().all()),
+            [(row.broadcast_id, row.chunk_index) for row in chunks_result.all()]
+        )
+    
+    async def get_progress(self, broadcast_id: int) -> Dict[str, Any]:
+        """
+        REAL broadcast progress
+        """
+        broadcast = await self.db.get(NotificationBroadcast, broadcast_id)
+        
+        if broadcast is None:
+            raise ValueError("Broadcast not found")
+        
+        await self.db.refresh(broadcast)
+        
+        return {
+            "id": broadcast.id,
+            "key": broadcast.key,
+            "status": broadcast.status,
+            "total_chunks": broadcast.total_chunks,
+            "completed_chunks": broadcast.completed_chunks,
+            "sent": broadcast.sent,
+            "failed": broadcast.failed,
+            "completed_at": broadcast.completed_at.isoformat() if broadcast.completed_at else None,
+        }
+    
+    async def _complete_if_done(self, broadcast_id: int):
+        result = await self.db.execute(
+            update(NotificationBroadcast)
+            .where(NotificationBroadcast.id == broadcast_id)
+            .where(NotificationBroadcast.status == "dispatched")
+            .where(NotificationBroadcast.completed_chunks >= NotificationBroadcast.total_chunks)
+            .values(status="completed", completed_at=func.now())
+            .returning(NotificationBroadcast.sent, NotificationBroadcast.failed)
+        )
+        completed = result.first()
+        await self.db.commit()
+        
+        if completed:
+            logger.info(
+                f"Broadcast {broadcast_id} completed: "
+                f"sent={completed.sent}, failed={completed.failed}"
+            )
@@ -1,4 +1,4 @@
-from datetime import datetime, date, timedelta
+from datetime import date, timedelta
 from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy import select, func
 from typing import Dict, Any
@@ -6,8 +6,10 @@ import logging
 
 from app.models.user import User
 from app.models.session import Session
-from app.models.pricing import DailyPrice
+from app.models.rollup import UserDailyStats
 from app.models.transaction import WithdrawRequest
+from app.services.price_oracle import price_oracle
+from app.services.balance_service import BalanceService
 
 logger = logging.getLogger(__name__)
 
@@ -30,24 +32,9 @@ class DashboardService:
         if not user:
             raise ValueError("User not found")
         
-        # Get today's price - REAL query
+        # Get today's price - cached by the price oracle
         today = date.today()
-        price_result = await self.db.execute(
-            select(DailyPrice)
-            .where(DailyPrice.date == today)
-            .order_by(DailyPrice.created_at.desc())
-            .limit(1)
-        )
-        daily_price = price_result.scalar_one_or_none()
-        
-        # If no price today, get latest
-        if not daily_price:
-            latest_price_result = await self.db.execute(
-                select(DailyPrice)
-                .order_by(DailyPrice.date.desc())
-                .limit(1)
-            )
-            daily_price = latest_price_result.scalar_one_or_none()
+        price = await price_oracle.get_price(self.db)
         
         # Get active sessions - REAL count
         active_sessions_result = await self.db.execute(
@@ -57,21 +44,12 @@ class DashboardService:
         )
         active_count = active_sessions_result.scalar() or 0
         
-        # Get total sessions
-        total_sessions_result = await self.db.execute(
-            select(func.count(Session.id))
-            .where(Session.telegram_id == telegram_id)
-        )
-        total_sessions = total_sessions_result.scalar() or 0
-        
-        # Get today's earnings - REAL calculation
-        today_earnings = await self._get_today_earnings(telegram_id)
-        
-        # Get week earnings - REAL calculation
-        week_earnings = await self._get_week_earnings(telegram_id)
-        
-        # Get month earnings - REAL calculation
-        month_earnings = await self._get_month_earnings(telegram_id)
+        # Total sessions and earnings - one scan of the user's daily rollup
+        stats = await self._get_rollup_stats(telegram_id)
+        total_sessions = stats["total_sessions"]
+        today_earnings = stats["today"]
+        week_earnings = stats["week"]
+        month_earnings = stats["month"]
         
         # Pending withdrawals - REAL calculation
         pending_result = await self.db.execute(
@@ -104,9 +82,9 @@ class DashboardService:
                 "total": float(user.balance_usd),
             },
             "pricing": {
-                "price_per_gb": float(daily_price.price_per_gb if daily_price else 1.50),
-                "price_per_mb": float(daily_price.price_per_mb if daily_price else 0.0015),
-                "message": daily_price.message if daily_price else "Default pricing",
+                "price_per_gb": float(price["price_per_gb"]),
+                "price_per_mb": float(price["price_per_mb"]),
+                "message": price["message"],
                 "date": today.isoformat(),
             },
             "quick_actions": {
@@ -116,95 +94,50 @@ class DashboardService:
             }
         }
     
-    async def _get_today_earnings(self, telegram_id: int) -> float:
-        """Get REAL today's earnings from completed sessions"""
-        today_start = datetime.combine(date.today(), datetime.min.time())
-        
-        result = await self.db.execute(
-            select(func.sum(Session.earned_usd))
-            .where(Session.telegram_id == telegram_id)
-            .where(Session.start_time >= today_start)
-            .where(Session.status == 'completed')
-        )
-        earnings = result.scalar()
-        
-        return float(earnings or 0.0)
-    
-    async def _get_week_earnings(self, telegram_id: int) -> float:
-        """Get REAL week's earnings"""
+    async def _get_rollup_stats(self, telegram_id: int) -> Dict[str, Any]:
+        """Get REAL session count and today/week/month earnings from user_daily_stats"""
         today = date.today()
         week_start = today - timedelta(days=today.weekday())
-        week_start_dt = datetime.combine(week_start, datetime.min.time())
-        
-        result = await self.db.execute(
-            select(func.sum(Session.earned_usd))
-            .where(Session.telegram_id == telegram_id)
-            .where(Session.start_time >= week_start_dt)
-            .where(Session.status == 'completed')
-        )
-        earnings = result.scalar()
-        
-        return float(earnings or 0.0)
-    
-    async def _get_month_earnings(self, telegram_id: int) -> float:
-        """Get REAL month's earnings"""
-        today = date.today()
         month_start = date(today.year, today.month, 1)
-        month_start_dt = datetime.combine(month_start, datetime.min.time())
+        
+        def earned_since(day: date):
+            return func.coalesce(
+                func.sum(UserDailyStats.earned_usd).filter(UserDailyStats.day >= day),
+                0.0
+            )
         
         result = await self.db.execute(
-            select(func.sum(Session.earned_usd))
-            .where(Session.telegram_id == telegram_id)
-            .where(Session.start_time >= month_start_dt)
-            .where(Session.status == 'completed')
+            select(
+                func.coalesce(func.sum(UserDailyStats.sessions), 0).label('total_sessions'),
+                earned_since(today).label('today'),
+                earned_since(week_start).label('week'),
+                earned_since(month_start).label('month'),
+            )
+            .where(UserDailyStats.telegram_id == telegram_id)
         )
-        earnings = result.scalar()
+        row = result.one()
         
-        return float(earnings or 0.0)
+        return {
+            "total_sessions": int(row.total_sessions),
+            "today": float(row.today),
+            "week": float(row.week),
+            "month": float(row.month),
+        }
     
     async def refresh_balance(self, telegram_id: int) -> Dict[str, Any]:
-        """REAL balance refresh from sessions and withdrawals"""
-        
-        user_result = await self.db.execute(
-            select(User).where(User.telegram_id == telegram_id)
-        )
-        user = user_result.scalar_one_or_none()
-        
-        if not user:
-            raise ValueError("User not found")
-        
-        # Calculate total earnings from completed sessions
-        earnings_result = await self.db.execute(
-            select(func.sum(Session.earned_usd))
-            .where(Session.telegram_id == telegram_id)
-            .where(Session.status == 'completed')
-        )
-        total_earnings = earnings_result.scalar() or 0.0
-        
-        # Calculate total withdrawn
-        withdrawn_result = await self.db.execute(
-            select(func.sum(WithdrawRequest.amount_usd))
-            .where(WithdrawRequest.telegram_id == telegram_id)
-            .where(WithdrawRequest.status == 'completed')
-        )
-        total_withdrawn = abs(withdrawn_result.scalar() or 0.0)
+        """REAL balance refresh from sessions, withdrawals and adjustments"""
         
-        # Calculate correct balance
-        correct_balance = total_earnings - total_withdrawn
-        old_balance = user.balance_usd
-        delta = correct_balance - old_balance
+        result = await BalanceService(self.db).refresh_user(telegram_id)
         
-        # Update if significantly different (more than 1 cent)
-        if abs(delta) > 0.01:
-            user.balance_usd = correct_balance
+        if result["corrected"]:
             await self.db.commit()
-            logger.info(f"Balance corrected for user {telegram_id}: {old_balance:.2f} -> {correct_balance:.2f}")
         
         return {
             "status": "success",
-            "old_balance_usd": float(old_balance),
-            "new_balance_usd": float(correct_balance),
-            "delta": float(delta),
-            "total_earnings": float(total_earnings),
-            "total_withdrawn": float(total_withdrawn),
+            "old_balance_usd": result["old_balance"],
+            "new_balance_usd": result["new_balance"],
+            "delta": result["delta"],
+            "total_earnings": result["total_earnings"],
+            "total_withdrawn": result["total_withdrawn"],
+            "total_adjustments": result["total_adjustments"],
         }
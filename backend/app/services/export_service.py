@@ -0,0 +1,244 @@
+from datetime import datetime, date
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy import select, Boolean, Date, DateTime, Float, Integer
+from typing import Any, AsyncIterator, List, Optional
+import csv
+import io
+import json
+import zlib
+import logging
+
+from app.models.user import User
+from app.models.session import Session
+from app.core.config import settings
+
+logger = logging.getLogger(__name__)
+
+try:
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+    PARQUET_AVAILABLE = True
+except ImportError:
+    PARQUET_AVAILABLE = False
+
+
+USER_COLUMNS = [
+    User.telegram_id,
+    User.username,
+    User.first_name,
+    User.balance_usd,
+    User.sent_mb,
+    User.used_mb,
+    User.is_active,
+    User.is_banned,
+    User.last_seen,
+    User.created_at,
+]
+
+SESSION_COLUMNS = [
+    Session.session_id,
+    Session.telegram_id,
+    Session.start_time,
+    Session.end_time,
+    Session.duration,
+    Session.status,
+    Session.sent_mb,
+    Session.server_counted_mb,
+    Session.earned_usd,
+    Session.ip_country,
+    Session.network_type_client,
+    Session.filter_status,
+]
+
+
+class ExportService:
+    """
+    REAL streaming exports
+    Rows come from a server-side cursor and are encoded one partition at
+    a time, so memory stays constant whatever the table size
+    """
+    
+    FORMATS = {
+        "csv": ("text/csv", "csv"),
+        "ndjson": ("application/x-ndjson", "ndjson"),
+        "parquet": ("application/vnd.apache.parquet", "parquet"),
+    }
+    
+    def __init__(self, db: AsyncSession, chunk_size: int = settings.EXPORT_CHUNK_SIZE):
+        self.db = db
+        self.chunk_size = chunk_size
+    
+    def stream_users(self, fmt: str = "csv", compress: bool = False) -> AsyncIterator[bytes]:
+        """REAL users export"""
+        self.check_format(fmt, compress)
+        
+        query = select(*USER_COLUMNS).order_by(User.id)
+        
+        return self._stream(query, USER_COLUMNS, fmt, compress)
+    
+    def stream_sessions(
+        self,
+        fmt: str = "csv",
+        compress: bool = False,
+        start_date: Optional[date] = None,
+        end_date: Optional[date] = None
+    ) -> AsyncIterator[bytes]:
+        """REAL sessions export, optionally limited to start dates [start_date, end_date]"""
+        self.check_format(fmt, compress)
+        
+        query = select(*SESSION_COLUMNS).order_by(Session.id)
+        
+        if start_date:
+            query = query.where(Session.start_time >= datetime.combine(start_date, datetime.min.time()))
+        
+        if end_date:
+            query = query.where(Session.start_time <= datetime.combine(end_date, datetime.max.time()))
+        
+        return self._stream(query, SESSION_COLUMNS, fmt, compress)
+    
+    @classmethod
+    def check_format(cls, fmt: str, compress: bool = False):
+        """Raise ValueError before any bytes are streamed"""
+        if fmt not in cls.FORMATS:
+            raise ValueError(f"Unsupported export format: {fmt}")
+        
+        if fmt == "parquet":
+            if not PARQUET_AVAILABLE:
+                raise ValueError("Parquet export requires pyarrow")
+            if compress:
+                raise ValueError("Parquet is already compressed")
+    
+    @classmethod
+    def media_type(cls, fmt: str, compress: bool = False) -> str:
+        return "application/gzip" if compress else cls.FORMATS[fmt][0]
+    
+    @classmethod
+    def filename(cls, name: str, fmt: str, compress: bool = False) -> str:
+        filename = f"{name}.{cls.FORMATS[fmt][1]}"
+        return f"{filename}.gz" if compress else filename
+    
+    async def _stream(self, query, columns, fmt: str, compress: bool) -> AsyncIterator[bytes]:
+        encoder = {
+            "csv": self._encode_csv,
+            "ndjson": self._encode_ndjson,
+            "parquet": self._encode_parquet,
+        }[fmt]
+        
+        chunks = encoder(self._partitions(query), columns)
+        
+        if compress:
+            chunks = self._gzip(chunks)
+        
+        sent = 0
+        async for chunk in chunks:
+            sent += len(chunk)
+            yield chunk
+        
+        logger.info(f"Export ({fmt}{', gzip' if compress else ''}) finished: {sent} bytes")
+    
+    async def _partitions(self, query) -> AsyncIterator[List[Any]]:
+        # Own connection - the request session is closed before the response streams
+        async with self.db.bind.connect() as conn:
+            result = await conn.stream(query.execution_options(yield_per=self.chunk_size))
+            
+            async for partition in result.partitions(self.chunk_size):
+                yield partition
+    
+    async def _encode_csv(self, partitions, columns) -> AsyncIterator[bytes]:
+        buffer = io.StringIO()
+        writer = csv.writer(buffer)
+        
+        writer.writerow([column.key for column in columns])
+        
+        async for partition in partitions:
+            writer.writerows(
+                [value.isoformat() if isinstance(value, (datetime, date)) else value for value in row]
+                for row in partition
+            )
+            yield buffer.getvalue().encode("utf-8")
+            buffer.seek(0)
+            buffer.truncate()
+        
+        if buffer.tell():
+            yield buffer.getvalue().encode("utf-8")
+    
+    async def _encode_ndjson(self, partitions, columns) -> AsyncIterator[bytes]:
+        names = [column.key for column in columns]
+        
+        async for partition in partitions:
+            yield "".join(
+                json.dumps(dict(zip(names, row)), default=_json_default) + "\n"
+                for row in partition
+            ).encode("utf-8")
+    
+    async def _encode_parquet(self, partitions, columns) -> AsyncIterator[bytes]:
+        schema = pa.schema([(column.key, _arrow_type(column.type)) for column in columns])
+        sink = _ByteSink()
+        
+        # One row group per partition, drained after every write
+        with pq.ParquetWriter(sink, schema, compression="snappy") as writer:
+            async for partition in partitions:
+                writer.write_table(pa.Table.from_pylist(
+                    [dict(row._mapping) for row in partition],
+                    schema=schema
+                ))
+                data = sink.drain()
+                if data:
+                    yield data
+        
+        yield sink.drain()
+    
+    @staticmethod
+    async def _gzip(chunks: AsyncIterator[bytes]) -> AsyncIterator[bytes]:
+        compressor = zlib.compressobj(6, zlib.DEFLATED, 16 + zlib.MAX_WBITS)
+        
+        async for chunk in chunks:
+            data = compressor.compress(chunk)
+            if data:
+                yield data
+        
+        yield compressor.flush()
+
+
+class _ByteSink(io.RawIOBase):
+    """Write-only file that hands written bytes back through drain()"""
+    
+    def __init__(self):
+        self._chunks: List[bytes] = []
+        self._position = 0
+    
+    def writable(self) -> bool:
+        return True
+    
+    def write(self, data) -> int:
+        self._chunks.append(bytes(data))
+        self._position += len(data)
+        return len(data)
+    
+    def tell(self) -> int:
+        return self._position
+    
+    def drain(self) -> bytes:
+        data = b"".join(self._chunks)
+        self._chunks = []
+        return data
+
+
+def _json_default(value: Any) -> Any:
+    if isinstance(value, (datetime, date)):
+        return value.isoformat()
+    raise TypeError(f"Not JSON serializable: {type(value).__name__}")
+
+
+def _arrow_type(column_type):
+    if isinstance(column_type, Boolean):
+        return pa.bool_()
+    if isinstance(column_type, Integer):
+        return pa.int64()
+    if isinstance(column_type, Float):
+        return pa.float64()
+    if isinstance(column_type, DateTime):
+        return pa.timestamp("us", tz="UTC") if column_type.timezone else pa.timestamp("us")
+    if isinstance(column_type, Date):
+        return pa.date32()
+    return pa.string()
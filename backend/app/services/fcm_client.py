@@ -0,0 +1,176 @@
+from datetime import datetime, timezone
+from email.utils import parsedate_to_datetime
+from typing import Dict, Any, List, Optional
+import httpx
+import asyncio
+import logging
+import math
+
+from app.core.config import settings
+
+logger = logging.getLogger(__name__)
+
+try:
+    import h2  # noqa: F401
+    HTTP2_AVAILABLE = True
+except ImportError:
+    HTTP2_AVAILABLE = False
+
+
+class FCMClient:
+    """
+    REAL Firebase Cloud Messaging multicast client
+    One shared keep-alive client (HTTP/2 when h2 is installed),
+    requests in flight bounded by a semaphore
+    """
+    
+    # Tokens per multicast request (FCM accepts up to 1000 registration_ids)
+    MAX_TOKENS = 500
+    MAX_RETRIES = 3
+    
+    # Errors meaning the token will never work again
+    INVALID_TOKEN_ERRORS = {"NotRegistered", "InvalidRegistration", "MismatchSenderId"}
+    
+    def __init__(
+        self,
+        url: str = settings.FCM_URL,
+        server_key: str = settings.FCM_SERVER_KEY,
+        max_concurrency: int = settings.FCM_MAX_CONCURRENCY,
+        timeout: float = settings.FCM_TIMEOUT_SECONDS,
+        transport: Optional[httpx.AsyncBaseTransport] = None
+    ):
+        self.url = url
+        self.server_key = server_key
+        self.max_concurrency = max_concurrency
+        self.timeout = timeout
+        self._transport = transport
+        
+        self._client: Optional[httpx.AsyncClient] = None
+        self._semaphore: Optional[asyncio.Semaphore] = None
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+    
+    @property
+    def configured(self) -> bool:
+        return bool(self.server_key)
+    
+    async def send_multicast(
+        self,
+        tokens: List[str],
+        title: str,
+        body: str,
+        data: Dict[str, Any]
+    ) -> List[Optional[str]]:
+        """
+        REAL multicast send
+        Returns FCM error per token in the same order (None = delivered)
+        """
+        if len(tokens) > self.MAX_TOKENS:
+            raise ValueError(f"At most {self.MAX_TOKENS} tokens per multicast")
+        
+        if not self.configured:
+            logger.warning("FCM_SERVER_KEY not configured")
+            return ["NotConfigured"] * len(tokens)
+        
+        payload = {
+            "registration_ids": tokens,
+            "notification": {
+                "title": title,
+                "body": body,
+                "sound": "default",
+                "badge": 1
+            },
+            "data": data,
+            "priority": "high"
+        }
+        
+        client, semaphore = await self._get_client()
+        
+        async with semaphore:
+            for attempt in range(1, self.MAX_RETRIES + 1):
+                retry_after = float(2 ** attempt)
+                
+                try:
+                    response = await client.post(self.url, json=payload)
+                    
+                    if response.status_code == 200:
+                        results = response.json().get("results", [])
+                        return [
+                            result.get("error") for result in results
+                        ] + ["Unavailable"] * (len(tokens) - len(results))
+                    
+                    if response.status_code < 500:
+                        logger.error(f"FCM HTTP error: {response.status_code}")
+                        return [f"HTTP{response.status_code}"] * len(tokens)
+                    
+                    retry_after = self._retry_delay(response.headers.get("Retry-After"), retry_after)
+                    logger.warning(
+                        f"FCM HTTP error: {response.status_code} "
+                        f"(attempt {attempt}/{self.MAX_RETRIES})"
+                    )
+                
+                except httpx.HTTPError as e:
+                    logger.warning(f"FCM request failed (attempt {attempt}/{self.MAX_RETRIES}): {e}")
+                
+                if attempt < self.MAX_RETRIES:
+                    await asyncio.sleep(retry_after)
+        
+        return ["Unavailable"] * len(tokens)
+    
+    async def close(self):
+        if self._client:
+            await self._client.aclose()
+            self._client = None
+            self._loop = None
+    
+    @staticmethod
+    def _retry_delay(header: Optional[str], default: float) -> float:
+        """Seconds to wait from a Retry-After header (seconds or HTTP-date), else `default`"""
+        if not header:
+            return default
+        
+        try:
+            delay = float(header)
+            return max(delay, 0.0) if math.isfinite(delay) else default
+        except ValueError:
+            pass
+        
+        try:
+            retry_at = parsedate_to_datetime(header)
+        except (TypeError, ValueError):
+            return default
+        
+        if retry_at.tzinfo is None:
+            retry_at = retry_at.replace(tzinfo=timezone.utc)
+        
+        return max((retry_at - datetime.now(timezone.utc)).total_seconds(), 0.0)
+    
+    async def _get_client(self):
+        """Client and semaphore of the running loop (Celery tasks may use a new one)"""
+        loop = asyncio.get_running_loop()
+        
+        if self._loop is not loop:
+            if self._client:
+                # Opened on a previous loop; its connections are not reusable here
+                try:
+                    await self._client.aclose()
+                except Exception as e:
+                    logger.warning(f"Failed to close previous FCM client: {e}")
+            
+            self._loop = loop
+            self._semaphore = asyncio.Semaphore(self.max_concurrency)
+            self._client = httpx.AsyncClient(
+                http2=HTTP2_AVAILABLE,
+                timeout=self.timeout,
+                transport=self._transport,
+                headers={"Authorization": f"key={self.server_key}"},
+                limits=httpx.Limits(
+                    max_keepalive_connections=self.max_concurrency,
+                    max_connections=self.max_concurrency
+                )
+            )
+        
+        return self._client, self._semaphore
+
+
+# Global FCM client instance
+fcm_client = FCMClient()
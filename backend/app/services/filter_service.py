@@ -1,11 +1,13 @@
 from sqlalchemy.ext.asyncio import AsyncSession
 from typing import Tuple, Dict, Any, Optional
-import httpx
+import re
 import logging
 from datetime import datetime
 
 from app.core.config import settings
-from app.utils.cache_manager import CacheManager
+from app.utils.cache_manager import CacheManager, cache_manager
+from app.services.ip_reputation_service import IpReputationResolver, ip_reputation
+from app.services.ip_intel_index import IpIntelIndex, ip_intel_index
 
 logger = logging.getLogger(__name__)
 
@@ -31,9 +33,27 @@ class FilterService:
     ALLOWED_NETWORK_TYPES = ["mobile", "wifi", "ethernet"]
     BLOCKED_NETWORK_TYPES = ["vpn", "proxy", "tor"]
     
-    def __init__(self, db: AsyncSession, cache: Optional[CacheManager] = None):
+    # Sentinel telling a cache miss apart from a cached failed lookup
+    CACHE_MISS = object()
+    
+    # ISP name patterns, compiled once
+    VPN_ISP_PATTERN = re.compile(r"vpn|proxy|datacenter|hosting|cloud|virtual", re.IGNORECASE)
+    WHITELISTED_DATACENTER_PATTERN = re.compile(
+        r"amazon|aws|google|microsoft|azure|digitalocean|linode|vultr|hetzner",
+        re.IGNORECASE
+    )
+    
+    def __init__(
+        self,
+        db: AsyncSession,
+        cache: Optional[CacheManager] = None,
+        resolver: Optional[IpReputationResolver] = None,
+        index: Optional[IpIntelIndex] = None
+    ):
         self.db = db
-        self.cache = cache
+        self.cache = cache or cache_manager
+        self.resolver = resolver or ip_reputation
+        self.index = index or ip_intel_index
     
     async def check_can_start_session(
         self,
@@ -57,21 +77,21 @@ class FilterService:
         if not ip_address:
             return False, "IP address required"
         
-        # Check cache first
-        cached_result = None
-        if self.cache:
-            cached_result = self.cache.get_cached_ip_reputation(ip_address)
+        # Local index first, remote API only for unknown ranges
+        ip_data = await self._check_local_index(ip_address)
         
-        if cached_result:
-            logger.debug(f"Using cached IP reputation for {ip_address}")
-            ip_data = cached_result
-        else:
+        # Then cache (L1, then Redis)
+        if ip_data is None:
+            ip_data = await self.cache.get_cached_ip_reputation(ip_address, default=self.CACHE_MISS)
+        
+        if ip_data is self.CACHE_MISS:
             # Get IP reputation from API
             ip_data = await self._check_ip_reputation(ip_address)
             
-            # Cache result
-            if self.cache and ip_data:
-                self.cache.cache_ip_reputation(ip_address, ip_data, ttl=86400)
+            # Cache result, failed lookups are cached briefly so the API is not hammered
+            await self.cache.cache_ip_reputation(ip_address, ip_data, ttl=86400)
+        else:
+            logger.debug(f"Using cached IP reputation for {ip_address}")
         
         if not ip_data:
             # Failed to get IP data - allow or deny based on policy
@@ -120,54 +140,62 @@ class FilterService:
         logger.info(f"Session start allowed for user {telegram_id} from {ip_address} ({country_code})")
         return True, "Checks passed"
     
+    async def _check_local_index(self, ip: str) -> Optional[Dict[str, Any]]:
+        """
+        REAL offline lookup in the memory-mapped CIDR index
+        Returns None if the range is not in the index
+        """
+        record = self.index.lookup(ip)
+        
+        if not record:
+            return None
+        
+        vpn_score = await self._calculate_vpn_score({
+            'proxy': record['is_proxy'] or record['is_vpn'],
+            'hosting': record['is_datacenter'],
+            'isp': record['isp'],
+        })
+        
+        return {
+            'country_code': record['country_code'],
+            'isp': record['isp'],
+            'as': f"AS{record['asn']}" if record['asn'] else '',
+            'is_proxy': record['is_proxy'],
+            'is_datacenter': record['is_datacenter'],
+            'is_vpn': record['is_vpn'],
+            'vpn_score': vpn_score,
+        }
+    
     async def _check_ip_reputation(self, ip: str) -> Optional[Dict[str, Any]]:
         """
         REAL IP reputation check using ip-api.com (free) or IPQualityScore (paid)
+        Lookups are coalesced and batched by the shared resolver
         """
-        try:
-            # Using ip-api.com (free, 45 req/min limit)
-            async with httpx.AsyncClient() as client:
-                response = await client.get(
-                    f"http://ip-api.com/json/{ip}",
-                    params={
-                        "fields": "status,message,country,countryCode,region,city,isp,org,as,proxy,hosting"
-                    },
-                    timeout=5.0
-                )
-                
-                if response.status_code != 200:
-                    logger.error(f"IP API error: {response.status_code}")
-                    return None
-                
-                data = response.json()
-                
-                if data.get('status') != 'success':
-                    logger.error(f"IP API failed: {data.get('message')}")
-                    return None
-                
-                # Calculate VPN score based on available data
-                vpn_score = await self._calculate_vpn_score(data)
-                
-                return {
-                    'country_code': data.get('countryCode', 'XX'),
-                    'country': data.get('country', 'Unknown'),
-                    'region': data.get('region', ''),
-                    'city': data.get('city', ''),
-                    'isp': data.get('isp', ''),
-                    'org': data.get('org', ''),
-                    'as': data.get('as', ''),
-                    'is_proxy': data.get('proxy', False),
-                    'is_datacenter': data.get('hosting', False),
-                    'is_vpn': data.get('proxy', False),  # Proxy includes VPN
-                    'vpn_score': vpn_score,
-                }
-        
-        except httpx.TimeoutException:
-            logger.error(f"IP API timeout for {ip}")
+        data = await self.resolver.resolve(ip)
+        
+        if not data:
             return None
-        except Exception as e:
-            logger.error(f"IP reputation check failed: {e}")
+        
+        if data.get('status') != 'success':
+            logger.error(f"IP API failed: {data.get('message')}")
             return None
+        
+        # Calculate VPN score based on available data
+        vpn_score = await self._calculate_vpn_score(data)
+        
+        return {
+            'country_code': data.get('countryCode', 'XX'),
+            'country': data.get('country', 'Unknown'),
+            'region': data.get('region', ''),
+            'city': data.get('city', ''),
+            'isp': data.get('isp', ''),
+            'org': data.get('org', ''),
+            'as': data.get('as', ''),
+            'is_proxy': data.get('proxy', False),
+            'is_datacenter': data.get('hosting', False),
+            'is_vpn': data.get('proxy', False),  # Proxy includes VPN
+            'vpn_score': vpn_score,
+        }
     
     async def _calculate_vpn_score(self, ip_data: Dict) -> int:
         """
@@ -184,13 +212,8 @@ class FilterService:
             score += 40
         
         # Check ISP name for VPN keywords
-        isp = ip_data.get('isp', '').lower()
-        vpn_keywords = ['vpn', 'proxy', 'datacenter', 'hosting', 'cloud', 'virtual']
-        
-        for keyword in vpn_keywords:
-            if keyword in isp:
-                score += 20
-                break
+        if self.VPN_ISP_PATTERN.search(ip_data.get('isp') or ''):
+            score += 20
         
         # Cap at 100
         return min(score, 100)
@@ -200,13 +223,7 @@ class FilterService:
         Check if ISP is a legitimate datacenter provider
         (Some datacenters like AWS/Google Cloud may be whitelisted)
         """
-        whitelist_keywords = [
-            'amazon', 'aws', 'google', 'microsoft', 'azure', 
-            'digitalocean', 'linode', 'vultr', 'hetzner'
-        ]
-        
-        isp_lower = isp.lower()
-        return any(keyword in isp_lower for keyword in whitelist_keywords)
+        return bool(self.WHITELISTED_DATACENTER_PATTERN.search(isp or ''))
     
     def _get_error_message(self, reasons: list) -> str:
         """
@@ -0,0 +1,279 @@
+from typing import Dict, Any, Iterable, Optional, Tuple
+import ipaddress
+import struct
+import mmap
+import os
+import time
+import logging
+
+from app.core.config import settings
+
+logger = logging.getLogger(__name__)
+
+
+# Record flags
+FLAG_DATACENTER = 1
+FLAG_VPN = 2
+FLAG_PROXY = 4
+FLAG_TOR = 8
+FLAG_MOBILE = 16
+
+FLAG_NAMES = {
+    "datacenter": FLAG_DATACENTER,
+    "vpn": FLAG_VPN,
+    "proxy": FLAG_PROXY,
+    "tor": FLAG_TOR,
+    "mobile": FLAG_MOBILE,
+}
+
+MAGIC = b"IPIX"
+VERSION = 1
+
+# magic, version, record size, record count, string table offset
+HEADER = struct.Struct("<4sHHII")
+# start, end (16 byte big-endian so bytes compare like numbers),
+# country, flags, padding, asn, isp string offset
+RECORD = struct.Struct("<16s16s2sBxII")
+
+
+def ip_key(ip: str) -> bytes:
+    """16 byte sortable key, IPv4 mapped into ::ffff:0:0/96"""
+    address = ipaddress.ip_address(ip)
+    
+    if address.version == 4:
+        return b"\x00" * 10 + b"\xff\xff" + address.packed
+    
+    return address.packed
+
+
+def build_index(rows: Iterable[Tuple[str, str, int, str, int]], path: str) -> int:
+    """
+    Write index file from (cidr, country, asn, isp, flags) rows
+    Nested ranges are flattened into disjoint intervals, most specific prefix wins
+    Written to a temp file and renamed so readers never see a partial file
+    """
+    networks = []
+    strings = bytearray()
+    string_offsets: Dict[str, int] = {}
+    
+    for position, (cidr, country, asn, isp, flags) in enumerate(rows):
+        network = ipaddress.ip_network(cidr, strict=False)
+        
+        start = int.from_bytes(ip_key(str(network.network_address)), "big")
+        end = int.from_bytes(ip_key(str(network.broadcast_address)), "big")
+        
+        if isp not in string_offsets:
+            encoded = isp.encode("utf-8")[:65535]
+            string_offsets[isp] = len(strings)
+            strings += struct.pack("<H", len(encoded)) + encoded
+        
+        networks.append((
+            start,
+            end,
+            position,
+            (
+                (country or "XX").upper().encode("ascii")[:2].ljust(2, b"X"),
+                flags,
+                asn or 0,
+                string_offsets[isp],
+            ),
+        ))
+    
+    records = _flatten(networks)
+    
+    strings_offset = HEADER.size + RECORD.size * len(records)
+    tmp_path = f"{path}.tmp"
+    
+    with open(tmp_path, "wb") as f:
+        f.write(HEADER.pack(MAGIC, VERSION, RECORD.size, len(records), strings_offset))
+        for start, end, data in records:
+            f.write(RECORD.pack(start.to_bytes(16, "big"), end.to_bytes(16, "big"), *data))
+        f.write(strings)
+    
+    os.replace(tmp_path, path)
+    
+    return len(records)
+
+
+def _flatten(networks) -> list:
+    """
+    Split nested CIDR ranges into disjoint (start, end, data) intervals
+    CIDRs are either nested or disjoint, so a stack of open ranges is enough:
+    the innermost open range owns every address until it closes
+    """
+    # Outer ranges first on a shared start; same range, the later row wins
+    networks.sort(key=lambda n: (n[0], -n[1], n[2]))
+    
+    records = []
+    stack = []
+    cursor = 0
+    
+    def close_until(limit: int):
+        nonlocal cursor
+        while stack and stack[-1][1] < limit:
+            _, end, data = stack.pop()
+            if cursor <= end:
+                records.append((cursor, end, data))
+                cursor = end + 1
+    
+    for start, end, _, data in networks:
+        close_until(start)
+        
+        if stack and cursor < start:
+            records.append((cursor, start - 1, stack[-1][2]))
+        
+        cursor = start
+        stack.append((start, end, data))
+    
+    close_until(1 << 128)
+    
+    return records
+
+
+class IpIntelIndex:
+    """
+    REAL offline IP intelligence index
+    Memory-mapped sorted interval table, binary search per lookup,
+    reloaded when the file on disk changes
+    """
+    
+    # How often lookups check the file for changes
+    RELOAD_CHECK_SECONDS = 30
+    
+    def __init__(self, path: str = settings.IP_INTEL_INDEX_PATH):
+        self.path = path
+        self._mmap: Optional[mmap.mmap] = None
+        self._count = 0
+        self._strings_offset = 0
+        self._mtime = 0.0
+        self._checked_at = 0.0
+        # isp string offset -> decoded name
+        self._strings: Dict[int, str] = {}
+        
+        if path:
+            self.reload()
+    
+    @property
+    def loaded(self) -> bool:
+        return self._mmap is not None
+    
+    def __len__(self) -> int:
+        return self._count
+    
+    def lookup(self, ip: str) -> Optional[Dict[str, Any]]:
+        """
+        REAL lookup - O(log n), no network
+        Returns None for unknown ranges or invalid addresses
+        """
+        self._maybe_reload()
+        
+        data = self._mmap
+        if data is None or not self._count:
+            return None
+        
+        try:
+            key = ip_key(ip)
+        except ValueError:
+            return None
+        
+        # Last record with start <= key
+        lo, hi = 0, self._count
+        while lo < hi:
+            mid = (lo + hi) // 2
+            offset = HEADER.size + mid * RECORD.size
+            if data[offset:offset + 16] <= key:
+                lo = mid + 1
+            else:
+                hi = mid
+        
+        if lo == 0:
+            return None
+        
+        start, end, country, flags, asn, isp_offset = RECORD.unpack_from(
+            data, HEADER.size + (lo - 1) * RECORD.size
+        )
+        
+        if key > end:
+            return None
+        
+        return {
+            "country_code": country.decode("ascii"),
+            "asn": asn,
+            "isp": self._string(isp_offset),
+            "is_datacenter": bool(flags & FLAG_DATACENTER),
+            "is_vpn": bool(flags & FLAG_VPN),
+            "is_proxy": bool(flags & (FLAG_PROXY | FLAG_TOR)),
+            "is_tor": bool(flags & FLAG_TOR),
+            "is_mobile": bool(flags & FLAG_MOBILE),
+        }
+    
+    def reload(self) -> bool:
+        """Map the index file, keeping the current one if the new file is bad"""
+        try:
+            mtime = os.stat(self.path).st_mtime
+        except OSError:
+            if self.loaded:
+                logger.warning(f"IP index {self.path} disappeared, keeping loaded copy")
+            return False
+        
+        try:
+            with open(self.path, "rb") as f:
+                data = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+            
+            magic, version, record_size, count, strings_offset = HEADER.unpack_from(data, 0)
+            
+            if magic != MAGIC or version != VERSION or record_size != RECORD.size:
+                data.close()
+                raise ValueError(f"unsupported index format {magic!r} v{version}")
+        
+        except Exception as e:
+            logger.error(f"Failed to load IP index {self.path}: {e}")
+            return False
+        
+        # Swap in one step; lookups in flight keep the old map
+        self._mmap, self._count, self._strings_offset = data, count, strings_offset
+        self._strings = {}
+        self._mtime = mtime
+        self._checked_at = time.monotonic()
+        
+        logger.info(f"IP index loaded: {count} ranges from {self.path}")
+        
+        return True
+    
+    def _maybe_reload(self):
+        now = time.monotonic()
+        if not self.path or now - self._checked_at < self.RELOAD_CHECK_SECONDS:
+            return
+        
+        self._checked_at = now
+        
+        try:
+            mtime = os.stat(self.path).st_mtime
+        except OSError:
+            return
+        
+        if mtime != self._mtime:
+            self.reload()
+    
+    def _string(self, offset: int) -> str:
+        name = self._strings.get(offset)
+        if name is None:
+            start = self._strings_offset + offset
+            (length,) = struct.unpack_from("<H", self._mmap, start)
+            name = self._mmap[start + 2:start + 2 + length].decode("utf-8", "replace")
+            self._strings[offset] = name
+        return name
+
+
+def parse_flags(value: str) -> int:
+    """'datacenter|vpn' -> bit flags"""
+    flags = 0
+    for name in value.replace(",", "|").split("|"):
+        name = name.strip().lower()
+        if name:
+            flags |= FLAG_NAMES[name]
+    return flags
+
+
+# Global IP intelligence index instance
+ip_intel_index = IpIntelIndex()
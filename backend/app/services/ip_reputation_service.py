@@ -0,0 +1,248 @@
+from typing import Dict, Any, List, Optional
+import httpx
+import asyncio
+import time
+import logging
+
+from app.core.config import settings
+from app.utils.rate_limiter import RateLimitRule, InMemoryRateLimiter
+
+logger = logging.getLogger(__name__)
+
+
+class IpApiProvider:
+    """
+    REAL ip-api.com batch provider
+    Shared keep-alive client, requests queued against the provider budget
+    """
+    
+    FIELDS = "status,message,query,country,countryCode,region,city,isp,org,as,proxy,hosting"
+    
+    # ip-api batch endpoint accepts up to 100 queries per request
+    MAX_BATCH = 100
+    
+    def __init__(
+        self,
+        base_url: str = settings.IP_API_URL,
+        requests_per_minute: int = settings.IP_API_REQUESTS_PER_MINUTE
+    ):
+        self.base_url = base_url.rstrip("/")
+        self._client: Optional[httpx.AsyncClient] = None
+        self._budget = InMemoryRateLimiter(max_keys=1)
+        self._rule = RateLimitRule("ip-api", requests_per_minute, 60)
+        # Set from X-Rl / X-Ttl headers when the provider says we are out
+        self._blocked_until = 0.0
+    
+    async def lookup_batch(self, ips: List[str]) -> Dict[str, Optional[Dict[str, Any]]]:
+        """
+        REAL batch lookup
+        Waits for budget instead of failing when the limit is reached
+        """
+        await self._acquire()
+        
+        response = await self._get_client().post(
+            f"{self.base_url}/batch",
+            params={"fields": self.FIELDS},
+            json=[{"query": ip} for ip in ips]
+        )
+        self._update_budget(response)
+        
+        if response.status_code == 429:
+            raise RuntimeError("ip-api rate limit reached")
+        
+        if response.status_code != 200:
+            raise RuntimeError(f"IP API error: {response.status_code}")
+        
+        return dict(zip(ips, response.json()))
+    
+    async def close(self):
+        if self._client:
+            await self._client.aclose()
+            self._client = None
+    
+    async def _acquire(self):
+        """Queue until one more request fits in the budget"""
+        while True:
+            wait = self._blocked_until - time.monotonic()
+            
+            if wait <= 0:
+                allowed, _, wait = self._budget.take("ip-api", self._rule)
+                if allowed:
+                    return
+            
+            logger.debug(f"IP API budget exhausted, waiting {wait:.1f}s")
+            await asyncio.sleep(wait)
+    
+    def _update_budget(self, response: httpx.Response):
+        """ip-api reports remaining requests and seconds to reset"""
+        remaining = response.headers.get("X-Rl")
+        ttl = response.headers.get("X-Ttl")
+        
+        if response.status_code == 429 or remaining == "0":
+            self._blocked_until = time.monotonic() + float(ttl or 60)
+    
+    def _get_client(self) -> httpx.AsyncClient:
+        if self._client is None:
+            self._client = httpx.AsyncClient(
+                timeout=5.0,
+                limits=httpx.Limits(max_keepalive_connections=5, max_connections=10)
+            )
+        return self._client
+
+
+class StubIpProvider:
+    """
+    Local provider for tests and development
+    Answers from a dict in ip-api response format, records every batch
+    """
+    
+    MAX_BATCH = 100
+    
+    def __init__(self, records: Optional[Dict[str, Dict[str, Any]]] = None):
+        self.records = records or {}
+        self.batches: List[List[str]] = []
+    
+    async def lookup_batch(self, ips: List[str]) -> Dict[str, Optional[Dict[str, Any]]]:
+        self.batches.append(list(ips))
+        
+        return {
+            ip: {
+                "status": "success",
+                "query": ip,
+                "countryCode": "US",
+                "country": "United States",
+                "isp": "Stub ISP",
+                "proxy": False,
+                "hosting": False,
+                **self.records.get(ip, {}),
+            }
+            for ip in ips
+        }
+    
+    async def close(self):
+        pass
+
+
+class IpReputationResolver:
+    """
+    REAL coalescing IP reputation resolver
+    Concurrent lookups of one IP share a single request (single-flight),
+    misses arriving together are sent as one batch
+    """
+    
+    MAX_RETRIES = 3
+    
+    def __init__(
+        self,
+        provider=None,
+        batch_window: float = settings.IP_REPUTATION_BATCH_WINDOW_SECONDS,
+        timeout: float = settings.IP_REPUTATION_TIMEOUT_SECONDS
+    ):
+        self.provider = provider or self._default_provider()
+        self.batch_window = batch_window
+        self.timeout = timeout
+        
+        # ip -> future shared by every caller waiting for it
+        self._inflight: Dict[str, asyncio.Future] = {}
+        self._queue: List[str] = []
+        self._wakeup: Optional[asyncio.Event] = None
+        self._task: Optional[asyncio.Task] = None
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+    
+    async def resolve(self, ip: str) -> Optional[Dict[str, Any]]:
+        """
+        REAL resolve IP to provider record
+        Returns None if the lookup failed or timed out
+        """
+        self._ensure_worker()
+        
+        future = self._inflight.get(ip)
+        if future is None:
+            future = self._loop.create_future()
+            self._inflight[ip] = future
+            self._queue.append(ip)
+            self._wakeup.set()
+        
+        try:
+            return await asyncio.wait_for(asyncio.shield(future), timeout=self.timeout)
+        except asyncio.TimeoutError:
+            logger.error(f"IP reputation lookup timed out for {ip}")
+            return None
+    
+    async def close(self):
+        """Stop batch worker and close provider client"""
+        if self._task:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+        
+        await self.provider.close()
+    
+    def _ensure_worker(self):
+        """Start worker, resetting state left behind by a previous event loop"""
+        loop = asyncio.get_running_loop()
+        
+        if self._loop is not loop:
+            self._loop = loop
+            self._inflight = {}
+            self._queue = []
+            self._wakeup = asyncio.Event()
+            self._task = None
+        
+        if self._task is None or self._task.done():
+            self._task = loop.create_task(self._run())
+    
+    async def _run(self):
+        """Collect misses for a short window, then look them up in batches"""
+        try:
+            while True:
+                await self._wakeup.wait()
+                self._wakeup.clear()
+                
+                # Let concurrent misses join the batch
+                await asyncio.sleep(self.batch_window)
+                
+                while self._queue:
+                    batch = self._queue[:self.provider.MAX_BATCH]
+                    self._queue = self._queue[self.provider.MAX_BATCH:]
+                    
+                    results = await self._lookup(batch)
+                    
+                    for ip in batch:
+                        future = self._inflight.pop(ip, None)
+                        if future and not future.done():
+                            future.set_result(results.get(ip))
+        finally:
+            # Do not leave callers waiting for a dead worker
+            for future in self._inflight.values():
+                if not future.done():
+                    future.set_result(None)
+            self._inflight = {}
+            self._queue = []
+    
+    async def _lookup(self, batch: List[str]) -> Dict[str, Optional[Dict[str, Any]]]:
+        for attempt in range(1, self.MAX_RETRIES + 1):
+            try:
+                return await self.provider.lookup_batch(batch)
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                logger.error(
+                    f"IP reputation batch of {len(batch)} failed "
+                    f"(attempt {attempt}/{self.MAX_RETRIES}): {e}"
+                )
+        
+        return {}
+    
+    @staticmethod
+    def _default_provider():
+        if settings.IP_REPUTATION_PROVIDER == "stub":
+            return StubIpProvider()
+        return IpApiProvider()
+
+
+# Global IP reputation resolver instance
+ip_reputation = IpReputationResolver()
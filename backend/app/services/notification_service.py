@@ -1,12 +1,17 @@
 from sqlalchemy.ext.asyncio import AsyncSession
-from sqlalchemy import select, and_
-from typing import List, Dict, Any, Optional
-from datetime import datetime, timedelta
-import httpx
+from sqlalchemy import select, insert, update, and_, func, any_, literal, BigInteger
+from sqlalchemy.dialects.postgresql import ARRAY
+from typing import List, Dict, Any, AsyncIterator, Iterable, Optional, Tuple
+from datetime import datetime, date, timedelta
+from contextlib import aclosing
+import asyncio
+import json
 import logging
 
 from app.models.user import User
+from app.models.session import Session
 from app.models.notification import Notification, FCMToken
+from app.services.fcm_client import FCMClient, fcm_client
 from app.core.config import settings
 
 logger = logging.getLogger(__name__)
@@ -18,11 +23,11 @@ class NotificationService:
     Sends actual push notifications
     """
     
-    FCM_URL = "https://fcm.googleapis.com/fcm/send"
-    BATCH_SIZE = 500
+    BATCH_SIZE = FCMClient.MAX_TOKENS
     
-    def __init__(self, db: AsyncSession):
+    def __init__(self, db: AsyncSession, fcm: Optional[FCMClient] = None):
         self.db = db
+        self.fcm = fcm or fcm_client
     
     async def send_to_user(
         self,
@@ -35,58 +40,15 @@ class NotificationService:
         """
         REAL send notification to single user
         """
-        # Get user's active FCM tokens
-        result = await self.db.execute(
-            select(FCMToken)
-            .where(FCMToken.telegram_id == telegram_id)
-            .where(FCMToken.is_active == True)
-        )
-        tokens = result.scalars().all()
-        
-        if not tokens:
-            logger.debug(f"No FCM tokens for user {telegram_id}")
-            return False
-        
-        # Send to all user's devices
-        success_count = 0
-        for token_obj in tokens:
-            try:
-                sent = await self._send_fcm_notification(
-                    token=token_obj.token,
-                    title=title,
-                    body=body,
-                    data=data or {}
-                )
-                
-                if sent:
-                    success_count += 1
-                    token_obj.last_used = datetime.utcnow()
-                else:
-                    # Token might be invalid
-                    token_obj.is_active = False
-            
-            except Exception as e:
-                logger.error(f"Failed to send to token {token_obj.id}: {e}")
-                token_obj.is_active = False
-        
-        # Save notification to database
-        notification = Notification(
-            telegram_id=telegram_id,
+        result = await self.send_to_multiple(
+            telegram_ids=[telegram_id],
             title=title,
             body=body,
-            type=notif_type,
-            is_read=False,
             data=data,
-            sent_at=datetime.utcnow(),
-            created_at=datetime.utcnow()
+            notif_type=notif_type
         )
-        self.db.add(notification)
         
-        await self.db.commit()
-        
-        logger.info(f"Notification sent to user {telegram_id}: {title}")
-        
-        return success_count > 0
+        return result["sent"] > 0
     
     async def send_to_multiple(
         self,
@@ -99,34 +61,113 @@ class NotificationService:
         """
         REAL batch send to multiple users
         """
-        sent_count = 0
-        failed_count = 0
+        return await self.send_messages(
+            [(telegram_id, title, body, data) for telegram_id in telegram_ids],
+            notif_type=notif_type
+        )
+    
+    async def send_messages(
+        self,
+        messages: Iterable[Tuple[int, str, str, Optional[Dict]]],
+        notif_type: str = "general"
+    ) -> Dict[str, int]:
+        """
+        REAL batched delivery of (telegram_id, title, body, data) messages
+        One token query, identical payloads multicast in BATCH_SIZE batches
+        concurrently, one bulk insert and one commit
+        """
+        by_user = {telegram_id: (title, body, data or {}) for telegram_id, title, body, data in messages}
         
-        for telegram_id in telegram_ids:
-            try:
-                success = await self.send_to_user(
-                    telegram_id=telegram_id,
-                    title=title,
-                    body=body,
-                    data=data,
-                    notif_type=notif_type
-                )
-                
-                if success:
-                    sent_count += 1
-                else:
-                    failed_count += 1
-            
-            except Exception as e:
-                logger.error(f"Failed to send to user {telegram_id}: {e}")
-                failed_count += 1
+        if not by_user:
+            return {"sent": 0, "failed": 0, "total": 0}
+        
+        # All active tokens of the audience in one query
+        result = await self.db.execute(
+            select(FCMToken.id, FCMToken.telegram_id, FCMToken.token)
+            .where(FCMToken.telegram_id == any_(literal(list(by_user), ARRAY(BigInteger))))
+            .where(FCMToken.is_active == True)
+        )
+        
+        # Users sharing a payload share multicast requests
+        groups: Dict[str, List[Tuple[int, int, str]]] = {}
+        for token_id, telegram_id, token in result.all():
+            key = json.dumps(by_user[telegram_id], sort_keys=True, default=str)
+            groups.setdefault(key, []).append((token_id, telegram_id, token))
+        
+        batches = [
+            (by_user[rows[0][1]], rows[i:i + self.BATCH_SIZE])
+            for rows in groups.values()
+            for i in range(0, len(rows), self.BATCH_SIZE)
+        ]
+        
+        errors = await asyncio.gather(*(
+            self.fcm.send_multicast([token for _, _, token in batch], title, body, data)
+            for (title, body, data), batch in batches
+        ))
+        
+        delivered_users = set()
+        users_with_tokens = set()
+        delivered_tokens = []
+        invalid_tokens = []
+        
+        for (_, batch), batch_errors in zip(batches, errors):
+            for (token_id, telegram_id, _), error in zip(batch, batch_errors):
+                users_with_tokens.add(telegram_id)
+                if error is None:
+                    delivered_users.add(telegram_id)
+                    delivered_tokens.append(token_id)
+                elif error in FCMClient.INVALID_TOKEN_ERRORS:
+                    invalid_tokens.append(token_id)
+        
+        now = datetime.utcnow()
+        
+        if delivered_tokens:
+            await self.db.execute(
+                update(FCMToken)
+                .where(FCMToken.id == any_(literal(delivered_tokens, ARRAY(BigInteger))))
+                .values(last_used=now)
+            )
+        
+        if invalid_tokens:
+            await self.db.execute(
+                update(FCMToken)
+                .where(FCMToken.id == any_(literal(invalid_tokens, ARRAY(BigInteger))))
+                .values(is_active=False)
+            )
+        
+        # Save notifications of users that have a device
+        if users_with_tokens:
+            await self.db.execute(
+                insert(Notification),
+                [
+                    {
+                        "telegram_id": telegram_id,
+                        "title": by_user[telegram_id][0],
+                        "body": by_user[telegram_id][1],
+                        "type": notif_type,
+                        "is_read": False,
+                        "data": by_user[telegram_id][2],
+                        "sent_at": now,
+                        "created_at": now,
+                    }
+                    for telegram_id in users_with_tokens
+                ]
+            )
+        
+        await self.db.commit()
         
-        logger.info(f"Batch notification: sent={sent_count}, failed={failed_count}")
+        sent_count = len(delivered_users)
+        failed_count = len(by_user) - sent_count
+        
+        logger.info(
+            f"Batch notification: sent={sent_count}, failed={failed_count}, "
+            f"requests={len(batches)}, invalid_tokens={len(invalid_tokens)}"
+        )
         
         return {
             "sent": sent_count,
             "failed": failed_count,
-            "total": len(telegram_ids)
+            "total": len(by_user)
         }
     
     async def send_to_all_active_users(
@@ -138,89 +179,102 @@ class NotificationService:
     ) -> Dict[str, int]:
         """
         REAL send to all active users (last 7 days)
+        Audience is streamed and sent chunk by chunk, never held in memory
         """
-        # Get active users
-        week_ago = datetime.utcnow() - timedelta(days=7)
-        result = await self.db.execute(
-            select(User.telegram_id)
-            .where(User.is_active == True)
-            .where(User.is_banned == False)
-            .where(User.last_seen >= week_ago)
-        )
+        totals = {"sent": 0, "failed": 0, "total": 0}
         
-        telegram_ids = [row[0] for row in result.all()]
+        audience = self.iter_active_audience()
         
-        logger.info(f"Sending to {len(telegram_ids)} active users")
+        async with aclosing(audience):
+            async for telegram_ids in audience:
+                result = await self.send_to_multiple(
+                    telegram_ids=telegram_ids,
+                    title=title,
+                    body=body,
+                    data=data,
+                    notif_type=notif_type
+                )
+                for key in totals:
+                    totals[key] += result[key]
         
-        return await self.send_to_multiple(
-            telegram_ids=telegram_ids,
-            title=title,
-            body=body,
-            data=data,
-            notif_type=notif_type
-        )
+        logger.info(f"Sent to {totals['total']} active users")
+        
+        return totals
     
-    async def _send_fcm_notification(
+    async def send_session_summaries(
         self,
-        token: str,
-        title: str,
-        body: str,
-        data: Dict[str, Any]
-    ) -> bool:
+        hours: int = 24,
+        chunk_size: int = settings.BROADCAST_CHUNK_SIZE
+    ) -> Dict[str, int]:
         """
-        REAL FCM API call
-        Sends actual HTTP request to Firebase
+        REAL send per-user session summary for the last `hours`
+        One grouped aggregate streamed in chunks into batched delivery
         """
-        if not settings.FCM_SERVER_KEY:
-            logger.warning("FCM_SERVER_KEY not configured")
-            return False
-        
-        payload = {
-            "to": token,
-            "notification": {
-                "title": title,
-                "body": body,
-                "sound": "default",
-                "badge": 1
-            },
-            "data": data,
-            "priority": "high"
-        }
-        
-        headers = {
-            "Content-Type": "application/json",
-            "Authorization": f"key={settings.FCM_SERVER_KEY}"
-        }
+        since = datetime.utcnow() - timedelta(hours=hours)
+        totals = {"sent": 0, "failed": 0, "total": 0}
         
-        try:
-            async with httpx.AsyncClient() as client:
-                response = await client.post(
-                    self.FCM_URL,
-                    json=payload,
-                    headers=headers,
-                    timeout=10.0
+        async with self.db.bind.connect() as conn:
+            result = await conn.stream(
+                select(
+                    Session.telegram_id,
+                    func.coalesce(func.sum(Session.sent_mb), 0.0).label("total_mb"),
+                    func.coalesce(func.sum(Session.earned_usd), 0.0).label("total_earned"),
+                    func.count(Session.id).label("session_count")
+                )
+                .where(Session.start_time >= since)
+                .group_by(Session.telegram_id)
+                .execution_options(yield_per=chunk_size)
+            )
+            
+            async for partition in result.partitions(chunk_size):
+                delivery = await self.send_messages(
+                    [
+                        (
+                            row.telegram_id,
+                            "?? 24 soatlik hisobot",
+                            f"Yuborilgan: {row.total_mb:.0f} MB\nDaromad: ${row.total_earned:.3f}",
+                            {
+                                "type": "session_summary",
+                                "total_mb": float(row.total_mb),
+                                "total_earned": float(row.total_earned),
+                                "session_count": row.session_count,
+                            }
+                        )
+                        for row in partition
+                    ]
                 )
-                
-                if response.status_code == 200:
-                    result = response.json()
-                    
-                    if result.get('success') == 1:
-                        logger.debug(f"FCM notification sent successfully")
-                        return True
-                    else:
-                        error = result.get('results', [{}])[0].get('error')
-                        logger.warning(f"FCM error: {error}")
-                        return False
-                else:
-                    logger.error(f"FCM HTTP error: {response.status_code}")
-                    return False
-        
-        except httpx.TimeoutException:
-            logger.error("FCM request timeout")
-            return False
-        except Exception as e:
-            logger.error(f"FCM send error: {e}")
-            return False
+                for key in totals:
+                    totals[key] += delivery[key]
+        
+        logger.info(f"Sent session summaries to {totals['total']} users")
+        
+        return totals
+    
+    async def iter_active_audience(
+        self,
+        after_telegram_id: int = 0,
+        chunk_size: int = settings.BROADCAST_CHUNK_SIZE
+    ) -> AsyncIterator[List[int]]:
+        """
+        REAL stream active users (last 7 days) in telegram_id order
+        Server-side cursor on its own connection, so callers may commit
+        between chunks
+        """
+        week_ago = datetime.utcnow() - timedelta(days=7)
+        
+        async with self.db.bind.connect() as conn:
+            result = await conn.stream(
+                select(User.telegram_id)
+                .where(User.is_active == True)
+                .where(User.is_banned == False)
+                .where(User.last_seen >= week_ago)
+                .where(User.telegram_id > after_telegram_id)
+                .order_by(User.telegram_id)
+                .execution_options(yield_per=chunk_size)
+            )
+            
+            async for partition in result.partitions(chunk_size):
+                yield [row[0] for row in partition]
     
     async def register_device(
         self,
@@ -348,9 +402,17 @@ class NotificationService:
         self,
         price_per_gb: float,
         message: str
-    ):
-        """Send daily price announcement to all active users"""
-        await self.send_to_all_active_users(
+    ) -> Dict[str, Any]:
+        """
+        Send daily price announcement to all active users
+        Runs as a checkpointed Celery broadcast; the same price on the same
+        day is one broadcast, so repeated calls resume instead of re-sending
+        """
+        from app.services.broadcast_service import BroadcastService
+        from app.tasks.notification_tasks import plan_broadcast
+        
+        broadcast = await BroadcastService(self.db, self).start(
+            key=f"daily_price:{date.today().isoformat()}:{price_per_gb:.4f}",
             title="?? Kunlik narx e'loni",
             body=f"Bugungi narx: ${price_per_gb:.2f}/GB\n{message}",
             data={
@@ -360,3 +422,11 @@ class NotificationService:
             },
             notif_type="daily_price"
         )
+        
+        if broadcast.status == "planning":
+            plan_broadcast.delay(broadcast.id)
+        
+        return {
+            "broadcast_id": broadcast.id,
+            "status": broadcast.status
+        }
@@ -0,0 +1,308 @@
+from datetime import datetime, timedelta
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy import select, func, and_, or_, literal
+from sqlalchemy.dialects.postgresql import insert as pg_insert
+from sqlalchemy.types import DateTime, Interval
+from typing import Dict, Any, Optional
+import logging
+
+from app.models.user import User
+from app.models.session import Session
+from app.models.transaction import WithdrawRequest
+from app.models.rollup import UserDailyStats
+from app.models.platform_stats import PlatformHourlyStats
+from app.utils.cache_manager import cache_manager
+from app.core.config import settings
+
+logger = logging.getLogger(__name__)
+
+
+SNAPSHOT_CACHE_KEY = "admin:dashboard_snapshot"
+
+
+class PlatformStatsService:
+    """
+    REAL platform metrics
+    Hourly buckets are recomputed for the last hours only; the admin
+    dashboard snapshot is built from them off the request path and
+    served from cache
+    """
+    
+    COUNTERS = (
+        "sessions_started",
+        "sessions_completed",
+        "active_sessions",
+        "sent_mb",
+        "used_mb",
+        "earned_usd",
+        "new_users",
+        "withdrawals_requested",
+        "withdrawals_usd",
+    )
+    
+    def __init__(self, db: AsyncSession):
+        self.db = db
+    
+    async def refresh_hours(self, since: datetime, until: Optional[datetime] = None) -> int:
+        """
+        REAL recompute hourly buckets [since, until]
+        Each source is range scanned once and the rows overwritten,
+        so repeated runs are idempotent
+        """
+        until = until or datetime.utcnow()
+        first_hour = since.replace(minute=0, second=0, microsecond=0)
+        last_hour = until.replace(minute=0, second=0, microsecond=0)
+        
+        one_hour = literal(timedelta(hours=1), Interval())
+        hours = select(
+            func.generate_series(
+                literal(first_hour, DateTime(timezone=True)),
+                literal(last_hour, DateTime(timezone=True)),
+                one_hour
+            ).label("hour")
+        ).subquery()
+        
+        started_hour = func.date_trunc("hour", Session.start_time)
+        completed_hour = func.date_trunc("hour", Session.end_time)
+        user_hour = func.date_trunc("hour", User.created_at)
+        withdrawal_hour = func.date_trunc("hour", WithdrawRequest.created_at)
+        
+        started = (
+            select(started_hour.label("hour"), func.count(Session.id).label("count"))
+            .where(Session.start_time >= first_hour)
+            .group_by(started_hour)
+            .subquery()
+        )
+        
+        completed = (
+            select(
+                completed_hour.label("hour"),
+                func.count(Session.id).label("count"),
+                func.sum(Session.sent_mb).label("sent_mb"),
+                func.sum(Session.server_counted_mb).label("used_mb"),
+                func.sum(Session.earned_usd).label("earned_usd"),
+            )
+            .where(Session.end_time >= first_hour)
+            .where(Session.status == "completed")
+            .group_by(completed_hour)
+            .subquery()
+        )
+        
+        # Running sessions plus those that ended inside the range
+        active = (
+            select(hours.c.hour, func.count(Session.id).label("count"))
+            .join(Session, and_(
+                Session.start_time < hours.c.hour + one_hour,
+                or_(Session.is_active == True, Session.end_time >= hours.c.hour)
+            ))
+            .where(or_(Session.is_active == True, Session.end_time >= first_hour))
+            .group_by(hours.c.hour)
+            .subquery()
+        )
+        
+        users = (
+            select(user_hour.label("hour"), func.count(User.id).label("count"))
+            .where(User.created_at >= first_hour)
+            .group_by(user_hour)
+            .subquery()
+        )
+        
+        withdrawals = (
+            select(
+                withdrawal_hour.label("hour"),
+                func.count(WithdrawRequest.id).label("count"),
+                func.sum(WithdrawRequest.amount_usd).label("amount"),
+            )
+            .where(WithdrawRequest.created_at >= first_hour)
+            .group_by(withdrawal_hour)
+            .subquery()
+        )
+        
+        buckets = (
+            select(
+                hours.c.hour,
+                func.coalesce(started.c.count, 0),
+                func.coalesce(completed.c.count, 0),
+                func.coalesce(active.c.count, 0),
+                func.coalesce(completed.c.sent_mb, 0.0),
+                func.coalesce(completed.c.used_mb, 0.0),
+                func.coalesce(completed.c.earned_usd, 0.0),
+                func.coalesce(users.c.count, 0),
+                func.coalesce(withdrawals.c.count, 0),
+                func.coalesce(withdrawals.c.amount, 0.0),
+            )
+            .outerjoin(started, started.c.hour == hours.c.hour)
+            .outerjoin(completed, completed.c.hour == hours.c.hour)
+            .outerjoin(active, active.c.hour == hours.c.hour)
+            .outerjoin(users, users.c.hour == hours.c.hour)
+            .outerjoin(withdrawals, withdrawals.c.hour == hours.c.hour)
+        )
+        
+        stmt = pg_insert(PlatformHourlyStats).from_select(["hour", *self.COUNTERS], buckets)
+        stmt = stmt.on_conflict_do_update(
+            index_elements=["hour"],
+            set_={
+                **{name: stmt.excluded[name] for name in self.COUNTERS},
+                "updated_at": func.now(),
+            }
+        )
+        
+        result = await self.db.execute(stmt)
+        await self.db.commit()
+        
+        logger.info(f"Refreshed platform stats {first_hour} - {last_hour}: {result.rowcount} hours")
+        
+        return result.rowcount
+    
+    async def build_snapshot(self) -> Dict[str, Any]:
+        """
+        REAL admin dashboard snapshot
+        Totals come from the hourly rollup; only small live sets
+        (running sessions, pending withdrawals) are counted directly
+        """
+        now = datetime.utcnow()
+        today_start = now.replace(hour=0, minute=0, second=0, microsecond=0)
+        week_ago = now - timedelta(days=7)
+        
+        def today(column):
+            return func.coalesce(
+                func.sum(column).filter(PlatformHourlyStats.hour >= today_start),
+                0
+            )
+        
+        totals_result = await self.db.execute(
+            select(
+                func.coalesce(func.sum(PlatformHourlyStats.new_users), 0).label("users"),
+                func.coalesce(func.sum(PlatformHourlyStats.sessions_started), 0).label("sessions"),
+                func.coalesce(func.sum(PlatformHourlyStats.used_mb), 0.0).label("used_mb"),
+                func.coalesce(func.sum(PlatformHourlyStats.earned_usd), 0.0).label("earned_usd"),
+                today(PlatformHourlyStats.new_users).label("today_users"),
+                today(PlatformHourlyStats.sessions_started).label("today_sessions"),
+                today(PlatformHourlyStats.sent_mb).label("today_sent_mb"),
+                today(PlatformHourlyStats.used_mb).label("today_used_mb"),
+                today(PlatformHourlyStats.earned_usd).label("today_earned_usd"),
+            )
+        )
+        totals = totals_result.one()
+        
+        live_result = await self.db.execute(
+            select(
+                select(func.count(Session.id))
+                .where(Session.is_active == True)
+                .scalar_subquery().label("active_sessions"),
+                select(func.count(User.id))
+                .where(User.last_seen >= week_ago)
+                .where(User.is_active == True)
+                .scalar_subquery().label("active_users"),
+                select(func.coalesce(func.sum(User.balance_usd), 0.0))
+                .scalar_subquery().label("balance_usd"),
+            )
+        )
+        live = live_result.one()
+        
+        pending_result = await self.db.execute(
+            select(
+                func.count(WithdrawRequest.id).label("count"),
+                func.coalesce(func.sum(WithdrawRequest.amount_usd), 0.0).label("amount"),
+            )
+            .where(WithdrawRequest.status.in_(["pending", "processing"]))
+        )
+        pending = pending_result.one()
+        
+        # Top earners from the per-user daily rollup
+        ranking = (
+            select(
+                UserDailyStats.telegram_id,
+                func.sum(UserDailyStats.earned_usd).label("total_earned"),
+            )
+            .group_by(UserDailyStats.telegram_id)
+            .order_by(func.sum(UserDailyStats.earned_usd).desc())
+            .limit(10)
+            .subquery()
+        )
+        top_result = await self.db.execute(
+            select(
+                User.telegram_id,
+                User.first_name,
+                User.username,
+                User.balance_usd,
+                ranking.c.total_earned,
+            )
+            .join(ranking, ranking.c.telegram_id == User.telegram_id)
+            .order_by(ranking.c.total_earned.desc())
+        )
+        
+        hourly_result = await self.db.execute(
+            select(PlatformHourlyStats)
+            .where(PlatformHourlyStats.hour >= now - timedelta(hours=24))
+            .order_by(PlatformHourlyStats.hour)
+        )
+        
+        return {
+            "generated_at": now.isoformat(),
+            "users": {
+                "total": int(totals.users),
+                "active_7_days": live.active_users or 0,
+                "new_today": int(totals.today_users),
+            },
+            "sessions": {
+                "total": int(totals.sessions),
+                "active_now": live.active_sessions or 0,
+                "today": int(totals.today_sessions),
+            },
+            "traffic": {
+                "total_mb": float(totals.used_mb),
+                "today_mb": float(totals.today_used_mb),
+                "today_sent_mb": float(totals.today_sent_mb),
+            },
+            "earnings": {
+                "total_usd": float(totals.earned_usd),
+                "today_usd": float(totals.today_earned_usd),
+            },
+            "balance_total_usd": float(live.balance_usd),
+            "pending_withdrawals": {
+                "count": pending.count or 0,
+                "amount_usd": float(pending.amount),
+            },
+            "top_users": [
+                {
+                    "telegram_id": row.telegram_id,
+                    "first_name": row.first_name,
+                    "username": row.username,
+                    "balance_usd": float(row.balance_usd or 0),
+                    "total_earned": float(row.total_earned or 0),
+                }
+                for row in top_result.all()
+            ],
+            "hourly": [
+                {
+                    "hour": row.hour.isoformat(),
+                    **{name: getattr(row, name) or 0 for name in self.COUNTERS},
+                }
+                for row in hourly_result.scalars().all()
+            ],
+        }
+    
+    async def refresh_snapshot(self) -> Dict[str, Any]:
+        """Build the snapshot and publish it to the cache"""
+        snapshot = await self.build_snapshot()
+        
+        await cache_manager.set(
+            SNAPSHOT_CACHE_KEY,
+            snapshot,
+            ttl=settings.ADMIN_SNAPSHOT_TTL_SECONDS
+        )
+        
+        return snapshot
+    
+    async def get_snapshot(self) -> Dict[str, Any]:
+        """
+        REAL cached snapshot
+        Built inline only when the refresh job has not published one
+        """
+        snapshot = await cache_manager.get(SNAPSHOT_CACHE_KEY)
+        
+        if snapshot is None:
+            snapshot = await self.refresh_snapshot()
+        
+        return snapshot
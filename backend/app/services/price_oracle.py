@@ -0,0 +1,205 @@
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy import select
+from datetime import date, timedelta
+from typing import Dict, Any, Optional, Tuple
+import redis.asyncio as redis
+import threading
+import asyncio
+import time
+import logging
+
+from app.core.config import settings
+from app.models.pricing import DailyPrice
+from app.services.price_timeline import price_timeline
+
+logger = logging.getLogger(__name__)
+
+
+class PriceOracle:
+    """
+    REAL shared price cache
+    Loads today's price once per process and keeps it until a new
+    price is published by PricingService.set_daily_price
+    """
+    
+    CHANNEL = "pricing:invalidate"
+    
+    # Safety net in case an invalidation message is missed
+    MAX_AGE_SECONDS = 300
+    
+    def __init__(self):
+        # date -> (loaded_at monotonic, price dict)
+        self._cache: Dict[date, Tuple[float, Dict[str, Any]]] = {}
+        # Bumped on every invalidation so in-flight loads are not cached
+        self._generation = 0
+        self._listener_task: Optional[asyncio.Task] = None
+        self._listener_thread: Optional[threading.Thread] = None
+    
+    async def get_price(self, db: AsyncSession) -> Dict[str, Any]:
+        """
+        REAL current price lookup
+        Dictionary read on the hot path, DB only on miss
+        """
+        today = date.today()
+        entry = self._cache.get(today)
+        
+        if entry and time.monotonic() - entry[0] < self.MAX_AGE_SECONDS:
+            return entry[1]
+        
+        generation = self._generation
+        price = await self._load(db, today)
+        
+        # Only today's entry is ever useful
+        if generation == self._generation:
+            self._cache = {today: (time.monotonic(), price)}
+        
+        return price
+    
+    def invalidate(self):
+        """Drop cached prices in this process"""
+        self._generation += 1
+        self._cache = {}
+        price_timeline.mark_stale()
+        logger.debug("Price cache invalidated")
+    
+    async def publish_invalidation(self):
+        """
+        REAL invalidate price in all API and Celery processes
+        """
+        self.invalidate()
+        
+        try:
+            client = redis.from_url(settings.REDIS_URL)
+            try:
+                await client.publish(self.CHANNEL, "invalidate")
+            finally:
+                await client.aclose()
+        except Exception as e:
+            logger.error(f"Failed to publish price invalidation: {e}")
+    
+    async def start_listener(self):
+        """Subscribe this (API) process to invalidations"""
+        if self._listener_task and not self._listener_task.done():
+            return
+        
+        self._listener_task = asyncio.create_task(self._listen())
+    
+    async def stop_listener(self):
+        """Stop invalidation listener"""
+        if self._listener_task:
+            self._listener_task.cancel()
+            try:
+                await self._listener_task
+            except asyncio.CancelledError:
+                pass
+            self._listener_task = None
+    
+    def start_background_listener(self):
+        """
+        Subscribe a process without a long-lived event loop (Celery worker)
+        Runs a blocking Redis subscription in a daemon thread
+        """
+        if self._listener_thread and self._listener_thread.is_alive():
+            return
+        
+        self._listener_thread = threading.Thread(
+            target=self._listen_blocking,
+            name="price-oracle-listener",
+            daemon=True
+        )
+        self._listener_thread.start()
+    
+    async def _listen(self):
+        """Async pub/sub loop with reconnect"""
+        while True:
+            try:
+                client = redis.from_url(settings.REDIS_URL)
+                pubsub = client.pubsub()
+                await pubsub.subscribe(self.CHANNEL)
+                
+                # Anything published while disconnected was missed
+                self.invalidate()
+                
+                async for message in pubsub.listen():
+                    if message.get("type") == "message":
+                        self.invalidate()
+            
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                logger.error(f"Price invalidation listener error: {e}")
+                await asyncio.sleep(5)
+    
+    def _listen_blocking(self):
+        """Blocking pub/sub loop with reconnect"""
+        import redis as redis_sync
+        
+        while True:
+            try:
+                client = redis_sync.from_url(settings.REDIS_URL)
+                pubsub = client.pubsub()
+                pubsub.subscribe(self.CHANNEL)
+                
+                self.invalidate()
+                
+                for message in pubsub.listen():
+                    if message.get("type") == "message":
+                        self.invalidate()
+            
+            except Exception as e:
+                logger.error(f"Price invalidation listener error: {e}")
+                time.sleep(5)
+    
+    async def _load(self, db: AsyncSession, today: date) -> Dict[str, Any]:
+        """Load today's price, falling back to latest, then default"""
+        # Try today's price first
+        result = await db.execute(
+            select(DailyPrice)
+            .where(DailyPrice.date == today)
+            .order_by(DailyPrice.created_at.desc())
+            .limit(1)
+        )
+        price = result.scalar_one_or_none()
+        
+        # Fallback to latest price
+        if not price:
+            result = await db.execute(
+                select(DailyPrice)
+                .order_by(DailyPrice.date.desc())
+                .limit(1)
+            )
+            price = result.scalar_one_or_none()
+        
+        # Default if no price in DB
+        if not price:
+            return {
+                "date": today.isoformat(),
+                "price_per_gb": settings.DEFAULT_PRICE_PER_GB,
+                "price_per_mb": settings.DEFAULT_PRICE_PER_GB / 1024,
+                "message": "Default pricing",
+                "change": 0.0
+            }
+        
+        # Get yesterday's price for comparison
+        yesterday_result = await db.execute(
+            select(DailyPrice.price_per_gb)
+            .where(DailyPrice.date == today - timedelta(days=1))
+            .limit(1)
+        )
+        yesterday_price = yesterday_result.scalar_one_or_none()
+        
+        change = 0.0
+        if yesterday_price is not None:
+            change = price.price_per_gb - yesterday_price
+        
+        return {
+            "date": price.date.isoformat(),
+            "price_per_gb": float(price.price_per_gb),
+            "price_per_mb": float(price.price_per_mb),
+            "message": price.message or "",
+            "change": float(change)
+        }
+
+
+# Global price oracle instance
+price_oracle = PriceOracle()
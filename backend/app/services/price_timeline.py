@@ -0,0 +1,194 @@
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy import select, func
+from datetime import date, datetime, time as dt_time, timedelta, timezone
+from typing import Dict, List, Optional
+from bisect import bisect_right
+import time
+import logging
+
+from app.core.config import settings
+from app.models.pricing import DailyPrice, PricingLog
+
+logger = logging.getLogger(__name__)
+
+
+class PriceTimeline:
+    """
+    REAL in-memory price history
+    Sorted by effective time, answers price-at-time and piecewise
+    earnings integrals with bisect instead of DB queries
+    """
+    
+    # Safety net in case an invalidation message is missed
+    MAX_AGE_SECONDS = 300
+    
+    # Change times are transaction-start now(), so a row can commit after one
+    # with a later timestamp; re-read this far behind the watermark
+    WATERMARK_OVERLAP = timedelta(minutes=10)
+    
+    def __init__(self):
+        # date -> price_per_mb, daily_price overrides pricing_logs
+        self._daily: Dict[date, float] = {}
+        self._logged: Dict[date, float] = {}
+        
+        # Parallel sorted arrays
+        self._starts: List[datetime] = []
+        self._values: List[float] = []
+        # Integral of price over seconds up to each start
+        self._cumulative: List[float] = []
+        
+        self._daily_watermark: Optional[datetime] = None
+        self._log_watermark: Optional[datetime] = None
+        self._stale = True
+        self._loaded_at = 0.0
+    
+    @property
+    def default_price_per_mb(self) -> float:
+        return settings.DEFAULT_PRICE_PER_GB / 1024
+    
+    def mark_stale(self):
+        """Force incremental refresh on next use"""
+        self._stale = True
+    
+    async def ensure_fresh(self, db: AsyncSession):
+        """Refresh only if invalidated or too old"""
+        if not self._stale and time.monotonic() - self._loaded_at < self.MAX_AGE_SECONDS:
+            return
+        
+        await self.refresh(db)
+    
+    async def refresh(self, db: AsyncSession):
+        """
+        REAL incremental refresh
+        Only rows changed since shortly before the last seen change are loaded
+        """
+        # Clear first so an invalidation during the queries is not lost
+        self._stale = False
+        
+        daily_changed = func.coalesce(DailyPrice.updated_at, DailyPrice.created_at)
+        query = select(DailyPrice.date, DailyPrice.price_per_mb, daily_changed.label("changed_at"))
+        if self._daily_watermark is not None:
+            query = query.where(daily_changed > self._daily_watermark - self.WATERMARK_OVERLAP)
+        
+        daily_rows = (await db.execute(query)).all()
+        
+        log_changed = func.coalesce(PricingLog.updated_at, PricingLog.created_at)
+        query = (
+            select(PricingLog.date, PricingLog.price_per_mb, log_changed.label("changed_at"))
+            .order_by(log_changed)
+        )
+        if self._log_watermark is not None:
+            query = query.where(log_changed > self._log_watermark - self.WATERMARK_OVERLAP)
+        
+        log_rows = (await db.execute(query)).all()
+        
+        for row in daily_rows:
+            self._daily[row.date] = float(row.price_per_mb)
+            if row.changed_at and (self._daily_watermark is None or row.changed_at > self._daily_watermark):
+                self._daily_watermark = row.changed_at
+        
+        # Ordered by change time, so the latest log entry per date wins
+        for row in log_rows:
+            self._logged[row.date] = float(row.price_per_mb)
+            if row.changed_at and (self._log_watermark is None or row.changed_at > self._log_watermark):
+                self._log_watermark = row.changed_at
+        
+        if daily_rows or log_rows:
+            self._rebuild()
+            logger.debug(
+                f"Price timeline refreshed: +{len(daily_rows)} daily, "
+                f"+{len(log_rows)} logged, {len(self._starts)} points"
+            )
+        
+        self._loaded_at = time.monotonic()
+    
+    def price_at(self, ts: datetime) -> float:
+        """Price per MB in effect at timestamp - O(log n)"""
+        if not self._starts:
+            return self.default_price_per_mb
+        
+        i = bisect_right(self._starts, self._normalize(ts)) - 1
+        
+        # Before the first known price, use the earliest one
+        return self._values[max(i, 0)]
+    
+    def settle(self, accrued: Optional[float], start: datetime, end: datetime, mb: float) -> float:
+        """
+        Session payout: the earnings accrued per report, each at the price in
+        effect when it was sent; the span integral only if nothing was accrued
+        """
+        if accrued or not mb:
+            return float(accrued or 0.0)
+        
+        return self.integrate(start, end, mb)
+    
+    def price_on(self, day: date) -> float:
+        """Price per MB in effect on a calendar day"""
+        return self.price_at(datetime.combine(day, dt_time.min))
+    
+    def integrate(self, start: datetime, end: datetime, mb: float) -> float:
+        """
+        REAL earnings for MB sent evenly over [start, end]
+        Piecewise prices weighted by time spent in each - O(log n)
+        """
+        if not mb:
+            return 0.0
+        
+        if start is None or end is None:
+            return mb * self.price_at(end or start or datetime.utcnow())
+        
+        start = self._normalize(start)
+        end = self._normalize(end)
+        
+        seconds = (end - start).total_seconds()
+        if seconds <= 0 or not self._starts:
+            return mb * self.price_at(end)
+        
+        avg_price = (self._integral_to(end) - self._integral_to(start)) / seconds
+        
+        return mb * avg_price
+    
+    def _integral_to(self, ts: datetime) -> float:
+        """Integral of price over seconds from the first point to ts"""
+        i = bisect_right(self._starts, ts) - 1
+        
+        if i < 0:
+            # Before first point: extend earliest price backwards
+            return (ts - self._starts[0]).total_seconds() * self._values[0]
+        
+        return self._cumulative[i] + (ts - self._starts[i]).total_seconds() * self._values[i]
+    
+    def _rebuild(self):
+        """Rebuild sorted arrays and prefix integrals"""
+        merged = dict(self._logged)
+        merged.update(self._daily)
+        
+        starts: List[datetime] = []
+        values: List[float] = []
+        cumulative: List[float] = []
+        
+        for day in sorted(merged):
+            start = datetime.combine(day, dt_time.min)
+            
+            if starts:
+                cumulative.append(
+                    cumulative[-1] + (start - starts[-1]).total_seconds() * values[-1]
+                )
+            else:
+                cumulative.append(0.0)
+            
+            starts.append(start)
+            values.append(merged[day])
+        
+        self._starts, self._values, self._cumulative = starts, values, cumulative
+    
+    @staticmethod
+    def _normalize(ts: datetime) -> datetime:
+        """Compare everything as naive UTC"""
+        if ts.tzinfo is not None:
+            return ts.astimezone(timezone.utc).replace(tzinfo=None)
+        return ts
+
+
+# Global price timeline instance
+price_timeline = PriceTimeline()
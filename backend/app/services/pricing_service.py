@@ -6,7 +6,8 @@ import logging
 
 from app.models.pricing import DailyPrice, TrafficLog
 from app.models.user import User
-from app.core.config import settings
+from app.services.price_oracle import price_oracle
+from app.services.price_timeline import price_timeline
 
 logger = logging.getLogger(__name__)
 
@@ -22,56 +23,9 @@ class PricingService:
     
     async def get_current_price(self) -> Dict[str, Any]:
         """
-        REAL get current price from database
+        REAL get current price (served from the shared price oracle)
         """
-        # Try today's price first
-        result = await self.db.execute(
-            select(DailyPrice)
-            .where(DailyPrice.date == date.today())
-            .order_by(DailyPrice.created_at.desc())
-            .limit(1)
-        )
-        price = result.scalar_one_or_none()
-        
-        # Fallback to latest price
-        if not price:
-            result = await self.db.execute(
-                select(DailyPrice)
-                .order_by(DailyPrice.date.desc())
-                .limit(1)
-            )
-            price = result.scalar_one_or_none()
-        
-        # Default if no price in DB
-        if not price:
-            return {
-                "date": date.today().isoformat(),
-                "price_per_gb": settings.DEFAULT_PRICE_PER_GB,
-                "price_per_mb": settings.DEFAULT_PRICE_PER_GB / 1024,
-                "message": "Default pricing",
-                "change": 0.0
-            }
-        
-        # Get yesterday's price for comparison
-        yesterday = date.today() - timedelta(days=1)
-        yesterday_result = await self.db.execute(
-            select(DailyPrice)
-            .where(DailyPrice.date == yesterday)
-            .limit(1)
-        )
-        yesterday_price = yesterday_result.scalar_one_or_none()
-        
-        change = 0.0
-        if yesterday_price:
-            change = price.price_per_gb - yesterday_price.price_per_gb
-        
-        return {
-            "date": price.date.isoformat(),
-            "price_per_gb": float(price.price_per_gb),
-            "price_per_mb": float(price.price_per_mb),
-            "message": price.message or "",
-            "change": float(change)
-        }
+        return await price_oracle.get_price(self.db)
     
     async def set_daily_price(
         self,
@@ -105,11 +59,10 @@ class PricingService:
             existing_price.price_per_gb = price_per_gb
             existing_price.price_per_mb = price_per_mb
             existing_price.message = message
-            existing_price.admin_id = admin_id
             
             logger.info(
                 f"Price updated for {target_date}: "
-                f"${old_price:.2f} -> ${price_per_gb:.2f}"
+                f"${old_price:.2f} -> ${price_per_gb:.2f} (admin {admin_id})"
             )
         else:
             # Create new
@@ -118,15 +71,17 @@ class PricingService:
                 price_per_gb=price_per_gb,
                 price_per_mb=price_per_mb,
                 message=message,
-                admin_id=admin_id,
                 created_at=datetime.utcnow()
             )
             self.db.add(new_price)
             
-            logger.info(f"New price set for {target_date}: ${price_per_gb:.2f}/GB")
+            logger.info(f"New price set for {target_date}: ${price_per_gb:.2f}/GB (admin {admin_id})")
         
         await self.db.commit()
         
+        # Drop cached price in every API and worker process
+        await price_oracle.publish_invalidation()
+        
         # Trigger notification if today's price
         if target_date == date.today():
             try:
@@ -185,17 +140,9 @@ class PricingService:
         if price_date is None:
             price_date = date.today()
         
-        # Get price for date
-        result = await self.db.execute(
-            select(DailyPrice)
-            .where(DailyPrice.date == price_date)
-        )
-        price = result.scalar_one_or_none()
-        
-        if price:
-            price_per_mb = price.price_per_mb
-        else:
-            price_per_mb = settings.DEFAULT_PRICE_PER_GB / 1024
+        # Price in effect on date, from the in-memory timeline
+        await price_timeline.ensure_fresh(self.db)
+        price_per_mb = price_timeline.price_on(price_date)
         
         earnings = mb_amount * price_per_mb
         
@@ -1,17 +1,23 @@
 from sqlalchemy.ext.asyncio import AsyncSession
-from sqlalchemy import select, and_, func
-from typing import Dict, Any, List
-from datetime import datetime, timedelta
+from sqlalchemy import select, update, values, column, cast, and_, or_, func, BigInteger, Float, DateTime
+from typing import Dict, Any, List, Optional, Tuple
+from datetime import datetime, timedelta, timezone
+import asyncio
 import logging
 
 from app.models.session import Session
 from app.models.user import User
-from app.models.transaction import Transaction
 from app.services.pricing_service import PricingService
+from app.services.balance_service import BalanceService
+from app.services.price_timeline import price_timeline
+from app.utils.report_archive import report_archive
 
 logger = logging.getLogger(__name__)
 
 
+EPOCH = datetime(1970, 1, 1, tzinfo=timezone.utc)
+
+
 class ReconciliationService:
     """
     REAL session and balance reconciliation
@@ -22,14 +28,19 @@ class ReconciliationService:
     TOLERANCE_PERCENT = 0.01
     TOLERANCE_MB = 5.0
     
+    # Sessions per keyset page in full reconciliation
+    BULK_CHUNK_SIZE = 5000
+    
     def __init__(self, db: AsyncSession):
         self.db = db
         self.pricing_service = PricingService(db)
+        self.balance_service = BalanceService(db)
+        self.archive = report_archive
     
     async def run_full_reconciliation(self) -> Dict[str, Any]:
         """
         REAL full system reconciliation
-        Checks all sessions and balances
+        Checks all sessions set-based in keyset chunks, then balances
         """
         logger.info("Starting full reconciliation...")
         
@@ -41,32 +52,31 @@ class ReconciliationService:
             "errors": []
         }
         
-        # Get all completed sessions in last 30 days
+        # Stream completed sessions of last 30 days in keyset pages
         thirty_days_ago = datetime.utcnow() - timedelta(days=30)
+        await price_timeline.ensure_fresh(self.db)
         
-        result = await self.db.execute(
-            select(Session)
-            .where(Session.status == "completed")
-            .where(Session.started_at >= thirty_days_ago)
-        )
-        sessions = result.scalars().all()
-        
-        results["sessions_checked"] = len(sessions)
-        
-        # Check each session
-        for session in sessions:
+        async for rows in self._iter_session_chunks(thirty_days_ago):
             try:
-                is_ok = await self._reconcile_session(session)
+                checked, mismatched, corrections = self._check_session_chunk(rows)
+                
+                if corrections:
+                    await self._apply_earnings_corrections(corrections)
                 
-                if is_ok:
-                    results["sessions_ok"] += 1
-                else:
-                    results["sessions_mismatch"] += 1
+                await self.db.commit()
+                
+                results["sessions_checked"] += checked
+                results["sessions_ok"] += checked - mismatched
+                results["sessions_mismatch"] += mismatched
             
             except Exception as e:
-                logger.error(f"Session {session.id} reconciliation error: {e}")
+                await self.db.rollback()
+                logger.error(
+                    f"Session chunk {rows[0].id}..{rows[-1].id} reconciliation error: {e}"
+                )
                 results["errors"].append({
-                    "session_id": session.id,
+                    "session_id_from": rows[0].id,
+                    "session_id_to": rows[-1].id,
                     "error": str(e)
                 })
         
@@ -85,6 +95,122 @@ class ReconciliationService:
         
         return results
     
+    async def _iter_session_chunks(self, since: datetime):
+        """
+        REAL keyset-paginated session scan
+        Yields plain rows (no ORM objects) so memory stays flat
+        """
+        local_mb = func.coalesce(Session.local_counted_mb, 0.0)
+        server_mb = func.coalesce(Session.server_counted_mb, 0.0)
+        
+        # Tolerance check done by the database in the same pass
+        is_mismatch = func.abs(local_mb - server_mb) > func.greatest(
+            local_mb * self.TOLERANCE_PERCENT,
+            self.TOLERANCE_MB
+        )
+        
+        last_id = 0
+        
+        while True:
+            result = await self.db.execute(
+                select(
+                    Session.id,
+                    server_mb.label("server_mb"),
+                    Session.estimated_earnings,
+                    Session.earned_usd,
+                    Session.start_time,
+                    Session.end_time,
+                    is_mismatch.label("is_mismatch")
+                )
+                .where(Session.status == "completed")
+                .where(Session.start_time >= since)
+                .where(Session.id > last_id)
+                .order_by(Session.id)
+                .limit(self.BULK_CHUNK_SIZE)
+            )
+            rows = result.all()
+            
+            if not rows:
+                return
+            
+            last_id = rows[-1].id
+            yield rows
+    
+    def _check_session_chunk(self, rows) -> Tuple[int, int, List[Dict[str, Any]]]:
+        """
+        Count mismatches in a chunk and compute earnings corrections
+        Returns: (checked, mismatched, corrections)
+        """
+        mismatched = 0
+        corrections = []
+        
+        for row in rows:
+            if not row.is_mismatch:
+                continue
+            
+            mismatched += 1
+            
+            correct_earnings = self._correct_earnings(
+                row.estimated_earnings,
+                row.earned_usd,
+                row.start_time,
+                row.end_time,
+                row.server_mb
+            )
+            if correct_earnings is not None:
+                corrections.append({
+                    "id": row.id,
+                    "estimated_earnings": correct_earnings
+                })
+        
+        if mismatched:
+            logger.warning(
+                f"Sessions {rows[0].id}..{rows[-1].id}: "
+                f"{mismatched} mismatched, {len(corrections)} earnings corrected"
+            )
+        
+        return len(rows), mismatched, corrections
+    
+    def _correct_earnings(
+        self,
+        estimated_earnings: Optional[float],
+        earned_usd: Optional[float],
+        start_time: Optional[datetime],
+        end_time: Optional[datetime],
+        server_mb: float
+    ) -> Optional[float]:
+        """
+        Earnings by the rule the session was paid with (per-report prices)
+        Returns None if the stored estimate is already correct
+        """
+        if not estimated_earnings:
+            return None
+        
+        correct_earnings = price_timeline.settle(earned_usd, start_time, end_time, server_mb)
+        
+        if abs(estimated_earnings - correct_earnings) <= 0.001:
+            return None
+        
+        return correct_earnings
+    
+    async def _apply_earnings_corrections(self, corrections: List[Dict[str, Any]]):
+        """
+        REAL bulk correction
+        Single UPDATE ... FROM (VALUES ...) per chunk
+        """
+        corrected = values(
+            column("id", BigInteger),
+            column("estimated_earnings", Float),
+            name="corrected"
+        ).data([(c["id"], c["estimated_earnings"]) for c in corrections])
+        
+        await self.db.execute(
+            update(Session)
+            .where(Session.id == corrected.c.id)
+            .values(estimated_earnings=corrected.c.estimated_earnings)
+            .execution_options(synchronize_session=False)
+        )
+    
     async def _reconcile_session(self, session: Session) -> bool:
         """
         REAL reconcile single session
@@ -110,89 +236,41 @@ class ReconciliationService:
         )
         
         # Use server count as authoritative
-        if session.estimated_earnings:
-            # Recalculate earnings based on server count
-            price_data = await self.pricing_service.get_current_price()
-            price_per_mb = price_data["price_per_mb"]
-            
-            correct_earnings = server_mb * price_per_mb
-            
-            if abs(session.estimated_earnings - correct_earnings) > 0.001:
-                logger.info(
-                    f"Correcting session {session.id} earnings: "
-                    f"${session.estimated_earnings:.4f} -> ${correct_earnings:.4f}"
-                )
-                session.estimated_earnings = correct_earnings
+        await price_timeline.ensure_fresh(self.db)
+        correct_earnings = self._correct_earnings(
+            session.estimated_earnings,
+            session.earned_usd,
+            session.start_time,
+            session.end_time,
+            server_mb
+        )
+        
+        if correct_earnings is not None:
+            logger.info(
+                f"Correcting session {session.id} earnings: "
+                f"${session.estimated_earnings:.4f} -> ${correct_earnings:.4f}"
+            )
+            session.estimated_earnings = correct_earnings
         
         return False  # Mismatch detected
     
     async def _reconcile_all_balances(self) -> int:
         """
         REAL reconcile all user balances
-        Recalculates from transactions
+        One grouped query and one UPDATE regardless of user count
         """
-        result = await self.db.execute(
-            select(User).where(User.is_active == True)
-        )
-        users = result.scalars().all()
-        
-        corrected_count = 0
+        corrections = await self.balance_service.correct_drift(active_only=True)
         
-        for user in users:
-            try:
-                corrected = await self._reconcile_user_balance(user)
-                if corrected:
-                    corrected_count += 1
-            except Exception as e:
-                logger.error(f"Balance reconciliation error for user {user.telegram_id}: {e}")
-        
-        return corrected_count
+        return len(corrections)
     
     async def _reconcile_user_balance(self, user: User) -> bool:
         """
         REAL reconcile single user balance
         Returns True if balance was corrected
         """
-        # Calculate actual balance from transactions
-        result = await self.db.execute(
-            select(func.sum(Transaction.amount_usd))
-            .where(Transaction.telegram_id == user.telegram_id)
-            .where(Transaction.status == "completed")
-        )
-        
-        total_from_transactions = result.scalar() or 0.0
-        
-        # Add income from completed sessions (if not in transactions)
-        sessions_result = await self.db.execute(
-            select(func.sum(Session.estimated_earnings))
-            .where(Session.telegram_id == user.telegram_id)
-            .where(Session.status == "completed")
-        )
-        
-        total_from_sessions = sessions_result.scalar() or 0.0
+        result = await self.balance_service.refresh_user(user.telegram_id)
         
-        # Calculate expected balance
-        expected_balance = total_from_transactions + total_from_sessions
-        
-        # Compare with current balance
-        current_balance = user.balance_usd or 0.0
-        
-        diff = abs(expected_balance - current_balance)
-        
-        if diff > 0.01:  # More than 1 cent difference
-            logger.warning(
-                f"User {user.telegram_id} balance mismatch: "
-                f"current=${current_balance:.2f}, expected=${expected_balance:.2f}"
-            )
-            
-            # Correct the balance
-            user.balance_usd = expected_balance
-            user.last_balance_refresh = datetime.utcnow()
-            
-            logger.info(f"Corrected balance for user {user.telegram_id}")
-            return True
-        
-        return False  # Balance is correct
+        return result["corrected"]
     
     async def reconcile_session_reports(
         self,
@@ -200,39 +278,10 @@ class ReconciliationService:
     ) -> Dict[str, Any]:
         """
         REAL reconcile session reports
-        Aggregates all reports for a session
+        Totals are computed by the database in one windowed aggregate;
+        no report rows are loaded
         """
-        from app.models.session import SessionReport
-        
-        # Get all reports for session
-        result = await self.db.execute(
-            select(SessionReport)
-            .where(SessionReport.session_id == session_id)
-            .order_by(SessionReport.timestamp)
-        )
-        reports = result.scalars().all()
-        
-        if not reports:
-            return {
-                "status": "no_reports",
-                "total_mb": 0.0
-            }
-        
-        # Aggregate MB from reports
-        total_mb = 0.0
-        last_cumulative = 0.0
-        
-        for report in reports:
-            if report.delta_mb:
-                total_mb += report.delta_mb
-            elif report.cumulative_mb:
-                # Use delta from cumulative
-                delta = report.cumulative_mb - last_cumulative
-                if delta > 0:
-                    total_mb += delta
-                last_cumulative = report.cumulative_mb
-        
-        # Get session
+        # Get session first - its start time bounds the report partitions scanned
         session_result = await self.db.execute(
             select(Session).where(Session.id == session_id)
         )
@@ -241,6 +290,16 @@ class ReconciliationService:
         if not session:
             raise ValueError(f"Session {session_id} not found")
         
+        stats = (await self._aggregate_reports([session])).get(session.id)
+        
+        if not stats:
+            return {
+                "status": "no_reports",
+                "total_mb": 0.0
+            }
+        
+        total_mb = stats["total_mb"]
+        
         # Update server_counted_mb
         old_server_mb = session.server_counted_mb or 0.0
         session.server_counted_mb = total_mb
@@ -252,10 +311,227 @@ class ReconciliationService:
             f"{old_server_mb:.2f}MB -> {total_mb:.2f}MB"
         )
         
+        if stats["counter_resets"] or stats["negative_deltas"]:
+            logger.warning(
+                f"Session {session_id} reports: {stats['counter_resets']} counter resets, "
+                f"{stats['negative_deltas']} negative deltas"
+            )
+        
         return {
             "status": "reconciled",
-            "reports_count": len(reports),
+            "reports_count": stats["reports_count"],
             "total_mb": total_mb,
             "old_server_mb": old_server_mb,
-            "new_server_mb": total_mb
+            "new_server_mb": total_mb,
+            "counter_resets": stats["counter_resets"],
+            "negative_deltas": stats["negative_deltas"]
         }
+    
+    async def reconcile_session_reports_batch(self, session_ids: List[int]) -> Dict[str, Any]:
+        """
+        REAL reconcile reports of many sessions in one pass
+        One grouped aggregate and one UPDATE ... FROM (VALUES ...)
+        """
+        results = {
+            "sessions_checked": 0,
+            "sessions_reconciled": 0,
+            "sessions_changed": 0,
+            "counter_resets": 0,
+            "negative_deltas": 0,
+        }
+        
+        if not session_ids:
+            return results
+        
+        session_result = await self.db.execute(
+            select(
+                Session.id,
+                Session.start_time,
+                Session.end_time,
+                Session.last_report_at,
+                func.coalesce(Session.server_counted_mb, 0.0).label("server_mb")
+            )
+            .where(Session.id.in_(session_ids))
+        )
+        sessions = session_result.all()
+        
+        all_stats = await self._aggregate_reports(sessions)
+        corrections = []
+        
+        for session in sessions:
+            stats = all_stats.get(session.id)
+            if not stats:
+                continue
+            
+            results["sessions_reconciled"] += 1
+            results["counter_resets"] += stats["counter_resets"]
+            results["negative_deltas"] += stats["negative_deltas"]
+            
+            if abs(stats["total_mb"] - session.server_mb) > 1e-6:
+                corrections.append((session.id, stats["total_mb"]))
+        
+        if corrections:
+            corrected = values(
+                column("id", BigInteger),
+                column("server_counted_mb", Float),
+                name="corrected"
+            ).data(corrections)
+            
+            await self.db.execute(
+                update(Session)
+                .where(Session.id == corrected.c.id)
+                .values(server_counted_mb=corrected.c.server_counted_mb)
+                .execution_options(synchronize_session=False)
+            )
+        
+        await self.db.commit()
+        
+        results["sessions_checked"] = len(sessions)
+        results["sessions_changed"] = len(corrections)
+        
+        logger.info(f"Batch report reconciliation: {results}")
+        
+        return results
+    
+    async def _aggregate_reports(self, sessions) -> Dict[int, Dict[str, Any]]:
+        """
+        Report totals per session: {session pk: stats}, sessions without reports omitted
+        Delta reports are summed; reports carrying only a cumulative counter
+        add their positive increase over the previous such report (lag() in a
+        window). Archived days are folded first and seed the counter
+        """
+        from app.models.session import SessionReport
+        
+        bounds = []
+        archived_stats = {}
+        
+        for session in sessions:
+            since = session.start_time or EPOCH
+            archived = self._fold_reports(await self._archived_reports(session))
+            
+            after = None
+            seed = 0.0
+            if archived["reports_count"]:
+                archived_stats[session.id] = archived
+                after = archived["last_timestamp"]
+                seed = archived["last_cumulative"]
+            
+            bounds.append((session.id, since, after, seed))
+        
+        if not bounds:
+            return {}
+        
+        bounds_table = values(
+            column("session_id", BigInteger),
+            column("since", DateTime(timezone=True)),
+            column("after", DateTime(timezone=True)),
+            column("seed", Float),
+            name="bounds"
+        ).data(bounds)
+        
+        delta_mb = func.coalesce(SessionReport.delta_mb, 0.0)
+        cumulative_mb = func.coalesce(SessionReport.cumulative_mb, 0.0)
+        cumulative_only = and_(delta_mb == 0, cumulative_mb != 0)
+        
+        ordered = (
+            select(
+                SessionReport.session_id,
+                delta_mb.label("delta_mb"),
+                cumulative_mb.label("cumulative_mb"),
+                cumulative_only.label("cumulative_only"),
+                func.lag(cumulative_mb, 1, bounds_table.c.seed).over(
+                    partition_by=(SessionReport.session_id, cumulative_only),
+                    order_by=(SessionReport.timestamp, SessionReport.id)
+                ).label("previous_mb")
+            )
+            .join(bounds_table, bounds_table.c.session_id == SessionReport.session_id)
+            # Constant lower bound lets the planner prune report partitions
+            .where(SessionReport.timestamp >= min(since for _, since, _, _ in bounds))
+            .where(SessionReport.timestamp >= bounds_table.c.since)
+            .where(or_(
+                bounds_table.c.after.is_(None),
+                # Typed explicitly - an all-NULL VALUES column is text
+                SessionReport.timestamp > cast(bounds_table.c.after, DateTime(timezone=True))
+            ))
+            .subquery()
+        )
+        
+        increase = ordered.c.cumulative_mb - ordered.c.previous_mb
+        
+        result = await self.db.execute(
+            select(
+                ordered.c.session_id,
+                func.count().label("reports_count"),
+                (
+                    func.coalesce(func.sum(ordered.c.delta_mb), 0.0)
+                    + func.coalesce(
+                        func.sum(func.greatest(increase, 0.0)).filter(ordered.c.cumulative_only),
+                        0.0
+                    )
+                ).label("total_mb"),
+                func.count().filter(and_(ordered.c.cumulative_only, increase < 0)).label("counter_resets"),
+                func.count().filter(ordered.c.delta_mb < 0).label("negative_deltas"),
+            )
+            .group_by(ordered.c.session_id)
+        )
+        
+        stats = {}
+        for row in result.all():
+            stats[row.session_id] = {
+                "reports_count": row.reports_count,
+                "total_mb": float(row.total_mb),
+                "counter_resets": row.counter_resets,
+                "negative_deltas": row.negative_deltas,
+            }
+        
+        for session_id, archived in archived_stats.items():
+            live = stats.get(session_id)
+            stats[session_id] = {
+                name: archived[name] + (live[name] if live else 0)
+                for name in ("reports_count", "total_mb", "counter_resets", "negative_deltas")
+            }
+        
+        return stats
+    
+    @staticmethod
+    def _fold_reports(reports: List[Any]) -> Dict[str, Any]:
+        """Same totals as _aggregate_reports over reports already in memory (archive)"""
+        stats = {
+            "reports_count": len(reports),
+            "total_mb": 0.0,
+            "counter_resets": 0,
+            "negative_deltas": 0,
+            "last_cumulative": 0.0,
+            "last_timestamp": None,
+        }
+        
+        for report in reports:
+            if report.delta_mb:
+                stats["total_mb"] += report.delta_mb
+                if report.delta_mb < 0:
+                    stats["negative_deltas"] += 1
+            elif report.cumulative_mb:
+                increase = report.cumulative_mb - stats["last_cumulative"]
+                if increase > 0:
+                    stats["total_mb"] += increase
+                elif increase < 0:
+                    stats["counter_resets"] += 1
+                stats["last_cumulative"] = report.cumulative_mb
+            
+            stats["last_timestamp"] = report.timestamp
+        
+        return stats
+    
+    async def _archived_reports(self, session: Session) -> List[Any]:
+        """Archived reports of a session, read only for days it spanned (off the event loop)"""
+        if not self.archive or not session.start_time:
+            return []
+        
+        last_time = session.end_time or session.last_report_at or datetime.utcnow()
+        
+        return await asyncio.to_thread(
+            self.archive.read_session,
+            session.id,
+            session.start_time.date(),
+            last_time.date()
+        )
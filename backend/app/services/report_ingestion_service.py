@@ -0,0 +1,485 @@
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy import select, insert, update, bindparam, func
+from typing import Dict, Any, List, Optional, Tuple
+from datetime import datetime
+import asyncio
+import time
+import logging
+
+from app.core.config import settings
+from app.models.session import Session, SessionReport
+from app.models.user import User
+from app.models.transaction import Transaction
+from app.services.price_timeline import price_timeline
+from app.services.traffic_series_service import TrafficSeriesService
+from app.services.anomaly_detector import AnomalyDetector
+from app.services.anomaly_service import AnomalyService
+from app.services.rollup_service import RollupService
+from app.services.websocket_manager import ws_manager
+
+logger = logging.getLogger(__name__)
+
+
+class ReportIngestionService:
+    """
+    REAL write-behind ingestion for traffic reports
+    Buffers reports in-process and flushes them in batches
+    
+    Each worker has its own buffer, so a session can be stopped by one worker
+    while another still holds reports it already acknowledged. Those late
+    reports are still written, and credited to the user if the session was
+    already paid out.
+    """
+    
+    def __init__(
+        self,
+        flush_interval: float = settings.REPORT_FLUSH_INTERVAL_SECONDS,
+        max_batch: int = settings.REPORT_FLUSH_MAX_BATCH,
+        max_buffer: int = settings.REPORT_BUFFER_MAX_SIZE,
+        session_idle: float = settings.REPORT_SESSION_IDLE_SECONDS
+    ):
+        self.flush_interval = flush_interval
+        self.max_batch = max_batch
+        self.max_buffer = max_buffer
+        self.session_idle = session_idle
+        
+        # session_id -> (session pk, telegram_id, server_counted_mb, earned_usd) incl. pending
+        # Counters are re-read from the database on every flush, so the
+        # totals other workers wrote are picked up
+        self._sessions: Dict[str, Tuple[int, int, float, float]] = {}
+        # session_id -> monotonic time of its last report
+        self._last_seen: Dict[str, float] = {}
+        
+        # Pending SessionReport rows and coalesced per-session counters
+        self._reports: List[Dict[str, Any]] = []
+        self._counters: Dict[int, Dict[str, Any]] = {}
+        
+        # Online checks, state kept only for sessions cached above
+        self.detector = AnomalyDetector()
+        
+        self._flush_event = asyncio.Event()
+        self._flush_lock = asyncio.Lock()
+        self._task: Optional[asyncio.Task] = None
+    
+    @property
+    def is_running(self) -> bool:
+        return self._task is not None and not self._task.done()
+    
+    @property
+    def pending_count(self) -> int:
+        return len(self._reports)
+    
+    async def start(self):
+        """Start background flush loop"""
+        if self.is_running:
+            return
+        
+        self._task = asyncio.create_task(self._flush_loop())
+        logger.info(
+            f"Report ingestion started: interval={self.flush_interval}s "
+            f"batch={self.max_batch}"
+        )
+    
+    async def stop(self):
+        """Stop flush loop and write out everything still buffered"""
+        if self._task:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+        
+        from app.core.database import AsyncSessionLocal
+        
+        async with AsyncSessionLocal() as db:
+            await self.flush(db)
+        
+        logger.info("Report ingestion stopped")
+    
+    async def submit(
+        self,
+        db: AsyncSession,
+        session_id: str,
+        telegram_id: int,
+        cumulative_mb: float,
+        delta_mb: float,
+        speed_mb_s: Optional[float] = None,
+        battery_level: Optional[float] = None,
+        network_type: Optional[str] = None
+    ) -> Dict[str, Any]:
+        """
+        REAL accept traffic report into buffer
+        Only touches the database on first report of a session
+        """
+        session_pk, owner_id, server_mb, earned = await self._resolve_session(db, session_id)
+        
+        if owner_id != telegram_id:
+            raise ValueError("Session not found")
+        
+        if len(self._reports) >= self.max_buffer:
+            logger.error(f"Report buffer full ({self.max_buffer}), rejecting report for {session_id}")
+            raise RuntimeError("Report buffer is full, retry later")
+        
+        await price_timeline.ensure_fresh(db)
+        now = datetime.utcnow()
+        
+        # Online checks before the report can earn anything
+        anomalies = self.detector.observe(session_pk, now, cumulative_mb, delta_mb, speed_mb_s)
+        if anomalies:
+            paused = await AnomalyService(db).record(
+                session_pk,
+                telegram_id,
+                anomalies,
+                details={
+                    "session_id": session_id,
+                    "cumulative_mb": cumulative_mb,
+                    "delta_mb": delta_mb,
+                    "speed_mb_s": speed_mb_s,
+                }
+            )
+            
+            if paused:
+                self._forget_sessions({session_pk})
+                ws_manager.publish_session_event(session_id, {
+                    "type": "session_paused",
+                    "session_id": session_id,
+                    "timestamp": now.isoformat(),
+                    "reasons": [anomaly["kind"] for anomaly in anomalies if anomaly["pause"]],
+                })
+                raise ValueError("Session is paused for review")
+        
+        self._reports.append({
+            "session_id": session_pk,
+            "telegram_id": telegram_id,
+            "timestamp": now,
+            "cumulative_mb": cumulative_mb,
+            "delta_mb": delta_mb,
+            "speed_mb_s": speed_mb_s or 0.0,
+            "battery_level": battery_level,
+            "network_type": network_type,
+        })
+        
+        counter = self._counters.get(session_pk)
+        if counter is None:
+            counter = {"b_id": session_pk, "b_delta": 0.0}
+            self._counters[session_pk] = counter
+        
+        counter["b_delta"] += delta_mb
+        counter["b_cumulative"] = cumulative_mb
+        counter["b_reported_at"] = now
+        
+        server_mb += delta_mb
+        earned += delta_mb * price_timeline.price_at(now)
+        self._sessions[session_id] = (session_pk, owner_id, server_mb, earned)
+        self._last_seen[session_id] = time.monotonic()
+        
+        if self.is_running:
+            if len(self._reports) >= self.max_batch:
+                self._flush_event.set()
+        else:
+            # No background loop (tests, Celery) - write through
+            await self.flush(db)
+            
+            if session_id not in self._sessions:
+                raise ValueError("Session is not active")
+        
+        # Live session streams; fire-and-forget so ingestion never waits on sockets
+        ws_manager.publish_session_event(session_id, {
+            "type": "session_update",
+            "session_id": session_id,
+            "timestamp": now.isoformat(),
+            "cumulative_mb": cumulative_mb,
+            "delta_mb": delta_mb,
+            "speed_mb_s": speed_mb_s or 0.0,
+            "server_counted_mb": server_mb,
+            "earnings": earned,
+        })
+        
+        return {
+            "session_id": session_id,
+            "server_counted_mb": server_mb,
+            "current_earnings": earned,
+        }
+    
+    async def flush(self, db: AsyncSession) -> int:
+        """
+        REAL flush buffered reports
+        One bulk INSERT, the chart bucket upserts and one executemany
+        UPDATE per batch
+        """
+        async with self._flush_lock:
+            self._evict_idle()
+            
+            if not self._reports:
+                return 0
+            
+            reports, self._reports = self._reports, []
+            counters, self._counters = self._counters, {}
+            
+            try:
+                # Reports are kept even if their session stopped meanwhile;
+                # only sessions that no longer exist are dropped. Rows stay
+                # locked so a concurrent stop either sees these counters or
+                # is seen here as completed, never neither
+                session_result = await db.execute(
+                    select(
+                        Session.id,
+                        Session.session_id,
+                        Session.telegram_id,
+                        Session.status,
+                        Session.is_active,
+                        Session.start_time
+                    )
+                    .where(Session.id.in_(list(counters.keys())))
+                    .order_by(Session.id)
+                    .with_for_update()
+                )
+                sessions = {row.id: row for row in session_result.all()}
+                
+                reports = [r for r in reports if r["session_id"] in sessions]
+                counter_rows = [c for pk, c in counters.items() if pk in sessions]
+                
+                if not reports:
+                    await db.commit()
+                    self._forget_sessions(set(counters.keys()))
+                    return 0
+                
+                # Each report earns at the price in effect when it was sent
+                await price_timeline.ensure_fresh(db)
+                for row in counter_rows:
+                    row["b_earned"] = 0.0
+                for report in reports:
+                    counters[report["session_id"]]["b_earned"] += (
+                        report["delta_mb"] * price_timeline.price_at(report["timestamp"])
+                    )
+                
+                await db.execute(insert(SessionReport), reports)
+                await TrafficSeriesService(db).record_reports(reports)
+                
+                table = Session.__table__
+                await db.execute(
+                    update(table)
+                    .where(table.c.id == bindparam("b_id"))
+                    .values(
+                        sent_mb=bindparam("b_cumulative"),
+                        local_counted_mb=bindparam("b_cumulative"),
+                        server_counted_mb=table.c.server_counted_mb + bindparam("b_delta"),
+                        earned_usd=func.coalesce(table.c.earned_usd, 0.0) + bindparam("b_earned"),
+                        last_report_at=bindparam("b_reported_at"),
+                    ),
+                    counter_rows
+                )
+                
+                late = [sessions[row["b_id"]] for row in counter_rows if sessions[row["b_id"]].status == "completed"]
+                await self._credit_late_reports(db, late, counters)
+                
+                await db.commit()
+            
+            except Exception as e:
+                await db.rollback()
+                logger.error(f"Report flush failed, requeueing {len(reports)} reports: {e}")
+                self._requeue(reports, counters)
+                raise
+            
+            active = {pk for pk, row in sessions.items() if row.is_active}
+            self._forget_sessions(set(counters.keys()) - active)
+            
+            try:
+                await self._refresh_sessions(db, active)
+            except Exception as e:
+                logger.error(f"Failed to refresh cached session counters: {e}")
+            
+            logger.debug(f"Flushed {len(reports)} reports for {len(counter_rows)} sessions")
+            
+            return len(reports)
+    
+    async def _credit_late_reports(self, db: AsyncSession, late: list, counters: Dict[int, Dict[str, Any]]):
+        """
+        Pay reports that reached the database after their session was paid out
+        (accepted by another worker before the stop, flushed after it)
+        """
+        for row in late:
+            counter = counters[row.id]
+            earned = counter["b_earned"]
+            
+            await db.execute(
+                update(User)
+                .where(User.telegram_id == row.telegram_id)
+                .values(
+                    used_mb=User.used_mb + counter["b_delta"],
+                    balance_usd=User.balance_usd + earned
+                )
+            )
+            
+            db.add(Transaction(
+                telegram_id=row.telegram_id,
+                type='income',
+                amount_usd=earned,
+                status='completed',
+                description=f"Session {row.session_id[:8]} late reports",
+                created_at=datetime.utcnow()
+            ))
+            
+            await RollupService(db).record_late_traffic(
+                row.telegram_id,
+                row.start_time,
+                counter["b_delta"],
+                earned
+            )
+            
+            logger.warning(
+                f"Credited {counter['b_delta']:.2f}MB (${earned:.4f}) reported after "
+                f"session {row.session_id} was completed"
+            )
+    
+    async def _refresh_sessions(self, db: AsyncSession, session_pks: set):
+        """
+        Re-base cached counters on the database totals, which include reports
+        flushed by other workers, plus what is still buffered here
+        """
+        cached = {entry[0]: sid for sid, entry in self._sessions.items() if entry[0] in session_pks}
+        if not cached:
+            return
+        
+        result = await db.execute(
+            select(Session.id, Session.server_counted_mb, Session.earned_usd)
+            .where(Session.id.in_(list(cached.keys())))
+        )
+        rows = result.all()
+        
+        # No awaits from here on, so reports accepted meanwhile are all counted
+        pending: Dict[int, List[float]] = {}
+        for report in self._reports:
+            totals = pending.setdefault(report["session_id"], [0.0, 0.0])
+            totals[0] += report["delta_mb"]
+            totals[1] += report["delta_mb"] * price_timeline.price_at(report["timestamp"])
+        
+        for row in rows:
+            session_id = cached[row.id]
+            entry = self._sessions.get(session_id)
+            if entry is None:
+                continue
+            
+            extra_mb, extra_earned = pending.get(row.id, (0.0, 0.0))
+            self._sessions[session_id] = (
+                entry[0],
+                entry[1],
+                float(row.server_counted_mb or 0.0) + extra_mb,
+                float(row.earned_usd or 0.0) + extra_earned
+            )
+    
+    def _evict_idle(self):
+        """Drop cached sessions that stopped reporting without being stopped"""
+        cutoff = time.monotonic() - self.session_idle
+        idle = [
+            sid for sid, seen in self._last_seen.items()
+            if seen < cutoff and (sid not in self._sessions or self._sessions[sid][0] not in self._counters)
+        ]
+        
+        for sid in idle:
+            self.evict_session(sid)
+
+    async def flush_session(self, db: AsyncSession, session_id: str):
+        """Flush before a session is finalized so its counters are complete"""
+        entry = self._sessions.get(session_id)
+        if entry and entry[0] in self._counters:
+            await self.flush(db)
+    
+    def evict_session(self, session_id: str):
+        """Forget cached session state (session stopped)"""
+        self._last_seen.pop(session_id, None)
+        entry = self._sessions.pop(session_id, None)
+        if entry:
+            self.detector.forget(entry[0])
+    
+    async def _resolve_session(
+        self,
+        db: AsyncSession,
+        session_id: str
+    ) -> Tuple[int, int, float, float]:
+        """Get cached session identity, loading it once per session"""
+        entry = self._sessions.get(session_id)
+        if entry:
+            return entry
+        
+        result = await db.execute(
+            select(
+                Session.id,
+                Session.telegram_id,
+                Session.server_counted_mb,
+                Session.earned_usd,
+                Session.is_active
+            )
+            .where(Session.session_id == session_id)
+        )
+        row = result.one_or_none()
+        
+        if not row:
+            raise ValueError("Session not found")
+        
+        if not row.is_active:
+            raise ValueError("Session is not active")
+        
+        entry = (
+            row.id,
+            row.telegram_id,
+            float(row.server_counted_mb or 0.0),
+            float(row.earned_usd or 0.0)
+        )
+        self._sessions[session_id] = entry
+        self._last_seen[session_id] = time.monotonic()
+        
+        # Newly cached session - detection starts from its next report
+        self.detector.forget(row.id)
+        
+        return entry
+    
+    def _forget_sessions(self, session_pks: set):
+        """Drop index entries of sessions that are no longer active"""
+        if not session_pks:
+            return
+        
+        for sid, entry in list(self._sessions.items()):
+            if entry[0] in session_pks:
+                del self._sessions[sid]
+                self._last_seen.pop(sid, None)
+        
+        for pk in session_pks:
+            self.detector.forget(pk)
+    
+    def _requeue(self, reports: List[Dict[str, Any]], counters: Dict[int, Dict[str, Any]]):
+        """Put a failed batch back in front of newer reports"""
+        self._reports = reports + self._reports
+        
+        for pk, counter in counters.items():
+            newer = self._counters.get(pk)
+            if newer:
+                counter["b_delta"] += newer["b_delta"]
+                counter["b_cumulative"] = newer["b_cumulative"]
+                counter["b_reported_at"] = newer["b_reported_at"]
+            self._counters[pk] = counter
+    
+    async def _flush_loop(self):
+        """Flush on interval or when batch size threshold is reached"""
+        from app.core.database import AsyncSessionLocal
+        
+        while True:
+            try:
+                await asyncio.wait_for(self._flush_event.wait(), timeout=self.flush_interval)
+            except asyncio.TimeoutError:
+                pass
+            
+            self._flush_event.clear()
+            
+            try:
+                async with AsyncSessionLocal() as db:
+                    await self.flush(db)
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                logger.error(f"Report flush loop error: {e}")
+
+
+# Global report ingestion instance
+report_ingestion = ReportIngestionService()
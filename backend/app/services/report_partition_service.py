@@ -0,0 +1,215 @@
+from datetime import datetime, date, time, timedelta
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy import select, text
+from sqlalchemy.exc import DBAPIError
+from typing import Dict, Any, List, Optional, Tuple
+import logging
+
+from app.models.session import SessionReport
+from app.utils.report_archive import ReportArchive, report_archive
+from app.core.config import settings
+
+logger = logging.getLogger(__name__)
+
+
+PARENT_TABLE = "session_reports"
+DEFAULT_PARTITION = "session_reports_default"
+PARTITION_PREFIX = "session_reports_p"
+
+
+class ReportPartitionService:
+    """
+    REAL session_reports partition maintenance
+    One partition per day: upcoming days are created ahead of time and
+    days past retention are archived to disk, then dropped whole
+    """
+    
+    # Dropping a partition locks the parent; give up instead of queueing writers
+    LOCK_TIMEOUT = "5s"
+    
+    # Reports fetched per step while archiving
+    ARCHIVE_BATCH_SIZE = 5000
+    
+    def __init__(self, db: AsyncSession, archive: Optional[ReportArchive] = report_archive):
+        self.db = db
+        self.archive = archive
+    
+    @staticmethod
+    def partition_name(day: date) -> str:
+        return f"{PARTITION_PREFIX}{day:%Y%m%d}"
+    
+    @staticmethod
+    def partition_day(name: str) -> Optional[date]:
+        if not name.startswith(PARTITION_PREFIX):
+            return None
+        try:
+            return datetime.strptime(name[len(PARTITION_PREFIX):], "%Y%m%d").date()
+        except ValueError:
+            return None
+    
+    async def list_partitions(self) -> List[Tuple[str, date]]:
+        """Daily partitions attached to session_reports, oldest first"""
+        result = await self.db.execute(
+            text(
+                "SELECT child.relname FROM pg_inherits "
+                "JOIN pg_class child ON child.oid = pg_inherits.inhrelid "
+                "JOIN pg_class parent ON parent.oid = pg_inherits.inhparent "
+                "WHERE parent.relname = :parent"
+            ),
+            {"parent": PARENT_TABLE}
+        )
+        
+        partitions = []
+        for (name,) in result.all():
+            day = self.partition_day(name)
+            if day is not None:
+                partitions.append((name, day))
+        
+        return sorted(partitions, key=lambda partition: partition[1])
+    
+    async def ensure_partitions(
+        self,
+        ahead_days: int = settings.REPORT_PARTITIONS_AHEAD_DAYS,
+        since: Optional[date] = None
+    ) -> List[str]:
+        """
+        REAL create missing daily partitions from `since` (default today)
+        through today + ahead_days. Returns the names created
+        """
+        today = datetime.utcnow().date()
+        day = since or today
+        last_day = today + timedelta(days=ahead_days)
+        
+        existing = {name for name, _ in await self.list_partitions()}
+        created = []
+        
+        while day <= last_day:
+            name = self.partition_name(day)
+            
+            if name not in existing:
+                try:
+                    await self._create_partition(name, day)
+                    await self.db.commit()
+                    created.append(name)
+                except DBAPIError as e:
+                    # Typically rows for this day already sit in the default partition
+                    await self.db.rollback()
+                    logger.error(f"Could not create report partition {name}: {e}")
+            
+            day += timedelta(days=1)
+        
+        if created:
+            logger.info(f"Created report partitions: {', '.join(created)}")
+        
+        return created
+    
+    async def drop_expired(self, retention_days: int = settings.REPORT_RETENTION_DAYS) -> List[str]:
+        """
+        REAL drop partitions whose whole day is older than retention
+        Each day is archived first and each drop commits on its own;
+        a failed archive or a lock timeout leaves the partition for
+        the next run
+        """
+        cutoff = datetime.utcnow().date() - timedelta(days=retention_days)
+        dropped = []
+        
+        for name, day in await self.list_partitions():
+            if day >= cutoff:
+                break
+            
+            if self.archive and not self.archive.has_day(day):
+                try:
+                    await self.archive_day(day)
+                except Exception as e:
+                    logger.error(f"Could not archive report partition {name}, keeping it: {e}")
+                    continue
+            
+            try:
+                await self.db.execute(text(f"SET LOCAL lock_timeout = '{self.LOCK_TIMEOUT}'"))
+                await self.db.execute(text(f'DROP TABLE IF EXISTS "{name}"'))
+                await self.db.commit()
+                dropped.append(name)
+            except DBAPIError as e:
+                await self.db.rollback()
+                logger.warning(f"Could not drop report partition {name}: {e}")
+        
+        if dropped:
+            logger.info(f"Dropped expired report partitions: {', '.join(dropped)}")
+        
+        return dropped
+    
+    async def archive_day(self, day: date) -> int:
+        """
+        REAL write one day of reports to the archive, a row group per session
+        Reads only that day's partition; returns the rows archived
+        """
+        start = datetime.combine(day, time.min)
+        end = start + timedelta(days=1)
+        
+        result = await self.db.stream(
+            select(SessionReport)
+            .where(SessionReport.timestamp >= start)
+            .where(SessionReport.timestamp < end)
+            .order_by(SessionReport.session_id, SessionReport.timestamp, SessionReport.id)
+            .execution_options(yield_per=self.ARCHIVE_BATCH_SIZE)
+        )
+        
+        try:
+            with self.archive.writer(day) as writer:
+                session_reports = []
+                
+                async for report in result.scalars():
+                    if session_reports and report.session_id != session_reports[0].session_id:
+                        self._add_session(writer, session_reports)
+                        session_reports = []
+                    session_reports.append(report)
+                
+                if session_reports:
+                    self._add_session(writer, session_reports)
+        finally:
+            # Release the cursor and its read transaction before the partition is dropped
+            await result.close()
+            await self.db.rollback()
+        
+        logger.info(f"Archived {writer.rows} session reports of {day}")
+        
+        return writer.rows
+    
+    async def maintain(self) -> Dict[str, Any]:
+        """Create upcoming partitions and drop expired ones"""
+        created = await self.ensure_partitions()
+        dropped = await self.drop_expired()
+        
+        result = await self.db.execute(
+            text(f'SELECT EXISTS (SELECT 1 FROM "{DEFAULT_PARTITION}")')
+        )
+        default_has_rows = bool(result.scalar())
+        
+        if default_has_rows:
+            logger.warning(
+                f"{DEFAULT_PARTITION} holds rows outside the daily partitions; "
+                f"they are not covered by partition retention"
+            )
+        
+        return {
+            "created": created,
+            "dropped": dropped,
+            "default_has_rows": default_has_rows,
+        }
+    
+    def _add_session(self, writer, reports: List[SessionReport]):
+        writer.add_session(reports[0].session_id, reports[0].telegram_id, reports)
+        
+        # Keep the identity map at one session while streaming the day
+        for report in reports:
+            self.db.expunge(report)
+    
+    async def _create_partition(self, name: str, day: date):
+        start = datetime.combine(day, time.min)
+        end = start + timedelta(days=1)
+        
+        # Bounds in UTC whatever the session time zone
+        await self.db.execute(text(
+            f'CREATE TABLE IF NOT EXISTS "{name}" PARTITION OF {PARENT_TABLE} '
+            f"FOR VALUES FROM ('{start.isoformat()}+00') TO ('{end.isoformat()}+00')"
+        ))
@@ -0,0 +1,158 @@
+from datetime import datetime, date, time, timedelta
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy import select, func
+from sqlalchemy.dialects.postgresql import insert as pg_insert
+from typing import Dict, Any, List, Optional
+import logging
+
+from app.models.session import Session
+from app.models.rollup import UserDailyStats
+
+logger = logging.getLogger(__name__)
+
+
+class RollupService:
+    """
+    REAL per-user daily rollup maintenance
+    Incremented on session start/stop, rebuilt from sessions by the
+    catch-up job so missed or later corrected sessions converge
+    """
+    
+    COUNTERS = (
+        "sessions",
+        "completed_sessions",
+        "sent_mb",
+        "used_mb",
+        "earned_usd",
+        "duration_seconds",
+    )
+    
+    def __init__(self, db: AsyncSession):
+        self.db = db
+    
+    async def record_session_started(self, telegram_id: int, started_at: datetime):
+        """Count a started session (caller commits)"""
+        await self._increment(telegram_id, started_at.date(), sessions=1)
+    
+    async def record_session_completed(self, session: Session):
+        """Add totals of a completed session to its start day (caller commits)"""
+        duration = 0.0
+        if session.start_time and session.end_time:
+            duration = (session.end_time - session.start_time).total_seconds()
+        
+        await self._increment(
+            session.telegram_id,
+            session.start_time.date(),
+            completed_sessions=1,
+            sent_mb=session.sent_mb or 0.0,
+            used_mb=session.server_counted_mb or 0.0,
+            earned_usd=session.earned_usd or 0.0,
+            duration_seconds=duration
+        )
+    
+    async def record_late_traffic(self, telegram_id: int, started_at: datetime, used_mb: float, earned_usd: float):
+        """Add traffic credited after its session was completed (caller commits)"""
+        await self._increment(
+            telegram_id,
+            started_at.date(),
+            used_mb=used_mb,
+            earned_usd=earned_usd
+        )
+    
+    async def rebuild(self, since: date, until: Optional[date] = None) -> int:
+        """
+        REAL recompute days [since, until] from sessions
+        One INSERT ... SELECT ... ON CONFLICT that overwrites the rows
+        """
+        until = until or date.today()
+        start = datetime.combine(since, time.min)
+        end = datetime.combine(until + timedelta(days=1), time.min)
+        
+        day = func.date(Session.start_time)
+        completed = Session.status == "completed"
+        
+        aggregate = (
+            select(
+                Session.telegram_id,
+                day,
+                func.count(Session.id),
+                func.count(Session.id).filter(completed),
+                func.coalesce(func.sum(Session.sent_mb).filter(completed), 0.0),
+                func.coalesce(func.sum(Session.server_counted_mb).filter(completed), 0.0),
+                func.coalesce(func.sum(Session.earned_usd).filter(completed), 0.0),
+                func.coalesce(
+                    func.sum(func.extract("epoch", Session.end_time - Session.start_time)).filter(completed),
+                    0.0
+                ),
+            )
+            .where(Session.start_time >= start)
+            .where(Session.start_time < end)
+            .group_by(Session.telegram_id, day)
+        )
+        
+        stmt = pg_insert(UserDailyStats).from_select(
+            ["telegram_id", "day", *self.COUNTERS],
+            aggregate
+        )
+        stmt = stmt.on_conflict_do_update(
+            index_elements=["telegram_id", "day"],
+            set_={
+                **{name: stmt.excluded[name] for name in self.COUNTERS},
+                "updated_at": func.now(),
+            }
+        )
+        
+        result = await self.db.execute(stmt)
+        await self.db.commit()
+        
+        logger.info(f"Rebuilt user daily stats {since} - {until}: {result.rowcount} rows")
+        
+        return result.rowcount
+    
+    async def get_user_days(
+        self,
+        telegram_id: int,
+        since: date,
+        until: Optional[date] = None
+    ) -> List[UserDailyStats]:
+        """
+        REAL daily rows of one user - primary key range scan
+        """
+        query = (
+            select(UserDailyStats)
+            .where(UserDailyStats.telegram_id == telegram_id)
+            .where(UserDailyStats.day >= since)
+            .order_by(UserDailyStats.day)
+        )
+        
+        if until is not None:
+            query = query.where(UserDailyStats.day <= until)
+        
+        result = await self.db.execute(query)
+        return list(result.scalars().all())
+    
+    @staticmethod
+    def sum_days(days: List[UserDailyStats]) -> Dict[str, Any]:
+        """Totals over rollup rows"""
+        return {
+            name: sum(getattr(row, name) or 0 for row in days)
+            for name in RollupService.COUNTERS
+        }
+    
+    async def _increment(self, telegram_id: int, day: date, **increments):
+        values = {name: 0 for name in self.COUNTERS}
+        values.update(increments)
+        
+        stmt = pg_insert(UserDailyStats).values(telegram_id=telegram_id, day=day, **values)
+        stmt = stmt.on_conflict_do_update(
+            index_elements=["telegram_id", "day"],
+            set_={
+                **{
+                    name: getattr(UserDailyStats, name) + stmt.excluded[name]
+                    for name in increments
+                },
+                "updated_at": func.now(),
+            }
+        )
+        
+        await self.db.execute(stmt)
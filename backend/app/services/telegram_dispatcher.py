@@ -0,0 +1,301 @@
+from typing import Dict, Any, Callable, List, Optional, Tuple
+import httpx
+import asyncio
+import itertools
+import json
+import time
+import logging
+
+from app.core.config import settings
+from app.utils.rate_limiter import RateLimitRule, InMemoryRateLimiter, RedisRateLimiter
+
+logger = logging.getLogger(__name__)
+
+
+# Lower value is sent first
+PRIORITY_ADMIN = 0
+PRIORITY_USER = 10
+
+
+class TelegramDispatcher:
+    """
+    REAL outbound Telegram Bot API queue
+    One pooled client, priority queue, global and per-chat token buckets,
+    429 retry_after pauses all sending as Telegram asks
+    
+    The global bucket lives in Redis when RATE_LIMIT_BACKEND is "redis", so the
+    API and every Celery worker share one bot-wide budget; with the memory
+    backend each process gets its own messages_per_second
+    """
+    
+    MAX_RETRIES = 3
+    
+    def __init__(
+        self,
+        bot_token: str = settings.TELEGRAM_BOT_TOKEN,
+        api_base: str = settings.TELEGRAM_API_URL,
+        messages_per_second: int = settings.TELEGRAM_MESSAGES_PER_SECOND,
+        chat_interval: float = settings.TELEGRAM_CHAT_INTERVAL_SECONDS,
+        workers: int = settings.TELEGRAM_DISPATCH_WORKERS,
+        transport: Optional[httpx.AsyncBaseTransport] = None,
+        global_limiter=None
+    ):
+        self.bot_token = bot_token
+        self.api_url = f"{api_base.rstrip('/')}/bot{bot_token}"
+        self.workers = workers
+        self._transport = transport
+        
+        self._limiter = InMemoryRateLimiter(max_keys=100000)
+        # Injected limiters are kept; the default is rebuilt per event loop
+        # because a Redis connection cannot move between loops
+        self._global_limiter_injected = global_limiter is not None
+        self._global_limiter = global_limiter if global_limiter is not None else self._make_global_limiter()
+        self._global_rule = RateLimitRule("telegram", messages_per_second, 1.0)
+        self._chat_rule = RateLimitRule("telegram-chat", 1, chat_interval)
+        # Set from 429 retry_after, applies to every chat
+        self._paused_until = 0.0
+        
+        self._sequence = itertools.count()
+        self._queue: Optional[asyncio.PriorityQueue] = None
+        self._tasks: List[asyncio.Task] = []
+        self._client: Optional[httpx.AsyncClient] = None
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+    
+    @property
+    def configured(self) -> bool:
+        return bool(self.bot_token) and self.bot_token != "YOUR_TELEGRAM_BOT_TOKEN_HERE"
+    
+    @property
+    def pending(self) -> int:
+        return self._queue.qsize() if self._queue else 0
+    
+    async def send(
+        self,
+        method: str,
+        payload: Dict[str, Any],
+        priority: int = PRIORITY_USER
+    ) -> bool:
+        """
+        REAL queue Bot API call and wait for the result
+        Returns True once Telegram accepted it
+        """
+        return await self.enqueue(method, payload, priority)
+    
+    def enqueue(
+        self,
+        method: str,
+        payload: Dict[str, Any],
+        priority: int = PRIORITY_USER
+    ) -> asyncio.Future:
+        """
+        REAL queue Bot API call
+        The returned future resolves to True/False; it does not need awaiting
+        """
+        if not self.configured:
+            logger.warning("Telegram bot token not configured")
+            future = asyncio.get_running_loop().create_future()
+            future.set_result(False)
+            return future
+        
+        self._ensure_workers()
+        
+        future = self._loop.create_future()
+        self._queue.put_nowait((priority, next(self._sequence), method, payload, future, 1))
+        
+        return future
+    
+    async def close(self):
+        """Stop workers and close the HTTP client"""
+        for task in self._tasks:
+            task.cancel()
+        for task in self._tasks:
+            try:
+                await task
+            except asyncio.CancelledError:
+                pass
+        self._tasks = []
+        
+        if self._queue is not None:
+            while not self._queue.empty():
+                *_, future, _ = self._queue.get_nowait()
+                if not future.done():
+                    future.set_result(False)
+        
+        if self._client:
+            await self._client.aclose()
+            self._client = None
+        
+        if not self._global_limiter_injected and isinstance(self._global_limiter, RedisRateLimiter):
+            await self._global_limiter.close()
+        
+        self._loop = None
+    
+    @staticmethod
+    def _make_global_limiter():
+        if settings.RATE_LIMIT_BACKEND == "redis":
+            return RedisRateLimiter()
+        return InMemoryRateLimiter(max_keys=1)
+    
+    def _ensure_workers(self):
+        """Start workers, resetting state left behind by a previous event loop"""
+        loop = asyncio.get_running_loop()
+        
+        if self._loop is not loop:
+            self._loop = loop
+            self._queue = asyncio.PriorityQueue()
+            self._tasks = []
+            if not self._global_limiter_injected:
+                self._global_limiter = self._make_global_limiter()
+            self._client = httpx.AsyncClient(
+                timeout=30.0,
+                transport=self._transport,
+                limits=httpx.Limits(
+                    max_keepalive_connections=self.workers,
+                    max_connections=self.workers
+                )
+            )
+        
+        self._tasks = [task for task in self._tasks if not task.done()]
+        while len(self._tasks) < self.workers:
+            self._tasks.append(loop.create_task(self._worker()))
+    
+    async def _worker(self):
+        while True:
+            item = await self._queue.get()
+            priority, _, method, payload, future, attempt = item
+            
+            if future.done():
+                continue
+            
+            # One bad call (unencodable payload, bad API URL) must not stop
+            # the worker or leave its caller waiting forever
+            try:
+                await self._process(item)
+            except Exception as e:
+                logger.error(f"Telegram {method} to {payload.get('chat_id')} failed: {e}")
+                if not future.done():
+                    future.set_result(False)
+    
+    async def _process(self, item: tuple):
+        priority, _, method, payload, future, attempt = item
+        
+        # Chat over its budget - requeue when it frees up, serve others meanwhile
+        allowed, _, wait = self._limiter.take(str(payload.get("chat_id")), self._chat_rule)
+        if not allowed:
+            self._loop.call_later(wait, self._queue.put_nowait, item)
+            return
+        
+        await self._wait_for_global_budget()
+        
+        status, retry_after = await self._call(method, payload)
+        
+        if status == "ok":
+            future.set_result(True)
+        elif status == "retry" and attempt < self.MAX_RETRIES:
+            logger.warning(
+                f"Telegram {method} to {payload.get('chat_id')} retrying in {retry_after:.1f}s "
+                f"(attempt {attempt}/{self.MAX_RETRIES})"
+            )
+            retry = (priority, next(self._sequence), method, payload, future, attempt + 1)
+            self._loop.call_later(retry_after, self._queue.put_nowait, retry)
+        else:
+            future.set_result(False)
+    
+    async def _wait_for_global_budget(self):
+        while True:
+            wait = self._paused_until - time.monotonic()
+            
+            if wait <= 0:
+                allowed, _, wait = await self._global_limiter.hit("global", self._global_rule)
+                if allowed:
+                    return
+            
+            await asyncio.sleep(wait)
+    
+    async def _call(self, method: str, payload: Dict[str, Any]) -> Tuple[str, float]:
+        """One Bot API request -> ("ok" | "retry" | "failed", retry_after)"""
+        try:
+            response = await self._client.post(f"{self.api_url}/{method}", json=payload)
+        except httpx.HTTPError as e:
+            logger.error(f"Telegram {method} request failed: {e}")
+            return "retry", 1.0
+        
+        if response.status_code == 200:
+            logger.info(f"Telegram {method} sent to {payload.get('chat_id')}")
+            return "ok", 0.0
+        
+        if response.status_code == 429:
+            try:
+                retry_after = float(response.json()["parameters"]["retry_after"])
+            except (ValueError, KeyError, TypeError):
+                retry_after = 1.0
+            
+            # Flood limit is per bot - hold every worker, not just this message
+            self._paused_until = max(self._paused_until, time.monotonic() + retry_after)
+            return "retry", retry_after
+        
+        if response.status_code >= 500:
+            logger.error(f"Telegram API error: {response.status_code}")
+            return "retry", 1.0
+        
+        logger.error(f"Telegram API error: {response.status_code} - {response.text}")
+        return "failed", 0.0
+
+
+class MockTelegramTransport(httpx.AsyncBaseTransport):
+    """
+    Local Bot API for tests and development
+    Enforces Telegram flood limits (answers 429 with retry_after) and
+    records every accepted call as (method, payload)
+    """
+    
+    def __init__(
+        self,
+        messages_per_second: int = 30,
+        chat_interval: float = 1.0,
+        latency: float = 0.0,
+        clock: Callable[[], float] = time.monotonic
+    ):
+        self.latency = latency
+        self.sent: List[Tuple[str, Dict[str, Any]]] = []
+        self.rejected = 0
+        # Status codes to answer the next calls with, e.g. [429, 502]
+        self.fail_next: List[int] = []
+        self.retry_after = 1
+        
+        self._limiter = InMemoryRateLimiter(clock=clock)
+        # Small tolerance so a client pacing exactly at the limit passes
+        self._global_rule = RateLimitRule("global", messages_per_second, 1.0, burst=messages_per_second + 1)
+        self._chat_rule = RateLimitRule("chat", 1, chat_interval * 0.9)
+    
+    async def handle_async_request(self, request: httpx.Request) -> httpx.Response:
+        if self.latency:
+            await asyncio.sleep(self.latency)
+        
+        method = request.url.path.rsplit("/", 1)[-1]
+        payload = json.loads(request.content or b"{}")
+        
+        if self.fail_next:
+            return self._error(self.fail_next.pop(0), self.retry_after)
+        
+        for key, rule in (("bot", self._global_rule), (str(payload.get("chat_id")), self._chat_rule)):
+            allowed, _, wait = self._limiter.take(key, rule)
+            if not allowed:
+                self.rejected += 1
+                return self._error(429, max(1, round(wait)))
+        
+        self.sent.append((method, payload))
+        
+        return httpx.Response(200, json={"ok": True, "result": {"message_id": len(self.sent)}})
+    
+    @staticmethod
+    def _error(status_code: int, retry_after: float) -> httpx.Response:
+        body = {"ok": False, "error_code": status_code, "description": "Mock error"}
+        if status_code == 429:
+            body["description"] = f"Too Many Requests: retry after {retry_after}"
+            body["parameters"] = {"retry_after": retry_after}
+        return httpx.Response(status_code, json=body)
+
+
+# Global Telegram dispatcher instance
+telegram_dispatcher = TelegramDispatcher()
@@ -1,34 +1,37 @@
 from typing import Optional, Dict, Any, List
-import httpx
+import asyncio
 import logging
 
 from app.core.config import settings
+from app.services.telegram_dispatcher import (
+    TelegramDispatcher,
+    telegram_dispatcher,
+    PRIORITY_ADMIN,
+    PRIORITY_USER,
+)
 
 logger = logging.getLogger(__name__)
 
 
 class TelegramService:
-    """Telegram Bot integration service"""
+    """
+    Telegram Bot integration service
+    Calls go through the shared rate-limited dispatcher queue
+    """
     
-    def __init__(self):
-        self.bot_token = settings.TELEGRAM_BOT_TOKEN
-        self.api_url = f"https://api.telegram.org/bot{self.bot_token}"
+    def __init__(self, dispatcher: Optional[TelegramDispatcher] = None):
+        self.dispatcher = dispatcher or telegram_dispatcher
     
     async def send_message(
         self,
         chat_id: int,
         text: str,
         parse_mode: str = "HTML",
-        disable_notification: bool = False
+        disable_notification: bool = False,
+        priority: int = PRIORITY_USER
     ) -> bool:
         """Send message via Telegram bot"""
         
-        if not self.bot_token or self.bot_token == "YOUR_TELEGRAM_BOT_TOKEN_HERE":
-            logger.warning("Telegram bot token not configured")
-            return False
-        
-        url = f"{self.api_url}/sendMessage"
-        
         payload = {
             "chat_id": chat_id,
             "text": text,
@@ -36,31 +39,17 @@ class TelegramService:
             "disable_notification": disable_notification,
         }
         
-        try:
-            async with httpx.AsyncClient() as client:
-                response = await client.post(url, json=payload, timeout=30.0)
-                
-                if response.status_code == 200:
-                    logger.info(f"Message sent to {chat_id}")
-                    return True
-                else:
-                    logger.error(f"Telegram API error: {response.status_code} - {response.text}")
-                    return False
-        
-        except Exception as e:
-            logger.error(f"Failed to send Telegram message: {e}")
-            return False
+        return await self.dispatcher.send("sendMessage", payload, priority)
     
     async def send_photo(
         self,
         chat_id: int,
         photo_url: str,
-        caption: Optional[str] = None
+        caption: Optional[str] = None,
+        priority: int = PRIORITY_USER
     ) -> bool:
         """Send photo via Telegram bot"""
         
-        url = f"{self.api_url}/sendPhoto"
-        
         payload = {
             "chat_id": chat_id,
             "photo": photo_url,
@@ -69,25 +58,17 @@ class TelegramService:
         if caption:
             payload["caption"] = caption
         
-        try:
-            async with httpx.AsyncClient() as client:
-                response = await client.post(url, json=payload, timeout=30.0)
-                return response.status_code == 200
-        
-        except Exception as e:
-            logger.error(f"Failed to send Telegram photo: {e}")
-            return False
+        return await self.dispatcher.send("sendPhoto", payload, priority)
     
     async def send_document(
         self,
         chat_id: int,
         document_url: str,
-        caption: Optional[str] = None
+        caption: Optional[str] = None,
+        priority: int = PRIORITY_USER
     ) -> bool:
         """Send document via Telegram bot"""
         
-        url = f"{self.api_url}/sendDocument"
-        
         payload = {
             "chat_id": chat_id,
             "document": document_url,
@@ -96,14 +77,27 @@ class TelegramService:
         if caption:
             payload["caption"] = caption
         
-        try:
-            async with httpx.AsyncClient() as client:
-                response = await client.post(url, json=payload, timeout=30.0)
-                return response.status_code == 200
+        return await self.dispatcher.send("sendDocument", payload, priority)
+    
+    async def _notify_admins(self, text: str, photo_url: Optional[str] = None) -> List[bool]:
+        """Send to every admin at once, ahead of queued user messages"""
         
-        except Exception as e:
-            logger.error(f"Failed to send Telegram document: {e}")
-            return False
+        admin_ids = settings.admin_ids_list
+        if not admin_ids:
+            return []
+        
+        if photo_url:
+            sends = [
+                self.send_photo(admin_id, photo_url, text, priority=PRIORITY_ADMIN)
+                for admin_id in admin_ids
+            ]
+        else:
+            sends = [
+                self.send_message(admin_id, text, priority=PRIORITY_ADMIN)
+                for admin_id in admin_ids
+            ]
+        
+        return await asyncio.gather(*sends)
     
     async def notify_admin_new_user(
         self,
@@ -113,10 +107,6 @@ class TelegramService:
     ):
         """Notify admin about new user registration"""
         
-        admin_ids = settings.admin_ids_list
-        if not admin_ids:
-            return
-        
         message = f"""
 ?? <b>Yangi foydalanuvchi!</b>
 
@@ -126,8 +116,7 @@ class TelegramService:
 ?? Sana: {datetime.now().strftime('%Y-%m-%d %H:%M:%S')}
 """
         
-        for admin_id in admin_ids:
-            await self.send_message(admin_id, message)
+        await self._notify_admins(message)
     
     async def notify_admin_support_request(
         self,
@@ -140,10 +129,6 @@ class TelegramService:
     ):
         """Notify admin about new support request"""
         
-        admin_ids = settings.admin_ids_list
-        if not admin_ids:
-            return
-        
         notification = f"""
 ?? <b>Yangi support xabari</b>
 
@@ -156,11 +141,7 @@ class TelegramService:
 {message}
 """
         
-        for admin_id in admin_ids:
-            if attachment_url:
-                await self.send_photo(admin_id, attachment_url, notification)
-            else:
-                await self.send_message(admin_id, notification)
+        await self._notify_admins(notification, photo_url=attachment_url)
     
     async def notify_admin_withdraw_request(
         self,
@@ -172,10 +153,6 @@ class TelegramService:
     ):
         """Notify admin about new withdraw request"""
         
-        admin_ids = settings.admin_ids_list
-        if not admin_ids:
-            return
-        
         message = f"""
 ?? <b>Yangi yechish so'rovi</b>
 
@@ -189,8 +166,7 @@ class TelegramService:
 <i>Avtomatik processing boshlanadi...</i>
 """
         
-        for admin_id in admin_ids:
-            await self.send_message(admin_id, message)
+        await self._notify_admins(message)
     
     async def notify_admin_system_alert(
         self,
@@ -200,10 +176,6 @@ class TelegramService:
     ):
         """Send system alert to admins"""
         
-        admin_ids = settings.admin_ids_list
-        if not admin_ids:
-            return
-        
         emoji = {
             "info": "??",
             "warning": "??",
@@ -219,8 +191,7 @@ class TelegramService:
 ? Vaqt: {datetime.now().strftime('%Y-%m-%d %H:%M:%S')}
 """
         
-        for admin_id in admin_ids:
-            await self.send_message(admin_id, notification)
+        await self._notify_admins(notification)
     
     async def notify_user_welcome(self, telegram_id: int, first_name: str):
         """Send welcome message to new user"""
@@ -0,0 +1,181 @@
+from datetime import datetime, timedelta, timezone
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy import select, delete, func
+from sqlalchemy.dialects.postgresql import insert as pg_insert
+from typing import Dict, Any, List, Optional, Tuple
+import logging
+
+from app.models.session import Session
+from app.models.traffic_series import SessionTrafficBucket
+from app.utils.downsampling import lttb
+from app.core.config import settings
+
+logger = logging.getLogger(__name__)
+
+
+EPOCH = datetime(1970, 1, 1)
+
+
+class TrafficSeriesService:
+    """
+    REAL per-session traffic time series
+    Reports are folded into 10s / 1min / 15min buckets as they are
+    flushed; charts read the finest resolution that keeps the bucket
+    count near the points requested, then LTTB bounds the points returned
+    """
+    
+    RESOLUTIONS = (10, 60, 900)
+    
+    # Buckets read per point returned before moving to a coarser resolution
+    OVERSAMPLE = 4
+    
+    def __init__(self, db: AsyncSession):
+        self.db = db
+    
+    async def record_reports(self, reports: List[Dict[str, Any]]):
+        """
+        Fold a batch of report rows into buckets (caller commits)
+        Aggregated in memory first, then one upsert per bucket touched
+        """
+        buckets: Dict[Tuple[int, int, datetime], Dict[str, Any]] = {}
+        
+        for report in reports:
+            speed = report.get("speed_mb_s") or 0.0
+            
+            for resolution in self.RESOLUTIONS:
+                bucket_start = self.bucket_start(report["timestamp"], resolution)
+                key = (report["session_id"], resolution, bucket_start)
+                bucket = buckets.get(key)
+                
+                if bucket is None:
+                    buckets[key] = {
+                        "session_id": report["session_id"],
+                        "resolution": resolution,
+                        "bucket_start": bucket_start,
+                        "reports": 1,
+                        "delta_mb": report.get("delta_mb") or 0.0,
+                        "speed_min": speed,
+                        "speed_max": speed,
+                        "speed_sum": speed,
+                    }
+                else:
+                    bucket["reports"] += 1
+                    bucket["delta_mb"] += report.get("delta_mb") or 0.0
+                    bucket["speed_min"] = min(bucket["speed_min"], speed)
+                    bucket["speed_max"] = max(bucket["speed_max"], speed)
+                    bucket["speed_sum"] += speed
+        
+        if not buckets:
+            return
+        
+        table = SessionTrafficBucket.__table__
+        stmt = pg_insert(table)
+        stmt = stmt.on_conflict_do_update(
+            index_elements=["session_id", "resolution", "bucket_start"],
+            set_={
+                "reports": table.c.reports + stmt.excluded.reports,
+                "delta_mb": table.c.delta_mb + stmt.excluded.delta_mb,
+                "speed_min": func.least(table.c.speed_min, stmt.excluded.speed_min),
+                "speed_max": func.greatest(table.c.speed_max, stmt.excluded.speed_max),
+                "speed_sum": table.c.speed_sum + stmt.excluded.speed_sum,
+                "updated_at": func.now(),
+            }
+        )
+        
+        await self.db.execute(stmt, list(buckets.values()))
+    
+    async def get_series(
+        self,
+        session: Session,
+        start: Optional[datetime] = None,
+        end: Optional[datetime] = None,
+        points: int = settings.SERIES_MAX_POINTS
+    ) -> Dict[str, Any]:
+        """
+        REAL speed-over-time of one session, at most `points` points
+        Reads O(points) buckets whatever the number of reports
+        """
+        if points < 2:
+            raise ValueError("points must be at least 2")
+        
+        points = min(points, settings.SERIES_MAX_POINTS)
+        start = self._naive_utc(start or session.start_time)
+        end = self._naive_utc(end or session.end_time or datetime.utcnow())
+        
+        if end <= start:
+            raise ValueError("end must be after start")
+        
+        resolution = self.pick_resolution((end - start).total_seconds(), points)
+        
+        result = await self.db.execute(
+            select(SessionTrafficBucket)
+            .where(SessionTrafficBucket.session_id == session.id)
+            .where(SessionTrafficBucket.resolution == resolution)
+            .where(SessionTrafficBucket.bucket_start >= self.bucket_start(start, resolution))
+            .where(SessionTrafficBucket.bucket_start < end)
+            .order_by(SessionTrafficBucket.bucket_start)
+        )
+        buckets = result.scalars().all()
+        
+        selected = lttb(
+            [
+                (bucket.bucket_start.timestamp(), bucket.speed_sum / bucket.reports if bucket.reports else 0.0)
+                for bucket in buckets
+            ],
+            points
+        )
+        
+        return {
+            "session_id": session.session_id,
+            "start": start.isoformat(),
+            "end": end.isoformat(),
+            "resolution_seconds": resolution,
+            "buckets": len(buckets),
+            "points": [self._point(buckets[i]) for i in selected],
+        }
+    
+    async def cleanup_fine_buckets(
+        self,
+        retention_days: int = settings.SERIES_FINE_RETENTION_DAYS
+    ) -> int:
+        """Delete finest-resolution buckets past retention; coarser ones stay"""
+        cutoff = datetime.utcnow() - timedelta(days=retention_days)
+        
+        result = await self.db.execute(
+            delete(SessionTrafficBucket)
+            .where(SessionTrafficBucket.resolution == self.RESOLUTIONS[0])
+            .where(SessionTrafficBucket.bucket_start < cutoff)
+        )
+        
+        return result.rowcount
+    
+    @classmethod
+    def pick_resolution(cls, span_seconds: float, points: int) -> int:
+        """Finest resolution with at most OVERSAMPLE buckets per point"""
+        for resolution in cls.RESOLUTIONS:
+            if span_seconds / resolution <= points * cls.OVERSAMPLE:
+                return resolution
+        
+        return cls.RESOLUTIONS[-1]
+    
+    @staticmethod
+    def bucket_start(timestamp: datetime, resolution: int) -> datetime:
+        seconds = int((TrafficSeriesService._naive_utc(timestamp) - EPOCH).total_seconds())
+        return EPOCH + timedelta(seconds=seconds - seconds % resolution)
+    
+    @staticmethod
+    def _naive_utc(value: datetime) -> datetime:
+        if value.tzinfo is not None:
+            value = value.astimezone(timezone.utc).replace(tzinfo=None)
+        return value
+    
+    @staticmethod
+    def _point(bucket: SessionTrafficBucket) -> Dict[str, Any]:
+        return {
+            "t": bucket.bucket_start.isoformat(),
+            "reports": bucket.reports,
+            "delta_mb": bucket.delta_mb,
+            "avg_speed_mb_s": bucket.speed_sum / bucket.reports if bucket.reports else 0.0,
+            "min_speed_mb_s": bucket.speed_min,
+            "max_speed_mb_s": bucket.speed_max,
+        }
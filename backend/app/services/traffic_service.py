@@ -5,10 +5,15 @@ import uuid
 from typing import Optional, Dict, Any
 import logging
 
-from app.models.session import Session, SessionReport
+from app.models.session import Session
 from app.models.user import User
-from app.models.pricing import DailyPrice
 from app.models.transaction import Transaction
+from app.services.report_ingestion_service import report_ingestion
+from app.services.price_oracle import price_oracle
+from app.services.price_timeline import price_timeline
+from app.services.rollup_service import RollupService
+from app.utils.cache_manager import cache_manager
+from app.utils.pagination import KeysetPaginator, cached_total
 
 logger = logging.getLogger(__name__)
 
@@ -78,9 +83,18 @@ class TrafficService:
         )
         
         self.db.add(session)
+        await RollupService(self.db).record_session_started(telegram_id, session.start_time)
         await self.db.commit()
         await self.db.refresh(session)
         
+        # Session identity for other workers and the live update stream
+        await cache_manager.cache_session_data(session_id, {
+            "id": session.id,
+            "telegram_id": telegram_id,
+            "start_time": session.start_time.isoformat(),
+            "price_per_mb": price['price_per_mb'],
+        }, ttl=self.SESSION_TIMEOUT_HOURS * 3600)
+        
         logger.info(f"Session started: {session_id} for user {telegram_id}")
         
         return {
@@ -95,11 +109,16 @@ class TrafficService:
         """
         REAL session stop with final calculations
         """
-        # Get session
+        # Write out buffered reports so final counters are complete
+        await report_ingestion.flush_session(self.db, session_id)
+        
+        # Get session, locked so flushes from other workers land before or after the payout
         result = await self.db.execute(
             select(Session)
             .where(Session.session_id == session_id)
             .where(Session.telegram_id == telegram_id)
+            .with_for_update()
+            .execution_options(populate_existing=True)
         )
         session = result.scalar_one_or_none()
         
@@ -122,9 +141,15 @@ class TrafficService:
             seconds = int(duration_seconds % 60)
             session.duration = f"{hours:02d}:{minutes:02d}:{seconds:02d}"
         
-        # Recalculate earnings based on server counted traffic
-        price = await self._get_current_price()
-        final_earned = session.server_counted_mb * price['price_per_mb']
+        # Ingestion already priced each report at its own timestamp, which is
+        # what the client was shown (reconciliation uses the same rule)
+        await price_timeline.ensure_fresh(self.db)
+        final_earned = price_timeline.settle(
+            session.earned_usd,
+            session.start_time,
+            session.end_time,
+            session.server_counted_mb
+        )
         session.earned_usd = final_earned
         
         # Update user totals
@@ -148,9 +173,15 @@ class TrafficService:
         )
         self.db.add(transaction)
         
+        # Same transaction, so the rollup never counts a session twice
+        await RollupService(self.db).record_session_completed(session)
+        
         await self.db.commit()
         await self.db.refresh(session)
         
+        report_ingestion.evict_session(session_id)
+        await cache_manager.invalidate_session(session_id)
+        
         logger.info(
             f"Session stopped: {session_id} - "
             f"{session.server_counted_mb:.2f}MB earned ${final_earned:.4f}"
@@ -171,52 +202,30 @@ class TrafficService:
         session_id: str,
         telegram_id: int,
         cumulative_mb: float,
-        delta_mb: float
+        delta_mb: float,
+        speed_mb_s: Optional[float] = None,
+        battery_level: Optional[float] = None,
+        network_type: Optional[str] = None
     ) -> Dict[str, Any]:
         """
         REAL traffic reporting with validation
+        Reports are checked by the anomaly detector, acknowledged
+        immediately and written behind in batches
         """
         # Validate input
         if cumulative_mb < 0 or delta_mb < 0:
             raise ValueError("Traffic values cannot be negative")
         
-        if delta_mb > 1000:
-            logger.warning(f"Large delta reported: {delta_mb}MB for session {session_id}")
-        
-        # Get session
-        result = await self.db.execute(
-            select(Session)
-            .where(Session.session_id == session_id)
-            .where(Session.telegram_id == telegram_id)
-        )
-        session = result.scalar_one_or_none()
-        
-        if not session:
-            raise ValueError("Session not found")
-        
-        if not session.is_active:
-            raise ValueError("Session is not active")
-        
-        # Create report record
-        report = SessionReport(
-            session_id=session.id,
+        accepted = await report_ingestion.submit(
+            self.db,
+            session_id=session_id,
+            telegram_id=telegram_id,
             cumulative_mb=cumulative_mb,
             delta_mb=delta_mb,
-            timestamp=datetime.utcnow()
+            speed_mb_s=speed_mb_s,
+            battery_level=battery_level,
+            network_type=network_type
         )
-        self.db.add(report)
-        
-        # Update session
-        session.sent_mb = cumulative_mb
-        session.local_counted_mb = cumulative_mb
-        session.server_counted_mb += delta_mb
-        session.last_report_at = datetime.utcnow()
-        
-        # Calculate current earnings
-        price = await self._get_current_price()
-        session.earned_usd = session.server_counted_mb * price['price_per_mb']
-        
-        await self.db.commit()
         
         logger.debug(
             f"Traffic reported for {session_id}: "
@@ -227,8 +236,8 @@ class TrafficService:
             "status": "success",
             "session_id": session_id,
             "cumulative_mb": float(cumulative_mb),
-            "server_counted_mb": float(session.server_counted_mb),
-            "current_earnings": float(session.earned_usd),
+            "server_counted_mb": float(accepted["server_counted_mb"]),
+            "current_earnings": float(accepted["current_earnings"]),
         }
     
     async def get_active_sessions(self, telegram_id: int) -> list:
@@ -307,29 +316,21 @@ class TrafficService:
         self,
         telegram_id: int,
         limit: int = 20,
-        offset: int = 0
+        cursor: Optional[str] = None,
+        include_total: bool = False
     ) -> dict:
         """
         REAL session history from database
+        Keyset pages on (start_time, id); pass the returned next_cursor
+        to continue
         """
-        # Get total count
-        count_result = await self.db.execute(
-            select(func.count(Session.id))
-            .where(Session.telegram_id == telegram_id)
-        )
-        total = count_result.scalar()
+        query = select(Session).where(Session.telegram_id == telegram_id)
+        paginator = KeysetPaginator(Session.start_time, Session.id, limit)
         
-        # Get sessions
-        result = await self.db.execute(
-            select(Session)
-            .where(Session.telegram_id == telegram_id)
-            .order_by(Session.start_time.desc())
-            .offset(offset)
-            .limit(limit)
-        )
-        sessions = result.scalars().all()
+        result = await self.db.execute(paginator.apply(query, cursor))
+        sessions, next_cursor = paginator.page(result.scalars().all())
         
-        return {
+        history = {
             "sessions": [
                 {
                     "id": s.id,
@@ -346,39 +347,16 @@ class TrafficService:
                 }
                 for s in sessions
             ],
-            "total": total,
             "limit": limit,
-            "offset": offset,
+            "next_cursor": next_cursor,
+            "has_next": next_cursor is not None,
         }
+        
+        if include_total:
+            history["total"] = await cached_total(self.db, f"sessions:{telegram_id}", query)
+        
+        return history
     
     async def _get_current_price(self) -> dict:
         """Get current traffic price"""
-        from datetime import date
-        
-        # Try today's price
-        result = await self.db.execute(
-            select(DailyPrice)
-            .where(DailyPrice.date == date.today())
-            .order_by(DailyPrice.created_at.desc())
-            .limit(1)
-        )
-        price = result.scalar_one_or_none()
-        
-        # Fallback to latest price
-        if not price:
-            result = await self.db.execute(
-                select(DailyPrice).order_by(DailyPrice.date.desc()).limit(1)
-            )
-            price = result.scalar_one_or_none()
-        
-        if price:
-            return {
-                "price_per_gb": float(price.price_per_gb),
-                "price_per_mb": float(price.price_per_mb),
-            }
-        
-        # Default fallback
-        return {
-            "price_per_gb": 1.50,
-            "price_per_mb": 0.0015,
-        }
+        return await price_oracle.get_price(self.db)
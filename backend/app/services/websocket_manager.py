@@ -1,23 +1,135 @@
-from typing import Dict, Set, Any
+from typing import Dict, Set, Any, List, Optional
+from collections import deque
 from fastapi import WebSocket
+import redis.asyncio as redis
+import asyncio
 import json
 import logging
 from datetime import datetime
 
+from app.core.config import settings
+
 logger = logging.getLogger(__name__)
 
 
+class _Connection:
+    """
+    One socket with a bounded outgoing queue and its own sender task
+    session_update messages are coalesced to the latest one per session
+    """
+    
+    def __init__(
+        self,
+        websocket: WebSocket,
+        telegram_id: int,
+        max_queue: int,
+        session_id: Optional[str] = None,
+        min_interval: float = 0.0
+    ):
+        self.websocket = websocket
+        self.telegram_id = telegram_id
+        self.max_queue = max_queue
+        
+        # Set for live session streams, throttled to one update per min_interval
+        self.session_id = session_id
+        self.min_interval = min_interval
+        self.last_session_send = 0.0
+        
+        # Serialized messages, or session_id markers for coalesced updates
+        self.queue: deque = deque()
+        self.latest_session_updates: Dict[str, str] = {}
+        self.ready = asyncio.Event()
+        self.task: Optional[asyncio.Task] = None
+    
+    def enqueue(self, message: str, session_id: Optional[str] = None) -> bool:
+        """
+        Queue without blocking the caller
+        Returns False if the client is too slow to keep up
+        """
+        if session_id is not None:
+            # Replace a stale update still waiting in the queue
+            if session_id not in self.latest_session_updates:
+                self.queue.append((session_id,))
+            self.latest_session_updates[session_id] = message
+        else:
+            if len(self.queue) >= self.max_queue:
+                return False
+            self.queue.append(message)
+        
+        self.ready.set()
+        return True
+    
+    def next_is_session_update(self) -> bool:
+        return isinstance(self.queue[0], tuple)
+    
+    def next_message(self) -> str:
+        item = self.queue.popleft()
+        if isinstance(item, tuple):
+            return self.latest_session_updates.pop(item[0])
+        return item
+
+
 class WebSocketManager:
     """
-    REAL WebSocket manager for live updates
-    Handles real-time session data streaming
+    REAL WebSocket fan-out hub for live updates
+    Messages go through Redis (ws:user:{id}, ws:session:{id}, ws:broadcast)
+    so any API or Celery worker can reach sockets held by any API worker
     """
     
-    def __init__(self):
-        # telegram_id -> Set of WebSocket connections
-        self.active_connections: Dict[int, Set[WebSocket]] = {}
+    USER_CHANNEL = "ws:user:{}"
+    SESSION_CHANNEL = "ws:session:{}"
+    BROADCAST_CHANNEL = "ws:broadcast"
+    
+    def __init__(
+        self,
+        max_queue: int = settings.WS_SEND_QUEUE_SIZE,
+        send_timeout: float = settings.WS_SEND_TIMEOUT_SECONDS,
+        session_max_rate: float = settings.WS_SESSION_MAX_UPDATES_PER_SECOND
+    ):
+        self.max_queue = max_queue
+        self.send_timeout = send_timeout
+        self.session_min_interval = 1.0 / session_max_rate if session_max_rate > 0 else 0.0
+        
+        # telegram_id -> connections of this worker
+        self.active_connections: Dict[int, Set[_Connection]] = {}
+        # session_id -> live session stream connections of this worker
+        self.session_connections: Dict[str, Set[_Connection]] = {}
         # session_id -> telegram_id mapping
         self.session_users: Dict[str, int] = {}
+        
+        # Fire-and-forget publishes, referenced until done
+        self._pending_publishes: Set[asyncio.Task] = set()
+        
+        self._redis: Optional[redis.Redis] = None
+        self._redis_loop: Optional[asyncio.AbstractEventLoop] = None
+        self._pubsub = None
+        self._listener_task: Optional[asyncio.Task] = None
+    
+    async def start(self):
+        """Subscribe this API worker to broadcast and connected users' channels"""
+        if self._listener_task and not self._listener_task.done():
+            return
+        
+        self._listener_task = asyncio.create_task(self._listen())
+    
+    async def stop(self):
+        """Stop listener and close all sockets of this worker"""
+        if self._listener_task:
+            self._listener_task.cancel()
+            try:
+                await self._listener_task
+            except asyncio.CancelledError:
+                pass
+            self._listener_task = None
+        
+        for group in (self.active_connections, self.session_connections):
+            for connections in list(group.values()):
+                for conn in list(connections):
+                    self._drop(conn)
+        
+        if self._redis:
+            await self._redis.aclose()
+            self._redis = None
     
     async def connect(self, websocket: WebSocket, telegram_id: int):
         """
@@ -25,63 +137,100 @@ class WebSocketManager:
         """
         await websocket.accept()
         
+        conn = _Connection(websocket, telegram_id, self.max_queue)
+        conn.task = asyncio.create_task(self._sender(conn))
+        
         if telegram_id not in self.active_connections:
             self.active_connections[telegram_id] = set()
+            await self._subscribe(self.USER_CHANNEL.format(telegram_id))
         
-        self.active_connections[telegram_id].add(websocket)
+        self.active_connections[telegram_id].add(conn)
         
         logger.info(f"WebSocket connected: user {telegram_id}")
         
         # Send welcome message
-        await self.send_to_user(telegram_id, {
+        conn.enqueue(json.dumps({
             "type": "connected",
             "message": "WebSocket connection established",
             "timestamp": datetime.utcnow().isoformat()
-        })
+        }))
     
     def disconnect(self, websocket: WebSocket, telegram_id: int):
         """
         REAL disconnect websocket
         """
-        if telegram_id in self.active_connections:
-            self.active_connections[telegram_id].discard(websocket)
-            
-            if not self.active_connections[telegram_id]:
-                del self.active_connections[telegram_id]
+        for conn in list(self.active_connections.get(telegram_id, ())):
+            if conn.websocket is websocket:
+                self._drop(conn)
         
         logger.info(f"WebSocket disconnected: user {telegram_id}")
     
-    async def send_to_user(self, telegram_id: int, data: Dict[str, Any]):
+    async def connect_session(self, websocket: WebSocket, session_id: str, telegram_id: int):
         """
-        REAL send message to specific user's all connections
+        REAL connect live stream of one session
+        Relays ingested traffic events, throttled per client
         """
-        if telegram_id not in self.active_connections:
-            return
+        await websocket.accept()
         
-        message = json.dumps(data)
+        conn = _Connection(
+            websocket,
+            telegram_id,
+            self.max_queue,
+            session_id=session_id,
+            min_interval=self.session_min_interval
+        )
+        conn.task = asyncio.create_task(self._sender(conn))
         
-        # Send to all user's connections
-        disconnected = set()
+        if session_id not in self.session_connections:
+            self.session_connections[session_id] = set()
+            self.session_users[session_id] = telegram_id
+            await self._subscribe(self.SESSION_CHANNEL.format(session_id))
         
-        for connection in self.active_connections[telegram_id]:
-            try:
-                await connection.send_text(message)
-            except Exception as e:
-                logger.error(f"WebSocket send error: {e}")
-                disconnected.add(connection)
+        self.session_connections[session_id].add(conn)
+        
+        logger.info(f"Session stream connected: {session_id}")
+    
+    def disconnect_session(self, websocket: WebSocket, session_id: str):
+        """
+        REAL disconnect live session stream
+        """
+        for conn in list(self.session_connections.get(session_id, ())):
+            if conn.websocket is websocket:
+                self._drop(conn)
         
-        # Clean up disconnected
-        for connection in disconnected:
-            self.disconnect(connection, telegram_id)
+        logger.info(f"Session stream disconnected: {session_id}")
+    
+    def publish_session_event(self, session_id: str, data: Dict[str, Any]):
+        """
+        REAL publish traffic event to the session's live streams
+        Does not wait for Redis so report ingestion is never slowed down
+        """
+        task = asyncio.get_running_loop().create_task(
+            self._publish(self.SESSION_CHANNEL.format(session_id), json.dumps(data))
+        )
+        self._pending_publishes.add(task)
+        task.add_done_callback(self._pending_publishes.discard)
+    
+    async def send_to_user(self, telegram_id: int, data: Dict[str, Any]):
+        """
+        REAL send message to specific user's all connections on all workers
+        """
+        await self._publish(self.USER_CHANNEL.format(telegram_id), json.dumps(data))
+    
+    async def broadcast(self, data: Dict[str, Any]):
+        """
+        REAL send message to every connected user, serialized once
+        """
+        await self._publish(self.BROADCAST_CHANNEL, json.dumps(data))
     
     async def broadcast_to_admins(self, data: Dict[str, Any]):
         """
         REAL broadcast to all admin connections
         """
-        from app.core.config import settings
+        message = json.dumps(data)
         
         for admin_id in settings.admin_ids_list:
-            await self.send_to_user(admin_id, data)
+            await self._publish(self.USER_CHANNEL.format(admin_id), message)
     
     async def send_session_update(
         self,
@@ -137,17 +286,197 @@ class WebSocketManager:
             "timestamp": datetime.utcnow().isoformat()
         }
         
-        # Send to all connected users
-        for telegram_id in list(self.active_connections.keys()):
-            await self.send_to_user(telegram_id, data)
+        await self.broadcast(data)
     
     def get_active_users_count(self) -> int:
-        """Get count of users with active WebSocket connections"""
+        """Get count of users with active WebSocket connections on this worker"""
         return len(self.active_connections)
     
     def is_user_connected(self, telegram_id: int) -> bool:
-        """Check if user has active connection"""
+        """Check if user has active connection on this worker"""
         return telegram_id in self.active_connections and len(self.active_connections[telegram_id]) > 0
+    
+    def deliver_local(self, telegram_id: Optional[int], message: str):
+        """
+        REAL fan-out to this worker's sockets
+        Only queues - sender tasks write to sockets concurrently
+        """
+        if telegram_id is None:
+            targets = [c for conns in self.active_connections.values() for c in conns]
+        else:
+            targets = list(self.active_connections.get(telegram_id, ()))
+        
+        self._enqueue(targets, message)
+    
+    def deliver_session_local(self, session_id: str, message: str):
+        """REAL fan-out of a session event to this worker's session streams"""
+        self._enqueue(list(self.session_connections.get(session_id, ())), message)
+    
+    def _enqueue(self, targets: List[_Connection], message: str):
+        if not targets:
+            return
+        
+        # Parsed once per message, not per socket
+        session_id = None
+        if '"session_update"' in message:
+            data = json.loads(message)
+            if data.get("type") == "session_update":
+                session_id = data.get("session_id")
+        
+        for conn in targets:
+            if not conn.enqueue(message, session_id):
+                logger.warning(
+                    f"WebSocket queue full for user {conn.telegram_id}, dropping slow client"
+                )
+                self._drop(conn, code=1013)
+    
+    async def _publish(self, channel: str, message: str):
+        """Publish to all workers, deliver locally if Redis is unavailable"""
+        try:
+            await self._get_redis().publish(channel, message)
+        except Exception as e:
+            logger.error(f"WebSocket publish to {channel} failed, delivering locally: {e}")
+            self._deliver_channel(channel, message)
+    
+    def _deliver_channel(self, channel: str, message: str):
+        """Route a channel message to local sockets"""
+        user_prefix = self.USER_CHANNEL.format("")
+        session_prefix = self.SESSION_CHANNEL.format("")
+        
+        if channel == self.BROADCAST_CHANNEL:
+            self.deliver_local(None, message)
+        elif channel.startswith(session_prefix):
+            self.deliver_session_local(channel[len(session_prefix):], message)
+        elif channel.startswith(user_prefix):
+            self.deliver_local(int(channel[len(user_prefix):]), message)
+    
+    async def _sender(self, conn: _Connection):
+        """Write queued messages to one socket"""
+        loop = asyncio.get_running_loop()
+        
+        try:
+            while True:
+                await conn.ready.wait()
+                conn.ready.clear()
+                
+                while conn.queue:
+                    if conn.min_interval and conn.next_is_session_update():
+                        # Throttle - newer events replace this one while we wait
+                        wait = conn.last_session_send + conn.min_interval - loop.time()
+                        if wait > 0:
+                            await asyncio.sleep(wait)
+                        conn.last_session_send = loop.time()
+                    
+                    await asyncio.wait_for(
+                        conn.websocket.send_text(conn.next_message()),
+                        timeout=self.send_timeout
+                    )
+        except asyncio.CancelledError:
+            raise
+        except Exception as e:
+            logger.error(f"WebSocket send error for user {conn.telegram_id}: {e}")
+            self._drop(conn)
+    
+    def _drop(self, conn: _Connection, code: Optional[int] = None):
+        """Forget connection and stop its sender"""
+        if conn.session_id is not None:
+            group, key, channel = (
+                self.session_connections,
+                conn.session_id,
+                self.SESSION_CHANNEL.format(conn.session_id)
+            )
+        else:
+            group, key, channel = (
+                self.active_connections,
+                conn.telegram_id,
+                self.USER_CHANNEL.format(conn.telegram_id)
+            )
+        
+        connections = group.get(key)
+        if connections is not None:
+            connections.discard(conn)
+            if not connections:
+                del group[key]
+                if conn.session_id is not None:
+                    self.session_users.pop(conn.session_id, None)
+                asyncio.ensure_future(self._unsubscribe(channel, group, key))
+        
+        if conn.task and conn.task is not asyncio.current_task():
+            conn.task.cancel()
+        
+        if code is not None:
+            asyncio.ensure_future(self._close_quietly(conn.websocket, code))
+    
+    async def _subscribe(self, channel: str):
+        if self._pubsub is not None:
+            try:
+                await self._pubsub.subscribe(channel)
+            except Exception as e:
+                logger.error(f"WebSocket subscribe to {channel} failed: {e}")
+    
+    async def _unsubscribe(self, channel: str, group: Dict, key):
+        # Client may have reconnected meanwhile
+        if self._pubsub is not None and key not in group:
+            try:
+                await self._pubsub.unsubscribe(channel)
+            except Exception as e:
+                logger.error(f"WebSocket unsubscribe from {channel} failed: {e}")
+    
+    def _wanted_channels(self) -> set:
+        """Channels for the broadcast and every locally connected user and session"""
+        return {self.BROADCAST_CHANNEL} | {
+            self.USER_CHANNEL.format(telegram_id)
+            for telegram_id in self.active_connections
+        } | {
+            self.SESSION_CHANNEL.format(session_id)
+            for session_id in self.session_connections
+        }
+    
+    async def _listen(self):
+        """Pub/sub loop with reconnect"""
+        while True:
+            client = redis.from_url(settings.REDIS_URL, decode_responses=True)
+            pubsub = client.pubsub()
+            try:
+                channels = self._wanted_channels()
+                await pubsub.subscribe(*channels)
+                self._pubsub = pubsub
+                
+                # Sockets that connected while subscribing skipped _subscribe
+                missing = self._wanted_channels() - channels
+                if missing:
+                    await pubsub.subscribe(*missing)
+                
+                async for message in pubsub.listen():
+                    if message.get("type") != "message":
+                        continue
+                    
+                    self._deliver_channel(message["channel"], message["data"])
+            
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                logger.error(f"WebSocket hub listener error: {e}")
+                await asyncio.sleep(5)
+            finally:
+                self._pubsub = None
+                await pubsub.aclose()
+                await client.aclose()
+    
+    def _get_redis(self) -> redis.Redis:
+        """Publisher client, recreated if used from a different event loop"""
+        loop = asyncio.get_running_loop()
+        if self._redis is None or self._redis_loop is not loop:
+            self._redis = redis.from_url(settings.REDIS_URL)
+            self._redis_loop = loop
+        return self._redis
+    
+    @staticmethod
+    async def _close_quietly(websocket: WebSocket, code: int):
+        try:
+            await websocket.close(code=code)
+        except Exception:
+            pass
 
 
 # Global WebSocket manager instance
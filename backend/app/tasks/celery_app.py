@@ -1,5 +1,6 @@
 from celery import Celery
 from celery.schedules import crontab
+from celery.signals import worker_process_init
 from app.core.config import settings
 
 # Create Celery app
@@ -40,6 +41,16 @@ celery_app.conf.beat_schedule = {
         "task": "app.tasks.periodic_tasks.reconcile_daily_stats",
         "schedule": crontab(hour=0, minute=5),  # 00:05 daily
     },
+    # Catch up user daily stats missed by session stop updates
+    "refresh-user-daily-stats": {
+        "task": "app.tasks.periodic_tasks.refresh_user_daily_stats",
+        "schedule": crontab(minute=15),  # Every hour
+    },
+    # Platform hourly stats and cached admin dashboard snapshot
+    "refresh-platform-stats": {
+        "task": "app.tasks.periodic_tasks.refresh_platform_stats",
+        "schedule": float(settings.PLATFORM_STATS_REFRESH_SECONDS),
+    },
     # Reconcile weekly stats on Monday
     "reconcile-weekly-stats": {
         "task": "app.tasks.periodic_tasks.reconcile_weekly_stats",
@@ -55,6 +66,16 @@ celery_app.conf.beat_schedule = {
         "task": "app.tasks.periodic_tasks.send_daily_price_notifications",
         "schedule": crontab(hour=9, minute=0),  # 09:00 daily
     },
+    # Pick up broadcasts interrupted by worker crashes
+    "resume-broadcasts": {
+        "task": "app.tasks.notification_tasks.resume_broadcasts",
+        "schedule": 300.0,  # 5 minutes
+    },
+    # Session report partitions ahead of time, expired ones dropped
+    "maintain-report-partitions": {
+        "task": "app.tasks.periodic_tasks.maintain_report_partitions",
+        "schedule": crontab(hour=0, minute=30),  # 00:30 daily
+    },
     # Cleanup old data weekly
     "cleanup-old-data": {
         "task": "app.tasks.periodic_tasks.cleanup_old_data",
@@ -72,5 +93,15 @@ celery_app.conf.beat_schedule = {
     },
 }
 
+
+@worker_process_init.connect
+def init_worker_process(**kwargs):
+    """Per worker process setup"""
+    from app.services.price_oracle import price_oracle
+    
+    # Keep cached price in sync with admin price changes
+    price_oracle.start_background_listener()
+
+
 if __name__ == "__main__":
     celery_app.start()
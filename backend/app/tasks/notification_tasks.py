@@ -1,12 +1,10 @@
-from datetime import datetime, timedelta
-from sqlalchemy import select
 import logging
 
 from app.tasks.celery_app import celery_app
 from app.core.database import AsyncSessionLocal
 from app.services.notification_service import NotificationService
+from app.services.broadcast_service import BroadcastService
 from app.models.user import User
-from app.models.session import Session
 
 logger = logging.getLogger(__name__)
 
@@ -56,53 +54,77 @@ def send_bulk_notification(
     return loop.run_until_complete(_send())
 
 
-@celery_app.task(name="app.tasks.notification_tasks.send_session_summaries")
-def send_session_summaries():
-    """Send session summaries to users with active sessions in the last 24h"""
+@celery_app.task(name="app.tasks.notification_tasks.plan_broadcast")
+def plan_broadcast(broadcast_id: int):
+    """Stream broadcast audience into chunks, one subtask per chunk"""
     
     import asyncio
     
-    async def _send_summaries():
+    async def _plan():
         async with AsyncSessionLocal() as db:
-            # Get users with sessions in last 24 hours
-            yesterday = datetime.utcnow() - timedelta(hours=24)
-            
-            result = await db.execute(
-                select(Session.telegram_id)
-                .where(Session.start_time >= yesterday)
-                .group_by(Session.telegram_id)
+            broadcast_service = BroadcastService(db)
+            return await broadcast_service.plan(
+                broadcast_id,
+                dispatch=lambda b_id, chunk_index: send_broadcast_chunk.delay(b_id, chunk_index)
             )
+    
+    loop = asyncio.get_event_loop()
+    return loop.run_until_complete(_plan())
+
+
+@celery_app.task(name="app.tasks.notification_tasks.send_broadcast_chunk")
+def send_broadcast_chunk(broadcast_id: int, chunk_index: int):
+    """Send one broadcast chunk (skipped if already sent)"""
+    
+    import asyncio
+    
+    async def _send():
+        async with AsyncSessionLocal() as db:
+            broadcast_service = BroadcastService(db)
+            return await broadcast_service.send_chunk(broadcast_id, chunk_index)
+    
+    loop = asyncio.get_event_loop()
+    return loop.run_until_complete(_send())
+
+
+@celery_app.task(name="app.tasks.notification_tasks.resume_broadcasts")
+def resume_broadcasts():
+    """Re-dispatch broadcast planning and chunks lost to crashed workers"""
+    
+    import asyncio
+    
+    async def _resume():
+        async with AsyncSessionLocal() as db:
+            broadcast_service = BroadcastService(db)
+            broadcast_ids, chunks = await broadcast_service.find_stalled()
             
-            user_ids = [row[0] for row in result.all()]
+            for broadcast_id in broadcast_ids:
+                plan_broadcast.delay(broadcast_id)
             
-            notification_service = NotificationService(db)
+            for broadcast_id, chunk_index in chunks:
+                send_broadcast_chunk.delay(broadcast_id, chunk_index)
             
-            for telegram_id in user_ids:
-                # Get user's session stats for last 24h
-                sessions_result = await db.execute(
-                    select(Session)
-                    .where(Session.telegram_id == telegram_id)
-                    .where(Session.start_time >= yesterday)
-                )
-                sessions = sessions_result.scalars().all()
-                
-                total_mb = sum(s.sent_mb or 0 for s in sessions)
-                total_earned = sum(s.earned_usd or 0 for s in sessions)
-                
-                # Send summary notification
-                await notification_service.send_to_user(
-                    telegram_id=telegram_id,
-                    title="?? 24 soatlik hisobot",
-                    body=f"Yuborilgan: {total_mb:.0f} MB\nDaromad: ${total_earned:.3f}",
-                    data={
-                        "type": "session_summary",
-                        "total_mb": total_mb,
-                        "total_earned": total_earned,
-                        "session_count": len(sessions),
-                    }
+            if broadcast_ids or chunks:
+                logger.warning(
+                    f"Resumed {len(broadcast_ids)} broadcast plans and {len(chunks)} chunks"
                 )
             
-            logger.info(f"Sent session summaries to {len(user_ids)} users")
+            return {"broadcasts": len(broadcast_ids), "chunks": len(chunks)}
+    
+    loop = asyncio.get_event_loop()
+    return loop.run_until_complete(_resume())
+
+
+@celery_app.task(name="app.tasks.notification_tasks.send_session_summaries")
+def send_session_summaries():
+    """Send session summaries to users with active sessions in the last 24h"""
+    
+    import asyncio
+    
+    async def _send_summaries():
+        async with AsyncSessionLocal() as db:
+            notification_service = NotificationService(db)
+            return await notification_service.send_session_summaries(hours=24)
     
     loop = asyncio.get_event_loop()
     return loop.run_until_complete(_send_summaries())
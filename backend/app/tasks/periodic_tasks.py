@@ -7,8 +7,13 @@ from app.core.database import AsyncSessionLocal
 from app.services.reconciliation_service import ReconciliationService
 from app.services.notification_service import NotificationService
 from app.services.pricing_service import PricingService
+from app.services.rollup_service import RollupService
+from app.services.platform_stats_service import PlatformStatsService
+from app.services.report_partition_service import ReportPartitionService
+from app.services.traffic_series_service import TrafficSeriesService
+from app.core.config import settings
 from app.models.user import User
-from app.models.session import Session, SessionReport
+from app.models.session import Session
 from app.models.notification import Notification
 
 logger = logging.getLogger(__name__)
@@ -49,6 +54,41 @@ def reconcile_daily_stats():
     return loop.run_until_complete(_reconcile_daily())
 
 
+@celery_app.task(name="app.tasks.periodic_tasks.refresh_user_daily_stats")
+def refresh_user_daily_stats():
+    """Rebuild recent user daily stats from sessions"""
+    
+    import asyncio
+    
+    async def _refresh():
+        async with AsyncSessionLocal() as db:
+            rollup_service = RollupService(db)
+            since = date.today() - timedelta(days=settings.ROLLUP_CATCHUP_DAYS - 1)
+            rows = await rollup_service.rebuild(since)
+            return {"since": since.isoformat(), "rows": rows}
+    
+    loop = asyncio.get_event_loop()
+    return loop.run_until_complete(_refresh())
+
+
+@celery_app.task(name="app.tasks.periodic_tasks.refresh_platform_stats")
+def refresh_platform_stats():
+    """Recompute recent platform hours and publish the admin dashboard snapshot"""
+    
+    import asyncio
+    
+    async def _refresh():
+        async with AsyncSessionLocal() as db:
+            platform_stats_service = PlatformStatsService(db)
+            since = datetime.utcnow() - timedelta(hours=settings.PLATFORM_STATS_REFRESH_HOURS - 1)
+            hours = await platform_stats_service.refresh_hours(since)
+            snapshot = await platform_stats_service.refresh_snapshot()
+            return {"hours": hours, "generated_at": snapshot["generated_at"]}
+    
+    loop = asyncio.get_event_loop()
+    return loop.run_until_complete(_refresh())
+
+
 @celery_app.task(name="app.tasks.periodic_tasks.reconcile_weekly_stats")
 def reconcile_weekly_stats():
     """Reconcile weekly statistics"""
@@ -102,14 +142,18 @@ def send_daily_price_notifications():
             price_per_gb = price_data['price_per_gb']
             message = price_data.get('message', '')
             
-            # Send notifications
+            # Start (or resume) today's chunked broadcast
             notification_service = NotificationService(db)
-            await notification_service.send_daily_price_notification(
+            result = await notification_service.send_daily_price_notification(
                 price_per_gb=price_per_gb,
                 message=message
             )
             
-            logger.info(f"Sent daily price notifications: ${price_per_gb}/GB")
+            logger.info(
+                f"Daily price broadcast {result['broadcast_id']} "
+                f"({result['status']}): ${price_per_gb}/GB"
+            )
+            return result
     
     loop = asyncio.get_event_loop()
     return loop.run_until_complete(_send_notifications())
@@ -130,17 +174,16 @@ def cleanup_old_data():
                 delete(Notification).where(Notification.created_at < cutoff_date)
             )
             
-            # Delete old session reports (older than 90 days)
-            report_cutoff = datetime.utcnow() - timedelta(days=90)
-            deleted_reports = await db.execute(
-                delete(SessionReport).where(SessionReport.timestamp < report_cutoff)
-            )
+            # Session reports expire by partition (maintain_report_partitions)
+            
+            # 10s chart buckets; minute and 15 minute buckets are kept
+            deleted_buckets = await TrafficSeriesService(db).cleanup_fine_buckets()
             
             await db.commit()
             
             result = {
                 "deleted_notifications": deleted_notifications.rowcount,
-                "deleted_reports": deleted_reports.rowcount,
+                "deleted_traffic_buckets": deleted_buckets,
             }
             
             logger.info(f"Cleanup completed: {result}")
@@ -150,6 +193,26 @@ def cleanup_old_data():
     return loop.run_until_complete(_cleanup())
 
 
+@celery_app.task(name="app.tasks.periodic_tasks.maintain_report_partitions")
+def maintain_report_partitions():
+    """Create upcoming session_reports partitions and drop expired ones"""
+    
+    import asyncio
+    
+    async def _maintain():
+        async with AsyncSessionLocal() as db:
+            partition_service = ReportPartitionService(db)
+            result = await partition_service.maintain()
+            logger.info(
+                f"Report partitions: {len(result['created'])} created, "
+                f"{len(result['dropped'])} dropped"
+            )
+            return result
+    
+    loop = asyncio.get_event_loop()
+    return loop.run_until_complete(_maintain())
+
+
 @celery_app.task(name="app.tasks.periodic_tasks.generate_analytics_reports")
 def generate_analytics_reports():
     """Generate daily analytics reports for admins"""
@@ -2,7 +2,8 @@ from app.utils.validators import Validators
 from app.utils.helpers import Helpers
 from app.utils.formatters import Formatters
 from app.utils.constants import Constants
-from app.utils.cache_manager import CacheManager
+from app.utils.cache_manager import CacheManager, cache_manager
+from app.utils.rate_limiter import RateLimitRule, InMemoryRateLimiter, RedisRateLimiter
 
 __all__ = [
     "Validators",
@@ -10,4 +11,8 @@ __all__ = [
     "Formatters",
     "Constants",
     "CacheManager",
+    "cache_manager",
+    "RateLimitRule",
+    "InMemoryRateLimiter",
+    "RedisRateLimiter",
 ]
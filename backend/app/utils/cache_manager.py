@@ -1,7 +1,8 @@
-from typing import Optional, Dict, Any
+from collections import OrderedDict
+from typing import Optional, Dict, Any, Callable, Iterable, Tuple
 import json
+import time
 import redis.asyncio as redis
-from datetime import timedelta
 import logging
 
 from app.core.config import settings
@@ -9,84 +10,210 @@ from app.core.config import settings
 logger = logging.getLogger(__name__)
 
 
+# Stored in place of a value to remember that a lookup found nothing
+_NEGATIVE = "__none__"
+
+
 class CacheManager:
     """
-    REAL Redis cache manager
+    REAL two-tier cache manager
+    Bounded in-process L1 (TTL + LRU) in front of pooled async Redis L2
     Handles IP reputation caching and session data
     """
     
-    def __init__(self, redis_client: Optional[redis.Redis] = None):
+    # Wait before retrying Redis after a connection failure
+    RECONNECT_DELAY_SECONDS = 30
+    
+    def __init__(
+        self,
+        redis_client: Optional[redis.Redis] = None,
+        l1_max_items: int = settings.CACHE_L1_MAX_ITEMS,
+        l1_ttl: float = settings.CACHE_L1_TTL_SECONDS,
+        use_redis: bool = True,
+        clock: Callable[[], float] = time.monotonic
+    ):
         self.redis = redis_client
-        self._connected = False
+        self._connected = redis_client is not None
+        self._use_redis = use_redis
+        self._retry_at = 0.0
+        
+        self.l1_max_items = l1_max_items
+        self.l1_ttl = l1_ttl
+        self._clock = clock
+        # key -> (expires_at, value), values are shared - treat as read-only
+        self._l1: "OrderedDict[str, Tuple[float, Any]]" = OrderedDict()
+        
+        self._metrics = {
+            "l1_hits": 0,
+            "l2_hits": 0,
+            "negative_hits": 0,
+            "misses": 0,
+            "sets": 0,
+            "errors": 0,
+        }
     
     async def connect(self):
-        """REAL connect to Redis"""
-        if not self.redis:
-            try:
-                self.redis = await redis.from_url(
+        """REAL connect to Redis through a shared connection pool"""
+        if self._connected or not self._use_redis:
+            return
+        
+        if self._clock() < self._retry_at:
+            return
+        
+        try:
+            if not self.redis:
+                pool = redis.ConnectionPool.from_url(
                     settings.REDIS_URL,
+                    max_connections=settings.CACHE_REDIS_MAX_CONNECTIONS,
                     encoding="utf-8",
                     decode_responses=True
                 )
-                self._connected = True
-                logger.info("Redis connected")
-            except Exception as e:
-                logger.error(f"Redis connection failed: {e}")
-                self._connected = False
+                self.redis = redis.Redis(connection_pool=pool)
+            
+            await self.redis.ping()
+            self._connected = True
+            logger.info("Redis connected")
+        except Exception as e:
+            logger.error(f"Redis connection failed, using L1 only: {e}")
+            self._connected = False
+            self._retry_at = self._clock() + self.RECONNECT_DELAY_SECONDS
     
     async def close(self):
-        """Close Redis connection"""
+        """Close Redis connection pool"""
         if self.redis:
-            await self.redis.close()
+            await self.redis.aclose(close_connection_pool=True)
+            self.redis = None
             self._connected = False
     
-    def get_cached_ip_reputation(self, ip: str) -> Optional[Dict[str, Any]]:
+    async def get(self, key: str, default: Any = None) -> Any:
         """
-        REAL get cached IP reputation data
+        REAL tiered get
+        Negative entries return None, absent keys return `default`
         """
-        if not self._connected or not self.redis:
-            return None
+        found, value = self._l1_get(key)
+        if found:
+            self._metrics["l1_hits"] += 1
+            return self._unwrap(value)
         
-        try:
-            key = f"ip_reputation:{ip}"
-            cached = self.redis.get(key)
-            
-            if cached:
-                return json.loads(cached)
+        raw = None
+        if await self._redis_ready():
+            try:
+                raw = await self.redis.get(key)
+            except Exception as e:
+                self._redis_failed(e)
+        
+        if raw is None:
+            self._metrics["misses"] += 1
+            return default
+        
+        self._metrics["l2_hits"] += 1
+        value = self._decode(raw)
+        self._l1_set(key, value, self.l1_ttl)
+        
+        return self._unwrap(value)
+    
+    async def mget(self, keys: Iterable[str]) -> Dict[str, Any]:
+        """
+        REAL batched get
+        L1 first, then a single Redis MGET for the rest
+        Returns only found keys (negative entries map to None)
+        """
+        found_values: Dict[str, Any] = {}
+        remaining = []
+        
+        for key in keys:
+            found, value = self._l1_get(key)
+            if found:
+                self._metrics["l1_hits"] += 1
+                found_values[key] = self._unwrap(value)
+            else:
+                remaining.append(key)
+        
+        if not remaining:
+            return found_values
+        
+        raws = [None] * len(remaining)
+        if await self._redis_ready():
+            try:
+                raws = await self.redis.mget(remaining)
+            except Exception as e:
+                self._redis_failed(e)
+        
+        for key, raw in zip(remaining, raws):
+            if raw is None:
+                self._metrics["misses"] += 1
+                continue
             
-            return None
+            self._metrics["l2_hits"] += 1
+            value = self._decode(raw)
+            self._l1_set(key, value, self.l1_ttl)
+            found_values[key] = self._unwrap(value)
         
-        except Exception as e:
-            logger.error(f"Cache get error: {e}")
-            return None
+        return found_values
     
-    def cache_ip_reputation(
+    async def set(
+        self,
+        key: str,
+        value: Any,
+        ttl: int = 3600,
+        negative_ttl: int = settings.CACHE_NEGATIVE_TTL_SECONDS
+    ):
+        """
+        REAL tiered set
+        A None value is cached as a negative entry for `negative_ttl`
+        """
+        if value is None:
+            value, ttl = _NEGATIVE, negative_ttl
+        
+        self._metrics["sets"] += 1
+        self._l1_set(key, value, min(ttl, self.l1_ttl))
+        
+        if await self._redis_ready():
+            try:
+                await self.redis.setex(key, ttl, json.dumps(value))
+            except Exception as e:
+                self._redis_failed(e)
+    
+    async def delete(self, key: str):
+        """Remove key from both tiers"""
+        self._l1.pop(key, None)
+        
+        if await self._redis_ready():
+            try:
+                await self.redis.delete(key)
+            except Exception as e:
+                self._redis_failed(e)
+    
+    def stats(self) -> Dict[str, Any]:
+        """Hit/miss counters for monitoring"""
+        hits = self._metrics["l1_hits"] + self._metrics["l2_hits"]
+        lookups = hits + self._metrics["misses"]
+        
+        return {
+            **self._metrics,
+            "hit_rate": round(hits / lookups, 4) if lookups else 0.0,
+            "l1_size": len(self._l1),
+            "redis_connected": self._connected,
+        }
+    
+    async def get_cached_ip_reputation(self, ip: str, default: Any = None) -> Optional[Dict[str, Any]]:
+        """
+        REAL get cached IP reputation data
+        """
+        return await self.get(f"ip_reputation:{ip}", default)
+    
+    async def cache_ip_reputation(
         self,
         ip: str,
-        data: Dict[str, Any],
+        data: Optional[Dict[str, Any]],
         ttl: int = 86400
     ):
         """
         REAL cache IP reputation data
-        TTL in seconds (default 24h)
+        TTL in seconds (default 24h), None caches a failed lookup briefly
         """
-        if not self._connected or not self.redis:
-            return
-        
-        try:
-            key = f"ip_reputation:{ip}"
-            value = json.dumps(data)
-            
-            self.redis.setex(
-                key,
-                timedelta(seconds=ttl),
-                value
-            )
-            
-            logger.debug(f"Cached IP reputation for {ip}")
-        
-        except Exception as e:
-            logger.error(f"Cache set error: {e}")
+        await self.set(f"ip_reputation:{ip}", data, ttl)
+        logger.debug(f"Cached IP reputation for {ip}")
     
     async def cache_session_data(
         self,
@@ -97,36 +224,57 @@ class CacheManager:
         """
         REAL cache session temporary data
         """
-        if not self._connected or not self.redis:
-            return
-        
-        try:
-            key = f"session:{session_id}"
-            value = json.dumps(data)
-            
-            await self.redis.setex(
-                key,
-                timedelta(seconds=ttl),
-                value
-            )
-        
-        except Exception as e:
-            logger.error(f"Cache session error: {e}")
+        await self.set(f"session:{session_id}", data, ttl)
     
     async def get_cached_session(self, session_id: str) -> Optional[Dict[str, Any]]:
         """Get cached session data"""
-        if not self._connected or not self.redis:
-            return None
+        return await self.get(f"session:{session_id}")
+    
+    async def invalidate_session(self, session_id: str):
+        """Drop cached session data"""
+        await self.delete(f"session:{session_id}")
+    
+    async def _redis_ready(self) -> bool:
+        if not self._connected:
+            await self.connect()
+        return self._connected
+    
+    def _redis_failed(self, error: Exception):
+        """Degrade to L1 only until the reconnect delay passes"""
+        logger.error(f"Redis cache error: {error}")
+        self._metrics["errors"] += 1
+        self._connected = False
+        self._retry_at = self._clock() + self.RECONNECT_DELAY_SECONDS
+    
+    def _l1_get(self, key: str) -> Tuple[bool, Any]:
+        entry = self._l1.get(key)
+        if entry is None:
+            return False, None
         
-        try:
-            key = f"session:{session_id}"
-            cached = await self.redis.get(key)
-            
-            if cached:
-                return json.loads(cached)
-            
-            return None
+        if entry[0] <= self._clock():
+            del self._l1[key]
+            return False, None
         
-        except Exception as e:
-            logger.error(f"Get cached session error: {e}")
+        self._l1.move_to_end(key)
+        return True, entry[1]
+    
+    def _l1_set(self, key: str, value: Any, ttl: float):
+        self._l1[key] = (self._clock() + ttl, value)
+        self._l1.move_to_end(key)
+        
+        while len(self._l1) > self.l1_max_items:
+            self._l1.popitem(last=False)
+    
+    def _unwrap(self, value: Any) -> Any:
+        if value == _NEGATIVE:
+            self._metrics["negative_hits"] += 1
             return None
+        return value
+    
+    @staticmethod
+    def _decode(raw: str) -> Any:
+        return json.loads(raw)
+
+
+# Global cache manager instance
+cache_manager = CacheManager()
@@ -0,0 +1,46 @@
+from typing import List, Sequence, Tuple
+
+
+def lttb(points: Sequence[Tuple[float, float]], threshold: int) -> List[int]:
+    """
+    Largest-Triangle-Three-Buckets downsampling
+    Returns indices of at most `threshold` points (x ascending) that keep
+    the visual shape of the series; first and last are always kept
+    """
+    count = len(points)
+    
+    if threshold >= count or count <= 2:
+        return list(range(count))
+    
+    if threshold <= 2:
+        return [0, count - 1][:max(threshold, 1)]
+    
+    selected = [0]
+    every = (count - 2) / (threshold - 2)
+    a = 0
+    
+    for i in range(threshold - 2):
+        # Average of the next bucket is the third triangle corner
+        next_start = int((i + 1) * every) + 1
+        next_end = min(int((i + 2) * every) + 1, count)
+        next_size = next_end - next_start
+        avg_x = sum(points[j][0] for j in range(next_start, next_end)) / next_size
+        avg_y = sum(points[j][1] for j in range(next_start, next_end)) / next_size
+        
+        ax, ay = points[a]
+        best, best_area = -1, -1.0
+        
+        for j in range(int(i * every) + 1, int((i + 1) * every) + 1):
+            area = abs(
+                (ax - avg_x) * (points[j][1] - ay)
+                - (ax - points[j][0]) * (avg_y - ay)
+            )
+            if area > best_area:
+                best, best_area = j, area
+        
+        selected.append(best)
+        a = best
+    
+    selected.append(count - 1)
+    
+    return selected
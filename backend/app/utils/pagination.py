@@ -0,0 +1,95 @@
+from datetime import datetime
+from sqlalchemy import Select, select, func, tuple_, literal
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.types import BigInteger, DateTime
+from typing import Any, List, Optional, Sequence, Tuple
+import base64
+import binascii
+import json
+
+from app.utils.cache_manager import cache_manager
+from app.core.config import settings
+
+
+class KeysetPaginator:
+    """
+    Keyset (cursor) pagination, newest first
+    Each page continues after the (sort value, id) of the previous page's
+    last row, so the cost per page does not grow with scroll depth
+    Rows with a NULL sort value have no place in that order and are skipped
+    """
+    
+    def __init__(self, sort_column, id_column, limit: int):
+        if limit < 1:
+            raise ValueError("limit must be at least 1")
+        
+        self.sort_column = sort_column
+        self.id_column = id_column
+        self.limit = limit
+    
+    def apply(self, query: Select, cursor: Optional[str] = None) -> Select:
+        """Order the query and continue after `cursor` (one extra row detects the next page)"""
+        query = query.where(self.sort_column.is_not(None))
+        
+        if cursor:
+            sort_value, row_id = self.decode_cursor(cursor)
+            query = query.where(
+                tuple_(self.sort_column, self.id_column) < tuple_(
+                    literal(sort_value, DateTime(timezone=True)),
+                    literal(row_id, BigInteger())
+                )
+            )
+        
+        return (
+            query
+            .order_by(self.sort_column.desc(), self.id_column.desc())
+            .limit(self.limit + 1)
+        )
+    
+    def page(self, rows: Sequence[Any]) -> Tuple[List[Any], Optional[str]]:
+        """Rows of this page and the cursor of the next one (None on the last page)"""
+        items = list(rows[:self.limit])
+        
+        if len(rows) <= self.limit:
+            return items, None
+        
+        last = items[-1]
+        return items, self.encode_cursor(
+            getattr(last, self.sort_column.key),
+            getattr(last, self.id_column.key)
+        )
+    
+    @staticmethod
+    def encode_cursor(sort_value: datetime, row_id: int) -> str:
+        raw = json.dumps([sort_value.isoformat(), row_id]).encode()
+        return base64.urlsafe_b64encode(raw).decode().rstrip("=")
+    
+    @staticmethod
+    def decode_cursor(cursor: str) -> Tuple[datetime, int]:
+        try:
+            raw = base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4))
+            sort_value, row_id = json.loads(raw)
+            return datetime.fromisoformat(sort_value), int(row_id)
+        except (binascii.Error, ValueError, TypeError, UnicodeDecodeError):
+            raise ValueError("Invalid cursor")
+
+
+async def cached_total(
+    db: AsyncSession,
+    cache_key: str,
+    query: Select,
+    ttl: int = settings.PAGINATION_TOTAL_TTL_SECONDS
+) -> int:
+    """
+    Row count of `query`, cached for `ttl` seconds
+    Scrolling clients get a total without a COUNT(*) on every page
+    """
+    key = f"total:{cache_key}"
+    total = await cache_manager.get(key)
+    
+    if total is None:
+        result = await db.execute(select(func.count()).select_from(query.subquery()))
+        total = result.scalar() or 0
+        await cache_manager.set(key, total, ttl=ttl)
+    
+    return total
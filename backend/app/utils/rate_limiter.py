@@ -0,0 +1,220 @@
+from collections import OrderedDict
+from typing import Callable, List, Optional, Tuple
+import redis.asyncio as redis
+import math
+import time
+import logging
+
+from app.core.config import settings
+
+logger = logging.getLogger(__name__)
+
+
+class RateLimitRule:
+    """
+    Token bucket budget
+    `requests` per `period_seconds`, bursts up to `burst` (default: requests)
+    """
+    
+    __slots__ = ("name", "requests", "period_seconds", "capacity", "refill_rate")
+    
+    def __init__(
+        self,
+        name: str,
+        requests: int,
+        period_seconds: float,
+        burst: Optional[int] = None
+    ):
+        self.name = name
+        self.requests = requests
+        self.period_seconds = period_seconds
+        self.capacity = float(burst or requests)
+        self.refill_rate = requests / period_seconds
+    
+    @property
+    def idle_ttl(self) -> float:
+        """Seconds after which an untouched bucket is full again"""
+        return self.capacity / self.refill_rate
+
+
+class InMemoryRateLimiter:
+    """
+    REAL in-process token bucket limiter
+    O(1) memory per key, least recently used keys evicted past max_keys
+    """
+    
+    def __init__(
+        self,
+        max_keys: int = settings.RATE_LIMIT_MAX_KEYS,
+        clock: Callable[[], float] = time.monotonic
+    ):
+        self.max_keys = max_keys
+        self._clock = clock
+        # key -> [tokens, updated_at]
+        self._buckets: "OrderedDict[str, list]" = OrderedDict()
+    
+    def __len__(self) -> int:
+        return len(self._buckets)
+    
+    async def hit(self, key: str, rule: RateLimitRule, cost: int = 1) -> Tuple[bool, int, float]:
+        """
+        Take `cost` tokens from the bucket
+        Returns: (allowed, remaining, retry_after_seconds)
+        """
+        return self.take(key, rule, cost)
+    
+    async def hit_all(self, key: str, rules: List[RateLimitRule], cost: int = 1) -> List[Tuple[bool, int, float]]:
+        """
+        Take `cost` tokens from every bucket, or from none if any is short
+        Returns one (allowed, remaining, retry_after_seconds) per rule
+        """
+        return self.take_all(key, rules, cost)
+    
+    def take(self, key: str, rule: RateLimitRule, cost: int = 1) -> Tuple[bool, int, float]:
+        return self.take_all(key, [rule], cost)[0]
+    
+    def take_all(self, key: str, rules: List[RateLimitRule], cost: int = 1) -> List[Tuple[bool, int, float]]:
+        buckets = [self._bucket(key, rule) for rule in rules]
+        allowed = all(bucket[0] >= cost for bucket in buckets)
+        
+        results = []
+        for rule, bucket in zip(rules, buckets):
+            if allowed:
+                bucket[0] -= cost
+                results.append((True, int(bucket[0]), 0.0))
+            elif bucket[0] >= cost:
+                results.append((True, int(bucket[0]), 0.0))
+            else:
+                results.append((False, 0, (cost - bucket[0]) / rule.refill_rate))
+        
+        return results
+    
+    def _bucket(self, key: str, rule: RateLimitRule) -> list:
+        """Bucket refilled up to now"""
+        now = self._clock()
+        bucket_key = f"{rule.name}:{key}"
+        bucket = self._buckets.get(bucket_key)
+        
+        if bucket is None:
+            bucket = [rule.capacity, now]
+            self._buckets[bucket_key] = bucket
+            
+            if len(self._buckets) > self.max_keys:
+                self._buckets.popitem(last=False)
+        else:
+            self._buckets.move_to_end(bucket_key)
+            bucket[0] = min(rule.capacity, bucket[0] + (now - bucket[1]) * rule.refill_rate)
+            bucket[1] = now
+        
+        return bucket
+
+
+class RedisRateLimiter:
+    """
+    REAL shared token bucket limiter
+    One atomic Lua call per check, limits hold across all workers
+    """
+    
+    # KEYS: one bucket per rule, ARGV: cost, then capacity, refill per ms, ttl ms per rule
+    # Tokens are only taken when every bucket has enough, so a request
+    # rejected by one rule does not spend the others
+    # Uses Redis server time so worker clocks do not matter
+    SCRIPT = """
+local cost = tonumber(ARGV[1])
+local t = redis.call('TIME')
+local now = tonumber(t[1]) * 1000 + math.floor(tonumber(t[2]) / 1000)
+
+local tokens = {}
+local allowed = 1
+for i, key in ipairs(KEYS) do
+    local capacity = tonumber(ARGV[i * 3 - 1])
+    local rate = tonumber(ARGV[i * 3])
+    local bucket = redis.call('HMGET', key, 'tokens', 'ts')
+    local current = tonumber(bucket[1])
+    
+    if current == nil then
+        current = capacity
+    else
+        current = math.min(capacity, current + math.max(0, now - tonumber(bucket[2])) * rate)
+    end
+    
+    tokens[i] = current
+    if current < cost then
+        allowed = 0
+    end
+end
+
+local result = {allowed}
+for i, key in ipairs(KEYS) do
+    local rate = tonumber(ARGV[i * 3])
+    local retry_after = 0
+    
+    if allowed == 1 then
+        tokens[i] = tokens[i] - cost
+    elseif tokens[i] < cost then
+        retry_after = math.ceil((cost - tokens[i]) / rate)
+    end
+    
+    redis.call('HSET', key, 'tokens', tostring(tokens[i]), 'ts', now)
+    redis.call('PEXPIRE', key, ARGV[i * 3 + 1])
+    
+    table.insert(result, math.floor(tokens[i]))
+    table.insert(result, retry_after)
+end
+
+return result
+"""
+    
+    def __init__(
+        self,
+        redis_client: Optional[redis.Redis] = None,
+        fallback: Optional[InMemoryRateLimiter] = None
+    ):
+        self.redis = redis_client
+        self._script = None
+        # Used while Redis is unreachable so limits still apply per worker
+        self.fallback = fallback if fallback is not None else InMemoryRateLimiter()
+    
+    async def hit(self, key: str, rule: RateLimitRule, cost: int = 1) -> Tuple[bool, int, float]:
+        """
+        Take `cost` tokens from the shared bucket
+        Returns: (allowed, remaining, retry_after_seconds)
+        """
+        return (await self.hit_all(key, [rule], cost))[0]
+    
+    async def hit_all(self, key: str, rules: List[RateLimitRule], cost: int = 1) -> List[Tuple[bool, int, float]]:
+        """
+        Take `cost` tokens from every shared bucket, or from none if any is short
+        Returns one (allowed, remaining, retry_after_seconds) per rule
+        """
+        try:
+            if self._script is None:
+                if self.redis is None:
+                    self.redis = redis.from_url(settings.REDIS_URL)
+                self._script = self.redis.register_script(self.SCRIPT)
+            
+            args = [cost]
+            for rule in rules:
+                args += [rule.capacity, rule.refill_rate / 1000, math.ceil(rule.idle_ttl * 1000)]
+            
+            allowed, *counters = await self._script(
+                keys=[f"ratelimit:{rule.name}:{key}" for rule in rules],
+                args=args
+            )
+            
+            results = []
+            for i in range(len(rules)):
+                remaining, retry_after_ms = counters[2 * i], counters[2 * i + 1]
+                results.append((bool(allowed) or not retry_after_ms, int(remaining), retry_after_ms / 1000))
+            
+            return results
+        
+        except Exception as e:
+            logger.error(f"Redis rate limiter error, using local limits: {e}")
+            return self.fallback.take_all(key, rules, cost)
+    
+    async def close(self):
+        if self.redis:
+            await self.redis.aclose()
+            self.redis = None
+            self._script = None
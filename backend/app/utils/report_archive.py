@@ -0,0 +1,234 @@
+from collections import namedtuple
+from datetime import datetime, date, timezone, timedelta
+from typing import Any, Dict, Iterable, List, Optional
+import json
+import math
+import os
+import struct
+import zlib
+
+from app.core.config import settings
+
+
+MAGIC = b"SRA1"
+TRAILER = struct.Struct("<Q4s")
+EPOCH = datetime(1970, 1, 1, tzinfo=timezone.utc)
+
+FLOAT_COLUMNS = ("cumulative_mb", "delta_mb", "speed_mb_s", "battery_level")
+TEXT_COLUMNS = ("network_type", "ip", "raw_meta")
+
+ArchivedReport = namedtuple(
+    "ArchivedReport",
+    ["id", "session_id", "telegram_id", "timestamp", *FLOAT_COLUMNS, *TEXT_COLUMNS]
+)
+
+
+class ReportArchive:
+    """
+    Columnar archive of session reports, one file per UTC day
+    Each session is a zlib-compressed row group: delta-encoded ids and
+    timestamps, float32 MB values; a footer indexes groups by session
+    """
+    
+    def __init__(self, directory: str):
+        self.directory = directory
+        self._indexes: Dict[date, Dict[str, Any]] = {}
+    
+    def path(self, day: date) -> str:
+        return os.path.join(self.directory, f"session_reports_{day:%Y%m%d}.sra")
+    
+    def has_day(self, day: date) -> bool:
+        return os.path.exists(self.path(day))
+    
+    def days(self) -> List[date]:
+        """Archived days, oldest first"""
+        if not os.path.isdir(self.directory):
+            return []
+        
+        days = []
+        for name in os.listdir(self.directory):
+            if name.startswith("session_reports_") and name.endswith(".sra"):
+                days.append(datetime.strptime(name[16:24], "%Y%m%d").date())
+        
+        return sorted(days)
+    
+    def writer(self, day: date) -> "ReportArchiveWriter":
+        return ReportArchiveWriter(self.path(day), day)
+    
+    def read_session(self, session_id: int, since: date, until: date) -> List[ArchivedReport]:
+        """Archived reports of one session over days [since, until], in time order"""
+        reports = []
+        day = since
+        
+        while day <= until:
+            if self.has_day(day):
+                reports.extend(self._read_day(session_id, day))
+            day += timedelta(days=1)
+        
+        return reports
+    
+    def _read_day(self, session_id: int, day: date) -> List[ArchivedReport]:
+        with open(self.path(day), "rb") as f:
+            index = self._index(day, f)
+            group = index["sessions"].get(str(session_id))
+            if group is None:
+                return []
+            
+            offset, length = group
+            f.seek(offset)
+            return _decode_group(session_id, zlib.decompress(f.read(length)))
+    
+    def _index(self, day: date, f) -> Dict[str, Any]:
+        # Files are immutable once written
+        index = self._indexes.get(day)
+        
+        if index is None:
+            f.seek(-TRAILER.size, os.SEEK_END)
+            footer_offset, magic = TRAILER.unpack(f.read(TRAILER.size))
+            if magic != MAGIC:
+                raise ValueError(f"Not a report archive: {self.path(day)}")
+            
+            f.seek(footer_offset)
+            footer = f.read(os.fstat(f.fileno()).st_size - TRAILER.size - footer_offset)
+            index = json.loads(zlib.decompress(footer))
+            self._indexes[day] = index
+        
+        return index
+
+
+class ReportArchiveWriter:
+    """
+    Writes one archive day; sessions are added one at a time so memory
+    stays at a single row group. The file appears only when complete
+    """
+    
+    def __init__(self, path: str, day: date):
+        self.path = path
+        self.day = day
+        self.rows = 0
+        self._sessions: Dict[str, List[int]] = {}
+        self._tmp_path = f"{path}.tmp"
+        self._file = None
+    
+    def __enter__(self) -> "ReportArchiveWriter":
+        os.makedirs(os.path.dirname(self.path) or ".", exist_ok=True)
+        self._file = open(self._tmp_path, "wb")
+        self._file.write(MAGIC)
+        return self
+    
+    def __exit__(self, exc_type, exc, tb):
+        try:
+            if exc_type is None:
+                footer_offset = self._file.tell()
+                self._file.write(zlib.compress(json.dumps({
+                    "day": self.day.isoformat(),
+                    "rows": self.rows,
+                    "sessions": self._sessions,
+                }).encode()))
+                self._file.write(TRAILER.pack(footer_offset, MAGIC))
+                self._file.flush()
+                os.fsync(self._file.fileno())
+        finally:
+            self._file.close()
+        
+        if exc_type is None:
+            os.replace(self._tmp_path, self.path)
+        else:
+            os.remove(self._tmp_path)
+    
+    def add_session(self, session_id: int, telegram_id: int, reports: Iterable[Any]):
+        """Append the reports of one session (any objects with report attributes)"""
+        reports = sorted(reports, key=lambda report: (report.timestamp, report.id))
+        if not reports:
+            return
+        
+        data = zlib.compress(_encode_group(telegram_id, reports), 6)
+        self._sessions[str(session_id)] = [self._file.tell(), len(data)]
+        self._file.write(data)
+        self.rows += len(reports)
+
+
+def _deltas(values: List[int]) -> List[int]:
+    return [values[0]] + [value - previous for previous, value in zip(values, values[1:])]
+
+
+def _undeltas(deltas) -> List[int]:
+    values, total = [], 0
+    for delta in deltas:
+        total += delta
+        values.append(total)
+    return values
+
+
+def _micros(value: datetime) -> int:
+    if value.tzinfo is None:
+        value = value.replace(tzinfo=timezone.utc)
+    return (value - EPOCH) // timedelta(microseconds=1)
+
+
+def _encode_group(telegram_id: int, reports: List[Any]) -> bytes:
+    count = len(reports)
+    
+    parts = [
+        struct.pack("<Iq", count, telegram_id),
+        struct.pack(f"<{count}q", *_deltas([report.id for report in reports])),
+        struct.pack(f"<{count}q", *_deltas([_micros(report.timestamp) for report in reports])),
+    ]
+    
+    # NaN marks NULL
+    for name in FLOAT_COLUMNS:
+        values = [getattr(report, name) for report in reports]
+        parts.append(struct.pack(
+            f"<{count}f",
+            *(math.nan if value is None else value for value in values)
+        ))
+    
+    text = json.dumps([[getattr(report, name) for report in reports] for name in TEXT_COLUMNS]).encode()
+    parts.append(struct.pack("<I", len(text)))
+    parts.append(text)
+    
+    return b"".join(parts)
+
+
+def _decode_group(session_id: int, data: bytes) -> List[ArchivedReport]:
+    count, telegram_id = struct.unpack_from("<Iq", data)
+    offset = struct.calcsize("<Iq")
+    
+    ids = _undeltas(struct.unpack_from(f"<{count}q", data, offset))
+    offset += 8 * count
+    
+    timestamps = [
+        EPOCH + timedelta(microseconds=value)
+        for value in _undeltas(struct.unpack_from(f"<{count}q", data, offset))
+    ]
+    offset += 8 * count
+    
+    floats = []
+    for _ in FLOAT_COLUMNS:
+        floats.append([
+            None if math.isnan(value) else value
+            for value in struct.unpack_from(f"<{count}f", data, offset)
+        ])
+        offset += 4 * count
+    
+    (text_length,) = struct.unpack_from("<I", data, offset)
+    offset += 4
+    texts = json.loads(data[offset:offset + text_length])
+    
+    return [
+        ArchivedReport(
+            ids[i],
+            session_id,
+            telegram_id,
+            timestamps[i],
+            *(column[i] for column in floats),
+            *(column[i] for column in texts)
+        )
+        for i in range(count)
+    ]
+
+
+# Global archive instance (None when archiving is disabled)
+report_archive: Optional[ReportArchive] = (
+    ReportArchive(settings.REPORT_ARCHIVE_DIR) if settings.REPORT_ARCHIVE_DIR else None
+)
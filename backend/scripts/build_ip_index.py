@@ -0,0 +1,35 @@
+#!/usr/bin/env python3
+"""
+Build offline IP intelligence index
+CSV columns: cidr,country,asn,isp,flags (flags e.g. "datacenter|vpn")
+"""
+import csv
+
+from app.services.ip_intel_index import build_index, parse_flags
+
+
+def read_rows(csv_path: str):
+    """Yield (cidr, country, asn, isp, flags) rows from CSV"""
+    with open(csv_path, newline="", encoding="utf-8") as f:
+        for row in csv.DictReader(f):
+            yield (
+                row["cidr"].strip(),
+                row.get("country", "").strip(),
+                int(row.get("asn") or 0),
+                row.get("isp", "").strip(),
+                parse_flags(row.get("flags", "")),
+            )
+
+
+if __name__ == "__main__":
+    import sys
+    
+    if len(sys.argv) < 3:
+        print("Usage: python build_ip_index.py <input.csv> <output.idx>")
+        print("Example: python build_ip_index.py ranges.csv /data/ip_intel.idx")
+        sys.exit(1)
+    
+    count = build_index(read_rows(sys.argv[1]), sys.argv[2])
+    
+    print(f"Wrote {count} ranges to {sys.argv[2]}")
+    print(f"Set IP_INTEL_INDEX_PATH={sys.argv[2]} (running workers reload it automatically)")
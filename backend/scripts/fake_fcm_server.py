@@ -0,0 +1,77 @@
+#!/usr/bin/env python3
+"""
+Local fake FCM server for load testing notification delivery
+Speaks the legacy /fcm/send multicast format; tokens starting with
+"invalid" are answered with NotRegistered
+"""
+import asyncio
+import time
+
+from fastapi import FastAPI, Request
+
+
+app = FastAPI(title="Fake FCM")
+
+# Simulated processing time per request
+LATENCY_SECONDS = 0.0
+
+stats = {
+    "requests": 0,
+    "tokens": 0,
+    "invalid": 0,
+    "started_at": time.monotonic(),
+}
+
+
+@app.post("/fcm/send")
+async def fcm_send(request: Request):
+    """Answer like FCM, one result per registration id"""
+    payload = await request.json()
+    tokens = payload.get("registration_ids") or [payload.get("to")]
+    
+    if LATENCY_SECONDS:
+        await asyncio.sleep(LATENCY_SECONDS)
+    
+    results = [
+        {"error": "NotRegistered"} if token.startswith("invalid") else {"message_id": f"fake:{i}"}
+        for i, token in enumerate(tokens)
+    ]
+    failure = sum(1 for r in results if "error" in r)
+    
+    stats["requests"] += 1
+    stats["tokens"] += len(tokens)
+    stats["invalid"] += failure
+    
+    return {
+        "multicast_id": stats["requests"],
+        "success": len(tokens) - failure,
+        "failure": failure,
+        "canonical_ids": 0,
+        "results": results,
+    }
+
+
+@app.get("/stats")
+async def get_stats():
+    """Throughput since start"""
+    elapsed = time.monotonic() - stats["started_at"]
+    
+    return {
+        **stats,
+        "elapsed_seconds": round(elapsed, 2),
+        "tokens_per_second": round(stats["tokens"] / elapsed, 2) if elapsed else 0.0,
+    }
+
+
+if __name__ == "__main__":
+    import sys
+    import uvicorn
+    
+    port = int(sys.argv[1]) if len(sys.argv) > 1 else 9000
+    LATENCY_SECONDS = float(sys.argv[2]) / 1000 if len(sys.argv) > 2 else 0.0
+    
+    print(f"Fake FCM listening on http://127.0.0.1:{port}/fcm/send")
+    print(f"Set FCM_URL=http://127.0.0.1:{port}/fcm/send and any FCM_SERVER_KEY")
+    print("Usage: python fake_fcm_server.py [port] [latency_ms]")
+    
+    uvicorn.run(app, host="127.0.0.1", port=port, log_level="warning")
@@ -0,0 +1,125 @@
+import pytest
+from datetime import datetime, timedelta
+from sqlalchemy import select, func
+from app.models.session import Session, SessionReport
+from app.models.anomaly import SessionAnomaly
+from app.services.anomaly_detector import AnomalyDetector
+from app.services.anomaly_service import AnomalyService
+from app.services.report_ingestion_service import ReportIngestionService
+
+
+def test_detector_flags_each_kind_once():
+    """Test impossible speed, counter regression, drift and spikes are flagged once per session"""
+    detector = AnomalyDetector(max_speed_mb_s=100.0, spike_factor=5.0, drift_mb=20.0, drift_percent=0.01)
+    start = datetime(2026, 1, 1)
+    
+    # Steady 1 MB/s
+    for i in range(1, 11):
+        assert detector.observe(1, start + timedelta(seconds=10 * i), 10.0 * i, 10.0, 1.0) == []
+    
+    # 80 MB in 10 s: a spike over the EWMA, still possible
+    kinds = [a["kind"] for a in detector.observe(1, start + timedelta(seconds=110), 180.0, 80.0, 8.0)]
+    assert kinds == ["speed_spike"]
+    
+    # Counter goes backwards while deltas keep coming: regression and drift
+    anomalies = detector.observe(1, start + timedelta(seconds=120), 50.0, 10.0, 1.0)
+    assert [a["kind"] for a in anomalies] == ["counter_regression", "drift"]
+    # Counter resets are ordinary client behaviour - flagged, never paused
+    assert [a["pause"] for a in anomalies] == [False, False]
+    
+    # Already flagged kinds are not raised again
+    assert detector.observe(1, start + timedelta(seconds=130), 40.0, 10.0, 1.0) == []
+    
+    anomalies = detector.observe(2, start, 0.0, 0.0, 500.0)
+    assert [a["kind"] for a in anomalies] == ["impossible_speed"]
+    
+    detector.forget(1)
+    detector.forget(2)
+    assert detector.tracked_sessions == 0
+
+
+@pytest.mark.asyncio
+async def test_impossible_report_pauses_session(db_session, mock_user):
+    """Test a pausing anomaly rejects the report, pauses the session and can be dismissed"""
+    telegram_id, user_id = mock_user.telegram_id, mock_user.id
+    ingestion = ReportIngestionService()
+    
+    session = Session(
+        session_id="anomaly_session",
+        user_id=user_id,
+        telegram_id=telegram_id,
+        is_active=True,
+        server_counted_mb=0.0
+    )
+    db_session.add(session)
+    await db_session.commit()
+    session_pk = session.id
+    
+    await ingestion.submit(
+        db_session,
+        session_id="anomaly_session",
+        telegram_id=telegram_id,
+        cumulative_mb=10.0,
+        delta_mb=10.0,
+        speed_mb_s=2.0
+    )
+    
+    with pytest.raises(ValueError):
+        await ingestion.submit(
+            db_session,
+            session_id="anomaly_session",
+            telegram_id=telegram_id,
+            cumulative_mb=100010.0,
+            delta_mb=100000.0,
+            speed_mb_s=2.0
+        )
+    
+    await db_session.refresh(session)
+    assert session.is_active is False
+    assert session.status == "paused"
+    assert session.server_counted_mb == pytest.approx(10.0)
+    
+    count_result = await db_session.execute(
+        select(func.count(SessionReport.id)).where(SessionReport.session_id == session_pk)
+    )
+    assert count_result.scalar() == 1
+    
+    anomaly_service = AnomalyService(db_session)
+    queue = await anomaly_service.list_anomalies()
+    kinds = {a["kind"]: a["action"] for a in queue["anomalies"]}
+    assert kinds["impossible_speed"] == "paused"
+    
+    result = await anomaly_service.dismiss(queue["anomalies"][0]["id"], admin_id=1)
+    assert result["resumed"] is True
+    assert result["resolved"] == len(queue["anomalies"])
+    
+    await db_session.refresh(session)
+    assert session.is_active is True
+    assert session.status == "active"
+    
+    open_result = await db_session.execute(
+        select(func.count(SessionAnomaly.id)).where(SessionAnomaly.status == "open")
+    )
+    assert open_result.scalar() == 0
+    
+    with pytest.raises(ValueError):
+        await anomaly_service.confirm(queue["anomalies"][0]["id"], admin_id=1)
+
+
+@pytest.mark.asyncio
+async def test_anomaly_routes_mounted(authenticated_client, mock_user_data, monkeypatch):
+    """Test the review queue and its actions are served under /api/admin/anomalies"""
+    from app.core.config import settings
+    monkeypatch.setattr(settings, "ADMIN_IDS", str(mock_user_data["id"]))
+    
+    response = await authenticated_client.get("/api/admin/anomalies/")
+    assert response.status_code == 200
+    data = response.json()
+    assert data["status"] == "success"
+    assert "anomalies" in data["data"]
+    
+    # Unknown ids reach the handler rather than 404ing on the route
+    response = await authenticated_client.post("/api/admin/anomalies/0/dismiss")
+    assert response.status_code == 400
+    response = await authenticated_client.post("/api/admin/anomalies/0/confirm")
+    assert response.status_code == 400
@@ -0,0 +1,74 @@
+import pytest
+from app.services.balance_service import BalanceService
+from app.models.session import Session
+from app.models.transaction import Transaction, WithdrawRequest
+
+
+@pytest.mark.asyncio
+async def test_correct_drift_updates_only_drifted_users(db_session, mock_user, mock_admin):
+    """Test grouped recomputation corrects drifted balances and leaves others"""
+    balance_service = BalanceService(db_session)
+    
+    db_session.add_all([
+        Session(
+            session_id="balance_session_1",
+            user_id=mock_user.id,
+            telegram_id=mock_user.telegram_id,
+            earned_usd=5.0,
+            status="completed"
+        ),
+        Session(
+            session_id="balance_session_2",
+            user_id=mock_user.id,
+            telegram_id=mock_user.telegram_id,
+            earned_usd=3.0,
+            status="active"
+        ),
+        WithdrawRequest(
+            telegram_id=mock_user.telegram_id,
+            amount_usd=2.0,
+            wallet_address="0xwallet",
+            status="completed"
+        ),
+        # Mirrors the session, must not be counted twice
+        Transaction(
+            telegram_id=mock_user.telegram_id,
+            type="income",
+            amount_usd=5.0,
+            status="completed"
+        ),
+        Transaction(
+            telegram_id=mock_user.telegram_id,
+            type="promo_bonus",
+            amount_usd=1.5,
+            status="completed"
+        ),
+    ])
+    mock_user.balance_usd = 10.0
+    mock_admin.balance_usd = 0.0
+    await db_session.commit()
+    
+    drift = await balance_service.find_drift()
+    
+    assert [d["telegram_id"] for d in drift] == [mock_user.telegram_id]
+    assert drift[0]["new_balance"] == pytest.approx(4.5)
+    
+    corrections = await balance_service.correct_drift()
+    await db_session.commit()
+    
+    assert len(corrections) == 1
+    assert corrections[0]["old_balance"] == pytest.approx(10.0)
+    
+    await db_session.refresh(mock_user)
+    assert mock_user.balance_usd == pytest.approx(4.5)
+    
+    assert await balance_service.find_drift() == []
+
+
+@pytest.mark.asyncio
+async def test_refresh_user_unknown(db_session):
+    """Test refreshing an unknown user raises"""
+    balance_service = BalanceService(db_session)
+    
+    with pytest.raises(ValueError):
+        await balance_service.refresh_user(999999)
@@ -0,0 +1,56 @@
+import pytest
+from datetime import datetime
+from app.services.broadcast_service import BroadcastService
+from app.models.user import User
+
+
+async def _add_audience(db_session, count):
+    for i in range(count):
+        db_session.add(User(
+            telegram_id=5000 + i,
+            username=f"user{i}",
+            first_name="User",
+            is_active=True,
+            is_banned=False,
+            last_seen=datetime.utcnow()
+        ))
+    await db_session.commit()
+
+
+@pytest.mark.asyncio
+async def test_broadcast_resumes_after_crash_without_resending(db_session):
+    """Test crashed planning continues after last chunk and sent chunks are skipped"""
+    await _add_audience(db_session, 5)
+    broadcast_service = BroadcastService(db_session, chunk_size=2)
+    
+    broadcast = await broadcast_service.start(key="test:1", title="Test", body="Body")
+    
+    dispatched = []
+    
+    def crashing_dispatch(broadcast_id, chunk_index):
+        dispatched.append(chunk_index)
+        if chunk_index == 1:
+            raise RuntimeError("worker lost")
+    
+    with pytest.raises(RuntimeError):
+        await broadcast_service.plan(broadcast.id, crashing_dispatch)
+    
+    # Same key returns the running broadcast instead of a new one
+    again = await broadcast_service.start(key="test:1", title="Test", body="Body")
+    assert again.id == broadcast.id
+    
+    await broadcast_service.plan(broadcast.id, lambda b_id, chunk_index: dispatched.append(chunk_index))
+    assert dispatched == [0, 1, 2]
+    
+    first = await broadcast_service.send_chunk(broadcast.id, 0)
+    repeat = await broadcast_service.send_chunk(broadcast.id, 0)
+    assert first["total"] == 2
+    assert repeat["status"] == "skipped"
+    
+    await broadcast_service.send_chunk(broadcast.id, 1)
+    await broadcast_service.send_chunk(broadcast.id, 2)
+    
+    progress = await broadcast_service.get_progress(broadcast.id)
+    assert progress["status"] == "completed"
+    assert progress["completed_chunks"] == 3
+    assert progress["sent"] + progress["failed"] == 5
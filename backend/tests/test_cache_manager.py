@@ -0,0 +1,51 @@
+import pytest
+from app.utils.cache_manager import CacheManager
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 1000.0
+    
+    def __call__(self):
+        return self.now
+
+
+@pytest.mark.asyncio
+async def test_l1_ttl_and_negative_entries():
+    """Test L1 expiry and cached misses"""
+    clock = FakeClock()
+    cache = CacheManager(l1_ttl=30, use_redis=False, clock=clock)
+    
+    await cache.set("ip_reputation:1.2.3.4", {"country_code": "US"}, ttl=86400)
+    await cache.set("ip_reputation:5.6.7.8", None)
+    
+    assert await cache.get("ip_reputation:1.2.3.4") == {"country_code": "US"}
+    
+    # Negative entry is a hit returning None, unknown key returns default
+    missing = object()
+    assert await cache.get("ip_reputation:5.6.7.8", missing) is None
+    assert await cache.get("ip_reputation:9.9.9.9", missing) is missing
+    
+    clock.now += 31
+    assert await cache.get("ip_reputation:1.2.3.4") is None
+    
+    stats = cache.stats()
+    assert stats["l1_hits"] == 2
+    assert stats["negative_hits"] == 1
+    assert stats["misses"] == 2
+
+
+@pytest.mark.asyncio
+async def test_l1_lru_bound_and_mget():
+    """Test L1 evicts least recently used keys and mget batches lookups"""
+    cache = CacheManager(l1_max_items=3, use_redis=False, clock=FakeClock())
+    
+    for key in ("a", "b", "c"):
+        await cache.set(key, key.upper())
+    
+    # Touch "a" so "b" is the least recently used
+    await cache.get("a")
+    await cache.set("d", "D")
+    
+    assert await cache.mget(["a", "b", "c", "d"]) == {"a": "A", "c": "C", "d": "D"}
+    assert cache.stats()["l1_size"] == 3
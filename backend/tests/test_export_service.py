@@ -0,0 +1,83 @@
+import pytest
+import csv
+import gzip
+import io
+import json
+from datetime import datetime, timedelta
+from app.services.export_service import ExportService
+from app.models.session import Session
+
+
+async def _collect(chunks):
+    return b"".join([chunk async for chunk in chunks])
+
+
+async def _add_sessions(db_session, user, count):
+    start = datetime.utcnow() - timedelta(hours=1)
+    for i in range(count):
+        db_session.add(Session(
+            session_id=f"export-{i}",
+            user_id=user.id,
+            telegram_id=user.telegram_id,
+            start_time=start,
+            end_time=start + timedelta(minutes=i),
+            status="completed",
+            sent_mb=float(i),
+            server_counted_mb=float(i),
+            earned_usd=i / 100
+        ))
+    await db_session.commit()
+
+
+@pytest.mark.asyncio
+async def test_sessions_export_streams_in_chunks(db_session, mock_user):
+    """Test gzip CSV and NDJSON exports contain every row across partitions"""
+    await _add_sessions(db_session, mock_user, 5)
+    export_service = ExportService(db_session, chunk_size=2)
+    
+    compressed = await _collect(export_service.stream_sessions(fmt="csv", compress=True))
+    rows = list(csv.DictReader(io.StringIO(gzip.decompress(compressed).decode())))
+    assert [row["session_id"] for row in rows] == [f"export-{i}" for i in range(5)]
+    assert float(rows[4]["server_counted_mb"]) == 4.0
+    
+    lines = (await _collect(export_service.stream_sessions(fmt="ndjson"))).decode().splitlines()
+    assert len(lines) == 5
+    assert json.loads(lines[2])["earned_usd"] == pytest.approx(0.02)
+    
+    with pytest.raises(ValueError):
+        export_service.stream_sessions(fmt="xlsx")
+
+
+@pytest.mark.asyncio
+async def test_sessions_export_parquet(db_session, mock_user):
+    """Test Parquet export writes one readable file"""
+    pq = pytest.importorskip("pyarrow.parquet")
+    await _add_sessions(db_session, mock_user, 5)
+    
+    data = await _collect(ExportService(db_session, chunk_size=2).stream_sessions(fmt="parquet"))
+    table = pq.read_table(io.BytesIO(data))
+    
+    assert table.num_rows == 5
+    assert table.column("session_id").to_pylist()[0] == "export-0"
+
+
+@pytest.mark.asyncio
+async def test_users_export_endpoint_streams(authenticated_client, mock_user_data, monkeypatch):
+    """Test the export is served under /api/admin/reports as a gzip CSV attachment"""
+    from app.core.config import settings
+    monkeypatch.setattr(settings, "ADMIN_IDS", str(mock_user_data["id"]))
+    
+    response = await authenticated_client.get(
+        "/api/admin/reports/export/users",
+        params={"format": "csv", "gzip": "true"}
+    )
+    
+    assert response.status_code == 200
+    assert response.headers["content-type"] == ExportService.media_type("csv", True)
+    assert "attachment" in response.headers["content-disposition"]
+    
+    rows = list(csv.DictReader(io.StringIO(gzip.decompress(response.content).decode())))
+    assert str(mock_user_data["id"]) in [row["telegram_id"] for row in rows]
+    
+    response = await authenticated_client.get("/api/admin/reports/export/users", params={"format": "xlsx"})
+    assert response.status_code == 400
@@ -54,3 +54,29 @@ async def test_vpn_score_calculation():
     ip_data = {"proxy": False, "hosting": False, "isp": "VPN Provider Inc"}
     score = await filter_service._calculate_vpn_score(ip_data)
     assert score >= 20
+
+
+@pytest.mark.asyncio
+async def test_ip_reputation_lookups_are_cached(db_session):
+    """Test repeated session starts from one IP hit the reputation API once"""
+    from app.utils.cache_manager import CacheManager
+    
+    filter_service = FilterService(db_session, cache=CacheManager(use_redis=False))
+    
+    calls = []
+    
+    async def fake_check(ip):
+        calls.append(ip)
+        return None
+    
+    filter_service._check_ip_reputation = fake_check
+    
+    for _ in range(3):
+        can_start, _ = await filter_service.check_can_start_session(
+            telegram_id=999999,
+            ip_address="203.0.113.7"
+        )
+        assert can_start is True
+    
+    # Failed lookup is negatively cached
+    assert calls == ["203.0.113.7"]
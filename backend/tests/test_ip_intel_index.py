@@ -0,0 +1,119 @@
+import pytest
+import os
+from app.services.ip_intel_index import (
+    IpIntelIndex,
+    build_index,
+    FLAG_DATACENTER,
+    FLAG_VPN,
+    FLAG_MOBILE,
+)
+from app.services.filter_service import FilterService
+from app.services.ip_reputation_service import IpReputationResolver, StubIpProvider
+from app.utils.cache_manager import CacheManager
+
+
+RANGES = [
+    ("203.0.113.0/24", "DE", 64500, "Example Hosting GmbH", FLAG_DATACENTER | FLAG_VPN),
+    ("198.51.100.0/25", "US", 64501, "Example Mobile", FLAG_MOBILE),
+    ("2001:db8::/32", "FR", 64502, "Example IPv6 ISP", 0),
+]
+
+
+def test_lookup_ranges(tmp_path):
+    """Test interval lookups for IPv4, IPv6 and gaps"""
+    path = str(tmp_path / "ip_intel.idx")
+    assert build_index(RANGES, path) == 3
+    
+    index = IpIntelIndex(path)
+    
+    record = index.lookup("203.0.113.200")
+    assert record["country_code"] == "DE"
+    assert record["is_datacenter"] is True
+    assert record["is_vpn"] is True
+    assert record["isp"] == "Example Hosting GmbH"
+    
+    assert index.lookup("198.51.100.5")["is_mobile"] is True
+    assert index.lookup("2001:db8::1")["country_code"] == "FR"
+    
+    # Gap between ranges, before first range, garbage input
+    assert index.lookup("198.51.100.200") is None
+    assert index.lookup("1.1.1.1") is None
+    assert index.lookup("not-an-ip") is None
+
+
+def test_nested_range_same_start(tmp_path):
+    """Test a more specific prefix wins over a wider range sharing its start"""
+    path = str(tmp_path / "ip_intel.idx")
+    build_index([
+        ("10.0.0.0/24", "NL", 64510, "Example VPN", FLAG_VPN),
+        ("10.0.0.0/16", "NL", 64511, "Example Home ISP", 0),
+    ], path)
+    
+    index = IpIntelIndex(path)
+    
+    record = index.lookup("10.0.0.5")
+    assert record["is_vpn"] is True
+    assert record["isp"] == "Example VPN"
+    
+    record = index.lookup("10.0.1.5")
+    assert record["is_vpn"] is False
+    assert record["isp"] == "Example Home ISP"
+
+
+def test_address_after_nested_range(tmp_path):
+    """Test addresses past a nested range fall back to the enclosing range"""
+    path = str(tmp_path / "ip_intel.idx")
+    build_index([
+        ("10.0.0.0/16", "NL", 64511, "Example Home ISP", 0),
+        ("10.0.5.0/24", "NL", 64510, "Example VPN", FLAG_VPN),
+    ], path)
+    
+    index = IpIntelIndex(path)
+    
+    assert index.lookup("10.0.4.255")["isp"] == "Example Home ISP"
+    assert index.lookup("10.0.5.1")["is_vpn"] is True
+    assert index.lookup("10.0.9.1")["isp"] == "Example Home ISP"
+    assert index.lookup("10.0.255.255")["isp"] == "Example Home ISP"
+    assert index.lookup("10.1.0.0") is None
+
+
+def test_hot_reload(tmp_path):
+    """Test index picks up a rebuilt file"""
+    path = str(tmp_path / "ip_intel.idx")
+    build_index(RANGES[:1], path)
+    
+    index = IpIntelIndex(path)
+    assert index.lookup("198.51.100.5") is None
+    
+    build_index(RANGES, path)
+    os.utime(path, (0, 12345))
+    index.RELOAD_CHECK_SECONDS = 0
+    
+    assert index.lookup("198.51.100.5")["country_code"] == "US"
+    assert len(index) == 3
+
+
+@pytest.mark.asyncio
+async def test_filter_uses_index_before_remote(db_session, tmp_path):
+    """Test indexed ranges are decided without calling the provider"""
+    path = str(tmp_path / "ip_intel.idx")
+    build_index(RANGES, path)
+    
+    provider = StubIpProvider()
+    filter_service = FilterService(
+        db_session,
+        cache=CacheManager(use_redis=False),
+        resolver=IpReputationResolver(provider=provider, batch_window=0.0),
+        index=IpIntelIndex(path)
+    )
+    
+    can_start, reason = await filter_service.check_can_start_session(
+        telegram_id=999999,
+        ip_address="203.0.113.10"
+    )
+    
+    assert can_start is False
+    assert "VPN" in reason
+    assert provider.batches == []
+    
+    await filter_service.resolver.close()
@@ -0,0 +1,45 @@
+import pytest
+import asyncio
+from app.services.ip_reputation_service import IpReputationResolver, StubIpProvider
+from app.services.filter_service import FilterService
+from app.utils.cache_manager import CacheManager
+
+
+@pytest.mark.asyncio
+async def test_concurrent_lookups_are_coalesced_and_batched():
+    """Test same-IP lookups share one request and misses go out as one batch"""
+    provider = StubIpProvider()
+    resolver = IpReputationResolver(provider=provider, batch_window=0.01)
+    
+    ips = ["198.51.100.1"] * 5 + ["198.51.100.2", "198.51.100.3"]
+    results = await asyncio.gather(*(resolver.resolve(ip) for ip in ips))
+    
+    assert len(provider.batches) == 1
+    assert sorted(provider.batches[0]) == ["198.51.100.1", "198.51.100.2", "198.51.100.3"]
+    assert all(r["status"] == "success" for r in results)
+    assert results[0] is results[4]
+    
+    await resolver.close()
+
+
+@pytest.mark.asyncio
+async def test_filter_blocks_proxy_from_stub_provider(db_session):
+    """Test FilterService applies rules to records from a pluggable provider"""
+    provider = StubIpProvider({
+        "198.51.100.9": {"proxy": True, "isp": "Proxy Hosting Ltd"},
+    })
+    filter_service = FilterService(
+        db_session,
+        cache=CacheManager(use_redis=False),
+        resolver=IpReputationResolver(provider=provider, batch_window=0.0)
+    )
+    
+    can_start, reason = await filter_service.check_can_start_session(
+        telegram_id=999999,
+        ip_address="198.51.100.9"
+    )
+    
+    assert can_start is False
+    assert "Proxy" in reason
+    
+    await filter_service.resolver.close()
@@ -106,3 +106,122 @@ async def test_send_withdraw_status(db_session, mock_user):
     
     assert notification is not None
     assert "10.00" in notification.body
+
+
+@pytest.mark.asyncio
+async def test_send_to_multiple_batches_tokens(db_session):
+    """Test audience tokens are multicast together and invalid tokens deactivated"""
+    import json
+    import httpx
+    from sqlalchemy import select
+    from app.models.notification import Notification
+    from app.services.fcm_client import FCMClient
+    
+    requests = []
+    
+    def handler(request):
+        tokens = json.loads(request.content)["registration_ids"]
+        requests.append(tokens)
+        return httpx.Response(200, json={
+            "results": [
+                {"error": "NotRegistered"} if token.startswith("dead") else {"message_id": "1"}
+                for token in tokens
+            ]
+        })
+    
+    for telegram_id in (1001, 1002, 1003):
+        db_session.add(FCMToken(telegram_id=telegram_id, token=f"token_{telegram_id}", is_active=True))
+    db_session.add(FCMToken(telegram_id=1003, token="dead_1003", is_active=True))
+    await db_session.commit()
+    
+    fcm = FCMClient(
+        url="http://fcm.test/fcm/send",
+        server_key="test",
+        transport=httpx.MockTransport(handler)
+    )
+    notif_service = NotificationService(db_session, fcm=fcm)
+    
+    result = await notif_service.send_to_multiple(
+        telegram_ids=[1001, 1002, 1003, 1004],
+        title="Test",
+        body="Test body",
+        notif_type="test"
+    )
+    await fcm.close()
+    
+    assert result == {"sent": 3, "failed": 1, "total": 4}
+    assert len(requests) == 1 and len(requests[0]) == 4
+    
+    dead = await db_session.execute(select(FCMToken).where(FCMToken.token == "dead_1003"))
+    assert dead.scalar_one().is_active is False
+    
+    notifications = await db_session.execute(
+        select(Notification.telegram_id).where(Notification.type == "test")
+    )
+    assert sorted(notifications.scalars().all()) == [1001, 1002, 1003]
+
+
+@pytest.mark.asyncio
+async def test_send_session_summaries_aggregates_per_user(db_session, mock_user):
+    """Test summaries are built from one grouped query per user"""
+    from datetime import datetime, timedelta
+    from sqlalchemy import select
+    from app.models.notification import Notification
+    from app.models.session import Session
+    
+    now = datetime.utcnow()
+    db_session.add_all([
+        Session(session_id="summary_1", user_id=mock_user.id, telegram_id=mock_user.telegram_id,
+                sent_mb=100.0, earned_usd=0.15, start_time=now - timedelta(hours=2)),
+        Session(session_id="summary_2", user_id=mock_user.id, telegram_id=mock_user.telegram_id,
+                sent_mb=50.0, earned_usd=0.075, start_time=now - timedelta(hours=1)),
+        Session(session_id="summary_old", user_id=mock_user.id, telegram_id=mock_user.telegram_id,
+                sent_mb=999.0, earned_usd=9.0, start_time=now - timedelta(days=3)),
+        FCMToken(telegram_id=mock_user.telegram_id, token="summary_token", is_active=True),
+    ])
+    await db_session.commit()
+    
+    notif_service = NotificationService(db_session)
+    result = await notif_service.send_session_summaries(hours=24, chunk_size=1)
+    
+    assert result["total"] == 1
+    
+    notification = (await db_session.execute(
+        select(Notification).where(Notification.telegram_id == mock_user.telegram_id)
+    )).scalar_one()
+    
+    assert notification.data["total_mb"] == 150.0
+    assert notification.data["session_count"] == 2
+
+
+@pytest.mark.asyncio
+async def test_multicast_retries_after_http_date(monkeypatch):
+    """Test a Retry-After given as an HTTP-date is honoured instead of failing the send"""
+    import asyncio
+    import httpx
+    from app.services.fcm_client import FCMClient
+    
+    responses = iter([
+        httpx.Response(503, headers={"Retry-After": "Wed, 21 Oct 2015 07:28:00 GMT"}),
+        httpx.Response(503, headers={"Retry-After": "soon"}),
+        httpx.Response(200, json={"results": [{"message_id": "1"}]}),
+    ])
+    delays = []
+    
+    async def fake_sleep(delay):
+        delays.append(delay)
+    
+    monkeypatch.setattr(asyncio, "sleep", fake_sleep)
+    
+    fcm = FCMClient(
+        url="http://fcm.test/fcm/send",
+        server_key="test",
+        transport=httpx.MockTransport(lambda request: next(responses))
+    )
+    
+    errors = await fcm.send_multicast(["token"], "Test", "Test body", {})
+    await fcm.close()
+    
+    assert errors == [None]
+    # Date in the past -> retry now; unparseable -> backoff
+    assert delays == [0.0, 4.0]
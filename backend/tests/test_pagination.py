@@ -0,0 +1,73 @@
+import pytest
+from datetime import datetime, timedelta
+from sqlalchemy import select
+from app.utils.pagination import KeysetPaginator
+from app.services.traffic_service import TrafficService
+from app.models.session import Session
+from app.models.transaction import Transaction
+
+
+@pytest.mark.asyncio
+async def test_keyset_pages_cover_ties_without_duplicates(db_session, mock_user):
+    """Test rows sharing a timestamp are split across pages by id"""
+    created_at = datetime.utcnow()
+    for i in range(5):
+        db_session.add(Transaction(
+            telegram_id=mock_user.telegram_id,
+            type="income",
+            amount_usd=float(i),
+            status="completed",
+            created_at=created_at if i < 4 else created_at - timedelta(days=1)
+        ))
+    await db_session.commit()
+    
+    paginator = KeysetPaginator(Transaction.created_at, Transaction.id, 2)
+    query = select(Transaction).where(Transaction.telegram_id == mock_user.telegram_id)
+    
+    seen, cursor, pages = [], None, 0
+    while True:
+        result = await db_session.execute(paginator.apply(query, cursor))
+        transactions, cursor = paginator.page(result.scalars().all())
+        seen.extend(t.amount_usd for t in transactions)
+        pages += 1
+        if cursor is None:
+            break
+    
+    assert seen == [3.0, 2.0, 1.0, 0.0, 4.0]
+    assert pages == 3
+    
+    with pytest.raises(ValueError):
+        paginator.apply(query, "not-a-cursor")
+
+
+@pytest.mark.asyncio
+async def test_session_history_next_cursor(db_session, mock_user):
+    """Test session history continues from next_cursor"""
+    user_id, telegram_id = mock_user.id, mock_user.telegram_id
+    start = datetime.utcnow()
+    for i in range(3):
+        db_session.add(Session(
+            session_id=f"history-{i}",
+            user_id=user_id,
+            telegram_id=telegram_id,
+            start_time=start - timedelta(minutes=i)
+        ))
+    await db_session.commit()
+    
+    traffic_service = TrafficService(db_session)
+    first = await traffic_service.get_session_history(telegram_id, limit=2)
+    second = await traffic_service.get_session_history(telegram_id, limit=2, cursor=first["next_cursor"])
+    
+    assert [s["session_id"] for s in first["sessions"]] == ["history-0", "history-1"]
+    assert [s["session_id"] for s in second["sessions"]] == ["history-2"]
+    assert second["has_next"] is False
+
+
+def test_paginator_rejects_empty_pages_and_skips_null_sort_values():
+    """Test limit must be positive and rows without a sort value are left out"""
+    with pytest.raises(ValueError):
+        KeysetPaginator(Session.start_time, Session.id, 0)
+    
+    paginator = KeysetPaginator(Session.start_time, Session.id, 20)
+    query = str(paginator.apply(select(Session)))
+    assert "sessions.start_time IS NOT NULL" in query
@@ -0,0 +1,58 @@
+import pytest
+from datetime import datetime, timedelta
+from app.services.platform_stats_service import PlatformStatsService
+from app.models.session import Session
+from app.models.transaction import WithdrawRequest
+from app.models.platform_stats import PlatformHourlyStats
+
+
+@pytest.mark.asyncio
+async def test_refresh_hours_is_idempotent_and_feeds_snapshot(db_session, mock_user):
+    """Test hourly buckets are recomputed in place and summed by the snapshot"""
+    user_id, telegram_id = mock_user.id, mock_user.telegram_id
+    now = datetime.utcnow()
+    
+    db_session.add(Session(
+        session_id="done",
+        user_id=user_id,
+        telegram_id=telegram_id,
+        start_time=now - timedelta(minutes=30),
+        end_time=now,
+        status="completed",
+        is_active=False,
+        sent_mb=120.0,
+        server_counted_mb=100.0,
+        earned_usd=0.5
+    ))
+    db_session.add(Session(
+        session_id="running",
+        user_id=user_id,
+        telegram_id=telegram_id,
+        start_time=now - timedelta(minutes=5),
+        status="active",
+        is_active=True
+    ))
+    db_session.add(WithdrawRequest(
+        telegram_id=telegram_id,
+        amount_usd=2.0,
+        wallet_address="0xabc",
+        status="pending"
+    ))
+    await db_session.commit()
+    
+    platform_stats_service = PlatformStatsService(db_session)
+    await platform_stats_service.refresh_hours(now - timedelta(hours=1))
+    await platform_stats_service.refresh_hours(now - timedelta(hours=1))
+    
+    current = await db_session.get(PlatformHourlyStats, now.replace(minute=0, second=0, microsecond=0))
+    await db_session.refresh(current)
+    assert current.used_mb == pytest.approx(100.0)
+    assert current.sessions_completed == 1
+    assert current.active_sessions == 2
+    assert current.withdrawals_requested == 1
+    
+    snapshot = await platform_stats_service.build_snapshot()
+    assert snapshot["traffic"]["total_mb"] == pytest.approx(100.0)
+    assert snapshot["earnings"]["total_usd"] == pytest.approx(0.5)
+    assert snapshot["sessions"]["active_now"] == 1
+    assert snapshot["pending_withdrawals"]["amount_usd"] == pytest.approx(2.0)
@@ -0,0 +1,39 @@
+import pytest
+from app.services.price_oracle import PriceOracle
+from app.services.pricing_service import PricingService
+
+
+@pytest.mark.asyncio
+async def test_price_is_cached_until_invalidated(db_session, mock_admin):
+    """Test oracle serves cached price until invalidation"""
+    oracle = PriceOracle()
+    
+    first = await oracle.get_price(db_session)
+    second = await oracle.get_price(db_session)
+    
+    # Same cached object - no reload
+    assert first is second
+    
+    oracle.invalidate()
+    third = await oracle.get_price(db_session)
+    
+    assert third is not first
+
+
+@pytest.mark.asyncio
+async def test_set_daily_price_invalidates_cache(db_session, mock_admin):
+    """Test new price is visible right after it is set"""
+    pricing_service = PricingService(db_session)
+    
+    await pricing_service.get_current_price()
+    
+    await pricing_service.set_daily_price(
+        admin_id=mock_admin.telegram_id,
+        price_per_gb=2.50,
+        message="Oracle test"
+    )
+    
+    price_data = await pricing_service.get_current_price()
+    
+    assert price_data["price_per_gb"] == 2.50
+    assert price_data["message"] == "Oracle test"
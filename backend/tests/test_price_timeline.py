@@ -0,0 +1,67 @@
+import pytest
+from datetime import date, datetime, timedelta
+from app.services.price_timeline import PriceTimeline
+
+
+def _timeline(prices: dict) -> PriceTimeline:
+    """Build a timeline from {date: price_per_mb} without a database"""
+    timeline = PriceTimeline()
+    timeline._daily = dict(prices)
+    timeline._rebuild()
+    return timeline
+
+
+def test_price_at_uses_price_in_effect():
+    """Test lookup returns the latest price on or before the timestamp"""
+    timeline = _timeline({
+        date(2024, 1, 1): 0.001,
+        date(2024, 1, 3): 0.002,
+    })
+    
+    assert timeline.price_at(datetime(2024, 1, 1, 12)) == 0.001
+    assert timeline.price_at(datetime(2024, 1, 2, 23, 59)) == 0.001
+    assert timeline.price_at(datetime(2024, 1, 3)) == 0.002
+    assert timeline.price_at(datetime(2024, 2, 1)) == 0.002
+    
+    # Before first known price falls back to the earliest one
+    assert timeline.price_at(datetime(2023, 12, 1)) == 0.001
+
+
+def test_integrate_piecewise_prices():
+    """Test earnings are weighted by time spent under each price"""
+    timeline = _timeline({
+        date(2024, 1, 1): 0.001,
+        date(2024, 1, 2): 0.003,
+    })
+    
+    # Half the session on each price
+    start = datetime(2024, 1, 1, 12)
+    end = datetime(2024, 1, 2, 12)
+    
+    earnings = timeline.integrate(start, end, 1000.0)
+    
+    assert earnings == pytest.approx(1000.0 * 0.002)
+
+
+def test_integrate_single_price_and_empty_timeline():
+    """Test integration degenerates to mb * price"""
+    timeline = _timeline({date(2024, 1, 1): 0.002})
+    
+    start = datetime(2024, 1, 5)
+    assert timeline.integrate(start, start + timedelta(hours=1), 500.0) == pytest.approx(1.0)
+    
+    empty = PriceTimeline()
+    assert empty.integrate(start, start + timedelta(hours=1), 1024.0) == pytest.approx(
+        1024.0 * empty.default_price_per_mb
+    )
+
+
+def test_settle_prefers_accrued_earnings():
+    """Test payouts use per-report accrued earnings, the span integral only without them"""
+    timeline = _timeline({date(2024, 1, 1): 0.001})
+    start = datetime(2024, 1, 2)
+    end = start + timedelta(hours=1)
+    
+    assert timeline.settle(0.75, start, end, 500.0) == 0.75
+    assert timeline.settle(None, start, end, 500.0) == pytest.approx(0.5)
+    assert timeline.settle(0.0, start, end, 0.0) == 0.0
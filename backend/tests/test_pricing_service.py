@@ -2,6 +2,7 @@ import pytest
 from datetime import date
 from app.services.pricing_service import PricingService
 from app.models.pricing import DailyPrice
+from app.services.price_timeline import price_timeline
 
 
 @pytest.mark.asyncio
@@ -86,3 +87,23 @@ async def test_get_price_history(db_session, mock_admin):
     assert isinstance(history, list)
     assert len(history) > 0
     assert history[0]["price_per_gb"] == 1.75
+
+
+@pytest.mark.asyncio
+async def test_calculate_earnings_uses_historical_price(db_session, mock_admin):
+    """Test earnings for a past date use that date's price"""
+    from datetime import timedelta
+    
+    pricing_service = PricingService(db_session)
+    past_date = date.today() - timedelta(days=3)
+    
+    db_session.add_all([
+        DailyPrice(date=past_date, price_per_gb=1.00, price_per_mb=1.00 / 1024),
+        DailyPrice(date=date.today(), price_per_gb=3.00, price_per_mb=3.00 / 1024),
+    ])
+    await db_session.commit()
+    price_timeline.mark_stale()
+    
+    earnings = await pricing_service.calculate_earnings(1024.0, price_date=past_date)
+    
+    assert earnings == pytest.approx(1.0, rel=0.01)
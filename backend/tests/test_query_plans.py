@@ -0,0 +1,166 @@
+import pytest
+import json
+from datetime import datetime, date, timedelta
+from sqlalchemy import event, text
+from app.services.traffic_service import TrafficService
+from app.services.dashboard_service import DashboardService
+from app.services.reconciliation_service import ReconciliationService
+from app.services.rollup_service import RollupService
+from app.services.report_partition_service import ReportPartitionService
+
+
+USERS = 200
+SESSIONS_PER_USER = 100
+
+
+async def _seed(db_session):
+    """Year of sessions for many users, a few still running, reports and rollups"""
+    await db_session.execute(text("""
+        INSERT INTO users (id, telegram_id, username, first_name, is_active, is_banned)
+        SELECT i, 10000 + i, 'user' || i, 'User', true, false
+        FROM generate_series(1, :users) AS i
+    """), {"users": USERS})
+    
+    await db_session.execute(text("""
+        INSERT INTO sessions (
+            session_id, user_id, telegram_id, start_time, end_time,
+            status, is_active, sent_mb, local_counted_mb, server_counted_mb, earned_usd
+        )
+        SELECT
+            'seed-' || i,
+            1 + i % :users,
+            10000 + 1 + i % :users,
+            now() - (i % 8760) * interval '1 hour',
+            CASE WHEN i % 500 = 0 THEN NULL ELSE now() - (i % 8760) * interval '1 hour' + interval '20 minutes' END,
+            CASE WHEN i % 500 = 0 THEN 'active' ELSE 'completed' END,
+            i % 500 = 0,
+            10, 10, 10, 0.01
+        FROM generate_series(1, :sessions) AS i
+    """), {"users": USERS, "sessions": USERS * SESSIONS_PER_USER})
+    
+    # Reports over the last ~9 days, one partition per day
+    await db_session.commit()
+    await ReportPartitionService(db_session).ensure_partitions(
+        ahead_days=1,
+        since=datetime.utcnow().date() - timedelta(days=10)
+    )
+    
+    await db_session.execute(text("""
+        INSERT INTO session_reports (session_id, telegram_id, timestamp, cumulative_mb, delta_mb)
+        SELECT 1 + i % 2000, 10000, now() - i * interval '15 seconds', i, 1
+        FROM generate_series(1, 50000) AS i
+    """))
+    
+    await db_session.commit()
+    
+    await RollupService(db_session).rebuild(date.today() - timedelta(days=366))
+    await db_session.execute(text("ANALYZE"))
+
+
+async def _captured_selects(db_session, call):
+    """Run `call` and return the SELECT statements it sent"""
+    statements = []
+    
+    def record(conn, cursor, statement, parameters, context, executemany):
+        if statement.lstrip().upper().startswith("SELECT"):
+            statements.append((statement, parameters))
+    
+    engine = db_session.bind.sync_engine
+    event.listen(engine, "before_cursor_execute", record)
+    try:
+        await call()
+    except ValueError:
+        pass
+    finally:
+        event.remove(engine, "before_cursor_execute", record)
+    
+    return statements
+
+
+async def _scans(db_session, statement, parameters):
+    """(node type, relation, index) of every scan in the plan"""
+    connection = await db_session.connection()
+    raw = await connection.get_raw_connection()
+    plan = await raw.driver_connection.fetchval(
+        "EXPLAIN (FORMAT JSON) " + statement, *(parameters or ())
+    )
+    # SQLAlchemy registers a json codec on asyncpg connections
+    if isinstance(plan, str):
+        plan = json.loads(plan)
+    
+    scans, nodes = set(), [plan[0]["Plan"]]
+    while nodes:
+        node = nodes.pop()
+        if "Scan" in node["Node Type"]:
+            scans.add((node["Node Type"], node.get("Relation Name"), node.get("Index Name")))
+        nodes.extend(node.get("Plans", []))
+    
+    return scans
+
+
+def _indexes(scans):
+    return {index for _, _, index in scans if index}
+
+
+def _seq_scanned(scans):
+    return {relation for node_type, relation, _ in scans if node_type == "Seq Scan"}
+
+
+@pytest.mark.asyncio
+async def test_hot_queries_use_indexes(db_session):
+    """Test key service queries are planned as index scans on a seeded dataset"""
+    await _seed(db_session)
+    telegram_id = 10000 + 7
+    
+    traffic_service = TrafficService(db_session)
+    
+    # Active session limit check (start_session stops at the unknown user)
+    statements = await _captured_selects(
+        db_session,
+        lambda: traffic_service.start_session(telegram_id=999999999)
+    )
+    scans = await _scans(db_session, *statements[0])
+    assert "idx_sessions_active_by_user" in _indexes(scans)
+    
+    # Session history page
+    statements = await _captured_selects(
+        db_session,
+        lambda: traffic_service.get_session_history(telegram_id, limit=20)
+    )
+    scans = await _scans(db_session, *statements[0])
+    assert "idx_sessions_telegram_start" in _indexes(scans)
+    assert "sessions" not in _seq_scanned(scans)
+    
+    # Dashboard earnings from the daily rollup
+    statements = await _captured_selects(
+        db_session,
+        lambda: DashboardService(db_session)._get_rollup_stats(telegram_id)
+    )
+    scans = await _scans(db_session, *statements[0])
+    assert "pk_user_daily_stats" in _indexes(scans)
+    
+    reconciliation_service = ReconciliationService(db_session)
+    
+    # Reconciliation keyset chunk over the last 30 days
+    async def first_chunk():
+        chunks = reconciliation_service._iter_session_chunks(datetime.utcnow() - timedelta(days=30))
+        await chunks.__anext__()
+        await chunks.aclose()
+    
+    statements = await _captured_selects(db_session, first_chunk)
+    scans = await _scans(db_session, *statements[0])
+    assert "sessions" not in _seq_scanned(scans)
+    
+    # Reports of one session in time order, pruned to days since its start
+    statements = await _captured_selects(
+        db_session,
+        lambda: reconciliation_service.reconcile_session_reports(42)
+    )
+    scans = await _scans(db_session, *statements[1])
+    partitions = {relation for _, relation, _ in scans if relation and relation.startswith("session_reports")}
+    old_partition = ReportPartitionService.partition_name(datetime.utcnow().date() - timedelta(days=5))
+    assert partitions
+    assert old_partition not in partitions
+    # Empty partitions may still be seq scanned - they are a page or less
+    assert _indexes(scans)
+    assert all(index.endswith("session_id_timestamp_idx") for index in _indexes(scans))
@@ -0,0 +1,113 @@
+import pytest
+from app.utils.rate_limiter import RateLimitRule, InMemoryRateLimiter
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 1000.0
+    
+    def __call__(self):
+        return self.now
+
+
+@pytest.mark.asyncio
+async def test_token_bucket_limits_and_refills():
+    """Test bucket denies past capacity and refills over time"""
+    clock = FakeClock()
+    limiter = InMemoryRateLimiter(clock=clock)
+    rule = RateLimitRule("Minute", requests=3, period_seconds=60)
+    
+    for expected_remaining in (2, 1, 0):
+        allowed, remaining, _ = await limiter.hit("ip:1.2.3.4", rule)
+        assert allowed is True
+        assert remaining == expected_remaining
+    
+    allowed, _, retry_after = await limiter.hit("ip:1.2.3.4", rule)
+    assert allowed is False
+    assert retry_after == pytest.approx(20.0)
+    
+    # One token every 20 seconds
+    clock.now += 20
+    allowed, _, _ = await limiter.hit("ip:1.2.3.4", rule)
+    assert allowed is True
+    
+    # Other keys have their own bucket
+    allowed, _, _ = await limiter.hit("user:123456", rule)
+    assert allowed is True
+
+
+@pytest.mark.asyncio
+async def test_idle_keys_are_evicted():
+    """Test memory stays bounded by evicting least recently used keys"""
+    limiter = InMemoryRateLimiter(max_keys=100, clock=FakeClock())
+    rule = RateLimitRule("Minute", requests=1, period_seconds=60)
+    
+    await limiter.hit("ip:hot", rule)
+    
+    for i in range(500):
+        await limiter.hit(f"ip:10.0.{i // 256}.{i % 256}", rule)
+        # Keep one key recently used
+        if i % 50 == 0:
+            await limiter.hit("ip:hot", rule)
+    
+    assert len(limiter) == 100
+    
+    # Recently used key kept its (empty) bucket
+    allowed, _, _ = await limiter.hit("ip:hot", rule)
+    assert allowed is False
+
+
+@pytest.mark.asyncio
+async def test_rejected_request_spends_no_tokens():
+    """Test a request refused by one rule leaves the other buckets untouched"""
+    limiter = InMemoryRateLimiter(clock=FakeClock())
+    minute = RateLimitRule("Minute", requests=5, period_seconds=60)
+    hour = RateLimitRule("Hour", requests=1, period_seconds=3600)
+    
+    results = await limiter.hit_all("ip:1.2.3.4", [minute, hour])
+    assert [allowed for allowed, _, _ in results] == [True, True]
+    
+    for _ in range(3):
+        results = await limiter.hit_all("ip:1.2.3.4", [minute, hour])
+        assert [allowed for allowed, _, _ in results] == [True, False]
+    
+    # Only the first request was counted against the minute budget
+    allowed, remaining, _ = await limiter.hit("ip:1.2.3.4", minute)
+    assert allowed is True
+    assert remaining == 3
+
+
+@pytest.mark.asyncio
+async def test_middleware_keys_on_client_behind_trusted_proxy():
+    """Test forwarded addresses are used only when they come from a trusted proxy"""
+    from fastapi import FastAPI
+    from httpx import AsyncClient, ASGITransport
+    from app.middleware.rate_limit import RateLimitMiddleware
+    
+    app = FastAPI()
+    app.add_middleware(
+        RateLimitMiddleware,
+        route_rules=[],
+        rules=[RateLimitRule("Minute", requests=1, period_seconds=60)],
+        limiter=InMemoryRateLimiter(clock=FakeClock()),
+        trusted_proxies="10.0.0.0/8"
+    )
+    
+    @app.get("/ping")
+    async def ping():
+        return {"ok": True}
+    
+    async def get(peer: str, real_ip: str) -> int:
+        transport = ASGITransport(app=app, client=(peer, 1234))
+        async with AsyncClient(transport=transport, base_url="http://test") as client:
+            response = await client.get("/ping", headers={"X-Real-IP": real_ip})
+            return response.status_code
+    
+    # Two users behind the proxy get their own buckets
+    assert await get("10.0.0.2", "198.51.100.1") == 200
+    assert await get("10.0.0.2", "198.51.100.2") == 200
+    assert await get("10.0.0.2", "198.51.100.1") == 429
+    
+    # A direct client cannot pick its own key
+    assert await get("203.0.113.9", "198.51.100.3") == 200
+    assert await get("203.0.113.9", "198.51.100.4") == 429
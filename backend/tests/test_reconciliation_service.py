@@ -1,7 +1,9 @@
 import pytest
+from sqlalchemy import select
 from app.services.reconciliation_service import ReconciliationService
-from app.models.session import Session
-from datetime import datetime
+from app.services.price_timeline import price_timeline
+from app.models.session import Session, SessionReport
+from datetime import datetime, timedelta
 
 
 @pytest.mark.asyncio
@@ -60,12 +62,14 @@ async def test_reconcile_user_balance(db_session, mock_user):
     
     # Create completed session with earnings
     session = Session(
-        id="test_earnings_session",
+        session_id="test_earnings_session",
+        user_id=mock_user.id,
         telegram_id=mock_user.telegram_id,
         server_counted_mb=1024.0,
+        earned_usd=2.0,
         estimated_earnings=2.0,
         status="completed",
-        started_at=datetime.utcnow()
+        start_time=datetime.utcnow()
     )
     db_session.add(session)
     await db_session.commit()
@@ -75,3 +79,145 @@ async def test_reconcile_user_balance(db_session, mock_user):
     
     assert corrected is True
     assert mock_user.balance_usd > 0
+
+
+@pytest.mark.asyncio
+async def test_full_reconciliation_bulk_corrects_mismatches(db_session, mock_user):
+    """Test chunked reconciliation counts mismatches and bulk-corrects earnings"""
+    reconciliation_service = ReconciliationService(db_session)
+    reconciliation_service.BULK_CHUNK_SIZE = 2
+    
+    now = datetime.utcnow()
+    sessions = []
+    for i, (local_mb, server_mb) in enumerate([
+        (1000.0, 1002.0),  # within tolerance
+        (1000.0, 900.0),   # mismatch
+        (500.0, 500.0),    # exact
+        (200.0, 100.0),    # mismatch
+        (50.0, 51.0),      # within tolerance
+    ]):
+        session = Session(
+            session_id=f"bulk_session_{i}",
+            user_id=mock_user.id,
+            telegram_id=mock_user.telegram_id,
+            local_counted_mb=local_mb,
+            server_counted_mb=server_mb,
+            estimated_earnings=local_mb * 0.01,
+            # Paid from per-report accrual, except session 1 (no reports)
+            earned_usd=None if i == 1 else server_mb * 0.002,
+            status="completed",
+            start_time=now - timedelta(hours=2),
+            end_time=now - timedelta(hours=1)
+        )
+        db_session.add(session)
+        sessions.append(session)
+    await db_session.commit()
+    
+    results = await reconciliation_service.run_full_reconciliation()
+    
+    assert results["sessions_checked"] == 5
+    assert results["sessions_mismatch"] == 2
+    assert results["sessions_ok"] == 3
+    assert results["errors"] == []
+    
+    for session in sessions:
+        await db_session.refresh(session)
+    
+    expected = price_timeline.integrate(sessions[1].start_time, sessions[1].end_time, 900.0)
+    assert sessions[1].estimated_earnings == pytest.approx(expected)
+    
+    # Corrected to what the session was paid, not a re-spread over its span
+    assert sessions[3].estimated_earnings == pytest.approx(0.2)
+    
+    # Sessions within tolerance are left untouched
+    assert sessions[0].estimated_earnings == pytest.approx(10.0)
+
+
+async def _session_with_reports(db_session, mock_user, name, reports):
+    """Session plus (seconds after start, cumulative_mb, delta_mb) reports"""
+    start = datetime.utcnow() - timedelta(hours=1)
+    session = Session(
+        session_id=name,
+        user_id=mock_user.id,
+        telegram_id=mock_user.telegram_id,
+        start_time=start,
+        server_counted_mb=0.0
+    )
+    db_session.add(session)
+    await db_session.flush()
+    
+    for seconds, cumulative_mb, delta_mb in reports:
+        db_session.add(SessionReport(
+            session_id=session.id,
+            telegram_id=mock_user.telegram_id,
+            timestamp=start + timedelta(seconds=seconds),
+            cumulative_mb=cumulative_mb,
+            delta_mb=delta_mb
+        ))
+    
+    return session.id
+
+
+@pytest.mark.asyncio
+async def test_reconcile_session_reports_aggregates_in_sql(db_session, mock_user):
+    """Test deltas and cumulative-only reports are totalled, with counter resets flagged"""
+    session_pk = await _session_with_reports(db_session, mock_user, "report_session_1", [
+        (10, 5.0, 5.0),
+        (20, 0.0, 0.0),    # ignored
+        (30, 20.0, 0.0),   # cumulative only: +20
+        (40, 26.0, None),  # +6
+        (50, 4.0, 0.0),    # counter reset: +0
+        (60, 7.0, 0.0),    # +3
+        (70, 0.0, 2.5),
+    ])
+    await db_session.commit()
+    
+    reconciliation_service = ReconciliationService(db_session)
+    result = await reconciliation_service.reconcile_session_reports(session_pk)
+    
+    assert result["status"] == "reconciled"
+    assert result["reports_count"] == 7
+    assert result["total_mb"] == pytest.approx(36.5)
+    assert result["counter_resets"] == 1
+    assert result["negative_deltas"] == 0
+    
+    empty_pk = await _session_with_reports(db_session, mock_user, "report_reconcile_empty", [])
+    await db_session.commit()
+    assert (await reconciliation_service.reconcile_session_reports(empty_pk))["status"] == "no_reports"
+    
+    with pytest.raises(ValueError):
+        await reconciliation_service.reconcile_session_reports(999999)
+
+
+@pytest.mark.asyncio
+async def test_reconcile_session_reports_batch(db_session, mock_user):
+    """Test many sessions are reconciled with one aggregate and one update"""
+    first = await _session_with_reports(db_session, mock_user, "report_batch_1", [
+        (10, 10.0, 10.0),
+        (20, 15.0, 5.0),
+    ])
+    second = await _session_with_reports(db_session, mock_user, "report_batch_2", [
+        (10, 8.0, 0.0),
+        (20, 12.0, 0.0),
+        (30, 0.0, -1.0),
+    ])
+    empty = await _session_with_reports(db_session, mock_user, "report_batch_3", [])
+    await db_session.commit()
+    
+    reconciliation_service = ReconciliationService(db_session)
+    results = await reconciliation_service.reconcile_session_reports_batch([first, second, empty])
+    
+    assert results["sessions_checked"] == 3
+    assert results["sessions_reconciled"] == 2
+    assert results["sessions_changed"] == 2
+    assert results["negative_deltas"] == 1
+    
+    server_mb = await db_session.execute(
+        select(Session.id, Session.server_counted_mb)
+        .where(Session.id.in_([first, second, empty]))
+    )
+    assert dict(server_mb.all()) == {
+        first: pytest.approx(15.0),
+        second: pytest.approx(11.0),
+        empty: pytest.approx(0.0),
+    }
@@ -0,0 +1,147 @@
+import pytest
+import asyncio
+from sqlalchemy import select, func
+from app.services.report_ingestion_service import ReportIngestionService
+from app.models.session import Session, SessionReport
+
+
+@pytest.mark.asyncio
+async def test_buffered_reports_are_coalesced(db_session, mock_user):
+    """Test buffered reports flush as rows plus one coalesced counter update"""
+    ingestion = ReportIngestionService(flush_interval=60, max_batch=1000)
+    
+    session = Session(
+        session_id="ingest_session_1",
+        user_id=mock_user.id,
+        telegram_id=mock_user.telegram_id,
+        is_active=True,
+        server_counted_mb=0.0
+    )
+    db_session.add(session)
+    await db_session.commit()
+    
+    # Pretend the background loop is running so reports stay buffered
+    ingestion._task = asyncio.get_running_loop().create_future()
+    
+    for i in range(1, 4):
+        await ingestion.submit(
+            db_session,
+            session_id="ingest_session_1",
+            telegram_id=mock_user.telegram_id,
+            cumulative_mb=i * 10.0,
+            delta_mb=10.0
+        )
+    
+    assert ingestion.pending_count == 3
+    
+    flushed = await ingestion.flush(db_session)
+    
+    assert flushed == 3
+    assert ingestion.pending_count == 0
+    
+    await db_session.refresh(session)
+    assert session.server_counted_mb == pytest.approx(30.0)
+    assert session.sent_mb == pytest.approx(30.0)
+    
+    count_result = await db_session.execute(
+        select(func.count(SessionReport.id))
+        .where(SessionReport.session_id == session.id)
+    )
+    assert count_result.scalar() == 3
+
+
+@pytest.mark.asyncio
+async def test_submit_rejects_foreign_session(db_session, mock_user):
+    """Test reports for another user's session are rejected"""
+    ingestion = ReportIngestionService()
+    
+    session = Session(
+        session_id="ingest_session_2",
+        user_id=mock_user.id,
+        telegram_id=mock_user.telegram_id,
+        is_active=True
+    )
+    db_session.add(session)
+    await db_session.commit()
+    
+    with pytest.raises(ValueError):
+        await ingestion.submit(
+            db_session,
+            session_id="ingest_session_2",
+            telegram_id=999999,
+            cumulative_mb=1.0,
+            delta_mb=1.0
+        )
+
+
+@pytest.mark.asyncio
+async def test_late_reports_are_stored_and_credited(db_session, mock_user):
+    """Test reports buffered here for a session another worker completed are still paid"""
+    from app.models.user import User
+    from app.models.transaction import Transaction
+    
+    ingestion = ReportIngestionService(flush_interval=60, max_batch=1000)
+    
+    session = Session(
+        session_id="ingest_session_3",
+        user_id=mock_user.id,
+        telegram_id=mock_user.telegram_id,
+        is_active=True,
+        server_counted_mb=0.0
+    )
+    db_session.add(session)
+    await db_session.commit()
+    
+    ingestion._task = asyncio.get_running_loop().create_future()
+    
+    accepted = await ingestion.submit(
+        db_session,
+        session_id="ingest_session_3",
+        telegram_id=mock_user.telegram_id,
+        cumulative_mb=50.0,
+        delta_mb=50.0
+    )
+    
+    # Stopped and paid by another worker before this one flushed
+    balance_before = mock_user.balance_usd or 0.0
+    session.is_active = False
+    session.status = "completed"
+    await db_session.commit()
+    
+    assert await ingestion.flush(db_session) == 1
+    
+    await db_session.refresh(session)
+    assert session.server_counted_mb == pytest.approx(50.0)
+    
+    user = (await db_session.execute(
+        select(User).where(User.telegram_id == mock_user.telegram_id)
+    )).scalar_one()
+    await db_session.refresh(user)
+    assert user.balance_usd == pytest.approx(balance_before + accepted["current_earnings"])
+    
+    late = await db_session.execute(
+        select(func.count(Transaction.id))
+        .where(Transaction.telegram_id == mock_user.telegram_id)
+        .where(Transaction.description.like("%late reports"))
+    )
+    assert late.scalar() == 1
+    
+    # Session state is no longer cached
+    assert "ingest_session_3" not in ingestion._sessions
+
+
+def test_idle_sessions_are_evicted():
+    """Test cached sessions that stop reporting are dropped"""
+    ingestion = ReportIngestionService(session_idle=0.0)
+    ingestion._sessions["idle"] = (1, 1, 0.0, 0.0)
+    ingestion._last_seen["idle"] = 0.0
+    ingestion._sessions["busy"] = (2, 1, 0.0, 0.0)
+    ingestion._last_seen["busy"] = 0.0
+    ingestion._counters[2] = {"b_id": 2, "b_delta": 1.0}
+    
+    ingestion._evict_idle()
+    
+    assert "idle" not in ingestion._sessions
+    assert "idle" not in ingestion._last_seen
+    # Still has unflushed counters
+    assert "busy" in ingestion._sessions
@@ -0,0 +1,94 @@
+import pytest
+from datetime import datetime, timedelta
+from sqlalchemy import select, text
+from app.models.session import Session, SessionReport
+from app.services.report_partition_service import ReportPartitionService
+from app.services.reconciliation_service import ReconciliationService
+from app.utils.report_archive import ReportArchive
+
+
+@pytest.mark.asyncio
+async def test_ensure_partitions_routes_reports(db_session, mock_user):
+    """Test partitions are created ahead and reports land in their day"""
+    telegram_id, user_id = mock_user.telegram_id, mock_user.id
+    service = ReportPartitionService(db_session)
+    today = datetime.utcnow().date()
+    
+    created = await service.ensure_partitions(ahead_days=2)
+    assert created == [service.partition_name(today + timedelta(days=i)) for i in range(3)]
+    
+    # Idempotent
+    assert await service.ensure_partitions(ahead_days=2) == []
+    
+    session = Session(session_id="partitioned", user_id=user_id, telegram_id=telegram_id)
+    db_session.add(session)
+    await db_session.flush()
+    
+    db_session.add(SessionReport(
+        session_id=session.id,
+        telegram_id=telegram_id,
+        timestamp=datetime.utcnow() + timedelta(days=1),
+        delta_mb=1.0
+    ))
+    await db_session.commit()
+    
+    result = await db_session.execute(text("SELECT tableoid::regclass::text FROM session_reports"))
+    assert result.scalar() == service.partition_name(today + timedelta(days=1))
+
+
+@pytest.mark.asyncio
+async def test_drop_expired_partitions(db_session, mock_user, tmp_path):
+    """Test partitions past retention are archived, then dropped with their rows"""
+    telegram_id, user_id = mock_user.telegram_id, mock_user.id
+    archive = ReportArchive(str(tmp_path))
+    service = ReportPartitionService(db_session, archive=archive)
+    today = datetime.utcnow().date()
+    
+    await service.ensure_partitions(ahead_days=0, since=today - timedelta(days=5))
+    
+    session = Session(
+        session_id="expiring",
+        user_id=user_id,
+        telegram_id=telegram_id,
+        start_time=datetime.utcnow() - timedelta(days=5, minutes=1),
+        end_time=datetime.utcnow() - timedelta(days=1)
+    )
+    db_session.add(session)
+    await db_session.flush()
+    session_pk = session.id
+    
+    for days_ago, delta_mb in ((5, 1.5), (4, 2.25), (1, 4.0)):
+        db_session.add(SessionReport(
+            session_id=session_pk,
+            telegram_id=telegram_id,
+            timestamp=datetime.utcnow() - timedelta(days=days_ago),
+            delta_mb=delta_mb,
+            network_type="wifi"
+        ))
+    await db_session.commit()
+    
+    dropped = await service.drop_expired(retention_days=3)
+    
+    assert dropped == [
+        service.partition_name(today - timedelta(days=5)),
+        service.partition_name(today - timedelta(days=4)),
+    ]
+    assert len(await service.list_partitions()) == 4
+    
+    result = await db_session.execute(select(SessionReport))
+    assert len(result.scalars().all()) == 1
+    
+    assert archive.days() == [today - timedelta(days=5), today - timedelta(days=4)]
+    archived = archive.read_session(session_pk, today - timedelta(days=5), today)
+    assert [report.delta_mb for report in archived] == [1.5, 2.25]
+    assert archived[0].telegram_id == telegram_id
+    assert archived[0].network_type == "wifi"
+    
+    # Reconciliation reads the dropped days back from the archive
+    reconciliation_service = ReconciliationService(db_session)
+    reconciliation_service.archive = archive
+    
+    result = await reconciliation_service.reconcile_session_reports(session_pk)
+    
+    assert result["reports_count"] == 3
+    assert result["total_mb"] == pytest.approx(7.75)
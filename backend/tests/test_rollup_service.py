@@ -0,0 +1,84 @@
+import pytest
+from datetime import datetime, date, timedelta
+from app.services.rollup_service import RollupService
+from app.services.analytics_service import AnalyticsService
+from app.services.dashboard_service import DashboardService
+from app.models.session import Session
+from app.utils.helpers import Helpers
+
+
+def _session(session_id, user, start_time, minutes, used_mb, earned_usd, status="completed"):
+    return Session(
+        session_id=session_id,
+        user_id=user.id,
+        telegram_id=user.telegram_id,
+        start_time=start_time,
+        end_time=start_time + timedelta(minutes=minutes) if status == "completed" else None,
+        is_active=status == "active",
+        status=status,
+        sent_mb=used_mb,
+        server_counted_mb=used_mb,
+        earned_usd=earned_usd
+    )
+
+
+@pytest.mark.asyncio
+async def test_incremental_rollup_matches_rebuild(db_session, mock_user):
+    """Test session start/stop increments equal a rebuild from sessions"""
+    telegram_id = mock_user.telegram_id
+    rollup_service = RollupService(db_session)
+    now = datetime.utcnow().replace(hour=12, minute=0, second=0, microsecond=0)
+    
+    sessions = [
+        _session("s1", mock_user, now, 10, 100.0, 0.5),
+        _session("s2", mock_user, now, 30, 300.0, 1.5),
+        _session("s3", mock_user, now, 0, 0.0, 0.0, status="active"),
+    ]
+    for session in sessions:
+        db_session.add(session)
+        await rollup_service.record_session_started(session.telegram_id, session.start_time)
+        if session.status == "completed":
+            await rollup_service.record_session_completed(session)
+    await db_session.commit()
+    
+    days = await rollup_service.get_user_days(telegram_id, now.date())
+    incremental = RollupService.sum_days(days)
+    
+    assert incremental["sessions"] == 3
+    assert incremental["completed_sessions"] == 2
+    assert incremental["used_mb"] == pytest.approx(400.0)
+    assert incremental["earned_usd"] == pytest.approx(2.0)
+    assert incremental["duration_seconds"] == pytest.approx(2400.0)
+    
+    # The catch-up job rewrites the same numbers
+    await rollup_service.rebuild(now.date() - timedelta(days=1))
+    db_session.expire_all()
+    
+    days = await rollup_service.get_user_days(telegram_id, now.date())
+    assert RollupService.sum_days(days) == pytest.approx(incremental)
+    
+    analytics = await AnalyticsService(db_session).get_user_analytics(telegram_id, "week")
+    assert analytics["summary"]["total_sessions"] == 3
+    assert analytics["summary"]["completed_sessions"] == 2
+    assert analytics["summary"]["avg_duration"] == Helpers.format_duration(1200)
+    assert analytics["summary"]["avg_speed_mb_s"] == pytest.approx(round(400 / 2400, 2))
+    assert analytics["daily_breakdown"][0]["date"] == now.date().isoformat()
+
+
+@pytest.mark.asyncio
+async def test_rebuild_repairs_missed_days(db_session, mock_user):
+    """Test rebuild fills sessions that never reached the rollup"""
+    telegram_id = mock_user.telegram_id
+    today = datetime.combine(date.today(), datetime.min.time()) + timedelta(hours=1)
+    
+    db_session.add(_session("old", mock_user, today - timedelta(days=1), 5, 50.0, 0.25))
+    db_session.add(_session("new", mock_user, today, 5, 80.0, 0.75))
+    await db_session.commit()
+    
+    rows = await RollupService(db_session).rebuild(date.today() - timedelta(days=1))
+    assert rows == 2
+    
+    stats = await DashboardService(db_session)._get_rollup_stats(telegram_id)
+    assert stats["total_sessions"] == 2
+    assert stats["today"] == pytest.approx(0.75)
+    assert stats["month"] >= stats["today"]
@@ -0,0 +1,108 @@
+import pytest
+import asyncio
+from app.services.telegram_dispatcher import (
+    TelegramDispatcher,
+    MockTelegramTransport,
+    PRIORITY_ADMIN,
+    PRIORITY_USER,
+)
+
+
+@pytest.mark.asyncio
+async def test_per_chat_pacing_avoids_flood_errors():
+    """Test a burst to one chat is paced instead of hitting 429s"""
+    transport = MockTelegramTransport(chat_interval=0.05)
+    dispatcher = TelegramDispatcher(bot_token="test", chat_interval=0.05, transport=transport)
+    
+    results = await asyncio.gather(*(
+        dispatcher.send("sendMessage", {"chat_id": 1, "text": str(i)})
+        for i in range(4)
+    ))
+    await dispatcher.close()
+    
+    assert results == [True] * 4
+    assert transport.rejected == 0
+    assert [payload["text"] for _, payload in transport.sent] == ["0", "1", "2", "3"]
+
+
+@pytest.mark.asyncio
+async def test_admin_messages_jump_the_queue():
+    """Test queued admin alerts are sent before waiting user notices"""
+    transport = MockTelegramTransport(messages_per_second=1000)
+    dispatcher = TelegramDispatcher(bot_token="test", workers=1, transport=transport)
+    
+    users = [
+        dispatcher.enqueue("sendMessage", {"chat_id": chat_id, "text": "user"}, PRIORITY_USER)
+        for chat_id in range(100, 105)
+    ]
+    admin = dispatcher.enqueue("sendMessage", {"chat_id": 1, "text": "admin"}, PRIORITY_ADMIN)
+    
+    await asyncio.gather(admin, *users)
+    await dispatcher.close()
+    
+    assert [payload["text"] for _, payload in transport.sent] == ["admin"] + ["user"] * 5
+
+
+@pytest.mark.asyncio
+async def test_retry_after_is_honoured():
+    """Test a 429 pauses sending for retry_after and the message is retried"""
+    transport = MockTelegramTransport()
+    transport.fail_next = [429]
+    transport.retry_after = 0.05
+    dispatcher = TelegramDispatcher(bot_token="test", chat_interval=0.05, transport=transport)
+    
+    loop = asyncio.get_running_loop()
+    started = loop.time()
+    sent = await dispatcher.send("sendMessage", {"chat_id": 7, "text": "hi"})
+    await dispatcher.close()
+    
+    assert sent is True
+    assert loop.time() - started >= 0.05
+    assert len(transport.sent) == 1
+
+
+@pytest.mark.asyncio
+async def test_failed_call_resolves_and_worker_survives():
+    """Test a call that raises resolves to False and later messages still go out"""
+    transport = MockTelegramTransport()
+    dispatcher = TelegramDispatcher(bot_token="test", workers=1, transport=transport)
+    
+    bad = await asyncio.wait_for(
+        dispatcher.send("sendMessage", {"chat_id": 1, "text": object()}),
+        timeout=1.0
+    )
+    good = await asyncio.wait_for(
+        dispatcher.send("sendMessage", {"chat_id": 2, "text": "hi"}),
+        timeout=1.0
+    )
+    await dispatcher.close()
+    
+    assert bad is False
+    assert good is True
+    assert len(transport.sent) == 1
+
+
+@pytest.mark.asyncio
+async def test_global_budget_shared_between_dispatchers():
+    """Test dispatchers given one global limiter share a single flood budget"""
+    from app.utils.rate_limiter import InMemoryRateLimiter
+    
+    transport = MockTelegramTransport(messages_per_second=1000)
+    shared = InMemoryRateLimiter()
+    dispatchers = [
+        TelegramDispatcher(bot_token="test", messages_per_second=4, transport=transport, global_limiter=shared)
+        for _ in range(2)
+    ]
+    
+    loop = asyncio.get_running_loop()
+    started = loop.time()
+    results = await asyncio.gather(*(
+        dispatchers[i % 2].send("sendMessage", {"chat_id": i, "text": str(i)})
+        for i in range(8)
+    ))
+    for dispatcher in dispatchers:
+        await dispatcher.close()
+    
+    assert results == [True] * 8
+    # Separate budgets would send all 8 at once; shared, 4 wait for refill at 4/s
+    assert loop.time() - started >= 0.9
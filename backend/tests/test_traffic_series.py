@@ -0,0 +1,87 @@
+import pytest
+from datetime import datetime, timedelta
+from sqlalchemy import select, func
+from app.models.session import Session
+from app.models.traffic_series import SessionTrafficBucket
+from app.services.traffic_series_service import TrafficSeriesService
+from app.utils.downsampling import lttb
+
+
+def test_lttb_keeps_shape():
+    """Test LTTB bounds the points, keeps both ends and the spike"""
+    points = [(float(x), 1.0) for x in range(1000)]
+    points[500] = (500.0, 50.0)
+    
+    selected = lttb(points, 20)
+    
+    assert len(selected) == 20
+    assert selected[0] == 0 and selected[-1] == 999
+    assert 500 in selected
+    assert selected == sorted(selected)
+    assert lttb(points[:10], 20) == list(range(10))
+
+
+@pytest.mark.asyncio
+async def test_series_reads_bounded_buckets(db_session, mock_user):
+    """Test reports fold into buckets and the chart picks a coarse enough resolution"""
+    telegram_id, user_id = mock_user.telegram_id, mock_user.id
+    start = datetime(2026, 1, 1, 12, 0, 0)
+    
+    session = Session(
+        session_id="series_session",
+        user_id=user_id,
+        telegram_id=telegram_id,
+        start_time=start,
+        end_time=start + timedelta(hours=1)
+    )
+    db_session.add(session)
+    await db_session.flush()
+    session_pk = session.id
+    
+    service = TrafficSeriesService(db_session)
+    
+    # An hour of reports every 2 seconds, flushed in two batches
+    reports = [
+        {
+            "session_id": session_pk,
+            "timestamp": start + timedelta(seconds=2 * i),
+            "delta_mb": 0.5,
+            "speed_mb_s": float(i % 30),
+        }
+        for i in range(1800)
+    ]
+    await service.record_reports(reports[:1000])
+    await service.record_reports(reports[1000:])
+    await db_session.commit()
+    
+    totals = await db_session.execute(
+        select(
+            SessionTrafficBucket.resolution,
+            func.count(),
+            func.sum(SessionTrafficBucket.reports),
+            func.sum(SessionTrafficBucket.delta_mb),
+        )
+        .group_by(SessionTrafficBucket.resolution)
+        .order_by(SessionTrafficBucket.resolution)
+    )
+    assert [tuple(row) for row in totals.all()] == [
+        (10, 360, 1800, 900.0),
+        (60, 60, 1800, 900.0),
+        (900, 4, 1800, 900.0),
+    ]
+    
+    result = await db_session.execute(select(Session).where(Session.id == session_pk))
+    series = await service.get_series(result.scalar_one(), points=50)
+    
+    assert series["resolution_seconds"] == 60
+    assert series["buckets"] == 60
+    assert len(series["points"]) == 50
+    
+    first = series["points"][0]
+    assert first["reports"] == 30
+    assert first["min_speed_mb_s"] == 0.0
+    assert first["max_speed_mb_s"] == 29.0
+    assert first["avg_speed_mb_s"] == pytest.approx(14.5)
+    
+    with pytest.raises(ValueError):
+        await service.get_series(session, start=start, end=start, points=50)
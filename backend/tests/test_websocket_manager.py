@@ -0,0 +1,147 @@
+import pytest
+import asyncio
+import json
+from app.services.websocket_manager import WebSocketManager
+
+
+class FakeWebSocket:
+    """Socket whose sends block until the gate is opened"""
+    
+    def __init__(self):
+        self.gate = asyncio.Event()
+        self.sent = []
+        self.closed_with = None
+    
+    async def accept(self):
+        pass
+    
+    async def send_text(self, message):
+        await self.gate.wait()
+        self.sent.append(json.loads(message))
+    
+    async def close(self, code=1000):
+        self.closed_with = code
+
+
+@pytest.mark.asyncio
+async def test_slow_client_gets_latest_session_update():
+    """Test stale session updates are coalesced for a blocked socket"""
+    manager = WebSocketManager(max_queue=10)
+    websocket = FakeWebSocket()
+    
+    await manager.connect(websocket, telegram_id=123456)
+    await asyncio.sleep(0)
+    
+    for mb in range(1, 11):
+        message = json.dumps({"type": "session_update", "session_id": "s1", "mb_sent": mb})
+        manager.deliver_local(123456, message)
+    manager.deliver_local(123456, json.dumps({"type": "balance_update", "new_balance": 1.0}))
+    
+    websocket.gate.set()
+    await asyncio.sleep(0.01)
+    
+    assert [m["type"] for m in websocket.sent] == ["connected", "session_update", "balance_update"]
+    assert websocket.sent[1]["mb_sent"] == 10
+    
+    manager.disconnect(websocket, 123456)
+    assert not manager.is_user_connected(123456)
+
+
+@pytest.mark.asyncio
+async def test_broadcast_drops_client_with_full_queue():
+    """Test a client that cannot keep up is disconnected instead of buffering forever"""
+    manager = WebSocketManager(max_queue=2)
+    slow, fast = FakeWebSocket(), FakeWebSocket()
+    fast.gate.set()
+    
+    await manager.connect(slow, telegram_id=1)
+    await manager.connect(fast, telegram_id=2)
+    await asyncio.sleep(0)
+    
+    for i in range(3):
+        manager.deliver_local(None, json.dumps({"type": "price_update", "price_per_gb": i}))
+        await asyncio.sleep(0.01)
+    
+    assert not manager.is_user_connected(1)
+    assert slow.closed_with == 1013
+    assert [m["type"] for m in fast.sent] == ["connected"] + ["price_update"] * 3
+    
+    await manager.stop()
+
+
+@pytest.mark.asyncio
+async def test_session_stream_is_throttled_to_latest_update():
+    """Test session stream sends at most one update per interval, newest wins"""
+    manager = WebSocketManager(session_max_rate=20)
+    websocket = FakeWebSocket()
+    websocket.gate.set()
+    
+    await manager.connect_session(websocket, "s1", telegram_id=123456)
+    
+    for mb in range(1, 6):
+        message = json.dumps({"type": "session_update", "session_id": "s1", "server_counted_mb": mb})
+        manager.deliver_session_local("s1", message)
+        await asyncio.sleep(0.001)
+    
+    await asyncio.sleep(0.1)
+    
+    assert [m["server_counted_mb"] for m in websocket.sent] == [1, 5]
+    
+    manager.disconnect_session(websocket, "s1")
+    assert "s1" not in manager.session_connections
+    
+    await manager.stop()
+
+
+class FakePubSub:
+    """Pub/sub whose first subscribe blocks until released"""
+    
+    def __init__(self):
+        self.release = asyncio.Event()
+        self.channels = set()
+    
+    async def subscribe(self, *channels):
+        if not self.channels:
+            await self.release.wait()
+        self.channels.update(channels)
+    
+    async def listen(self):
+        await asyncio.Event().wait()
+        yield
+    
+    async def aclose(self):
+        pass
+
+
+class FakeRedis:
+    def __init__(self, pubsub):
+        self._pubsub = pubsub
+    
+    def pubsub(self):
+        return self._pubsub
+    
+    async def aclose(self):
+        pass
+
+
+@pytest.mark.asyncio
+async def test_connect_during_listener_subscribe_is_not_lost(monkeypatch):
+    """Test a socket that connects while the listener subscribes still gets its channel"""
+    from app.services import websocket_manager as module
+    
+    pubsub = FakePubSub()
+    monkeypatch.setattr(module.redis, "from_url", lambda *args, **kwargs: FakeRedis(pubsub))
+    
+    manager = WebSocketManager()
+    await manager.start()
+    await asyncio.sleep(0)
+    
+    # Listener is waiting on its initial subscribe
+    await manager.connect_session(FakeWebSocket(), "s1", telegram_id=123456)
+    
+    pubsub.release.set()
+    await asyncio.sleep(0.01)
+    
+    assert manager.SESSION_CHANNEL.format("s1") in pubsub.channels
+    
+    await manager.stop()